@@ -0,0 +1,57 @@
+"""
+Acesso ao banco a partir de views assíncronas que ficam abertas (long-poll, SSE).
+
+Sob ASGI, cada requisição roda o ORM numa thread própria, e a conexão dessa
+thread só é fechada quando a requisição termina: mil clientes esperando seriam
+mil conexões abertas. ``consultar`` usa em vez disso um pool fixo de threads por
+processo, cada uma com sua conexão persistente.
+
+Configuração (settings): ``LONG_POLL_DB_THREADS`` (0 = thread da requisição,
+como as demais views; usado nos testes, cujos dados só existem na transação da
+thread principal).
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import InterfaceError, OperationalError, connection
+
+# Pool fixo de threads (e conexões) para as consultas das esperas, um por processo
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def _pool_do_processo(threads: int) -> ThreadPoolExecutor:
+    global _pool, _pool_pid
+    with _pool_lock:
+        # Após um fork (workers do gunicorn) as threads do processo pai não existem no filho
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='async-db')
+            _pool_pid = os.getpid()
+        return _pool
+
+
+async def consultar(func, *args):
+    """Roda ``func`` (ORM síncrono) num pool fixo de LONG_POLL_DB_THREADS threads.
+
+    Cada thread mantém a sua conexão aberta entre consultas: milhares de esperas
+    usam no máximo LONG_POLL_DB_THREADS conexões, e acordar todas de uma vez não
+    abre uma conexão por requisição. Com 0, roda na thread da requisição como as
+    demais views (testes, cujos dados só existem na transação da thread principal).
+    """
+    threads = settings.LONG_POLL_DB_THREADS
+    if not threads:
+        return await sync_to_async(func)(*args)
+
+    def executar():
+        try:
+            return func(*args)
+        except (InterfaceError, OperationalError):
+            # Conexão perdida (banco reiniciado): a próxima consulta desta thread reconecta
+            connection.close()
+            raise
+
+    return await sync_to_async(executar, thread_sensitive=False, executor=_pool_do_processo(threads))()
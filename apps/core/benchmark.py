@@ -0,0 +1,86 @@
+"""
+Apoio aos benchmarks de conexões ASGI abertas (long-poll, SSE).
+
+Sobe o próprio projeto num servidor uvicorn, numa thread do processo do
+comando, para que os clientes simulados (asyncio, sockets crus) falem HTTP de
+verdade com o servidor, e conta as consultas SQL que o processo inteiro
+(servidor e gravações do benchmark) executa.
+"""
+import resource
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.asgi import get_asgi_application
+from django.core.management.base import CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from apps.core.desconexao import CancelarAoDesconectar
+
+
+def elevar_limite_de_arquivos(conexoes: int):
+    """Sobe o limite de descritores ao máximo permitido; cada conexão usa dois (cliente e servidor)."""
+    _, limite = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (limite, limite))
+    if limite < conexoes * 2 + 100:
+        raise CommandError(f"Limite de arquivos abertos ({limite}) insuficiente para {conexoes} conexões")
+
+
+@contextmanager
+def servidor_asgi(porta: int, conexoes: int):
+    try:
+        import uvicorn
+    except ImportError:
+        raise CommandError("uvicorn não instalado")
+
+    servidor = uvicorn.Server(uvicorn.Config(
+        CancelarAoDesconectar(get_asgi_application()), host='127.0.0.1', port=porta,
+        log_level='warning', lifespan='off', backlog=conexoes, timeout_keep_alive=5,
+    ))
+    servidor.install_signal_handlers = lambda: None
+    thread = threading.Thread(target=servidor.run, daemon=True)
+    thread.start()
+    try:
+        while not servidor.started:
+            time.sleep(0.05)
+        yield servidor
+    finally:
+        servidor.should_exit = True
+        thread.join(timeout=10)
+
+
+class _ContadorDeConsultas:
+    """execute_wrapper instalado em todas as conexões do processo, de qualquer thread."""
+
+    def __init__(self):
+        self.total = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        with self._lock:
+            self.total += 1
+        return execute(sql, params, many, context)
+
+
+_contador = _ContadorDeConsultas()
+
+
+def _instalar_contador(sender, connection, **kwargs):
+    if _contador not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_contador)
+
+
+connection_created.connect(_instalar_contador)
+
+
+def consultas_executadas() -> int:
+    """Total de consultas SQL executadas pelo processo desde o import deste módulo."""
+    # Conexões já abertas antes do import (thread principal)
+    for conexao in connections.all():
+        _instalar_contador(None, conexao)
+    return _contador.total
+
+
+def rss_maximo_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
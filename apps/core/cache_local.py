@@ -0,0 +1,78 @@
+"""
+Caches por processo de lookups muito repetidos (CNPJ -> parceiro/empresa), invalidados pelo pub/sub.
+
+Numa carga em lote o mesmo CNPJ aparece milhares de vezes; cada worker guarda
+as últimas resoluções num ``LRUCache`` e só vai ao banco na primeira. Quem grava
+a origem chama ``avisar_alteracao``: o ``pg_notify`` sai no commit e cada
+processo descarta a chave (dados vazios descartam tudo, como na reconexão do
+listener). Entre o commit e a entrega do aviso, outro processo ainda pode ler
+o valor antigo; o TTL limita a defasagem se o aviso se perder.
+"""
+import copy
+from typing import Any, Callable, Hashable
+
+from django.db import transaction
+
+from apps.core.lru import LRUCache
+from apps.core.metrics import record_cache
+from apps.core.pubsub import notificar, pubsub
+
+AUSENTE = object()
+
+
+def avisar_alteracao(canal: str, chave_pubsub: str, dados: str = ''):
+    """Invalida ``dados`` (ou tudo, se vazio) nos caches de todos os processos, após o commit."""
+    # Outros processos: NOTIFY sai no commit; este processo: publicação local, sem depender do listener
+    notificar(canal, [chave_pubsub], dados)
+    transaction.on_commit(lambda: pubsub.publicar(canal, chave_pubsub, dados))
+
+
+class CacheLocal:
+    """
+    ``LRUCache`` nomeado (métrica ``gestao_cache_requests_total{cache=nome}``) que escuta
+    ``(canal, chave_pubsub)``; ``converter`` transforma os dados do aviso na chave do cache.
+    """
+
+    def __init__(self, nome: str, canal: str, chave_pubsub: str, maxsize: int, ttl: float,
+                 converter: Callable[[str], Hashable] = str):
+        self.nome = nome
+        self.canal = canal
+        self.chave_pubsub = chave_pubsub
+        self.converter = converter
+        self.cache = LRUCache(maxsize=maxsize, ttl=ttl)
+        self._invalidacoes = None
+
+    def get(self, chave: Hashable) -> Any:
+        """Cópia do valor em cache (instâncias são compartilhadas entre threads) ou ``AUSENTE``."""
+        valor = self.cache.get(chave, AUSENTE)
+        record_cache(self.nome, valor is not AUSENTE)
+        return valor if valor is AUSENTE else copy.copy(valor)
+
+    @property
+    def geracao(self) -> int:
+        return self.cache.geracao
+
+    def guardar(self, chave: Hashable, valor: Any, geracao: int):
+        """Guarda após o commit, se nada foi invalidado desde ``geracao`` (lida antes de consultar o banco).
+
+        Um valor gravado numa transação desfeita nunca entra no cache.
+        """
+        def _guardar():
+            if self.cache.maxsize and geracao == self.cache.geracao:
+                self._escutar_invalidacoes()
+                self.cache.set(chave, copy.copy(valor))
+        transaction.on_commit(_guardar)
+
+    def invalidar(self, dados: str):
+        """Callback do pub/sub."""
+        if not dados:
+            self.cache.clear()
+        else:
+            self.cache.pop(self.converter(dados))
+
+    def _escutar_invalidacoes(self):
+        if self._invalidacoes is None:
+            self._invalidacoes = pubsub.assinar_callback(self.canal, self.chave_pubsub, self.invalidar)
+        elif pubsub.listener is not None:
+            # Após um fork o processo filho precisa do próprio listener
+            pubsub.listener.escutar(self.canal)
@@ -0,0 +1,133 @@
+"""
+Normalização e validação (dígitos verificadores) de CNPJ.
+
+Caminho escalar, em Python puro, para o CNPJ de cada nota/requisição, e
+caminho em lote, vetorizado com NumPy, para importações e varreduras de
+qualidade de dados com milhões de CNPJs (``validar_lote``). Os dois
+concordam em todas as entradas; ``manage.py benchmark_cnpj`` compara os
+custos.
+
+Só CNPJs numéricos: ``cnpj_numero`` (chave de ``MinhaEmpresa`` e
+``EmpresaNaoClassificada``) é um inteiro de 14 dígitos.
+"""
+import re
+from operator import mul
+from typing import Optional, Sequence, Tuple, Union
+
+_NAO_DIGITOS = re.compile(r'[^0-9]')
+_PESOS_1 = (5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2)
+_PESOS_2 = (6,) + _PESOS_1
+_LIMITE = 10 ** 14
+
+Cnpj = Union[str, int, None]
+
+
+def somente_digitos(texto: Optional[str]) -> str:
+    """Remove pontuação (e qualquer outro caractere que não seja dígito ASCII)."""
+    if not texto:
+        return ''
+    # Caso comum (00.000.000/0000-00): replace é bem mais barato que a regex
+    digitos = texto.replace('.', '').replace('/', '').replace('-', '')
+    return digitos if digitos.isascii() and digitos.isdigit() else _NAO_DIGITOS.sub('', texto)
+
+
+def cnpj_para_numero(cnpj: Cnpj) -> Optional[int]:
+    """Converte CNPJ string para número inteiro (``None`` sem dígitos); inteiros passam direto."""
+    if not cnpj:
+        return None
+    if isinstance(cnpj, int):
+        return cnpj
+    digitos = somente_digitos(cnpj)
+    return int(digitos) if digitos else None
+
+
+def normalizar(cnpj: Cnpj) -> Optional[str]:
+    """Os 14 dígitos do CNPJ (inteiros ganham os zeros à esquerda), ou ``None`` se não forem 14."""
+    if isinstance(cnpj, int):
+        return f'{cnpj:014d}' if 0 <= cnpj < _LIMITE else None
+    digitos = somente_digitos(cnpj)
+    return digitos if len(digitos) == 14 else None
+
+
+def _digito(codigos: bytes, pesos: Tuple[int, ...]) -> int:
+    # Soma sobre os códigos ASCII, descontando ord('0') de cada termo; map para no fim
+    # de ``pesos``: considera só os 12 (ou 13) primeiros dígitos
+    resto = (sum(map(mul, codigos, pesos)) - ord('0') * sum(pesos)) % 11
+    return 0 if resto < 2 else 11 - resto
+
+
+def validar(cnpj: Cnpj) -> bool:
+    """14 dígitos, dígitos verificadores corretos e não todos iguais (``00.000.000/0000-00`` passa no cálculo)."""
+    digitos = normalizar(cnpj)
+    if digitos is None or digitos == digitos[0] * 14:
+        return False
+    codigos = digitos.encode('ascii')
+    return (
+        codigos[12] - ord('0') == _digito(codigos, _PESOS_1)
+        and codigos[13] - ord('0') == _digito(codigos, _PESOS_2)
+    )
+
+
+def validar_lote(cnpjs: Sequence[Cnpj], lote: int = 1_000_000):
+    """
+    ``(numeros, validos)``: arrays NumPy (int64 e bool) alinhados à entrada.
+
+    ``numeros`` traz o ``cnpj_numero`` de cada entrada com 14 dígitos (0 nas
+    demais); ``validos`` é ``validar`` aplicado a cada uma. Aceita strings
+    formatadas ou não, inteiros e ``None``, ou um array de inteiros. Processa
+    ``lote`` entradas por vez para limitar as matrizes intermediárias.
+    """
+    import numpy as np
+
+    numeros, validos = [], []
+    for inicio in range(0, len(cnpjs), lote):
+        parte = cnpjs[inicio:inicio + lote]
+        if isinstance(parte, np.ndarray) and parte.dtype.kind in 'iu':
+            digitos, presentes = _digitos_de_inteiros(np, parte)
+        else:
+            digitos, presentes = _digitos_de_textos(np, parte)
+        numero, valido = _verificar(np, digitos, presentes)
+        numeros.append(numero)
+        validos.append(valido)
+    if not numeros:
+        return np.zeros(0, np.int64), np.zeros(0, bool)
+    return np.concatenate(numeros), np.concatenate(validos)
+
+
+def _digitos_de_inteiros(np, inteiros):
+    inteiros = inteiros.astype(np.int64)
+    presentes = (inteiros >= 0) & (inteiros < _LIMITE)
+    digitos = (np.where(presentes, inteiros, 0)[:, None] // 10 ** np.arange(13, -1, -1)) % 10
+    return digitos.astype(np.int8), presentes
+
+
+def _digitos_de_textos(np, textos):
+    textos = np.array(
+        ['' if c is None else f'{c:014d}' if isinstance(c, int) else c for c in textos], dtype=str,
+    )
+    digitos = np.zeros((len(textos), 14), np.int8)
+    if textos.dtype.itemsize == 0:
+        # Todas as entradas vazias
+        return digitos, np.zeros(len(textos), bool)
+
+    # Strings de largura fixa em UTF-32: cada caractere vira uma coluna de código (sem sinal:
+    # abaixo de '0' dá a volta e fica >= 10)
+    valores = textos.view(np.uint32).reshape(len(textos), -1) - ord('0')
+    eh_digito = valores < 10
+    presentes = np.count_nonzero(eh_digito, axis=1) == 14
+    # A máscara percorre linha a linha: 14 dígitos por linha escolhida, na ordem do texto
+    digitos[presentes] = valores[eh_digito & presentes[:, None]].reshape(-1, 14)
+    return digitos, presentes
+
+
+def _verificar(np, digitos, presentes):
+    def digito(soma):
+        resto = soma % 11
+        return np.where(resto < 2, 0, 11 - resto)
+
+    dv1 = digito(digitos[:, :12] @ np.array(_PESOS_1, np.int64))
+    dv2 = digito(digitos[:, :13] @ np.array(_PESOS_2, np.int64))
+    repetidos = (digitos == digitos[:, :1]).all(axis=1)
+    validos = presentes & ~repetidos & (digitos[:, 12] == dv1) & (digitos[:, 13] == dv2)
+    numeros = np.where(presentes, digitos @ 10 ** np.arange(13, -1, -1, dtype=np.int64), 0)
+    return numeros, validos
@@ -0,0 +1,55 @@
+"""
+Cancela a view quando o cliente desconecta (long-poll, SSE).
+
+O ASGIHandler do Django 4.2 lê o corpo e não escuta mais ``receive``; o
+uvicorn descarta em silêncio o que se envia depois da desconexão. Um stream
+SSE ou uma espera longa de um cliente que já foi embora seguiria vivo, com a
+assinatura do pub/sub, até o fim da janela (``SSE_MAX_DURATION``). Este
+wrapper faz o que o Django 5 passou a fazer: escuta ``http.disconnect`` e
+cancela a tarefa da requisição, e o ``CancelledError`` fecha o gerador da
+resposta (``with pubsub.assinatura`` libera a assinatura).
+
+Só vale para GET/HEAD: o corpo (vazio) é lido aqui e repassado ao Django;
+uploads seguem direto para o handler, sem passar por memória.
+"""
+import asyncio
+
+
+class CancelarAoDesconectar:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['method'] not in ('GET', 'HEAD'):
+            return await self.app(scope, receive, send)
+
+        mensagens = []
+        while not mensagens or mensagens[-1].get('more_body'):
+            mensagem = await receive()
+            if mensagem['type'] == 'http.disconnect':
+                return
+            mensagens.append(mensagem)
+        desconectou = asyncio.get_running_loop().create_future()
+
+        async def repassar():
+            return mensagens.pop(0) if mensagens else await asyncio.shield(desconectou)
+
+        async def escutar():
+            while (mensagem := await receive())['type'] != 'http.disconnect':
+                pass
+            desconectou.set_result(mensagem)
+
+        requisicao = asyncio.ensure_future(self.app(scope, repassar, send))
+        escuta = asyncio.ensure_future(escutar())
+        try:
+            await asyncio.wait({requisicao, escuta}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            escuta.cancel()
+            if not requisicao.done():
+                requisicao.cancel()
+                try:
+                    await requisicao
+                except asyncio.CancelledError:
+                    pass
+        if not requisicao.cancelled():
+            requisicao.result()
@@ -0,0 +1,143 @@
+"""
+Entrega assíncrona de eventos de observers, fora da transação de quem emite.
+
+``Subject.notify`` chama na hora os observers ``delivery = 'sync'`` (que precisam
+da transação, como os agregados por delta) e publica aqui os ``'async'``. A
+publicação só entra na fila após o commit (``transaction.on_commit``); se a
+transação for desfeita, o evento é descartado junto. Um consumidor em thread
+daemon, um por processo, drena a fila em lotes e entrega a cada observer os
+seus eventos de uma vez (``Observer.update_batch``).
+
+A entrega é "no máximo uma vez": eventos ainda na fila quando o processo morre
+se perdem. Por isso só observers de efeitos colaterais toleráveis (notificações,
+alertas, logs) devem ser assíncronos. A fila é esvaziada no ``atexit`` e, nos
+workers do Celery, ao fim de cada tarefa (``task_postrun``) e no encerramento
+do processo filho (``worker_process_shutdown``): os filhos do prefork saem com
+``os._exit``, sem passar pelo ``atexit``.
+
+Configuração (settings): ``EVENT_BUS_ENABLED`` (False = todos os observers
+síncronos, como antes), ``EVENT_BUS_BATCH_SIZE`` e ``EVENT_BUS_FLUSH_INTERVAL``
+(segundos que o consumidor espera para completar um lote).
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, List, NamedTuple
+
+from celery.signals import task_postrun, worker_process_shutdown
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from apps.core.metrics import EVENT_BUS_BATCH_SIZE, OBSERVER_DURATION
+
+logger = logging.getLogger(__name__)
+
+
+class Evento(NamedTuple):
+    observer: Any
+    subject: Any
+    event_type: str
+    kwargs: dict
+
+
+def entregar(observer, eventos: List[Evento], modo: str):
+    """Chama o observer com seus eventos, medindo o tempo; erros são registrados e engolidos."""
+    inicio = time.perf_counter()
+    status = 'ok'
+    try:
+        observer.update_batch([(e.subject, e.event_type, e.kwargs) for e in eventos])
+    except Exception as e:
+        status = 'error'
+        logger.exception("Observer error: %s", e)
+    finally:
+        OBSERVER_DURATION.labels(
+            observer=type(observer).__name__, mode=modo, status=status,
+        ).observe(time.perf_counter() - inicio)
+
+
+class EventBus:
+    def __init__(self, batch_size: int = 100, flush_interval: float = 0.5, background: bool = True):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # background=False: nada consome a fila sozinho, só flush() (testes)
+        self.background = background
+        self._queue: "queue.Queue[Evento]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def publish(self, observer, subject, event_type: str, kwargs: dict):
+        evento = Evento(observer, subject, event_type, kwargs)
+        transaction.on_commit(lambda: self._enqueue(evento))
+
+    def _enqueue(self, evento: Evento):
+        self._queue.put(evento)
+        if self.background:
+            self._ensure_consumer()
+
+    def _ensure_consumer(self):
+        # Após um fork (prefork do Celery, gunicorn) a thread do processo pai não existe no filho
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive() or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='event-bus', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            lote = [self._queue.get()]
+            limite = time.monotonic() + self.flush_interval
+            while len(lote) < self.batch_size:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    lote.append(self._queue.get(timeout=restante))
+                except queue.Empty:
+                    break
+            self._deliver(lote)
+
+    def flush(self):
+        """Entrega na thread atual tudo o que estiver na fila (encerramento do processo, testes)."""
+        lote = []
+        while True:
+            try:
+                lote.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if lote:
+            self._deliver(lote)
+
+    def _deliver(self, lote: List[Evento]):
+        EVENT_BUS_BATCH_SIZE.observe(len(lote))
+        # Agrupa por observer mantendo a ordem dos eventos de cada um
+        por_observer: "OrderedDict[int, List[Evento]]" = OrderedDict()
+        for evento in lote:
+            por_observer.setdefault(id(evento.observer), []).append(evento)
+        close_old_connections()
+        try:
+            for eventos in por_observer.values():
+                entregar(eventos[0].observer, eventos, 'async')
+        finally:
+            close_old_connections()
+
+
+event_bus = EventBus(
+    batch_size=getattr(settings, 'EVENT_BUS_BATCH_SIZE', 100),
+    flush_interval=getattr(settings, 'EVENT_BUS_FLUSH_INTERVAL', 0.5),
+)
+
+
+def _flush(**kwargs):
+    event_bus.flush()
+
+
+atexit.register(_flush)
+task_postrun.connect(_flush, weak=False)
+worker_process_shutdown.connect(_flush, weak=False)
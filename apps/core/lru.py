@@ -0,0 +1,89 @@
+"""
+Cache LRU em memória do processo, com expiração por entrada.
+
+Para valores pequenos e muito lidos que cada worker pode manter sozinho
+(principal do JWT, lookups de CNPJ), onde ir ao cache compartilhado custaria
+tanto quanto ir ao banco. Cada processo tem a sua cópia: quem muda o dado
+original precisa invalidar em todos (ver ``apps.core.pubsub``) ou aceitar a
+defasagem do TTL.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class LRUCache:
+    """Até ``maxsize`` entradas; descarta a menos usada ao encher. Seguro entre threads.
+
+    ``geracao`` muda a cada remoção explícita (``pop``, ``descartar_se``, ``clear``):
+    quem leu o valor da origem antes dela não deve guardá-lo (ver ``apps.core.cache_local``).
+    """
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.geracao = 0
+        self.hits = 0
+        self.misses = 0
+        self._dados: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, chave: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._dados.get(chave)
+            if item is not None and item[1] is not None and item[1] <= time.monotonic():
+                del self._dados[chave]
+                item = None
+            if item is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._dados.move_to_end(chave)
+            return item[0]
+
+    def set(self, chave: Hashable, valor: Any, ttl: Optional[float] = None):
+        """Guarda ``valor``; ``ttl`` (segundos) vale para esta entrada, limitado ao TTL do cache."""
+        if ttl is None or (self.ttl is not None and ttl > self.ttl):
+            ttl = self.ttl
+        if ttl is not None and ttl <= 0:
+            return
+        expira = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._dados[chave] = (valor, expira)
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.maxsize:
+                self._dados.popitem(last=False)
+
+    def pop(self, chave: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            self.geracao += 1
+            item = self._dados.pop(chave, None)
+        return default if item is None else item[0]
+
+    def descartar_se(self, predicado: Callable[[Any], bool]) -> int:
+        """Remove as entradas cujo valor satisfaz ``predicado``; retorna quantas (varre o cache todo)."""
+        with self._lock:
+            self.geracao += 1
+            chaves = [chave for chave, (valor, _) in self._dados.items() if predicado(valor)]
+            for chave in chaves:
+                del self._dados[chave]
+        return len(chaves)
+
+    def clear(self):
+        with self._lock:
+            self.geracao += 1
+            self._dados.clear()
+
+    def estatisticas(self) -> dict:
+        """Entradas e acertos desde a criação do cache (as métricas Prometheus ficam em ``record_cache``)."""
+        consultas = self.hits + self.misses
+        return {
+            'entradas': len(self._dados),
+            'hits': self.hits,
+            'misses': self.misses,
+            'taxa_de_acerto': self.hits / consultas if consultas else 0.0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._dados)
@@ -0,0 +1,74 @@
+"""
+Métricas Prometheus da aplicação (expostas em ``/metrics``).
+
+A API roda com vários workers (gunicorn + UvicornWorker) e o Celery com pool
+prefork. Para que ``/metrics`` agregue todos os processos, defina
+``PROMETHEUS_MULTIPROC_DIR`` apontando para um diretório compartilhado e
+vazio a cada deploy; sem a variável, cada processo expõe apenas os próprios
+valores. Métricas que vêm do banco (jobs por status, lag da fila) são
+calculadas no momento da coleta em ``backend/metrics.py``; por isso este
+módulo não define Gauges e não precisa de ``mark_process_dead`` ao encerrar
+workers.
+"""
+import os
+import socket
+
+from prometheus_client import Counter, Histogram, values
+
+if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+    # Web e worker gravam no mesmo diretório a partir de containers diferentes,
+    # onde os PIDs podem se repetir: o hostname evita colisão de arquivos.
+    _hostname = socket.gethostname().replace('_', '-')
+    values.ValueClass = values.MultiProcessValue(lambda: f"{_hostname}-{os.getpid()}")
+
+
+HTTP_REQUEST_DURATION = Histogram(
+    'gestao_http_request_duration_seconds',
+    'Latência das requisições HTTP por view',
+    ['view', 'method', 'status'],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+HTTP_DB_QUERIES = Histogram(
+    'gestao_http_db_queries',
+    'Consultas SQL executadas por requisição HTTP',
+    ['view'],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 200),
+)
+
+LLM_REQUEST_DURATION = Histogram(
+    'gestao_llm_request_duration_seconds',
+    'Latência das chamadas ao provedor LLM',
+    ['provider', 'model', 'status'],
+    buckets=(0.5, 1, 2, 5, 10, 20, 30, 60, 120),
+)
+
+LLM_TOKENS = Counter(
+    'gestao_llm_tokens_total',
+    'Tokens consumidos nas chamadas ao provedor LLM (LLMResponse.tokens_used)',
+    ['provider', 'model'],
+)
+
+CACHE_REQUESTS = Counter(
+    'gestao_cache_requests_total',
+    'Consultas aos caches da aplicação por resultado (hit/miss)',
+    ['cache', 'result'],
+)
+
+OBSERVER_DURATION = Histogram(
+    'gestao_observer_duration_seconds',
+    'Tempo de execução de cada observer por modo de entrega (sync/async) e resultado',
+    ['observer', 'mode', 'status'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+
+EVENT_BUS_BATCH_SIZE = Histogram(
+    'gestao_event_bus_batch_size',
+    'Eventos entregues por lote pelo consumidor do EventBus',
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500),
+)
+
+
+def record_cache(cache: str, hit: bool):
+    """Registra um acesso a cache; a taxa de acerto é hit / (hit + miss)."""
+    CACHE_REQUESTS.labels(cache=cache, result='hit' if hit else 'miss').inc()
@@ -2,10 +2,18 @@ from abc import ABC, abstractmethod
 from typing import Any, List
 import logging
 
+from django.conf import settings
+
+from apps.core.event_bus import Evento, entregar, event_bus
+
 logger = logging.getLogger(__name__)
 
 
 class Observer(ABC):
+    # 'sync': chamado dentro de notify, na transação de quem emite (ex.: agregados por delta).
+    # 'async': entregue após o commit, em lote, pelo EventBus (ver apps/core/event_bus.py).
+    delivery = 'sync'
+
     @abstractmethod
     def update(self, subject: Any, event_type: str, **kwargs):
         """Called when the subject emits an event.
@@ -15,6 +23,14 @@ class Observer(ABC):
         """
         pass
 
+    def update_batch(self, events):
+        """Receives a batch of (subject, event_type, kwargs) from the EventBus.
+
+        Override to process the batch at once (e.g. bulk inserts).
+        """
+        for subject, event_type, kwargs in events:
+            self.update(subject, event_type, **kwargs)
+
 
 class Subject:
     def __init__(self):
@@ -29,8 +45,9 @@ class Subject:
             self._observers.remove(observer)
 
     def notify(self, event_type: str, **kwargs):
+        async_enabled = getattr(settings, 'EVENT_BUS_ENABLED', True)
         for observer in list(self._observers):
-            try:
-                observer.update(self, event_type, **kwargs)
-            except Exception as e:
-                logger.exception("Observer error: %s", e)
+            if async_enabled and observer.delivery == 'async':
+                event_bus.publish(observer, self, event_type, kwargs)
+            else:
+                entregar(observer, [Evento(observer, self, event_type, kwargs)], 'sync')
@@ -0,0 +1,72 @@
+import json
+
+from django.db import connections
+from rest_framework.pagination import CursorPagination
+
+
+def estimar_total(queryset) -> int:
+    """
+    Estimativa barata do total de linhas, sem ``COUNT(*)``.
+
+    Sem filtros usa ``pg_class.reltuples`` (atualizado por VACUUM/ANALYZE);
+    com filtros usa a estimativa de linhas do planner (``EXPLAIN``).
+    """
+    conn = connections[queryset.db]
+    with conn.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+            # reltuples = -1 em tabelas nunca analisadas (PostgreSQL 14+)
+            if row and row[0] >= 0:
+                return int(row[0])
+        sql, params = queryset.order_by().query.sql_with_params()
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plano = cursor.fetchone()[0]
+        if isinstance(plano, str):
+            plano = json.loads(plano)
+        return int(plano[0]['Plan']['Plan Rows'])
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Paginação por cursor (keyset): cada página é um ``WHERE id < <último>``
+    sobre um índice, sem ``COUNT(*)`` nem ``OFFSET``, então o custo não cresce
+    com a profundidade da página.
+
+    A resposta traz ``next``/``previous`` (URLs com ``?cursor=``) e ``results``.
+    Com ``?estimar_total=true`` inclui ``total_estimado`` (ver ``estimar_total``).
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = '-id'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.total_estimado = None
+        if request.query_params.get('estimar_total') in ('1', 'true'):
+            self.total_estimado = estimar_total(queryset)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.total_estimado is not None:
+            response.data['total_estimado'] = self.total_estimado
+        return response
+
+    def get_paginated_response_schema(self, schema):
+        schema = super().get_paginated_response_schema(schema)
+        schema['properties']['total_estimado'] = {'type': 'integer', 'nullable': True}
+        return schema
+
+
+class VencimentoKeysetPagination(KeysetPagination):
+    """Lançamentos em ordem de vencimento; ``id`` desempata datas iguais."""
+    ordering = ('data_vencimento', 'id')
+
+
+class CnpjKeysetPagination(KeysetPagination):
+    """Para tabelas com chave primária ``cnpj_numero`` (sem coluna ``id``)."""
+    ordering = 'cnpj_numero'
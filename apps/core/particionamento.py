@@ -0,0 +1,389 @@
+"""
+Particionamento declarativo por intervalo de data (PostgreSQL ``PARTITION BY RANGE``).
+
+Tabelas consultadas quase sempre por faixa de data (notas por emissão,
+lançamentos por vencimento) ficam divididas em uma partição por mês ou ano:
+o planner só lê as partições da faixa pedida e um período antigo sai da
+tabela com um ``DETACH PARTITION``, sem ``DELETE`` nem ``VACUUM``.
+
+- ``particionar``: converte uma tabela comum, com os dados, numa transação.
+- ``criar_particoes``: cria as partições que faltam (a task agenda as futuras).
+- ``desanexar_particoes``: separa as partições antigas, que viram tabelas comuns.
+
+Linhas fora de todas as partições caem na partição padrão (``<tabela>_padrao``);
+ao criar a partição do período elas são movidas para ela.
+
+Limitações do PostgreSQL: toda chave única da tabela particionada precisa
+incluir a coluna de partição, uma FK só pode apontar para ela por uma chave
+que inclua essa coluna, e ``CREATE INDEX CONCURRENTLY`` não roda na tabela mãe
+(crie o índice em cada partição e depois na mãe).
+
+Por isso a conversão só acrescenta a coluna de partição às chaves substitutas
+(a PK e colunas ``uuid``), únicas por construção. As chaves de negócio (ex.:
+``ntf_chave_acesso``) continuam valendo na tabela inteira: cada uma ganha uma
+tabela comum ``<chave>__global`` com os valores em uso, mantida por trigger,
+cuja restrição única (com o nome da original) recusa a duplicata. Índices
+únicos por expressão não são convertidos: a conversão é recusada, a não ser
+com ``ampliar_chaves_unicas`` (que acrescenta a coluna a todas as chaves).
+Partições desanexadas continuam ocupando as suas chaves.
+"""
+import hashlib
+import re
+from datetime import date
+from typing import Iterable, List, Optional, Sequence
+
+from django.db import connection, transaction
+
+INTERVALOS = ('mes', 'ano')
+
+_LIMITES = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+# Ligado (SET LOCAL) enquanto linhas mudam de partição: os triggers das chaves globais não agem
+_MOVENDO = 'particionamento.movendo'
+
+
+class ParticionamentoError(Exception):
+    pass
+
+
+def _q(nome: str) -> str:
+    return connection.ops.quote_name(nome)
+
+
+def inicio_do_periodo(dia: date, intervalo: str) -> date:
+    return date(dia.year, dia.month if intervalo == 'mes' else 1, 1)
+
+
+def proximo_periodo(inicio: date, intervalo: str) -> date:
+    if intervalo == 'ano':
+        return date(inicio.year + 1, 1, 1)
+    return date(inicio.year + 1, 1, 1) if inicio.month == 12 else date(inicio.year, inicio.month + 1, 1)
+
+
+def nome_da_particao(tabela: str, inicio: date, intervalo: str) -> str:
+    return f"{tabela}_p{inicio:%Y}" if intervalo == 'ano' else f"{tabela}_p{inicio:%Y_%m}"
+
+
+def esta_particionada(cursor, tabela: str) -> bool:
+    cursor.execute("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass)", [tabela])
+    return cursor.fetchone()[0]
+
+
+def coluna_de_particao(cursor, tabela: str) -> str:
+    cursor.execute("""
+        SELECT a.attname
+        FROM pg_partitioned_table p
+        JOIN pg_attribute a ON a.attrelid = p.partrelid AND a.attnum = p.partattrs[0]
+        WHERE p.partrelid = %s::regclass
+    """, [tabela])
+    return cursor.fetchone()[0]
+
+
+def particoes(cursor, tabela: str) -> List[dict]:
+    """Partições da tabela em ordem: ``{nome, inicio, fim}`` (``None`` na partição padrão)."""
+    cursor.execute("""
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = %s::regclass
+    """, [tabela])
+    resultado = []
+    for nome, limites in cursor.fetchall():
+        encontrado = _LIMITES.search(limites)
+        inicio, fim = (date.fromisoformat(encontrado[1]), date.fromisoformat(encontrado[2])) if encontrado else (None, None)
+        resultado.append({'nome': nome, 'inicio': inicio, 'fim': fim})
+    return sorted(resultado, key=lambda p: (p['inicio'] is None, p['inicio'] or date.min))
+
+
+def _criar_particao(cursor, tabela: str, coluna: str, inicio: date, fim: date, nome: str, padrao: Optional[str]):
+    """Cria a partição [inicio, fim); linhas do período que estejam na partição padrão passam para ela."""
+    limites = f"FROM ('{inicio.isoformat()}') TO ('{fim.isoformat()}')"
+    filtro = f"{_q(coluna)} >= %s AND {_q(coluna)} < %s"
+    if padrao is not None:
+        cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {_q(padrao)} WHERE {filtro})", [inicio, fim])
+        if cursor.fetchone()[0]:
+            # ATTACH exige que a partição padrão não tenha linhas do novo intervalo. As linhas só
+            # mudam de partição: os triggers das chaves globais não liberam as chaves delas
+            cursor.execute(f"CREATE TABLE {_q(nome)} (LIKE {_q(tabela)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+            cursor.execute(f"SELECT set_config('{_MOVENDO}', 'on', true)")
+            cursor.execute(f"""
+                WITH movidas AS (DELETE FROM {_q(padrao)} WHERE {filtro} RETURNING *)
+                INSERT INTO {_q(nome)} SELECT * FROM movidas
+            """, [inicio, fim])
+            cursor.execute(f"SELECT set_config('{_MOVENDO}', 'off', true)")
+            cursor.execute(f"ALTER TABLE {_q(tabela)} ATTACH PARTITION {_q(nome)} FOR VALUES {limites}")
+            return
+    cursor.execute(f"CREATE TABLE {_q(nome)} PARTITION OF {_q(tabela)} FOR VALUES {limites}")
+
+
+def criar_particoes(tabela: str, intervalo: str, periodos: Iterable[date]) -> List[str]:
+    """Cria as partições dos períodos (qualquer dia de cada um) que ainda não existem; retorna os nomes."""
+    criadas = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        coluna = coluna_de_particao(cursor, tabela)
+        existentes = particoes(cursor, tabela)
+        padrao = next((p['nome'] for p in existentes if p['inicio'] is None), None)
+        ocupados = [(p['inicio'], p['fim']) for p in existentes if p['inicio'] is not None]
+        for inicio in sorted({inicio_do_periodo(dia, intervalo) for dia in periodos}):
+            fim = proximo_periodo(inicio, intervalo)
+            if any(inicio < ate and desde < fim for desde, ate in ocupados):
+                continue
+            nome = nome_da_particao(tabela, inicio, intervalo)
+            _criar_particao(cursor, tabela, coluna, inicio, fim, nome, padrao)
+            ocupados.append((inicio, fim))
+            criadas.append(nome)
+    return criadas
+
+
+def criar_particoes_adiante(tabela: str, intervalo: str, meses: int, hoje: Optional[date] = None) -> List[str]:
+    """Garante partições do período atual até ``meses`` à frente."""
+    inicio = inicio_do_periodo(hoje or date.today(), intervalo)
+    periodos = [inicio]
+    for _ in range(meses):
+        periodos.append(proximo_periodo(periodos[-1], 'mes'))
+    return criar_particoes(tabela, intervalo, periodos)
+
+
+def desanexar_particoes(tabela: str, antes_de: date) -> List[str]:
+    """Desanexa as partições que terminam até ``antes_de``; os dados ficam nas tabelas desanexadas."""
+    desanexadas = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        for particao in particoes(cursor, tabela):
+            if particao['fim'] is not None and particao['fim'] <= antes_de:
+                cursor.execute(f"ALTER TABLE {_q(tabela)} DETACH PARTITION {_q(particao['nome'])}")
+                desanexadas.append(particao['nome'])
+    return desanexadas
+
+
+def _com_coluna(definicao: str, coluna: str) -> str:
+    """Acrescenta ``coluna`` à lista de colunas de um PRIMARY KEY/UNIQUE/CREATE UNIQUE INDEX."""
+    abre = definicao.index('(')
+    nivel = 0
+    for posicao in range(abre, len(definicao)):
+        nivel += {'(': 1, ')': -1}.get(definicao[posicao], 0)
+        if nivel == 0:
+            break
+    colunas = definicao[abre + 1:posicao]
+    if _q(coluna) in colunas or re.search(rf'\b{re.escape(coluna)}\b', colunas):
+        return definicao
+    return f"{definicao[:posicao]}, {_q(coluna)}{definicao[posicao:]}"
+
+
+def _nome_global(chave: str) -> str:
+    nome = f"{chave}__global"
+    if len(nome) <= 63:
+        return nome
+    return f"{chave[:46]}_{hashlib.md5(chave.encode()).hexdigest()[:8]}__global"
+
+
+def _criar_chave_global(cursor, tabela: str, chave: str, colunas: Sequence[str], predicado: Optional[str]):
+    """
+    Mantém a chave única ``chave`` (colunas + predicado de índice parcial) na tabela inteira.
+
+    A tabela comum ``<chave>__global`` guarda os valores em uso (linhas com alguma
+    coluna nula não conflitam e ficam de fora); um trigger AFTER por linha a mantém
+    e a sua restrição única, com o nome da chave original, recusa a duplicata.
+    """
+    nome = _nome_global(chave)
+    lista = ', '.join(_q(c) for c in colunas)
+    filtro = ' AND '.join([f"{_q(c)} IS NOT NULL" for c in colunas] + ([f"({predicado})"] if predicado else []))
+    cursor.execute(f"CREATE TABLE {_q(nome)} AS SELECT {lista} FROM {_q(tabela)} WHERE {filtro}")
+    cursor.execute(f"ALTER TABLE {_q(nome)} ADD CONSTRAINT {_q(chave)} UNIQUE ({lista})")
+    # (SELECT NEW.*) expõe a linha com os nomes das colunas, para o filtro/predicado como na tabela
+    cursor.execute(f"""
+        CREATE FUNCTION {_q(nome)}() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF current_setting('{_MOVENDO}', true) = 'on' THEN
+                RETURN NULL;
+            END IF;
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                DELETE FROM {_q(nome)} WHERE ({lista}) IN (
+                    SELECT {lista} FROM (SELECT OLD.*) linha WHERE {filtro}
+                );
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO {_q(nome)} SELECT {lista} FROM (SELECT NEW.*) linha WHERE {filtro};
+            END IF;
+            RETURN NULL;
+        END
+        $$
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER {_q(nome)} AFTER INSERT OR UPDATE OR DELETE ON {_q(tabela)}
+        FOR EACH ROW EXECUTE FUNCTION {_q(nome)}()
+    """)
+    return nome
+
+
+def particionar(
+    tabela: str, coluna: str, intervalo: str = 'mes', remover_fks_de_entrada: bool = False,
+    ampliar_chaves_unicas: bool = False,
+) -> dict:
+    """
+    Converte ``tabela`` em particionada por ``coluna``, com os dados, numa única transação.
+
+    Escritas na tabela ficam bloqueadas durante a cópia (leituras não). Recria
+    restrições, índices, a identidade da PK e as views (materializadas) que
+    dependem da tabela. Cria uma partição por período com dados, mais a padrão.
+    FKs de outras tabelas apontando para esta não podem ser mantidas: sem
+    ``remover_fks_de_entrada`` a conversão é recusada; com ele são removidas
+    (o ORM continua aplicando ``on_delete``).
+
+    Chaves substitutas ganham a coluna de partição; chaves de negócio seguem
+    únicas na tabela inteira (``<chave>__global``, ver o módulo). Com
+    ``ampliar_chaves_unicas`` todas ganham a coluna, e passam a valer só dentro
+    de cada período.
+    """
+    if intervalo not in INTERVALOS:
+        raise ParticionamentoError(f"Intervalo inválido: {intervalo} (use {', '.join(INTERVALOS)})")
+    nova = f"{tabela}__particionada"
+    with transaction.atomic(), connection.cursor() as cursor:
+        if esta_particionada(cursor, tabela):
+            raise ParticionamentoError(f"{tabela} já é particionada")
+        cursor.execute("""
+            SELECT attnotnull FROM pg_attribute WHERE attrelid = %s::regclass AND attname = %s AND NOT attisdropped
+        """, [tabela, coluna])
+        if cursor.fetchone() is None:
+            raise ParticionamentoError(f"{tabela} não tem a coluna {coluna}")
+
+        cursor.execute("""
+            SELECT conname, conrelid::regclass::text FROM pg_constraint
+            WHERE confrelid = %s::regclass AND contype = 'f' AND conrelid <> confrelid AND conparentid = 0
+        """, [tabela])
+        fks_de_entrada = cursor.fetchall()
+        if fks_de_entrada and not remover_fks_de_entrada:
+            nomes = ', '.join(f"{origem}.{nome}" for nome, origem in fks_de_entrada)
+            raise ParticionamentoError(f"{tabela} é referenciada por chaves estrangeiras ({nomes})")
+
+        cursor.execute(f"LOCK TABLE {_q(tabela)} IN EXCLUSIVE MODE")
+        # DROP TABLE recusa tabelas com verificações de FK adiadas pendentes nesta transação
+        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+        cursor.execute("""
+            SELECT conname, contype, pg_get_constraintdef(c.oid),
+                   ARRAY(SELECT a.attname FROM unnest(c.conkey) WITH ORDINALITY k (attnum, n)
+                         JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = k.attnum ORDER BY k.n)
+            FROM pg_constraint c
+            WHERE conrelid = %s::regclass AND contype IN ('p', 'u', 'f', 'c')
+            ORDER BY contype = 'f', conname
+        """, [tabela])
+        restricoes = cursor.fetchall()
+        cursor.execute("""
+            SELECT ci.relname, pg_get_indexdef(i.indexrelid), i.indisunique,
+                   ARRAY(SELECT a.attname FROM unnest(i.indkey::int2[]) WITH ORDINALITY k (attnum, n)
+                         JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum ORDER BY k.n),
+                   i.indexprs IS NOT NULL, pg_get_expr(i.indpred, i.indrelid)
+            FROM pg_index i JOIN pg_class ci ON ci.oid = i.indexrelid
+            WHERE i.indrelid = %s::regclass
+              AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid AND c.conrelid = i.indrelid)
+        """, [tabela])
+        indices = cursor.fetchall()
+
+        # Substitutas: a PK e colunas uuid, únicas por construção; ampliá-las não muda nada
+        cursor.execute("""
+            SELECT attname FROM pg_attribute
+            WHERE attrelid = %s::regclass AND atttypid = 'uuid'::regtype AND NOT attisdropped
+        """, [tabela])
+        substitutas = {row[0] for row in cursor.fetchall()}
+        substitutas.update(next((colunas for _, tipo, _, colunas in restricoes if tipo == 'p'), []))
+        por_expressao = [nome for nome, _, unico, _, expressao, _ in indices if unico and expressao]
+        if por_expressao and not ampliar_chaves_unicas:
+            raise ParticionamentoError(
+                f"{tabela} tem índices únicos por expressão que só valeriam por período de {coluna} "
+                f"({', '.join(por_expressao)}); use ampliar_chaves_unicas para convertê-la assim mesmo"
+            )
+
+        def global_(tipo: str, colunas: Sequence[str]) -> bool:
+            return not ampliar_chaves_unicas and tipo != 'p' and not set(colunas) <= substitutas
+        cursor.execute("""
+            SELECT DISTINCT v.oid, v.relname, v.relkind, pg_get_viewdef(v.oid), v.relispopulated
+            FROM pg_depend d
+            JOIN pg_rewrite r ON r.oid = d.objid
+            JOIN pg_class v ON v.oid = r.ev_class
+            WHERE d.refobjid = %s::regclass AND v.oid <> %s::regclass
+        """, [tabela, tabela])
+        views = []
+        for oid, nome, tipo, definicao, populada in cursor.fetchall():
+            cursor.execute("SELECT indexdef FROM pg_indexes WHERE tablename = %s", [nome])
+            views.append((nome, tipo, definicao, populada, [row[0] for row in cursor.fetchall()]))
+        cursor.execute("""
+            SELECT a.attname, pg_get_serial_sequence(%s, a.attname)
+            FROM pg_attribute a
+            WHERE a.attrelid = %s::regclass AND a.attnum > 0 AND NOT a.attisdropped
+              AND pg_get_serial_sequence(%s, a.attname) IS NOT NULL
+        """, [tabela, tabela, tabela])
+        sequencias = cursor.fetchall()
+
+        cursor.execute(f"""
+            CREATE TABLE {_q(nova)} (
+                LIKE {_q(tabela)} INCLUDING DEFAULTS INCLUDING IDENTITY INCLUDING GENERATED INCLUDING STORAGE
+            ) PARTITION BY RANGE ({_q(coluna)})
+        """)
+        padrao = f"{tabela}_padrao"
+        cursor.execute(f"CREATE TABLE {_q(padrao)} PARTITION OF {_q(nova)} DEFAULT")
+        cursor.execute(f"SELECT DISTINCT {_q(coluna)} FROM {_q(tabela)} WHERE {_q(coluna)} IS NOT NULL")
+        periodos = sorted({inicio_do_periodo(row[0], intervalo) for row in cursor.fetchall()})
+        nomes_particoes = []
+        for inicio in periodos:
+            nome = nome_da_particao(tabela, inicio, intervalo)
+            _criar_particao(cursor, nova, coluna, inicio, proximo_periodo(inicio, intervalo), nome, None)
+            nomes_particoes.append(nome)
+        cursor.execute(f"INSERT INTO {_q(nova)} OVERRIDING SYSTEM VALUE SELECT * FROM {_q(tabela)}")
+        linhas = cursor.rowcount
+
+        # A identidade/sequência nova continua de onde a antiga parou (ids nunca são reaproveitados)
+        renomear_sequencias = []
+        for nome_coluna, sequencia in sequencias:
+            cursor.execute(f"SELECT last_value, is_called FROM {sequencia}")
+            ultimo, chamada = cursor.fetchone()
+            cursor.execute("SELECT pg_get_serial_sequence(%s, %s)", [nova, nome_coluna])
+            nova_sequencia = cursor.fetchone()[0]
+            cursor.execute("SELECT setval(%s, %s, %s)", [nova_sequencia, ultimo, chamada])
+            renomear_sequencias.append((nova_sequencia, sequencia.split('.')[-1].strip('"')))
+
+        for nome, origem in fks_de_entrada:
+            cursor.execute(f"ALTER TABLE {_q(origem)} DROP CONSTRAINT {_q(nome)}")
+        for nome, tipo, *_ in views:
+            cursor.execute(f"DROP {'MATERIALIZED VIEW' if tipo == 'm' else 'VIEW'} {_q(nome)}")
+        cursor.execute(f"DROP TABLE {_q(tabela)}")
+        cursor.execute(f"ALTER TABLE {_q(nova)} RENAME TO {_q(tabela)}")
+        for nova_sequencia, nome_original in renomear_sequencias:
+            cursor.execute(f"ALTER SEQUENCE {nova_sequencia} RENAME TO {_q(nome_original)}")
+
+        ampliadas, globais = [], []
+        for nome, tipo, definicao, colunas in restricoes:
+            if tipo in ('p', 'u') and coluna not in colunas:
+                if global_(tipo, colunas):
+                    globais.append(_criar_chave_global(cursor, tabela, nome, colunas, None))
+                    continue
+                definicao = _com_coluna(definicao, coluna)
+                ampliadas.append(nome)
+            cursor.execute(f"ALTER TABLE {_q(tabela)} ADD CONSTRAINT {_q(nome)} {definicao}")
+        for nome, definicao, unico, colunas, expressao, predicado in indices:
+            if unico and (expressao or coluna not in colunas):
+                if global_('u', colunas) and not expressao:
+                    globais.append(_criar_chave_global(cursor, tabela, nome, colunas, predicado))
+                    continue
+                definicao = _com_coluna(definicao, coluna)
+                ampliadas.append(nome)
+            cursor.execute(definicao)
+        for nome, tipo, definicao, populada, indices_da_view in views:
+            if tipo == 'm':
+                cursor.execute(
+                    f"CREATE MATERIALIZED VIEW {_q(nome)} AS {definicao.rstrip().rstrip(';')} "
+                    f"WITH {'' if populada else 'NO '}DATA"
+                )
+            else:
+                cursor.execute(f"CREATE VIEW {_q(nome)} AS {definicao.rstrip().rstrip(';')}")
+            for definicao_indice in indices_da_view:
+                cursor.execute(definicao_indice)
+        cursor.execute(f"ANALYZE {_q(tabela)}")
+
+    return {
+        'linhas': linhas,
+        'particoes': nomes_particoes + [padrao],
+        'chaves_ampliadas': ampliadas,
+        'chaves_globais': globais,
+        'fks_removidas': [f"{origem}.{nome}" for nome, origem in fks_de_entrada],
+        'views_recriadas': [nome for nome, *_ in views],
+    }
@@ -0,0 +1,226 @@
+"""
+Pub/sub para requisições ASGI que aguardam eventos (long-poll, SSE).
+
+Views assíncronas assinam uma chave (``canal``, ``chave``) e esperam numa
+``asyncio.Queue``: enquanto aguardam não ocupam thread nem conexão de banco.
+Quem produz os eventos (workers Celery, outros processos web) publica com
+``notificar``, que usa ``pg_notify``; um ``PgListener`` por processo mantém uma
+conexão dedicada em LISTEN nos canais assinados e repassa cada NOTIFY às
+assinaturas locais.
+
+NOTIFY é transacional (só sai no commit) e não é persistido: o aviso apenas
+acorda quem espera, o estado sempre vem do banco. Quando o listener reconecta,
+todos os assinantes do canal são acordados para reconsultar o que possam ter
+perdido.
+
+Além das esperas assíncronas, ``assinar_callback`` registra uma função chamada
+na própria thread de quem publica (o listener), para invalidar caches em
+memória do processo.
+
+Configuração (settings): ``PUBSUB_LISTEN_ENABLED`` (False = só publicações
+locais, sem conexão em LISTEN; usado nos testes).
+"""
+import asyncio
+import logging
+import os
+import re
+import selectors
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Callable, Iterable, Optional
+
+from django.conf import settings
+from django.db import connection, connections
+
+logger = logging.getLogger(__name__)
+
+# Nomes de canal vão direto no LISTEN (identificador, não parâmetro)
+_CANAL_VALIDO = re.compile(r'^[a-z_][a-z0-9_]*$')
+
+
+def notificar(canal: str, chaves: Iterable, dados: str = ''):
+    """``pg_notify`` para cada chave numa única instrução; entregue no commit da transação corrente."""
+    chaves = [str(c) for c in chaves]
+    if not chaves:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_notify(%s, c || ':' || %s) FROM unnest(%s::text[]) AS c",
+            [canal, dados, chaves],
+        )
+
+
+class Assinatura:
+    def __init__(self, canal: str, chave: str):
+        self.canal = canal
+        self.chave = chave
+        self.loop = asyncio.get_running_loop()
+        self.fila: "asyncio.Queue[str]" = asyncio.Queue()
+
+    async def aguardar(self, timeout: float) -> Optional[str]:
+        """Próximo evento publicado para a chave, ou None se o timeout expirar."""
+        try:
+            return await asyncio.wait_for(self.fila.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def _entregar(self, dados: str):
+        # Chamado de qualquer thread (listener, publicação local)
+        try:
+            self.loop.call_soon_threadsafe(self.fila.put_nowait, dados)
+        except RuntimeError:
+            # Loop já encerrado: a requisição terminou sem cancelar a assinatura
+            pass
+
+
+class Callback:
+    """Assinatura síncrona: ``func(dados)`` roda na thread que publica; deve ser rápida."""
+
+    def __init__(self, canal: str, chave: str, func: Callable[[str], None]):
+        self.canal = canal
+        self.chave = chave
+        self.func = func
+
+    def _entregar(self, dados: str):
+        try:
+            self.func(dados)
+        except Exception:
+            logger.exception("PUBSUB: callback de %s:%s falhou", self.canal, self.chave)
+
+
+class PubSub:
+    def __init__(self, listener: Optional["PgListener"] = None):
+        self._assinaturas = defaultdict(set)
+        self._lock = threading.Lock()
+        self.listener = listener
+
+    def assinar(self, canal: str, chave) -> Assinatura:
+        """Cria uma assinatura no loop corrente; chame ``cancelar`` ao terminar."""
+        return self._registrar(Assinatura(canal, str(chave)))
+
+    def assinar_callback(self, canal: str, chave, func: Callable[[str], None]) -> Callback:
+        """Chama ``func(dados)`` a cada publicação na chave (e com ``''`` quando o listener reconecta)."""
+        return self._registrar(Callback(canal, str(chave), func))
+
+    def _registrar(self, assinatura):
+        with self._lock:
+            self._assinaturas[(assinatura.canal, assinatura.chave)].add(assinatura)
+        if self.listener is not None:
+            self.listener.escutar(assinatura.canal)
+        return assinatura
+
+    def cancelar(self, assinatura):
+        with self._lock:
+            chave = (assinatura.canal, assinatura.chave)
+            self._assinaturas[chave].discard(assinatura)
+            if not self._assinaturas[chave]:
+                del self._assinaturas[chave]
+
+    @contextmanager
+    def assinatura(self, canal: str, chave):
+        assinatura = self.assinar(canal, chave)
+        try:
+            yield assinatura
+        finally:
+            self.cancelar(assinatura)
+
+    def publicar(self, canal: str, chave, dados: str = '') -> int:
+        """Entrega ``dados`` às assinaturas locais da chave; retorna quantas foram acordadas."""
+        with self._lock:
+            alvos = list(self._assinaturas.get((canal, str(chave)), ()))
+        for assinatura in alvos:
+            assinatura._entregar(dados)
+        return len(alvos)
+
+    def publicar_todos(self, canal: str, dados: str = '') -> int:
+        """Acorda todas as assinaturas do canal (ex.: após reconexão do listener)."""
+        with self._lock:
+            alvos = [a for (c, _), assinaturas in self._assinaturas.items() if c == canal for a in assinaturas]
+        for assinatura in alvos:
+            assinatura._entregar(dados)
+        return len(alvos)
+
+    def assinantes(self, canal: Optional[str] = None) -> int:
+        with self._lock:
+            return sum(len(a) for (c, _), a in self._assinaturas.items() if canal is None or c == canal)
+
+
+class PgListener:
+    """Thread daemon, uma por processo, com uma conexão em LISTEN repassando NOTIFYs ao PubSub."""
+
+    def __init__(self, alias: str = 'default', intervalo: float = 1.0):
+        self.alias = alias
+        # Tempo máximo até um canal novo entrar em LISTEN
+        self.intervalo = intervalo
+        self.pubsub: Optional[PubSub] = None
+        self._canais = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def escutar(self, canal: str):
+        if not getattr(settings, 'PUBSUB_LISTEN_ENABLED', True):
+            return
+        if not _CANAL_VALIDO.match(canal):
+            raise ValueError(f"Canal inválido: {canal!r}")
+        with self._lock:
+            self._canais.add(canal)
+            # Após um fork (workers do gunicorn) a thread do processo pai não existe no filho
+            if self._thread is None or not self._thread.is_alive() or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='pg-listener', daemon=True)
+                self._thread.start()
+
+    def _conectar(self):
+        import psycopg2
+        from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+        conn = psycopg2.connect(**connections[self.alias].get_connection_params())
+        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        return conn
+
+    def _run(self):
+        reconexao = False
+        while True:
+            conn = None
+            # selectors (epoll) e não select(): com milhares de sockets abertos o fd passa de 1024
+            seletor = selectors.DefaultSelector()
+            try:
+                conn = self._conectar()
+                seletor.register(conn, selectors.EVENT_READ)
+                escutando = set()
+                while True:
+                    with self._lock:
+                        novos = self._canais - escutando
+                    for canal in novos:
+                        with conn.cursor() as cursor:
+                            cursor.execute(f'LISTEN {canal}')
+                        escutando.add(canal)
+                        if reconexao:
+                            self.pubsub.publicar_todos(canal)
+                    reconexao = False
+                    if not seletor.select(self.intervalo):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        aviso = conn.notifies.pop(0)
+                        chave, _, dados = aviso.payload.partition(':')
+                        self.pubsub.publicar(aviso.channel, chave, dados)
+            except Exception:
+                logger.exception("PUBSUB: conexão de LISTEN perdida; reconectando")
+                reconexao = True
+                time.sleep(1)
+            finally:
+                seletor.close()
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+
+pg_listener = PgListener()
+pubsub = PubSub(listener=pg_listener)
+pg_listener.pubsub = pubsub
@@ -0,0 +1,100 @@
+"""
+Registro das consultas SQL executadas num bloco de código (requisição, teste).
+
+``QueryRecorder`` é instalado com ``connection.execute_wrapper`` e guarda a
+quantidade de consultas, o tempo total em SQL e quantas vezes cada consulta
+"normalizada" se repetiu — a mesma consulta com parâmetros diferentes
+executada N vezes é o sintoma clássico de N+1.
+
+``record_queries`` registra as consultas da conexão da thread atual.
+``record_context_queries`` segue o contexto (contextvars): registra também
+as consultas feitas em outras threads via ``sync_to_async``, como as de views
+e do ORM assíncrono sob ASGI.
+"""
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+
+from django.db import connection
+from django.db.backends.signals import connection_created
+
+# Listas de IN de tamanho variável e literais viram um único marcador
+_IN_LIST_RE = re.compile(r"\(\s*%s(?:\s*,\s*%s)*\s*\)")
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_sql(sql: str) -> str:
+    """Reduz a consulta ao seu "formato", ignorando valores de parâmetros."""
+    sql = _LITERAL_RE.sub('%s', sql)
+    sql = _IN_LIST_RE.sub('(%s)', sql)
+    return _WHITESPACE_RE.sub(' ', sql).strip()
+
+
+class QueryRecorder:
+    """execute_wrapper que acumula contagem, tempo total e padrões repetidos."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.patterns: Counter = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.total_time += time.perf_counter() - inicio
+            self.count += 1
+            self.patterns[normalize_sql(sql)] += 1
+
+    def duplicates(self, min_count: int = 2) -> List[Tuple[str, int]]:
+        """Consultas normalizadas executadas ``min_count`` vezes ou mais, da mais repetida à menos."""
+        return [(sql, n) for sql, n in self.patterns.most_common() if n >= min_count]
+
+    def summary(self, limit: int = 3) -> str:
+        linhas = [f"{self.count} consultas em {self.total_time * 1000:.1f} ms"]
+        for sql, n in self.duplicates()[:limit]:
+            linhas.append(f"  {n}x {sql[:200]}")
+        return "\n".join(linhas)
+
+
+@contextmanager
+def record_queries(using_connection=None):
+    """Registra as consultas executadas no bloco: ``with record_queries() as rec: ...``."""
+    recorder = QueryRecorder()
+    with (using_connection or connection).execute_wrapper(recorder):
+        yield recorder
+
+
+_recorder_do_contexto: ContextVar[Optional[QueryRecorder]] = ContextVar('query_recorder', default=None)
+
+
+def _gravar_no_contexto(execute, sql, params, many, context):
+    recorder = _recorder_do_contexto.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def _instalar_wrapper(sender, connection, **kwargs):
+    if _gravar_no_contexto not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_gravar_no_contexto)
+
+
+# Conexões abertas depois deste import (as das threads do sync_to_async) ganham o wrapper
+connection_created.connect(_instalar_wrapper)
+
+
+@contextmanager
+def record_context_queries():
+    """Como ``record_queries``, mas conta as consultas de qualquer thread que herde o contexto atual."""
+    recorder = QueryRecorder()
+    token = _recorder_do_contexto.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _recorder_do_contexto.reset(token)
@@ -0,0 +1,62 @@
+"""
+Escopo por empresa (tenant) das consultas da API.
+
+A empresa vem do ``EmpresaPrincipal`` autenticado pelo JWT de empresa
+(``backend.authentication``). O escopo falha fechado: sem empresa autenticada
+(usuário comum ou anônimo, enquanto as views seguirem sem ``IsAuthenticated``)
+a consulta não traz nada. Ver todas as empresas exige pedir explicitamente
+(``todas_as_empresas``).
+
+Cada tabela com dados de empresa tem a coluna ``emp_cnpj_numero`` e índices
+que começam por ela, para que a consulta de uma empresa não cresça com as
+demais.
+"""
+from typing import Optional
+
+from django.db import models
+from rest_framework import serializers
+
+
+def empresa_da_requisicao(request):
+    """``MinhaEmpresa`` autenticada na requisição, ou ``None``."""
+    return getattr(getattr(request, 'user', None), 'empresa', None)
+
+
+class EmpresaQuerySet(models.QuerySet):
+    campo_empresa = 'empresa'
+
+    def da_empresa(self, empresa: Optional[models.Model]):
+        """Filtra pela empresa informada; ``None`` (nenhuma empresa autenticada) não traz nada."""
+        if empresa is None:
+            return self.none()
+        return self.filter(**{self.campo_empresa: empresa})
+
+    def todas_as_empresas(self):
+        """Sem escopo, de propósito (tarefas internas, administração): nunca a partir de uma requisição."""
+        return self.all()
+
+
+class EmpresaScopedMixin:
+    """
+    Restringe o queryset de uma generic view à empresa autenticada.
+
+    Aplicado em ``filter_queryset``, que o DRF chama tanto na listagem quanto
+    em ``get_object``: vale também para views que sobrescrevem ``get_queryset``
+    e faz um ``uuid`` de outra empresa responder 404.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        return queryset.da_empresa(empresa_da_requisicao(self.request))
+
+
+class EmpresaScopedSlugRelatedField(serializers.SlugRelatedField):
+    """
+    Relação gravável só com objetos da empresa autenticada.
+
+    O queryset do campo passa por ``da_empresa``: um ``uuid`` de outra empresa
+    responde "objeto não existe", como o 404 do ``EmpresaScopedMixin``.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().da_empresa(empresa_da_requisicao(self.context.get('request')))
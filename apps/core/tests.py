@@ -1,8 +1,44 @@
+import asyncio
+import threading
+from contextlib import contextmanager
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from celery.signals import task_postrun, worker_process_shutdown
+
 from rest_framework.test import APITestCase
 from rest_framework import status
+from django.db import connection, transaction
+from django.test import override_settings
+from prometheus_client import REGISTRY
 from django.urls import reverse
+from apps.core import cnpj
+from apps.core.event_bus import EventBus
+from apps.core.lru import LRUCache
+from apps.core.observers import Observer, Subject
+from apps.core.pubsub import PubSub
+from apps.core.queries import normalize_sql, record_context_queries, record_queries
 from apps.empresa.models import MinhaEmpresa
 
+
+class QueryBudgetMixin:
+    """
+    Orçamento de consultas para testes de endpoints:
+
+        with self.assertMaxQueries(4):
+            self.client.get(url)
+
+    Ao estourar o orçamento, a falha lista as consultas mais repetidas (N+1).
+    """
+
+    @contextmanager
+    def assertMaxQueries(self, max_queries):
+        with record_queries() as queries:
+            yield queries
+        if queries.count > max_queries:
+            self.fail(f"Orçamento de {max_queries} consultas excedido: {queries.summary(limit=5)}")
+
+
 class AuthenticatedAPITestCase(APITestCase):
     def setUp(self):
         super().setUp()
@@ -33,4 +69,251 @@ class AuthenticatedAPITestCase(APITestCase):
 
         # Configura o token no cliente de teste
         token = response.data['access']
-        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
\ No newline at end of file
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+
+class QueryRecorderTestCase(QueryBudgetMixin, APITestCase):
+    def test_consultas_repetidas_sao_agrupadas(self):
+        """Mesma consulta com parâmetros diferentes conta como um padrão duplicado."""
+        with record_queries() as queries:
+            for cnpj in (1, 2, 3):
+                MinhaEmpresa.objects.filter(cnpj_numero=cnpj).first()
+            MinhaEmpresa.objects.filter(cnpj_numero__in=[1, 2, 3]).count()
+
+        self.assertEqual(queries.count, 4)
+        self.assertGreaterEqual(queries.total_time, 0)
+        [(sql, vezes)] = queries.duplicates()
+        self.assertEqual(vezes, 3)
+        self.assertIn('LIMIT %s', sql)
+
+    def test_normalize_sql_ignora_literais_e_tamanho_do_in(self):
+        self.assertEqual(
+            normalize_sql("SELECT a FROM t WHERE id IN (%s, %s) AND b = 'x'  LIMIT 21"),
+            normalize_sql("SELECT a FROM t WHERE id IN (%s) AND b = 'y' LIMIT 1"),
+        )
+
+    def test_assert_max_queries_falha_acima_do_orcamento(self):
+        with self.assertRaises(AssertionError):
+            with self.assertMaxQueries(1):
+                MinhaEmpresa.objects.count()
+                MinhaEmpresa.objects.count()
+
+    @override_settings(QUERY_INSPECTOR_ENABLED=True, QUERY_INSPECTOR_MAX_QUERIES=0)
+    def test_middleware_registra_requisicao_acima_do_limite(self):
+        with self.assertLogs('backend.middleware', level='WARNING') as logs:
+            response = self.client.get(reverse('healthz'))
+
+        self.assertEqual(response['X-DB-Query-Count'], '1')
+        self.assertIn('excedeu o limite', logs.output[0])
+
+    def test_middleware_desligado_por_padrao(self):
+        response = self.client.get(reverse('healthz'))
+        self.assertNotIn('X-DB-Query-Count', response)
+
+    async def test_record_context_queries_conta_consultas_de_outras_threads(self):
+        def contar():
+            try:
+                return MinhaEmpresa.objects.count()
+            finally:
+                connection.close()
+
+        with record_context_queries() as queries:
+            await sync_to_async(contar, thread_sensitive=False)()
+
+        self.assertEqual(queries.count, 1)
+
+
+class _RegistraObserver(Observer):
+    def __init__(self, delivery):
+        self.delivery = delivery
+        self.lotes = []
+
+    def update(self, subject, event_type, **kwargs):
+        self.lotes.append([event_type])
+
+    def update_batch(self, events):
+        self.lotes.append([event_type for _, event_type, _ in events])
+
+
+class EventBusTestCase(APITestCase):
+    """Observers síncronos na transação; assíncronos só após o commit, em lote."""
+
+    def setUp(self):
+        self.bus = EventBus(batch_size=10, flush_interval=0, background=False)
+        patcher = mock.patch('apps.core.observers.event_bus', self.bus)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.sync, self.assincrono = _RegistraObserver('sync'), _RegistraObserver('async')
+        self.subject = Subject()
+        self.subject.attach(self.sync)
+        self.subject.attach(self.assincrono)
+
+    def test_async_entregue_em_lote_apos_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.subject.notify('a')
+                self.subject.notify('b')
+                self.assertEqual(self.sync.lotes, [['a'], ['b']])
+            self.assertEqual(self.assincrono.lotes, [])
+
+        antes = REGISTRY.get_sample_value(
+            'gestao_observer_duration_seconds_count',
+            {'observer': '_RegistraObserver', 'mode': 'async', 'status': 'ok'},
+        ) or 0
+        self.bus.flush()
+
+        self.assertEqual(self.assincrono.lotes, [['a', 'b']])
+        depois = REGISTRY.get_sample_value(
+            'gestao_observer_duration_seconds_count',
+            {'observer': '_RegistraObserver', 'mode': 'async', 'status': 'ok'},
+        )
+        self.assertEqual(depois, antes + 1)
+
+    def test_sinais_do_celery_esvaziam_a_fila(self):
+        with mock.patch('apps.core.event_bus.event_bus', self.bus):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.subject.notify('a')
+            task_postrun.send(sender=None, task_id='t1', task=None)
+            self.assertEqual(self.assincrono.lotes, [['a']])
+
+            with self.captureOnCommitCallbacks(execute=True):
+                self.subject.notify('b')
+            worker_process_shutdown.send(sender=None, pid=1, exitcode=0)
+            self.assertEqual(self.assincrono.lotes, [['a'], ['b']])
+
+    @override_settings(EVENT_BUS_ENABLED=False)
+    def test_desabilitado_entrega_tudo_sincrono(self):
+        self.subject.notify('a')
+        self.assertEqual(self.assincrono.lotes, [['a']])
+
+
+
+class PubSubTestCase(APITestCase):
+    async def test_publicacao_acorda_so_a_chave_assinada(self):
+        pubsub = PubSub()
+        with pubsub.assinatura('canal', 1) as um, pubsub.assinatura('canal', 2) as dois:
+            self.assertEqual(pubsub.publicar('canal', '1', 'novo'), 1)
+            self.assertEqual(await um.aguardar(1), 'novo')
+            self.assertIsNone(await dois.aguardar(0.01))
+        self.assertEqual(pubsub.assinantes(), 0)
+
+    async def test_5000_assinantes_ociosos_acordam(self):
+        """5.000 esperas ociosas, cada uma acordada pela sua publicação vinda de outra thread (como o listener).
+
+        O tempo para acordar todas é medido por ``manage.py benchmark_long_poll``.
+        """
+        pubsub = PubSub()
+        assinaturas = [pubsub.assinar('canal', i) for i in range(5000)]
+        esperas = [asyncio.ensure_future(a.aguardar(60)) for a in assinaturas]
+        await asyncio.sleep(0.05)
+        self.assertFalse(any(e.done() for e in esperas))
+
+        acordadas = []
+        publicador = threading.Thread(
+            target=lambda: acordadas.extend(pubsub.publicar('canal', i, str(i)) for i in range(5000))
+        )
+        publicador.start()
+        resultados = await asyncio.wait_for(asyncio.gather(*esperas), 30)
+        publicador.join()
+
+        for a in assinaturas:
+            pubsub.cancelar(a)
+        self.assertEqual(acordadas, [1] * 5000)
+        self.assertEqual(resultados, [str(i) for i in range(5000)])
+        self.assertEqual(pubsub.assinantes(), 0)
+
+    def test_callback_recebe_publicacoes_e_falha_nao_propaga(self):
+        pubsub = PubSub()
+        recebidos = []
+        pubsub.assinar_callback('canal', 'x', recebidos.append)
+        falha = pubsub.assinar_callback('canal', 'x', lambda dados: 1 / 0)
+
+        with self.assertLogs('apps.core.pubsub', 'ERROR'):
+            self.assertEqual(pubsub.publicar('canal', 'x', '42'), 2)
+        pubsub.publicar_todos('canal')
+        pubsub.cancelar(falha)
+
+        self.assertEqual(recebidos, ['42', ''])
+        self.assertEqual(pubsub.assinantes('canal'), 1)
+
+
+class LRUCacheTestCase(APITestCase):
+    def test_descarta_a_menos_usada(self):
+        cache = LRUCache(maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(len(cache), 2)
+
+    @mock.patch('apps.core.lru.time.monotonic')
+    def test_expiracao_por_entrada_limitada_ao_ttl_do_cache(self, monotonic):
+        monotonic.return_value = 100.0
+        cache = LRUCache(maxsize=10, ttl=60)
+        cache.set('curta', 1, ttl=5)
+        cache.set('longa', 2, ttl=3600)
+        cache.set('expirada', 3, ttl=-1)
+
+        monotonic.return_value = 106.0
+        self.assertIsNone(cache.get('curta'))
+        self.assertEqual(cache.get('longa'), 2)
+        self.assertIsNone(cache.get('expirada'))
+        monotonic.return_value = 161.0
+        self.assertEqual(cache.get('longa', 'ausente'), 'ausente')
+
+    def test_descartar_se(self):
+        cache = LRUCache(maxsize=10)
+        for i in range(6):
+            cache.set(i, i % 3)
+        self.assertEqual(cache.descartar_se(lambda valor: valor == 0), 2)
+        self.assertEqual(cache.pop(1), 1)
+        self.assertEqual(len(cache), 3)
+
+    def test_contadores_e_geracao(self):
+        cache = LRUCache(maxsize=10)
+        cache.set('a', 1)
+        cache.get('a')
+        cache.get('b')
+        geracao = cache.geracao
+        cache.pop('a')
+
+        self.assertGreater(cache.geracao, geracao)
+        self.assertEqual(cache.estatisticas(), {'entradas': 0, 'hits': 1, 'misses': 1, 'taxa_de_acerto': 0.5})
+
+
+class CNPJTestCase(APITestCase):
+    ENTRADAS = [
+        '11.222.333/0001-81', '11222333000181', 11222333000181, '11.222.333/0001-82',
+        191, '00.000.000/0001-91', '11.111.111/1111-11', '1122233300018', '112223330001810',
+        '11 222 333 0001 81', '１１.222.333/0001-81', None, '', -1, 10 ** 14,
+    ]
+
+    def test_escalar(self):
+        self.assertTrue(cnpj.validar('11.222.333/0001-81'))
+        self.assertTrue(cnpj.validar(191))
+        self.assertFalse(cnpj.validar('11.222.333/0001-82'))
+        # Dígitos repetidos passam no cálculo, mas não são CNPJ
+        self.assertFalse(cnpj.validar('00.000.000/0000-00'))
+        self.assertEqual(cnpj.normalizar(191), '00000000000191')
+        self.assertIsNone(cnpj.normalizar('1122233300018'))
+        self.assertEqual(cnpj.cnpj_para_numero('11.222.333/0001-81'), 11222333000181)
+        self.assertIsNone(cnpj.cnpj_para_numero('--'))
+
+    def test_lote_concorda_com_escalar(self):
+        numeros, validos = cnpj.validar_lote(self.ENTRADAS, lote=4)
+
+        self.assertEqual(validos.tolist(), [cnpj.validar(c) for c in self.ENTRADAS])
+        normalizados = [cnpj.normalizar(c) for c in self.ENTRADAS]
+        self.assertEqual(numeros.tolist(), [int(n) if n else 0 for n in normalizados])
+
+    def test_lote_de_inteiros(self):
+        import numpy as np
+
+        numeros, validos = cnpj.validar_lote(np.array([11222333000181, 191, 11222333000182, -1]))
+
+        self.assertEqual(validos.tolist(), [True, True, False, False])
+        self.assertEqual(numeros.tolist(), [11222333000181, 191, 11222333000182, 0])
+        self.assertEqual(len(cnpj.validar_lote([])[0]), 0)
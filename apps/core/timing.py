@@ -0,0 +1,60 @@
+"""
+Instrumentação de tempo por etapa do pipeline de processamento de notas.
+
+O handler do job ativa um ``StageRecorder``; a partir daí qualquer código do
+pipeline (orquestrador, estratégias de extração, cadeia LLM) pode medir uma
+etapa com ``with stage('nome'):`` sem receber o recorder por parâmetro.
+Fora de um recorder ativo, ``stage`` apenas mede e registra em log.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_recorder_atual: ContextVar[Optional["StageRecorder"]] = ContextVar('stage_recorder', default=None)
+
+
+class StageRecorder:
+    """Acumula a duração (em segundos) de cada etapa de um job.
+
+    Etapas repetidas (ex.: classificação de vários batches) são somadas.
+    """
+
+    def __init__(self):
+        self.duracoes: Dict[str, float] = {}
+
+    def add(self, etapa: str, segundos: float):
+        self.duracoes[etapa] = self.duracoes.get(etapa, 0.0) + segundos
+
+    def as_dict(self) -> Dict[str, float]:
+        """Retorna as durações em milissegundos, prontas para serializar em JSON."""
+        return {etapa: round(segundos * 1000, 3) for etapa, segundos in self.duracoes.items()}
+
+    @contextmanager
+    def activate(self):
+        token = _recorder_atual.set(self)
+        try:
+            yield self
+        finally:
+            _recorder_atual.reset(token)
+
+
+def current_recorder() -> Optional[StageRecorder]:
+    return _recorder_atual.get()
+
+
+@contextmanager
+def stage(etapa: str):
+    """Mede a duração do bloco e acumula no recorder ativo (se houver)."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracao = time.perf_counter() - inicio
+        recorder = _recorder_atual.get()
+        if recorder is not None:
+            recorder.add(etapa, duracao)
+        logger.debug("ETAPA: %s concluída em %.1f ms", etapa, duracao * 1000)
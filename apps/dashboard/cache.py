@@ -0,0 +1,75 @@
+"""
+Cache das respostas do dashboard por (empresa, período), com invalidação por versão.
+
+Cada escopo (empresa; 0 = todas) tem um token de versão, e há um token global
+trocado a cada refresh das views materializadas. As respostas ficam sob chaves
+que incluem os dois tokens, então invalidar é só trocar o token: as entradas
+antigas deixam de ser lidas e expiram sozinhas. O ETag é derivado dos tokens,
+o que permite responder 304 sem consultar o banco.
+
+Usa o alias ``CACHES['dashboard']`` (arquivo por padrão, para ser visto pelos
+processos da API e pelo worker que processa as notas).
+"""
+import hashlib
+import uuid
+from typing import Iterable, Optional
+
+from django.core.cache import caches
+
+from apps.core.metrics import record_cache
+
+CACHE_ALIAS = 'dashboard'
+ESCOPO_TODAS = 0
+
+_VERSAO_GLOBAL = 'dashboard:versao:global'
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _chave_versao(escopo: int) -> str:
+    return f'dashboard:versao:{escopo}'
+
+
+def _novo_token() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+def versao(escopo: int) -> str:
+    """Versão atual do escopo (token global + token do escopo); cria os tokens que faltarem."""
+    cache = _cache()
+    chaves = [_VERSAO_GLOBAL, _chave_versao(escopo)]
+    tokens = cache.get_many(chaves)
+    for chave in chaves:
+        if chave not in tokens:
+            # add() não sobrescreve um token criado por outro processo nesse meio tempo
+            cache.add(chave, _novo_token(), timeout=None)
+            tokens[chave] = cache.get(chave)
+    return f"{tokens[_VERSAO_GLOBAL]}.{tokens[_chave_versao(escopo)]}"
+
+
+def etag(escopo: int, periodo: str, live: bool, versao_atual: str) -> str:
+    digest = hashlib.sha1(f"{escopo}:{periodo}:{live}:{versao_atual}".encode()).hexdigest()[:20]
+    return f'"{digest}"'
+
+
+def obter(escopo: int, periodo: str, live: bool, versao_atual: str) -> Optional[dict]:
+    dados = _cache().get(f'dashboard:dados:{escopo}:{periodo}:{int(live)}:{versao_atual}')
+    record_cache(CACHE_ALIAS, dados is not None)
+    return dados
+
+
+def guardar(escopo: int, periodo: str, live: bool, versao_atual: str, dados: dict):
+    _cache().set(f'dashboard:dados:{escopo}:{periodo}:{int(live)}:{versao_atual}', dados)
+
+
+def invalidar(empresas: Iterable[Optional[int]] = ()):
+    """Troca a versão das empresas informadas e a do escopo de todas as empresas."""
+    escopos = {ESCOPO_TODAS} | {e for e in empresas if e}
+    _cache().set_many({_chave_versao(e): _novo_token() for e in escopos}, timeout=None)
+
+
+def invalidar_tudo():
+    """Após um refresh das views materializadas: todas as respostas ficam desatualizadas."""
+    _cache().set(_VERSAO_GLOBAL, _novo_token(), timeout=None)
@@ -0,0 +1,150 @@
+from django.db import migrations
+
+# Janelas relativas a CURRENT_DATE no momento do REFRESH; mesmas de selectors.PERIODOS
+PERIODOS = """
+    periodos (periodo, inicio, fim) AS (
+        SELECT p.periodo, CURRENT_DATE - p.dias, CURRENT_DATE
+        FROM (VALUES ('last_7_days', 7), ('last_month', 30), ('last_3_months', 90), ('last_year', 365)) p (periodo, dias)
+    )
+"""
+
+# Escopo 0 = todas as empresas (linha de totais do GROUPING SETS); jobs sem empresa só entram nele
+ESCOPO = "CASE WHEN GROUPING(j.emp_cnpj_numero) = 1 THEN 0 ELSE j.emp_cnpj_numero END"
+
+KPIS = f"""
+CREATE MATERIALIZED VIEW dashboard_kpis_mv AS
+WITH {PERIODOS},
+escopos (escopo) AS (
+    SELECT 0::bigint UNION ALL SELECT emp_cnpj_numero FROM cadastro_empresas
+),
+kpis_lancamentos AS (
+    SELECT p.periodo, {ESCOPO} AS escopo,
+           SUM(l.lcf_valor) FILTER (
+               WHERE tipo.clf_codigo = 'RECEITA' AND l.lcf_data_pagamento BETWEEN p.inicio AND p.fim
+           ) AS total_revenue,
+           SUM(l.lcf_valor) FILTER (
+               WHERE tipo.clf_codigo = 'PAGAR' AND status.clf_codigo = 'PENDENTE'
+                 AND l.lcf_data_vencimento BETWEEN p.inicio AND p.fim
+           ) AS pending_payments
+    FROM periodos p
+    JOIN movimento_lancamentos_financeiros l
+        ON l.lcf_data_pagamento BETWEEN p.inicio AND p.fim OR l.lcf_data_vencimento BETWEEN p.inicio AND p.fim
+    JOIN geral_classificadores tipo ON tipo.clf_id = l.clf_id_tipo
+    JOIN geral_classificadores status ON status.clf_id = l.clf_id_status
+    JOIN movimento_notas_fiscais n ON n.ntf_id = l.ntf_id
+    LEFT JOIN movimento_jobs_processamento j ON j.jbp_id = n.jbp_id
+    GROUP BY p.periodo, GROUPING SETS ((j.emp_cnpj_numero), ())
+),
+kpis_notas AS (
+    SELECT p.periodo, {ESCOPO} AS escopo,
+           COUNT(*) AS processed_invoices,
+           COUNT(DISTINCT n.pcr_id) AS active_suppliers
+    FROM periodos p
+    JOIN movimento_notas_fiscais n ON n.ntf_data_emissao BETWEEN p.inicio AND p.fim
+    LEFT JOIN movimento_jobs_processamento j ON j.jbp_id = n.jbp_id
+    GROUP BY p.periodo, GROUPING SETS ((j.emp_cnpj_numero), ())
+)
+SELECT e.escopo AS emp_cnpj_numero, p.periodo,
+       COALESCE(kl.total_revenue, 0) AS total_revenue,
+       COALESCE(kl.pending_payments, 0) AS pending_payments,
+       COALESCE(kn.processed_invoices, 0) AS processed_invoices,
+       COALESCE(kn.active_suppliers, 0) AS active_suppliers,
+       NOW() AS atualizado_em
+FROM escopos e
+CROSS JOIN periodos p
+LEFT JOIN kpis_lancamentos kl ON kl.escopo = e.escopo AND kl.periodo = p.periodo
+LEFT JOIN kpis_notas kn ON kn.escopo = e.escopo AND kn.periodo = p.periodo;
+
+CREATE UNIQUE INDEX uq_dashboard_kpis_mv ON dashboard_kpis_mv (emp_cnpj_numero, periodo);
+"""
+
+RECEITA_MENSAL = f"""
+CREATE MATERIALIZED VIEW dashboard_receita_mensal_mv AS
+SELECT escopo AS emp_cnpj_numero, month, total
+FROM (
+    SELECT {ESCOPO} AS escopo,
+           to_char(DATE_TRUNC('month', l.lcf_data_pagamento), 'YYYY-MM') AS month,
+           SUM(l.lcf_valor) AS total
+    FROM movimento_lancamentos_financeiros l
+    JOIN geral_classificadores c ON c.clf_id = l.clf_id_tipo
+    JOIN movimento_notas_fiscais n ON n.ntf_id = l.ntf_id
+    LEFT JOIN movimento_jobs_processamento j ON j.jbp_id = n.jbp_id
+    WHERE c.clf_tipo = 'TIPO_LANCAMENTO' AND c.clf_codigo = 'RECEITA'
+      AND l.lcf_data_pagamento >= DATE_TRUNC('month', CURRENT_DATE - INTERVAL '6 months')
+    GROUP BY month, GROUPING SETS ((j.emp_cnpj_numero), ())
+) r
+WHERE escopo IS NOT NULL;
+
+CREATE UNIQUE INDEX uq_dashboard_receita_mensal_mv ON dashboard_receita_mensal_mv (emp_cnpj_numero, month);
+"""
+
+TOP_FORNECEDORES = f"""
+CREATE MATERIALIZED VIEW dashboard_top_fornecedores_mv AS
+WITH {PERIODOS},
+totais AS (
+    SELECT p.periodo, {ESCOPO} AS escopo, pc.pcr_nome AS nome, SUM(n.ntf_valor_total) AS total
+    FROM periodos p
+    JOIN movimento_notas_fiscais n ON n.ntf_data_emissao BETWEEN p.inicio AND p.fim
+    JOIN cadastro_parceiros pc ON pc.pcr_id = n.pcr_id
+    LEFT JOIN movimento_jobs_processamento j ON j.jbp_id = n.jbp_id
+    GROUP BY p.periodo, pc.pcr_nome, GROUPING SETS ((j.emp_cnpj_numero), ())
+)
+SELECT escopo AS emp_cnpj_numero, periodo, posicao, nome, total
+FROM (
+    SELECT t.*, ROW_NUMBER() OVER (PARTITION BY escopo, periodo ORDER BY total DESC, nome) AS posicao
+    FROM totais t
+    WHERE escopo IS NOT NULL
+) r
+WHERE posicao <= 5;
+
+CREATE UNIQUE INDEX uq_dashboard_top_fornecedores_mv ON dashboard_top_fornecedores_mv (emp_cnpj_numero, periodo, posicao);
+"""
+
+DISTRIBUICOES = f"""
+CREATE MATERIALIZED VIEW dashboard_distribuicoes_mv AS
+WITH {PERIODOS},
+lancamentos AS (
+    SELECT l.lcf_valor, l.lcf_data_pagamento, l.lcf_data_vencimento, l.clf_id_tipo, l.clf_id_status, j.emp_cnpj_numero
+    FROM movimento_lancamentos_financeiros l
+    JOIN movimento_notas_fiscais n ON n.ntf_id = l.ntf_id
+    LEFT JOIN movimento_jobs_processamento j ON j.jbp_id = n.jbp_id
+),
+distribuicoes AS (
+    SELECT p.periodo, {ESCOPO} AS escopo, 'tipo' AS dimensao, c.clf_descricao AS rotulo, SUM(j.lcf_valor) AS valor
+    FROM periodos p
+    JOIN lancamentos j ON j.lcf_data_pagamento BETWEEN p.inicio AND p.fim
+    JOIN geral_classificadores c ON c.clf_id = j.clf_id_tipo AND c.clf_tipo = 'TIPO_LANCAMENTO'
+    GROUP BY p.periodo, c.clf_descricao, GROUPING SETS ((j.emp_cnpj_numero), ())
+    UNION ALL
+    SELECT p.periodo, {ESCOPO}, 'status', c.clf_descricao, COUNT(*)
+    FROM periodos p
+    JOIN lancamentos j ON j.lcf_data_vencimento BETWEEN p.inicio AND p.fim
+    JOIN geral_classificadores c ON c.clf_id = j.clf_id_status AND c.clf_tipo = 'STATUS_LANCAMENTO'
+    GROUP BY p.periodo, c.clf_descricao, GROUPING SETS ((j.emp_cnpj_numero), ())
+)
+SELECT escopo AS emp_cnpj_numero, periodo, dimensao, rotulo, valor
+FROM distribuicoes
+WHERE escopo IS NOT NULL;
+
+CREATE UNIQUE INDEX uq_dashboard_distribuicoes_mv ON dashboard_distribuicoes_mv (emp_cnpj_numero, periodo, dimensao, rotulo);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classificadores', '0001_initial'),
+        ('empresa', '0002_remove_empresanaoclassificada_id_and_more'),
+        ('financeiro', '0004_resumo_diario'),
+        ('notas', '0001_initial'),
+        ('parceiros', '0001_initial'),
+        ('processamento', '0006_jobprocessamento_idx_status_id'),
+    ]
+
+    # Índices únicos sem WHERE/expressão: exigidos pelo REFRESH MATERIALIZED VIEW CONCURRENTLY
+    operations = [
+        migrations.RunSQL(KPIS, reverse_sql="DROP MATERIALIZED VIEW IF EXISTS dashboard_kpis_mv;"),
+        migrations.RunSQL(RECEITA_MENSAL, reverse_sql="DROP MATERIALIZED VIEW IF EXISTS dashboard_receita_mensal_mv;"),
+        migrations.RunSQL(TOP_FORNECEDORES, reverse_sql="DROP MATERIALIZED VIEW IF EXISTS dashboard_top_fornecedores_mv;"),
+        migrations.RunSQL(DISTRIBUICOES, reverse_sql="DROP MATERIALIZED VIEW IF EXISTS dashboard_distribuicoes_mv;"),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2 on 2026-10-19 18:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0001_dashboard_materializado'),
+        ('financeiro', '0004_resumo_diario'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetricaFinanceira',
+            fields=[
+                ('id', models.BigAutoField(db_column='mtf_id', primary_key=True, serialize=False)),
+                ('chave', models.CharField(db_column='mtf_chave', max_length=50, unique=True)),
+                ('valor_pendente', models.DecimalField(db_column='mtf_valor_pendente', decimal_places=2, default=0, max_digits=16)),
+                ('qtde_pendente', models.IntegerField(db_column='mtf_qtde_pendente', default=0)),
+                ('dt_alteracao', models.DateTimeField(auto_now=True, db_column='mtf_dt_alteracao')),
+            ],
+            options={
+                'db_table': 'dashboard_metricas_financeiras',
+            },
+        ),
+        # Carga inicial; daí em diante mantida por deltas e reconciliada periodicamente
+        migrations.RunSQL(
+            sql="""
+                INSERT INTO dashboard_metricas_financeiras
+                    (mtf_chave, mtf_valor_pendente, mtf_qtde_pendente, mtf_dt_alteracao)
+                SELECT tipo.clf_codigo, COALESCE(SUM(l.lcf_valor), 0), COUNT(l.lcf_id), NOW()
+                FROM geral_classificadores tipo
+                LEFT JOIN movimento_lancamentos_financeiros l ON l.clf_id_tipo = tipo.clf_id
+                    AND l.clf_id_status IN (
+                        SELECT clf_id FROM geral_classificadores
+                        WHERE clf_tipo = 'STATUS_LANCAMENTO' AND clf_codigo = 'PENDENTE'
+                    )
+                WHERE tipo.clf_tipo = 'TIPO_LANCAMENTO'
+                GROUP BY tipo.clf_codigo;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2 on 2026-10-19 19:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0002_metricas_financeiras'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='metricafinanceira',
+            name='balde',
+            field=models.SmallIntegerField(db_column='mtf_balde', default=0),
+        ),
+        migrations.AlterField(
+            model_name='metricafinanceira',
+            name='chave',
+            field=models.CharField(db_column='mtf_chave', max_length=50),
+        ),
+        migrations.AddConstraint(
+            model_name='metricafinanceira',
+            constraint=models.UniqueConstraint(fields=('chave', 'balde'), name='uq_mtf_chave_balde'),
+        ),
+    ]
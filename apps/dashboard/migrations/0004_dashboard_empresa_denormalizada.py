@@ -0,0 +1,143 @@
+from importlib import import_module
+
+from django.db import migrations
+
+# Mesmas views da 0001, mas a empresa vem da coluna denormalizada em lançamentos e notas
+# (emp_cnpj_numero), a mesma do dashboard ao vivo e das listas, e não do job de origem
+anterior = import_module('apps.dashboard.migrations.0001_dashboard_materializado')
+
+PERIODOS = anterior.PERIODOS
+
+
+def escopo(coluna: str) -> str:
+    """Escopo 0 = todas as empresas (linha de totais do GROUPING SETS); sem empresa só entra nele."""
+    return f"CASE WHEN GROUPING({coluna}) = 1 THEN 0 ELSE {coluna} END"
+
+
+KPIS = f"""
+CREATE MATERIALIZED VIEW dashboard_kpis_mv AS
+WITH {PERIODOS},
+escopos (escopo) AS (
+    SELECT 0::bigint UNION ALL SELECT emp_cnpj_numero FROM cadastro_empresas
+),
+kpis_lancamentos AS (
+    SELECT p.periodo, {escopo('l.emp_cnpj_numero')} AS escopo,
+           SUM(l.lcf_valor) FILTER (
+               WHERE tipo.clf_codigo = 'RECEITA' AND l.lcf_data_pagamento BETWEEN p.inicio AND p.fim
+           ) AS total_revenue,
+           SUM(l.lcf_valor) FILTER (
+               WHERE tipo.clf_codigo = 'PAGAR' AND status.clf_codigo = 'PENDENTE'
+                 AND l.lcf_data_vencimento BETWEEN p.inicio AND p.fim
+           ) AS pending_payments
+    FROM periodos p
+    JOIN movimento_lancamentos_financeiros l
+        ON l.lcf_data_pagamento BETWEEN p.inicio AND p.fim OR l.lcf_data_vencimento BETWEEN p.inicio AND p.fim
+    JOIN geral_classificadores tipo ON tipo.clf_id = l.clf_id_tipo
+    JOIN geral_classificadores status ON status.clf_id = l.clf_id_status
+    GROUP BY p.periodo, GROUPING SETS ((l.emp_cnpj_numero), ())
+),
+kpis_notas AS (
+    SELECT p.periodo, {escopo('n.emp_cnpj_numero')} AS escopo,
+           COUNT(*) AS processed_invoices,
+           COUNT(DISTINCT n.pcr_id) AS active_suppliers
+    FROM periodos p
+    JOIN movimento_notas_fiscais n ON n.ntf_data_emissao BETWEEN p.inicio AND p.fim
+    GROUP BY p.periodo, GROUPING SETS ((n.emp_cnpj_numero), ())
+)
+SELECT e.escopo AS emp_cnpj_numero, p.periodo,
+       COALESCE(kl.total_revenue, 0) AS total_revenue,
+       COALESCE(kl.pending_payments, 0) AS pending_payments,
+       COALESCE(kn.processed_invoices, 0) AS processed_invoices,
+       COALESCE(kn.active_suppliers, 0) AS active_suppliers,
+       NOW() AS atualizado_em
+FROM escopos e
+CROSS JOIN periodos p
+LEFT JOIN kpis_lancamentos kl ON kl.escopo = e.escopo AND kl.periodo = p.periodo
+LEFT JOIN kpis_notas kn ON kn.escopo = e.escopo AND kn.periodo = p.periodo;
+
+CREATE UNIQUE INDEX uq_dashboard_kpis_mv ON dashboard_kpis_mv (emp_cnpj_numero, periodo);
+"""
+
+RECEITA_MENSAL = f"""
+CREATE MATERIALIZED VIEW dashboard_receita_mensal_mv AS
+SELECT escopo AS emp_cnpj_numero, month, total
+FROM (
+    SELECT {escopo('l.emp_cnpj_numero')} AS escopo,
+           to_char(DATE_TRUNC('month', l.lcf_data_pagamento), 'YYYY-MM') AS month,
+           SUM(l.lcf_valor) AS total
+    FROM movimento_lancamentos_financeiros l
+    JOIN geral_classificadores c ON c.clf_id = l.clf_id_tipo
+    WHERE c.clf_tipo = 'TIPO_LANCAMENTO' AND c.clf_codigo = 'RECEITA'
+      AND l.lcf_data_pagamento >= DATE_TRUNC('month', CURRENT_DATE - INTERVAL '6 months')
+    GROUP BY month, GROUPING SETS ((l.emp_cnpj_numero), ())
+) r
+WHERE escopo IS NOT NULL;
+
+CREATE UNIQUE INDEX uq_dashboard_receita_mensal_mv ON dashboard_receita_mensal_mv (emp_cnpj_numero, month);
+"""
+
+TOP_FORNECEDORES = f"""
+CREATE MATERIALIZED VIEW dashboard_top_fornecedores_mv AS
+WITH {PERIODOS},
+totais AS (
+    SELECT p.periodo, {escopo('n.emp_cnpj_numero')} AS escopo, pc.pcr_nome AS nome, SUM(n.ntf_valor_total) AS total
+    FROM periodos p
+    JOIN movimento_notas_fiscais n ON n.ntf_data_emissao BETWEEN p.inicio AND p.fim
+    JOIN cadastro_parceiros pc ON pc.pcr_id = n.pcr_id
+    GROUP BY p.periodo, pc.pcr_nome, GROUPING SETS ((n.emp_cnpj_numero), ())
+)
+SELECT escopo AS emp_cnpj_numero, periodo, posicao, nome, total
+FROM (
+    SELECT t.*, ROW_NUMBER() OVER (PARTITION BY escopo, periodo ORDER BY total DESC, nome) AS posicao
+    FROM totais t
+    WHERE escopo IS NOT NULL
+) r
+WHERE posicao <= 5;
+
+CREATE UNIQUE INDEX uq_dashboard_top_fornecedores_mv ON dashboard_top_fornecedores_mv (emp_cnpj_numero, periodo, posicao);
+"""
+
+DISTRIBUICOES = f"""
+CREATE MATERIALIZED VIEW dashboard_distribuicoes_mv AS
+WITH {PERIODOS},
+distribuicoes AS (
+    SELECT p.periodo, {escopo('l.emp_cnpj_numero')} AS escopo, 'tipo' AS dimensao, c.clf_descricao AS rotulo,
+           SUM(l.lcf_valor) AS valor
+    FROM periodos p
+    JOIN movimento_lancamentos_financeiros l ON l.lcf_data_pagamento BETWEEN p.inicio AND p.fim
+    JOIN geral_classificadores c ON c.clf_id = l.clf_id_tipo AND c.clf_tipo = 'TIPO_LANCAMENTO'
+    GROUP BY p.periodo, c.clf_descricao, GROUPING SETS ((l.emp_cnpj_numero), ())
+    UNION ALL
+    SELECT p.periodo, {escopo('l.emp_cnpj_numero')}, 'status', c.clf_descricao, COUNT(*)
+    FROM periodos p
+    JOIN movimento_lancamentos_financeiros l ON l.lcf_data_vencimento BETWEEN p.inicio AND p.fim
+    JOIN geral_classificadores c ON c.clf_id = l.clf_id_status AND c.clf_tipo = 'STATUS_LANCAMENTO'
+    GROUP BY p.periodo, c.clf_descricao, GROUPING SETS ((l.emp_cnpj_numero), ())
+)
+SELECT escopo AS emp_cnpj_numero, periodo, dimensao, rotulo, valor
+FROM distribuicoes
+WHERE escopo IS NOT NULL;
+
+CREATE UNIQUE INDEX uq_dashboard_distribuicoes_mv ON dashboard_distribuicoes_mv (emp_cnpj_numero, periodo, dimensao, rotulo);
+"""
+
+
+def recriar(view: str, sql: str, sql_anterior: str):
+    drop = f"DROP MATERIALIZED VIEW IF EXISTS {view};"
+    return migrations.RunSQL(drop + sql, reverse_sql=drop + sql_anterior)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0003_metricas_por_balde'),
+        ('financeiro', '0006_lancamento_indices_empresa'),
+        ('notas', '0003_notafiscal_idx_emp_data'),
+    ]
+
+    operations = [
+        recriar('dashboard_kpis_mv', KPIS, anterior.KPIS),
+        recriar('dashboard_receita_mensal_mv', RECEITA_MENSAL, anterior.RECEITA_MENSAL),
+        recriar('dashboard_top_fornecedores_mv', TOP_FORNECEDORES, anterior.TOP_FORNECEDORES),
+        recriar('dashboard_distribuicoes_mv', DISTRIBUICOES, anterior.DISTRIBUICOES),
+    ]
@@ -0,0 +1,26 @@
+from django.db import models
+
+
+class MetricaFinanceira(models.Model):
+    """
+    Parcela (balde) do total e da quantidade de lançamentos PENDENTES por tipo (PAGAR, RECEBER...).
+
+    O total de um tipo é a soma dos seus baldes (``settings.METRICAS_FINANCEIRAS_BALDES``).
+    Mantida por deltas pelo MetricasFinanceirasObserver e reconciliada
+    periodicamente por ``tasks.reconciliar_metricas_financeiras_task``.
+    """
+    id = models.BigAutoField(primary_key=True, db_column='mtf_id')
+    chave = models.CharField(max_length=50, db_column='mtf_chave')
+    balde = models.SmallIntegerField(default=0, db_column='mtf_balde')
+    valor_pendente = models.DecimalField(max_digits=16, decimal_places=2, default=0, db_column='mtf_valor_pendente')
+    qtde_pendente = models.IntegerField(default=0, db_column='mtf_qtde_pendente')
+    dt_alteracao = models.DateTimeField(auto_now=True, db_column='mtf_dt_alteracao')
+
+    class Meta:
+        db_table = 'dashboard_metricas_financeiras'
+        constraints = [
+            models.UniqueConstraint(fields=['chave', 'balde'], name='uq_mtf_chave_balde'),
+        ]
+
+    def __str__(self):
+        return f"{self.chave}[{self.balde}]: R$ {self.valor_pendente} ({self.qtde_pendente})"
@@ -1,39 +1,50 @@
 import logging
 
+from django.db import transaction
+
 from apps.core.observers import Observer
-from apps.financeiro.models import LancamentoFinanceiro
+from . import cache as dashboard_cache
+from .repositories import MetricaFinanceiraRepository
 
 logger = logging.getLogger(__name__)
 
 
 class MetricasFinanceirasObserver(Observer):
-    """Observer that recalculates simple financial metrics for the dashboard."""
+    """Observer that keeps the pending PAGAR/RECEBER totals for the dashboard.
+
+    Each event adjusts the running totals (MetricaFinanceira) by the lancamento's
+    own value, a primary-key lookup, instead of re-aggregating the whole table;
+    ``tasks.reconciliar_metricas_financeiras_task`` corrects any drift periodically.
+    Also invalidates the cached dashboard responses of the lancamento's empresa
+    (after commit, so no request caches the old data under the new version).
+    """
+
+    SINAIS = {
+        "lancamento_created": 1,
+        "lancamento_changed": 1,
+        "lancamento_changing": -1,
+        "lancamento_deleting": -1,
+    }
+    EVENTOS_INVALIDACAO = ("lancamento_created", "lancamento_changed", "lancamento_deleting")
+
+    def __init__(self):
+        self.repository = MetricaFinanceiraRepository()
 
     def update(self, subject, event_type: str, **kwargs):
-        if event_type == "lancamento_created":
-            try:
-                self._atualizar_metricas()
-            except Exception:
-                logger.exception("Erro ao atualizar métricas financeiras")
-
-    def _atualizar_metricas(self):
-        # import Sum locally to avoid static analysis complaining about Django imports at top level
-        from django.db.models import Sum
-
-        total_pagar = (
-            LancamentoFinanceiro.objects.filter(
-                clf_tipo__codigo="PAGAR", clf_status__codigo="PENDENTE"
-            )
-            .aggregate(Sum("valor"))["valor__sum"]
-            or 0
-        )
-
-        total_receber = (
-            LancamentoFinanceiro.objects.filter(
-                clf_tipo__codigo="RECEBER", clf_status__codigo="PENDENTE"
-            )
-            .aggregate(Sum("valor"))["valor__sum"]
-            or 0
-        )
-
-        logger.info("MÉTRICAS: A Pagar: R$%s, A Receber: R$%s", total_pagar, total_receber)
+        lancamento = kwargs.get("lancamento")
+        if event_type in self.EVENTOS_INVALIDACAO:
+            self._invalidar_cache(lancamento)
+        sinal = self.SINAIS.get(event_type)
+        if sinal is None or lancamento is None:
+            return
+        try:
+            self.repository.aplicar_delta(lancamento.id, sinal)
+            if event_type == "lancamento_created":
+                totais = self.repository.totais(["PAGAR", "RECEBER"])
+                logger.info("MÉTRICAS: A Pagar: R$%s, A Receber: R$%s", totais["PAGAR"], totais["RECEBER"])
+        except Exception:
+            logger.exception("Erro ao atualizar métricas financeiras")
+
+    def _invalidar_cache(self, lancamento):
+        empresa_id = getattr(lancamento, 'empresa_id', None)
+        transaction.on_commit(lambda: dashboard_cache.invalidar([empresa_id]))
@@ -0,0 +1,132 @@
+import logging
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Sum
+
+from . import cache as dashboard_cache
+from .models import MetricaFinanceira
+
+logger = logging.getLogger(__name__)
+
+# Criadas na migration 0001_dashboard_materializado; todas com índice único para o refresh CONCURRENTLY
+VIEWS_MATERIALIZADAS = [
+    'dashboard_kpis_mv',
+    'dashboard_receita_mensal_mv',
+    'dashboard_top_fornecedores_mv',
+    'dashboard_distribuicoes_mv',
+]
+
+
+class DashboardMaterializadoRepository:
+    def atualizar(self) -> dict:
+        """Atualiza as views materializadas do dashboard e retorna a duração (ms) de cada uma.
+
+        ``CONCURRENTLY`` recalcula a view e grava apenas as linhas que mudaram, sem
+        bloquear as leituras do endpoint durante o refresh.
+        """
+        duracoes = {}
+        with connection.cursor() as cursor:
+            for view in VIEWS_MATERIALIZADAS:
+                inicio = time.perf_counter()
+                cursor.execute(f'REFRESH MATERIALIZED VIEW CONCURRENTLY {view}')
+                duracoes[view] = round((time.perf_counter() - inicio) * 1000, 1)
+        transaction.on_commit(dashboard_cache.invalidar_tudo)
+        logger.info("Dashboard materializado atualizado: %s", duracoes)
+        return duracoes
+
+
+# Uma linha por tipo de lançamento e balde; só lançamentos PENDENTES contam. O balde sai do id do
+# lançamento: o -1 e o +1 de uma alteração caem na mesma linha, e transações concorrentes com
+# lançamentos diferentes quase sempre em linhas diferentes (o lock de cada linha vai até o commit)
+_APLICAR_DELTA = """
+    INSERT INTO dashboard_metricas_financeiras
+        (mtf_chave, mtf_balde, mtf_valor_pendente, mtf_qtde_pendente, mtf_dt_alteracao)
+    SELECT tipo.clf_codigo, l.lcf_id %% %(baldes)s, %(sinal)s * l.lcf_valor, %(sinal)s, NOW()
+    FROM movimento_lancamentos_financeiros l
+    JOIN geral_classificadores tipo ON tipo.clf_id = l.clf_id_tipo
+    JOIN geral_classificadores status ON status.clf_id = l.clf_id_status
+        AND status.clf_tipo = 'STATUS_LANCAMENTO' AND status.clf_codigo = 'PENDENTE'
+    WHERE l.lcf_id = %(lancamento_id)s
+    ON CONFLICT (mtf_chave, mtf_balde) DO UPDATE SET
+        mtf_valor_pendente = dashboard_metricas_financeiras.mtf_valor_pendente + EXCLUDED.mtf_valor_pendente,
+        mtf_qtde_pendente = dashboard_metricas_financeiras.mtf_qtde_pendente + EXCLUDED.mtf_qtde_pendente,
+        mtf_dt_alteracao = NOW()
+"""
+
+# Total real e total mantido (soma dos baldes) numa única consulta, sem locks: as duas somas
+# vêm do mesmo snapshot, e um lançamento e o seu delta são gravados na mesma transação
+_RECALCULAR = """
+    WITH reais AS (
+        SELECT tipo.clf_codigo AS chave, COALESCE(SUM(l.lcf_valor), 0) AS valor, COUNT(l.lcf_id) AS qtde
+        FROM geral_classificadores tipo
+        LEFT JOIN movimento_lancamentos_financeiros l ON l.clf_id_tipo = tipo.clf_id
+            AND l.clf_id_status IN (
+                SELECT clf_id FROM geral_classificadores
+                WHERE clf_tipo = 'STATUS_LANCAMENTO' AND clf_codigo = 'PENDENTE'
+            )
+        WHERE tipo.clf_tipo = 'TIPO_LANCAMENTO'
+        GROUP BY tipo.clf_codigo
+    ), mantidos AS (
+        SELECT mtf_chave AS chave, SUM(mtf_valor_pendente) AS valor, SUM(mtf_qtde_pendente) AS qtde
+        FROM dashboard_metricas_financeiras
+        GROUP BY mtf_chave
+    )
+    SELECT reais.chave, COALESCE(mantidos.valor, 0), COALESCE(mantidos.qtde, 0), reais.valor, reais.qtde
+    FROM reais LEFT JOIN mantidos ON mantidos.chave = reais.chave
+"""
+
+# A correção é um delta no balde 0: comuta com os deltas concorrentes, que seguem valendo
+_CORRIGIR = """
+    INSERT INTO dashboard_metricas_financeiras
+        (mtf_chave, mtf_balde, mtf_valor_pendente, mtf_qtde_pendente, mtf_dt_alteracao)
+    VALUES (%(chave)s, 0, %(valor)s, %(qtde)s, NOW())
+    ON CONFLICT (mtf_chave, mtf_balde) DO UPDATE SET
+        mtf_valor_pendente = dashboard_metricas_financeiras.mtf_valor_pendente + EXCLUDED.mtf_valor_pendente,
+        mtf_qtde_pendente = dashboard_metricas_financeiras.mtf_qtde_pendente + EXCLUDED.mtf_qtde_pendente,
+        mtf_dt_alteracao = NOW()
+"""
+
+
+class MetricaFinanceiraRepository:
+    def aplicar_delta(self, lancamento_id: int, sinal: int):
+        """Soma (sinal=1) ou subtrai (sinal=-1) o lançamento do total do seu tipo, se estiver PENDENTE.
+
+        Lê o estado gravado da linha (por PK): para uma alteração, chame com -1
+        antes do UPDATE e com +1 depois, na mesma transação.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(_APLICAR_DELTA, {
+                'lancamento_id': lancamento_id, 'sinal': sinal, 'baldes': settings.METRICAS_FINANCEIRAS_BALDES,
+            })
+
+    def totais(self, chaves) -> dict:
+        """``{chave: valor_pendente}`` para as chaves pedidas (soma dos baldes; 0 se ainda não houver linha)."""
+        valores = dict(
+            MetricaFinanceira.objects.filter(chave__in=chaves)
+            .values('chave').annotate(total=Sum('valor_pendente')).values_list('chave', 'total')
+        )
+        return {chave: valores.get(chave, Decimal('0')) for chave in chaves}
+
+    def reconciliar(self) -> dict:
+        """Recalcula os totais a partir dos lançamentos e corrige os tipos divergentes.
+
+        Retorna ``{chave: (valor_mantido, valor_real)}`` dos tipos que divergiam.
+        O recálculo não trava nada; só a diferença é aplicada, como um delta,
+        e o lock dura apenas esse UPDATE.
+        """
+        divergencias = {}
+        with connection.cursor() as cursor:
+            cursor.execute(_RECALCULAR)
+            for chave, valor_mantido, qtde_mantida, valor, qtde in cursor.fetchall():
+                if valor_mantido == valor and qtde_mantida == qtde:
+                    continue
+                divergencias[chave] = (valor_mantido, valor)
+                cursor.execute(_CORRIGIR, {
+                    'chave': chave, 'valor': valor - valor_mantido, 'qtde': qtde - qtde_mantida,
+                })
+        if divergencias:
+            logger.warning("Métricas financeiras divergentes corrigidas: %s", divergencias)
+        return divergencias
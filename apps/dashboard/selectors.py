@@ -1,4 +1,5 @@
 from datetime import date, timedelta
+from typing import Optional
 from django.db import connection
 from django.db.models import Sum, Count
 from apps.classificadores.models import Classificador, get_classifier
@@ -7,18 +8,23 @@ from apps.notas.models import NotaFiscal
 from apps.parceiros.models import Parceiro
 
 
+# Janela (em dias até hoje) de cada período; as views materializadas usam as mesmas
+PERIODOS = {
+    'last_7_days': 7,
+    'last_month': 30,
+    'last_3_months': 90,
+    'last_year': 365,
+}
+PERIODO_PADRAO = 'last_month'
+
+
+def normalizar_periodo(period: str) -> str:
+    return period if period in PERIODOS else PERIODO_PADRAO
+
+
 def get_period_dates(period: str) -> tuple[date, date]:
     today = date.today()
-    if period == 'last_7_days':
-        start_date = today - timedelta(days=7)
-    elif period == 'last_month':
-        start_date = today - timedelta(days=30)
-    elif period == 'last_3_months':
-        start_date = today - timedelta(days=90)
-    elif period == 'last_year':
-        start_date = today - timedelta(days=365)
-    else: # Default to last 30 days
-        start_date = today - timedelta(days=30)
+    start_date = today - timedelta(days=PERIODOS[normalizar_periodo(period)])
     return start_date, today
 
 def get_total_revenue(start_date: date, end_date: date) -> float:
@@ -139,3 +145,180 @@ def get_financial_status_distribution(start_date: date, end_date: date) -> list[
         cursor.execute(query, [start_date, end_date])
         columns = [col[0] for col in cursor.description]
         return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+# Todos os KPIs e gráficos numa única instrução: CTEs leem lançamentos e notas uma vez e
+# cada seção sai como linhas (secao, rotulo, valor, qtde) de um UNION ALL. A empresa é a
+# coluna denormalizada em lançamentos e notas (índices idx_lcf_emp_*/idx_ntf_emp_data)
+_DASHBOARD_SQL = """
+    WITH lancamentos AS (
+        SELECT l.lcf_valor, l.lcf_data_pagamento, l.lcf_data_vencimento,
+               tipo.clf_codigo AS tipo_codigo, tipo.clf_descricao AS tipo_descricao,
+               status.clf_codigo AS status_codigo, status.clf_descricao AS status_descricao
+        FROM movimento_lancamentos_financeiros l
+        JOIN geral_classificadores tipo ON tipo.clf_id = l.clf_id_tipo AND tipo.clf_tipo = 'TIPO_LANCAMENTO'
+        JOIN geral_classificadores status ON status.clf_id = l.clf_id_status AND status.clf_tipo = 'STATUS_LANCAMENTO'
+        WHERE (%(empresa)s::bigint IS NULL OR l.emp_cnpj_numero = %(empresa)s)
+          AND (l.lcf_data_pagamento >= LEAST(%(inicio)s, DATE_TRUNC('month', CURRENT_DATE - INTERVAL '6 months')::date)
+               OR l.lcf_data_vencimento BETWEEN %(inicio)s AND %(fim)s)
+    ),
+    notas AS (
+        SELECT n.pcr_id, n.ntf_valor_total, p.pcr_nome
+        FROM movimento_notas_fiscais n
+        LEFT JOIN cadastro_parceiros p ON p.pcr_id = n.pcr_id
+        WHERE n.ntf_data_emissao BETWEEN %(inicio)s AND %(fim)s
+          AND (%(empresa)s::bigint IS NULL OR n.emp_cnpj_numero = %(empresa)s)
+    ),
+    kpis_lancamentos AS (
+        SELECT
+            SUM(lcf_valor) FILTER (
+                WHERE tipo_codigo = 'RECEITA' AND lcf_data_pagamento BETWEEN %(inicio)s AND %(fim)s
+            ) AS total_revenue,
+            SUM(lcf_valor) FILTER (
+                WHERE tipo_codigo = 'PAGAR' AND status_codigo = 'PENDENTE'
+                  AND lcf_data_vencimento BETWEEN %(inicio)s AND %(fim)s
+            ) AS pending_payments
+        FROM lancamentos
+    ),
+    kpis_notas AS (
+        SELECT COUNT(*) AS processed_invoices, COUNT(DISTINCT pcr_id) AS active_suppliers FROM notas
+    )
+    SELECT 'total_revenue' AS secao, NULL::text AS rotulo, total_revenue AS valor, NULL::bigint AS qtde
+    FROM kpis_lancamentos
+    UNION ALL
+    SELECT 'pending_payments', NULL, pending_payments, NULL FROM kpis_lancamentos
+    UNION ALL
+    SELECT 'processed_invoices', NULL, NULL, processed_invoices FROM kpis_notas
+    UNION ALL
+    SELECT 'active_suppliers', NULL, NULL, active_suppliers FROM kpis_notas
+    UNION ALL
+    SELECT 'revenue_evolution', to_char(DATE_TRUNC('month', lcf_data_pagamento), 'YYYY-MM') AS mes, SUM(lcf_valor), NULL
+    FROM lancamentos
+    WHERE tipo_codigo = 'RECEITA' AND lcf_data_pagamento >= DATE_TRUNC('month', CURRENT_DATE - INTERVAL '6 months')::date
+    GROUP BY mes
+    UNION ALL
+    (SELECT 'top_suppliers', pcr_nome, SUM(ntf_valor_total), NULL
+     FROM notas WHERE pcr_nome IS NOT NULL
+     GROUP BY pcr_nome ORDER BY SUM(ntf_valor_total) DESC LIMIT 5)
+    UNION ALL
+    SELECT 'financial_entry_distribution', tipo_descricao, SUM(lcf_valor), NULL
+    FROM lancamentos WHERE lcf_data_pagamento BETWEEN %(inicio)s AND %(fim)s
+    GROUP BY tipo_descricao
+    UNION ALL
+    SELECT 'financial_status_distribution', status_descricao, NULL, COUNT(*)
+    FROM lancamentos WHERE lcf_data_vencimento BETWEEN %(inicio)s AND %(fim)s
+    GROUP BY status_descricao
+"""
+
+
+def get_dashboard_stats(start_date: date, end_date: date, empresa_cnpj_numero: Optional[int] = None) -> dict:
+    """
+    KPIs e gráficos calculados ao vivo em uma única consulta (mesmo formato de ``DashboardStatsView``).
+
+    Equivale a chamar ``get_total_revenue``, ``get_pending_payments``,
+    ``get_processed_invoices_count``, ``get_active_suppliers_count``, ``get_revenue_evolution``,
+    ``get_top_suppliers`` e as duas distribuições, que juntas fazem 8+ idas ao banco.
+    """
+    params = {'inicio': start_date, 'fim': end_date, 'empresa': empresa_cnpj_numero}
+    with connection.cursor() as cursor:
+        cursor.execute(_DASHBOARD_SQL, params)
+        linhas = cursor.fetchall()
+
+    kpis = {}
+    charts = {
+        "revenue_evolution": [],
+        "top_suppliers": [],
+        "financial_entry_distribution": [],
+        "financial_status_distribution": [],
+    }
+    for secao, rotulo, valor, qtde in linhas:
+        if secao in ('total_revenue', 'pending_payments'):
+            kpis[secao] = valor or 0.0
+        elif secao in ('processed_invoices', 'active_suppliers'):
+            kpis[secao] = qtde
+        elif secao == 'revenue_evolution':
+            charts[secao].append({'month': rotulo, 'total': valor})
+        elif secao == 'top_suppliers':
+            charts[secao].append({'nome': rotulo, 'total': valor})
+        elif secao == 'financial_entry_distribution':
+            charts[secao].append({'tipo': rotulo, 'total': valor})
+        else:
+            charts[secao].append({'status': rotulo, 'count': qtde})
+    charts['revenue_evolution'].sort(key=lambda r: r['month'])
+    charts['top_suppliers'].sort(key=lambda r: r['total'], reverse=True)
+
+    return {
+        "kpis": {k: kpis[k] for k in ('total_revenue', 'pending_payments', 'processed_invoices', 'active_suppliers')},
+        "charts": charts,
+    }
+
+
+def _linhas(cursor, query: str, params) -> list[dict]:
+    cursor.execute(query, params)
+    columns = [col[0] for col in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def get_dashboard_materializado(period: str, empresa_cnpj_numero: Optional[int] = None) -> dict:
+    """
+    Lê KPIs e gráficos já calculados nas views materializadas do dashboard.
+
+    ``empresa_cnpj_numero=None`` lê o escopo de todas as empresas (0). ``atualizado_em``
+    é o instante do último refresh (``None`` se a empresa ainda não entrou em nenhum).
+    """
+    periodo = normalizar_periodo(period)
+    params = {'escopo': empresa_cnpj_numero or 0, 'periodo': periodo}
+    with connection.cursor() as cursor:
+        kpis = _linhas(cursor, """
+            SELECT total_revenue, pending_payments, processed_invoices, active_suppliers, atualizado_em
+            FROM dashboard_kpis_mv WHERE emp_cnpj_numero = %(escopo)s AND periodo = %(periodo)s
+        """, params)
+        revenue_evolution = _linhas(cursor, """
+            SELECT month, total FROM dashboard_receita_mensal_mv
+            WHERE emp_cnpj_numero = %(escopo)s ORDER BY month
+        """, params)
+        top_suppliers = _linhas(cursor, """
+            SELECT nome, total FROM dashboard_top_fornecedores_mv
+            WHERE emp_cnpj_numero = %(escopo)s AND periodo = %(periodo)s ORDER BY posicao
+        """, params)
+        distribuicoes = _linhas(cursor, """
+            SELECT dimensao, rotulo, valor FROM dashboard_distribuicoes_mv
+            WHERE emp_cnpj_numero = %(escopo)s AND periodo = %(periodo)s ORDER BY dimensao, rotulo
+        """, params)
+
+    if not kpis:
+        kpis = [{**_KPIS_ZERADOS, 'atualizado_em': None}]
+    kpis = kpis[0]
+    atualizado_em = kpis.pop('atualizado_em')
+    return {
+        "kpis": kpis,
+        "charts": {
+            "revenue_evolution": revenue_evolution,
+            "top_suppliers": top_suppliers,
+            "financial_entry_distribution": [
+                {'tipo': d['rotulo'], 'total': d['valor']} for d in distribuicoes if d['dimensao'] == 'tipo'
+            ],
+            "financial_status_distribution": [
+                {'status': d['rotulo'], 'count': int(d['valor'])} for d in distribuicoes if d['dimensao'] == 'status'
+            ],
+        },
+        "atualizado_em": atualizado_em,
+    }
+
+
+_KPIS_ZERADOS = {'total_revenue': 0.0, 'pending_payments': 0.0, 'processed_invoices': 0, 'active_suppliers': 0}
+
+
+def get_dashboard_vazio() -> dict:
+    """Mesmo formato, sem dados: a resposta sem empresa autenticada (não consulta o banco)."""
+    return {
+        "kpis": dict(_KPIS_ZERADOS),
+        "charts": {
+            "revenue_evolution": [],
+            "top_suppliers": [],
+            "financial_entry_distribution": [],
+            "financial_status_distribution": [],
+        },
+        "atualizado_em": None,
+    }
+
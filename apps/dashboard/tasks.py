@@ -0,0 +1,15 @@
+from celery import shared_task
+
+from .repositories import DashboardMaterializadoRepository, MetricaFinanceiraRepository
+
+
+@shared_task(ignore_result=True)
+def atualizar_dashboard_task():
+    """Agendada pelo Celery beat (CELERY_BEAT_SCHEDULE) para manter os KPIs do dashboard atualizados."""
+    return DashboardMaterializadoRepository().atualizar()
+
+
+@shared_task(ignore_result=True)
+def reconciliar_metricas_financeiras_task():
+    """Recalcula os totais pendentes mantidos por deltas (fora do caminho de criação das notas)."""
+    return MetricaFinanceiraRepository().reconciliar()
@@ -1,8 +1,22 @@
 from decimal import Decimal
 from datetime import date, timedelta
+from django.core.cache import caches
+from django.db.models import Sum
+from django.test import override_settings
 from django.urls import reverse
 from rest_framework import status
-from apps.core.tests import AuthenticatedAPITestCase
+from rest_framework.test import APITestCase
+from apps.core.tests import AuthenticatedAPITestCase, QueryBudgetMixin
+from apps.dashboard import selectors
+from apps.dashboard.models import MetricaFinanceira
+from apps.dashboard.observers import MetricasFinanceirasObserver
+from apps.dashboard.repositories import MetricaFinanceiraRepository
+from apps.dashboard.tasks import reconciliar_metricas_financeiras_task
+from apps.financeiro.services import LancamentoFinanceiroService
+from apps.dashboard.tasks import atualizar_dashboard_task
+from apps.core.queries import record_queries
+from backend.authentication import EmpresaPrincipal
+from apps.empresa.models import MinhaEmpresa
 from apps.parceiros.models import Parceiro
 from apps.notas.models import NotaFiscal
 from apps.financeiro.models import LancamentoFinanceiro
@@ -156,4 +170,242 @@ class DashboardStatsTestCase(AuthenticatedAPITestCase):
         top_5 = response.data['top_5_fornecedores_pendentes']
         self.assertEqual(len(top_5), 1)
         self.assertEqual(top_5[0]['nome'], 'Fornecedor Teste CNPJ')
-        self.assertEqual(top_5[0]['cnpj'], '77.888.999/0001-77')
\ No newline at end of file
+        self.assertEqual(top_5[0]['cnpj'], '77.888.999/0001-77')
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'dashboard': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'dashboard-tests'},
+})
+class DashboardMaterializadoTestCase(QueryBudgetMixin, APITestCase):
+    """Dashboard por empresa: views materializadas (após o refresh) e cálculo ao vivo em uma consulta."""
+
+    def setUp(self):
+        clf = lambda tipo, codigo, descricao: Classificador.objects.get_or_create(
+            tipo=tipo, codigo=codigo, defaults={'descricao': descricao}
+        )[0]
+        self.pendente = clf('STATUS_LANCAMENTO', 'PENDENTE', 'Pendente')
+        self.pagar = clf('TIPO_LANCAMENTO', 'PAGAR', 'Conta a Pagar')
+        caches['dashboard'].clear()
+        self.empresa = MinhaEmpresa.objects.create(
+            cnpj_numero=98765432000198, cnpj='98.765.432/0001-98', nome='Empresa Dashboard'
+        )
+        self.job = job = JobProcessamento.objects.create(empresa=self.empresa, status=clf('STATUS_JOB', 'CONCLUIDO', 'Concluído'))
+        self.fornecedor = fornecedor = Parceiro.objects.create(
+            nome='Fornecedor Dashboard', cnpj='98.765.432/0002-79',
+            clf_tipo=clf('TIPO_PARCEIRO', 'FORNECEDOR', 'Fornecedor'),
+        )
+        nota = NotaFiscal.objects.create(
+            job_origem=job, parceiro=fornecedor, numero='NF-DASH-1',
+            data_emissao=date.today(), valor_total=Decimal('500.00'),
+        )
+        LancamentoFinanceiro.objects.create(
+            nota_fiscal=nota, descricao='Compra dashboard', valor=Decimal('500.00'),
+            clf_tipo=self.pagar, clf_status=self.pendente,
+            data_vencimento=date.today(),
+        )
+        self.client.force_authenticate(user=EmpresaPrincipal(self.empresa))
+
+    def test_dados_aparecem_apos_refresh(self):
+        response = self.client.get(reverse('dashboard-stats'), {'period': 'last_7_days'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.data['atualizado_em'])
+        self.assertEqual(response.data['kpis']['processed_invoices'], 0)
+
+        # O refresh invalida as respostas em cache após o commit
+        with self.captureOnCommitCallbacks(execute=True):
+            atualizar_dashboard_task()
+
+        with self.assertMaxQueries(4):
+            response = self.client.get(reverse('dashboard-stats'), {'period': 'last_7_days'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNotNone(response.data['atualizado_em'])
+        self.assertEqual(response.data['kpis'], {
+            'total_revenue': Decimal('0'),
+            'pending_payments': Decimal('500.00'),
+            'processed_invoices': 1,
+            'active_suppliers': 1,
+        })
+        charts = response.data['charts']
+        self.assertEqual(charts['top_suppliers'], [{'nome': 'Fornecedor Dashboard', 'total': Decimal('500.00')}])
+        self.assertEqual(charts['financial_status_distribution'], [{'status': self.pendente.descricao, 'count': 1}])
+
+    def test_sem_empresa_autenticada_nao_traz_nada(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            atualizar_dashboard_task()
+        self.client.force_authenticate(user=None)
+
+        for params in ({'period': 'last_7_days'}, {'period': 'last_7_days', 'live': 'true'}):
+            with self.assertMaxQueries(0):
+                response = self.client.get(reverse('dashboard-stats'), params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data['kpis'], {
+                'total_revenue': 0.0, 'pending_payments': 0.0, 'processed_invoices': 0, 'active_suppliers': 0,
+            })
+            self.assertEqual(response.data['charts']['top_suppliers'], [])
+            self.assertNotIn('ETag', response)
+
+    def test_empresa_vem_da_coluna_da_nota_e_do_lancamento(self):
+        # Nota de outra empresa num job desta: views materializadas e cálculo ao vivo seguem a nota
+        outra = MinhaEmpresa.objects.create(
+            cnpj_numero=98765432000279, cnpj='98.765.432/0002-79', nome='Outra Empresa Dashboard'
+        )
+        nota = NotaFiscal.objects.create(
+            job_origem=self.job, empresa=outra, parceiro=self.fornecedor, numero='NF-DASH-OUTRA',
+            data_emissao=date.today(), valor_total=Decimal('70.00'),
+        )
+        LancamentoFinanceiro.objects.create(
+            nota_fiscal=nota, descricao='Compra outra', valor=Decimal('70.00'),
+            clf_tipo=self.pagar, clf_status=self.pendente, data_vencimento=date.today(),
+        )
+        atualizar_dashboard_task()
+
+        for empresa, pendente, notas in ((self.empresa, Decimal('500.00'), 1), (outra, Decimal('70.00'), 1)):
+            self.client.force_authenticate(user=EmpresaPrincipal(empresa))
+            for params in ({'period': 'last_7_days'}, {'period': 'last_7_days', 'live': 'true'}):
+                kpis = self.client.get(reverse('dashboard-stats'), params).data['kpis']
+                self.assertEqual((kpis['pending_payments'], kpis['processed_invoices']), (pendente, notas))
+
+    def test_periodo_invalido_usa_ultimo_mes(self):
+        atualizar_dashboard_task()
+        response = self.client.get(reverse('dashboard-stats'), {'period': 'desconhecido'})
+        self.assertEqual(response.data['kpis']['pending_payments'], Decimal('500.00'))
+
+    def test_ao_vivo_em_uma_consulta_igual_aos_selectors_individuais(self):
+        Classificador.objects.get_or_create(
+            tipo='TIPO_LANCAMENTO', codigo='RECEITA', defaults={'descricao': 'Receita'}
+        )
+        inicio, fim = selectors.get_period_dates('last_7_days')
+
+        with record_queries() as individuais:
+            esperado = {
+                "kpis": {
+                    "total_revenue": selectors.get_total_revenue(inicio, fim),
+                    "pending_payments": selectors.get_pending_payments(inicio, fim),
+                    "processed_invoices": selectors.get_processed_invoices_count(inicio, fim),
+                    "active_suppliers": selectors.get_active_suppliers_count(inicio, fim),
+                },
+                "charts": {
+                    "revenue_evolution": selectors.get_revenue_evolution(),
+                    "top_suppliers": selectors.get_top_suppliers(inicio, fim),
+                    "financial_entry_distribution": selectors.get_financial_entry_distribution(inicio, fim),
+                    "financial_status_distribution": selectors.get_financial_status_distribution(inicio, fim),
+                },
+            }
+        self.assertGreaterEqual(individuais.count, 8)
+
+        with self.assertMaxQueries(1):
+            response = self.client.get(reverse('dashboard-stats'), {'period': 'last_7_days', 'live': 'true'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNotNone(response.data['atualizado_em'])
+        self.assertEqual(response.data['kpis']['pending_payments'], Decimal('500.00'))
+        # Sem filtro de empresa, os números batem com os selectors individuais
+        self.assertEqual(selectors.get_dashboard_stats(inicio, fim), esperado)
+
+    def test_etag_responde_304_sem_banco_ate_um_lancamento_mudar(self):
+        url = reverse('dashboard-stats')
+        params = {'period': 'last_7_days', 'live': 'true'}
+        response = self.client.get(url, params)
+        etag = response['ETag']
+
+        with self.assertMaxQueries(0):
+            response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+            # Sem If-None-Match, vem do cache
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data['kpis']['pending_payments'], Decimal('500.00'))
+
+        nota = NotaFiscal.objects.create(
+            job_origem=self.job, parceiro=self.fornecedor, numero='NF-DASH-2',
+            data_emissao=date.today(), valor_total=Decimal('250.00'),
+        )
+        lancamento = LancamentoFinanceiro.objects.create(
+            nota_fiscal=nota, descricao='Segunda compra', valor=Decimal('250.00'),
+            clf_tipo=self.pagar, clf_status=self.pendente, data_vencimento=date.today(),
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            MetricasFinanceirasObserver().update(None, 'lancamento_created', lancamento=lancamento)
+
+        response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['kpis']['pending_payments'], Decimal('750.00'))
+
+
+class MetricasFinanceirasTestCase(APITestCase):
+    """Totais pendentes mantidos por deltas (O(1) por evento) e reconciliação periódica."""
+
+    def setUp(self):
+        clf = lambda tipo, codigo: Classificador.objects.get_or_create(
+            tipo=tipo, codigo=codigo, defaults={'descricao': codigo}
+        )[0]
+        self.pagar = clf('TIPO_LANCAMENTO', 'PAGAR')
+        self.pendente = clf('STATUS_LANCAMENTO', 'PENDENTE')
+        clf('STATUS_LANCAMENTO', 'PAGO')
+        self.job = JobProcessamento.objects.create(status=clf('STATUS_JOB', 'CONCLUIDO'))
+        self.parceiro = Parceiro.objects.create(
+            nome='Fornecedor Métricas', cnpj='66.666.666/0001-66', clf_tipo=clf('TIPO_PARCEIRO', 'FORNECEDOR')
+        )
+        # Parte de valores reais para que os deltas abaixo sejam exatos
+        reconciliar_metricas_financeiras_task()
+        self.service = LancamentoFinanceiroService()
+
+    def _total_pagar(self):
+        total = MetricaFinanceira.objects.filter(chave='PAGAR').aggregate(
+            valor=Sum('valor_pendente'), qtde=Sum('qtde_pendente'),
+        )
+        return total['valor'] or Decimal('0'), total['qtde'] or 0
+
+    def _lancamento(self, valor):
+        nota = NotaFiscal.objects.create(
+            job_origem=self.job, parceiro=self.parceiro, numero=f'NF-MTF-{valor}',
+            data_emissao=date.today(), valor_total=Decimal(valor),
+        )
+        return self.service.salvar(LancamentoFinanceiro(
+            nota_fiscal=nota, descricao='Métricas', valor=Decimal(valor),
+            clf_tipo=self.pagar, clf_status=self.pendente, data_vencimento=date.today(),
+        ))
+
+    def test_deltas_por_evento_sem_agregar_a_tabela(self):
+        valor_inicial, qtde_inicial = self._total_pagar()
+        lancamento = self._lancamento('300.00')
+        self.assertEqual(self._total_pagar(), (valor_inicial + Decimal('300.00'), qtde_inicial + 1))
+
+        # Upsert por PK + leitura dos dois totais, independente do tamanho da tabela
+        with record_queries() as rec:
+            MetricasFinanceirasObserver().update(None, 'lancamento_changing', lancamento=lancamento)
+            MetricasFinanceirasObserver().update(None, 'lancamento_created', lancamento=lancamento)
+        self.assertEqual(rec.count, 3)
+        self.assertFalse([p for p in rec.patterns if 'SUM(' in p and 'movimento_lancamentos_financeiros' in p])
+
+        self.service.registrar_pagamento(lancamento)
+        self.assertEqual(self._total_pagar(), (valor_inicial, qtde_inicial))
+
+    @override_settings(METRICAS_FINANCEIRAS_BALDES=4)
+    def test_deltas_concorrentes_caem_em_baldes_diferentes(self):
+        valor_inicial, qtde_inicial = self._total_pagar()
+        lancamentos = [self._lancamento(f'{10 + i}.00') for i in range(4)]
+
+        baldes = set(MetricaFinanceira.objects.filter(chave='PAGAR').values_list('balde', flat=True))
+        self.assertLessEqual({lancamento.id % 4 for lancamento in lancamentos}, baldes)
+        self.assertGreater(len({lancamento.id % 4 for lancamento in lancamentos}), 1)
+        self.assertEqual(self._total_pagar(), (valor_inicial + Decimal('46.00'), qtde_inicial + 4))
+        self.assertEqual(MetricaFinanceiraRepository().totais(['PAGAR'])['PAGAR'], valor_inicial + Decimal('46.00'))
+
+    def test_reconciliacao_corrige_deriva(self):
+        valor_real, qtde_real = self._total_pagar()
+        # Deriva num balde fora da faixa usada pelos deltas
+        MetricaFinanceira.objects.create(chave='PAGAR', balde=999, valor_pendente=1, qtde_pendente=7)
+
+        with record_queries() as rec:
+            divergencias = reconciliar_metricas_financeiras_task()
+
+        self.assertEqual(divergencias, {'PAGAR': (valor_real + 1, valor_real)})
+        self.assertEqual(self._total_pagar(), (valor_real, qtde_real))
+        # Soma sem locks; só a diferença é aplicada
+        self.assertNotIn('FOR UPDATE', ' '.join(rec.patterns))
+        self.assertEqual(reconciliar_metricas_financeiras_task(), {})
+
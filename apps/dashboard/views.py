@@ -1,27 +1,52 @@
+from django.utils import timezone
+from django.utils.http import parse_etags
 from rest_framework import views, status
 from rest_framework.response import Response
+from apps.core.tenancy import empresa_da_requisicao
+from . import cache as dashboard_cache
 from . import selectors
 
 class DashboardStatsView(views.APIView):
+    """
+    KPIs e gráficos do dashboard, lidos das views materializadas (ver ``tasks.atualizar_dashboard_task``).
+
+    Query params:
+      - period: last_7_days | last_month | last_3_months | last_year (padrão last_month)
+      - live=true: calcula ao vivo, numa única consulta (``selectors.get_dashboard_stats``)
+
+    ``atualizado_em`` informa o instante do último refresh dos dados (ou o atual, com ``live``).
+
+    As respostas ficam em cache por (empresa, período) até um lançamento mudar ou
+    as views serem atualizadas (ver ``apps.dashboard.cache``). Com ``If-None-Match``
+    igual ao ``ETag`` atual, responde 304 sem consultar o banco.
+
+    Sem empresa autenticada responde o dashboard zerado, sem consultar cache nem banco.
+    """
+
     def get(self, request, *args, **kwargs):
-        period = request.query_params.get('period', 'last_month')
-        start_date, end_date = selectors.get_period_dates(period)
-
-        kpis = {
-            "total_revenue": selectors.get_total_revenue(start_date, end_date),
-            "pending_payments": selectors.get_pending_payments(start_date, end_date),
-            "processed_invoices": selectors.get_processed_invoices_count(start_date, end_date),
-            "active_suppliers": selectors.get_active_suppliers_count(start_date, end_date),
-        }
-
-        charts = {
-            "revenue_evolution": selectors.get_revenue_evolution(),
-            "top_suppliers": selectors.get_top_suppliers(start_date, end_date),
-            "financial_entry_distribution": selectors.get_financial_entry_distribution(start_date, end_date),
-            "financial_status_distribution": selectors.get_financial_status_distribution(start_date, end_date),
-        }
-
-        return Response({
-            "kpis": kpis,
-            "charts": charts,
-        }, status=status.HTTP_200_OK)
+        periodo = selectors.normalizar_periodo(request.query_params.get('period', 'last_month'))
+        live = request.query_params.get('live') in ('1', 'true')
+        empresa = empresa_da_requisicao(request)
+        if empresa is None:
+            # Falha fechado, como o escopo das listas: nada de cache nem banco
+            return Response(selectors.get_dashboard_vazio(), status=status.HTTP_200_OK)
+        empresa_cnpj_numero = empresa.cnpj_numero
+        escopo = empresa_cnpj_numero
+
+        versao = dashboard_cache.versao(escopo)
+        etag = dashboard_cache.etag(escopo, periodo, live, versao)
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match and (etag in parse_etags(if_none_match) or if_none_match.strip() == '*'):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        dados = dashboard_cache.obter(escopo, periodo, live, versao)
+        if dados is None:
+            if live:
+                start_date, end_date = selectors.get_period_dates(periodo)
+                dados = selectors.get_dashboard_stats(start_date, end_date, empresa_cnpj_numero)
+                dados['atualizado_em'] = timezone.now()
+            else:
+                dados = selectors.get_dashboard_materializado(periodo, empresa_cnpj_numero)
+            dashboard_cache.guardar(escopo, periodo, live, versao, dados)
+
+        return Response(dados, status=status.HTTP_200_OK, headers={'ETag': etag})
@@ -0,0 +1,62 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.test import APIRequestFactory
+
+from apps.core.queries import record_queries
+from apps.empresa.models import MinhaEmpresa
+from apps.empresa.services import EmpresaAuthService
+from backend.authentication import EmpresaJWTAuthentication, _principais
+
+# Empresa criada e descartada (ROLLBACK) pelo benchmark
+CNPJ_NUMERO = 99887766000236
+CNPJ = '99.887.766/0002-36'
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede o custo por requisição de EmpresaJWTAuthentication.authenticate (decodificar o JWT e "
+        "carregar a empresa) sem e com o cache de principais. Cria a empresa numa transação desfeita ao final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requisicoes', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        n = options['requisicoes']
+        try:
+            with transaction.atomic():
+                empresa = MinhaEmpresa.objects.create(cnpj_numero=CNPJ_NUMERO, cnpj=CNPJ, nome='Empresa Benchmark Auth')
+                token = EmpresaAuthService().gerar_tokens_para_empresa(empresa)['access']
+                request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+                auth = EmpresaJWTAuthentication()
+
+                sem_cache = self._medir(n, lambda: (_principais.clear(), auth.authenticate(request)))
+                _principais.clear()
+                auth.authenticate(request)
+                com_cache = self._medir(n, lambda: auth.authenticate(request))
+                raise _Rollback()
+        except _Rollback:
+            pass
+        finally:
+            _principais.clear()
+
+        self.stdout.write(f"\n{'modo':<12}{'µs/requisição':>16}{'consultas/requisição':>22}")
+        for nome, (us, consultas) in (('sem cache', sem_cache), ('com cache', com_cache)):
+            self.stdout.write(f"{nome:<12}{us:>16.1f}{consultas:>22.2f}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{sem_cache[0] / com_cache[0]:.0f}x menos tempo de autenticação por requisição com o cache."
+        ))
+
+    def _medir(self, n: int, autenticar) -> tuple:
+        with record_queries() as consultas:
+            inicio = time.perf_counter()
+            for _ in range(n):
+                autenticar()
+            duracao = time.perf_counter() - inicio
+        return duracao / n * 1e6, consultas.count / n
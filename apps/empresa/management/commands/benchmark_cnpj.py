@@ -0,0 +1,79 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.cnpj import validar, validar_lote
+
+
+def _validar_legado(cnpj: str) -> bool:
+    """Validação anterior (ValidacaoCNPJObserver): um laço Python por caractere, a cada dígito verificador."""
+    import re
+    cnpj = re.sub(r"\D", "", cnpj or "")
+    if len(cnpj) != 14:
+        return False
+
+    def calcular_digito(cnpj_base, pesos):
+        soma = sum(int(cnpj_base[i]) * pesos[i] for i in range(len(pesos)))
+        resto = soma % 11
+        return 0 if resto < 2 else 11 - resto
+
+    pesos1 = [5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]
+    pesos2 = [6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]
+    return cnpj[12:14] == f"{calcular_digito(cnpj[:12], pesos1)}{calcular_digito(cnpj[:13], pesos2)}"
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede a validação de CNPJs formatados: a validação anterior, o caminho escalar e o lote "
+        "vetorizado (NumPy) de apps.core.cnpj, e confere que os três concordam. Não usa o banco."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quantidade', type=int, default=1_000_000)
+        parser.add_argument('--invalidos', type=float, default=0.1, help='Fração com dígito verificador errado')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        try:
+            import numpy as np
+        except ImportError:
+            raise CommandError("numpy não instalado")
+
+        n = options['quantidade']
+        cnpjs = self._gerar(np, n, options['invalidos'], options['seed'])
+
+        resultados = {}
+        for nome, validar_todos in (
+            ('anterior', lambda: [_validar_legado(c) for c in cnpjs]),
+            ('escalar', lambda: [validar(c) for c in cnpjs]),
+            ('lote (numpy)', lambda: validar_lote(cnpjs)[1].tolist()),
+        ):
+            inicio = time.perf_counter()
+            validos = validar_todos()
+            resultados[nome] = (time.perf_counter() - inicio, validos)
+
+        referencia = resultados['anterior'][1]
+        for nome, (_, validos) in resultados.items():
+            if validos != referencia:
+                raise CommandError(f"'{nome}' diverge da validação anterior")
+
+        self.stdout.write(f"\n{n} CNPJs formatados, {sum(referencia)} válidos")
+        self.stdout.write(f"{'modo':<14}{'ns/CNPJ':>10}{'milhões/s':>12}")
+        for nome, (segundos, _) in resultados.items():
+            self.stdout.write(f"{nome:<14}{segundos / n * 1e9:>10.0f}{n / segundos / 1e6:>12.2f}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Lote {resultados['anterior'][0] / resultados['lote (numpy)'][0]:.0f}x mais rápido que a validação anterior."
+        ))
+
+    def _gerar(self, np, n: int, invalidos: float, seed: int) -> list:
+        """CNPJs aleatórios com dígitos verificadores corretos, exceto uma fração ``invalidos``."""
+        rng = np.random.default_rng(seed)
+        base = rng.integers(0, 10 ** 12, n, dtype=np.int64)
+        digitos = (base[:, None] // 10 ** np.arange(11, -1, -1)) % 10
+        for pesos in ((5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2), (6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2)):
+            resto = (digitos @ np.array(pesos)) % 11
+            digitos = np.column_stack([digitos, np.where(resto < 2, 0, 11 - resto)])
+        errados = rng.random(n) < invalidos
+        digitos[errados, 13] = (digitos[errados, 13] + 1) % 10
+        numeros = digitos @ 10 ** np.arange(13, -1, -1, dtype=np.int64)
+        return [f'{s[:2]}.{s[2:5]}.{s[5:8]}/{s[8:12]}-{s[12:]}' for s in (f'{c:014d}' for c in numeros.tolist())]
@@ -2,15 +2,11 @@ import uuid
 from django.db import models
 from django.core.exceptions import ValidationError
 from apps.classificadores.models import Classificador
+from apps.core.cnpj import cnpj_para_numero
 
-
-def cnpj_para_numero(cnpj_str):
-    """Converte CNPJ string para número inteiro."""
-    if not cnpj_str:
-        return None
-    # Remove pontos, barras e traços
-    cnpj_limpo = ''.join(filter(str.isdigit, cnpj_str))
-    return int(cnpj_limpo) if cnpj_limpo else None
+# Canal de pg_notify avisando (chave CHAVE_EMPRESA_ALTERADA, dados = cnpj_numero) que uma empresa mudou
+CANAL_EMPRESAS = 'empresas'
+CHAVE_EMPRESA_ALTERADA = 'alterada'
 
 
 class MinhaEmpresa(models.Model):
@@ -33,7 +29,7 @@ class MinhaEmpresa(models.Model):
     @classmethod
     def get_by_cnpj(cls, cnpj_str):
         """Busca empresa por CNPJ (string ou número)."""
-        cnpj_numero = cnpj_para_numero(cnpj_str) if isinstance(cnpj_str, str) else cnpj_str
+        cnpj_numero = cnpj_para_numero(cnpj_str)
         try:
             return cls.objects.get(pk=cnpj_numero)
         except cls.DoesNotExist:
@@ -3,7 +3,28 @@ Repository for Empresa operations.
 """
 
 from typing import Optional
-from apps.empresa.models import EmpresaNaoClassificada
+from django.conf import settings
+from apps.core.cache_local import AUSENTE, CacheLocal
+from apps.empresa.models import CANAL_EMPRESAS, CHAVE_EMPRESA_ALTERADA, EmpresaNaoClassificada, MinhaEmpresa
+
+# cnpj_numero -> empresa (ou None, quando não existe), por processo; apps/empresa/signals.py invalida
+_minhas_empresas = CacheLocal(
+    'minha_empresa', CANAL_EMPRESAS, CHAVE_EMPRESA_ALTERADA,
+    maxsize=settings.CNPJ_CACHE_SIZE, ttl=settings.CNPJ_CACHE_TTL, converter=int,
+)
+_nao_classificadas = CacheLocal(
+    'empresa_nao_classificada', CANAL_EMPRESAS, CHAVE_EMPRESA_ALTERADA,
+    maxsize=settings.CNPJ_CACHE_SIZE, ttl=settings.CNPJ_CACHE_TTL, converter=int,
+)
+
+
+def _buscar(cache: CacheLocal, model, cnpj_numero: int):
+    empresa = cache.get(cnpj_numero)
+    if empresa is AUSENTE:
+        geracao = cache.geracao
+        empresa = model.objects.filter(pk=cnpj_numero).first()
+        cache.guardar(cnpj_numero, empresa, geracao)
+    return empresa
 
 
 class EmpresaRepository:
@@ -11,13 +32,15 @@ class EmpresaRepository:
     Repository for Empresa operations.
     """
 
+    @staticmethod
+    def find_minha_empresa_by_cnpj(cnpj_numero: int) -> Optional[MinhaEmpresa]:
+        """Find company by CNPJ number (cached per process, including misses)."""
+        return _buscar(_minhas_empresas, MinhaEmpresa, cnpj_numero)
+
     @staticmethod
     def find_nao_classificada_by_cnpj(cnpj_numero: int) -> Optional[EmpresaNaoClassificada]:
-        """Find non-classified company by CNPJ number."""
-        try:
-            return EmpresaNaoClassificada.objects.get(cnpj_numero=cnpj_numero)
-        except EmpresaNaoClassificada.DoesNotExist:
-            return None
+        """Find non-classified company by CNPJ number (cached per process, including misses)."""
+        return _buscar(_nao_classificadas, EmpresaNaoClassificada, cnpj_numero)
 
     @staticmethod
     def create_nao_classificada(
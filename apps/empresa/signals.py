@@ -0,0 +1,18 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.core.cache_local import avisar_alteracao
+from .models import CANAL_EMPRESAS, CHAVE_EMPRESA_ALTERADA, EmpresaNaoClassificada, MinhaEmpresa
+
+
+@receiver(post_save, sender=MinhaEmpresa)
+@receiver(post_delete, sender=MinhaEmpresa)
+@receiver(post_save, sender=EmpresaNaoClassificada)
+@receiver(post_delete, sender=EmpresaNaoClassificada)
+def avisar_empresa_alterada(sender, instance, **kwargs):
+    """Avisa os caches em memória (principal do JWT, lookups por CNPJ) de todos os processos, após o commit.
+
+    ``QuerySet.update()`` não dispara o sinal: alterações em massa de empresas
+    (inclusive a exclusão lógica por ``dt_exclusao``) devem passar por ``save()``.
+    """
+    avisar_alteracao(CANAL_EMPRESAS, CHAVE_EMPRESA_ALTERADA, str(instance.pk))
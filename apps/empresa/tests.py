@@ -2,10 +2,20 @@
 Testes para o app empresa.
 Testa autenticação, setup de senha e login com JWT.
 """
+from datetime import timedelta
+
+from django.test import override_settings
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
-from rest_framework.test import APITestCase
-from apps.empresa.models import MinhaEmpresa
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIRequestFactory, APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from apps.core.tests import QueryBudgetMixin
+from apps.empresa.models import EmpresaNaoClassificada, MinhaEmpresa
+from apps.empresa.repositories import EmpresaRepository, _minhas_empresas, _nao_classificadas
+from apps.empresa.services import EmpresaAuthService
+from backend.authentication import EmpresaJWTAuthentication, _principais
 
 
 class EmpresaSenhaSetupTestCase(APITestCase):
@@ -216,3 +226,96 @@ class EmpresaLoginTestCase(APITestCase):
         # Tokens JWT têm 3 partes separadas por ponto
         self.assertEqual(len(response.data['access'].split('.')), 3)
         self.assertEqual(len(response.data['refresh'].split('.')), 3)
+
+
+class EmpresaJWTCacheTestCase(QueryBudgetMixin, APITestCase):
+    """Principal do JWT em cache por token: sem consulta nas requisições seguintes, invalidado ao alterar a empresa."""
+
+    def setUp(self):
+        _principais.clear()
+        self.empresa = MinhaEmpresa.objects.create(
+            cnpj_numero=22333444000155, cnpj='22.333.444/0001-55', nome='Empresa Cache',
+        )
+        self.token = EmpresaAuthService().gerar_tokens_para_empresa(self.empresa)['access']
+        self.auth = EmpresaJWTAuthentication()
+
+    def _autenticar(self, token=None):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token or self.token}')
+        return self.auth.authenticate(request)
+
+    def test_segunda_requisicao_sem_consulta(self):
+        primeiro, _ = self._autenticar()
+        with self.assertMaxQueries(0):
+            segundo, token = self._autenticar()
+
+        self.assertEqual(token, self.token)
+        self.assertEqual(segundo.empresa.pk, self.empresa.pk)
+        # Cada requisição recebe a sua instância
+        self.assertIsNot(segundo.empresa, primeiro.empresa)
+
+    def test_alteracao_da_empresa_invalida_o_cache(self):
+        self._autenticar()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.empresa.nome = 'Empresa Renomeada'
+            self.empresa.save()
+
+        with self.assertNumQueries(1):
+            principal, _ = self._autenticar()
+        self.assertEqual(principal.empresa.nome, 'Empresa Renomeada')
+
+    def test_exclusao_logica_bloqueia_o_token(self):
+        self._autenticar()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.empresa.dt_exclusao = timezone.now()
+            self.empresa.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self._autenticar()
+
+    def test_token_expirado_nao_autentica(self):
+        token = AccessToken()
+        token['emp_uuid'] = str(self.empresa.uuid)
+        token['emp_cnpj'] = self.empresa.cnpj
+        token.set_exp(lifetime=timedelta(seconds=-1))
+
+        self.assertIsNone(self._autenticar(str(token)))
+        self.assertEqual(len(_principais), 0)
+
+    @override_settings(AUTH_PRINCIPAL_CACHE_TTL=0)
+    def test_cache_desligado(self):
+        self._autenticar()
+        with self.assertNumQueries(1):
+            self._autenticar()
+
+
+class EmpresaRepositoryCacheTestCase(QueryBudgetMixin, APITestCase):
+    """Lookup de empresa por CNPJ em cache por processo (inclusive ausência), invalidado pelos sinais."""
+
+    def setUp(self):
+        for cache in (_minhas_empresas, _nao_classificadas):
+            cache.cache.clear()
+            self.addCleanup(cache.cache.clear)
+
+    def test_lookup_em_cache_e_invalidado_ao_salvar(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertIsNone(EmpresaRepository.find_minha_empresa_by_cnpj(49049049000149))
+        with self.assertMaxQueries(0):
+            self.assertIsNone(EmpresaRepository.find_minha_empresa_by_cnpj(49049049000149))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            MinhaEmpresa.objects.create(cnpj_numero=49049049000149, cnpj='49.049.049/0001-49', nome='Empresa Lookup')
+        with self.captureOnCommitCallbacks(execute=True):
+            empresa = EmpresaRepository.find_minha_empresa_by_cnpj(49049049000149)
+        self.assertEqual(empresa.nome, 'Empresa Lookup')
+        with self.assertMaxQueries(0):
+            self.assertEqual(EmpresaRepository.find_minha_empresa_by_cnpj(49049049000149).pk, empresa.pk)
+
+    def test_nao_classificada_criada_invalida_a_ausencia(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertIsNone(EmpresaRepository.find_nao_classificada_by_cnpj(49049049000230))
+            EmpresaRepository.create_nao_classificada(
+                cnpj_numero=49049049000230, cnpj='49.049.049/0002-30',
+                nome_fantasia='Nao Classificada', razao_social='Nao Classificada',
+            )
+
+        self.assertIsInstance(EmpresaRepository.find_nao_classificada_by_cnpj(49049049000230), EmpresaNaoClassificada)
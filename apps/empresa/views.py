@@ -5,6 +5,7 @@ from .serializers import EmpresaLoginSerializer, EmpresaSenhaSetupSerializer
 from .services import EmpresaAuthService
 from .models import EmpresaNaoClassificada
 from rest_framework import generics
+from apps.core.pagination import CnpjKeysetPagination
 
 class EmpresaLoginView(APIView):
     permission_classes = [permissions.AllowAny]
@@ -46,6 +47,7 @@ class EmpresaSenhaSetupView(APIView):
 class EmpresaNaoClassificadaView(generics.ListAPIView):
     queryset = EmpresaNaoClassificada.objects.all()
     permission_classes = [permissions.AllowAny]
+    pagination_class = CnpjKeysetPagination
 
     def get_serializer_class(self):
         # Simples serializer inline para listagem
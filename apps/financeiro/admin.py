@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import LancamentoFinanceiro
+from .services import LancamentoFinanceiroService
 
 
 @admin.register(LancamentoFinanceiro)
@@ -8,3 +9,15 @@ class LancamentoFinanceiroAdmin(admin.ModelAdmin):
     # list_filter pode ser refeito com clf_tipo__codigo / clf_status__codigo
     list_filter = ("clf_tipo", "clf_status")
     search_fields = ("descricao",)
+
+    # Edições pelo admin passam pelo service para manter o ResumoDiario em dia
+    def save_model(self, request, obj, form, change):
+        LancamentoFinanceiroService().salvar(obj)
+
+    def delete_model(self, request, obj):
+        LancamentoFinanceiroService().remover(obj)
+
+    def delete_queryset(self, request, queryset):
+        service = LancamentoFinanceiroService()
+        for obj in queryset:
+            service.remover(obj)
@@ -0,0 +1,91 @@
+"""
+Massa de dados e medição de planos para benchmarks de lançamentos.
+
+Usado pelo comando ``benchmark_indices_lancamentos`` e pelos testes de
+desempenho do calendário. Os dados são gerados com ``generate_series`` numa
+única instrução; quem chama é responsável pela transação (e pelo ROLLBACK).
+"""
+import json
+from datetime import date
+
+from apps.classificadores.models import Classificador
+
+
+def popular_lancamentos(cursor, linhas: int) -> dict:
+    """Gera ``linhas`` notas + lançamentos (~30% pendentes, vencimentos em 2023-2025).
+
+    Retorna os ids dos classificadores usados e datas de referência (junho/2024)
+    para parametrizar as consultas.
+    """
+    clf = {
+        nome: Classificador.objects.get_or_create(tipo=tipo, codigo=codigo, defaults={'descricao': codigo})[0].id
+        for nome, tipo, codigo in [
+            ('pagar', 'TIPO_LANCAMENTO', 'PAGAR'),
+            ('receber', 'TIPO_LANCAMENTO', 'RECEBER'),
+            ('pendente', 'STATUS_LANCAMENTO', 'PENDENTE'),
+            ('pago', 'STATUS_LANCAMENTO', 'PAGO'),
+            ('status_job', 'STATUS_JOB', 'CONCLUIDO'),
+            ('fornecedor', 'TIPO_PARCEIRO', 'FORNECEDOR'),
+        ]
+    }
+    cursor.execute("""
+        INSERT INTO movimento_jobs_processamento
+            (jbp_uuid, jbp_arquivo_original, clf_id_status, jbp_dt_criacao, jbp_dt_alteracao)
+        VALUES (gen_random_uuid(), 'benchmark.pdf', %s, NOW(), NOW()) RETURNING jbp_id
+    """, [clf['status_job']])
+    job_id = cursor.fetchone()[0]
+    cursor.execute("""
+        INSERT INTO cadastro_parceiros (pcr_uuid, pcr_nome, pcr_cnpj, clf_id_tipo)
+        VALUES (gen_random_uuid(), 'Parceiro Benchmark', '00.000.000/0000-00', %s) RETURNING pcr_id
+    """, [clf['fornecedor']])
+    parceiro_id = cursor.fetchone()[0]
+
+    cursor.execute('SELECT setseed(0.42)')
+    cursor.execute("""
+        INSERT INTO movimento_notas_fiscais
+            (ntf_uuid, ntf_numero, ntf_data_emissao, ntf_valor_total, jbp_id, pcr_id)
+        SELECT gen_random_uuid(), 'BENCH-' || g, DATE '2023-01-01' + (g %% 1095), 100, %s, %s
+        FROM generate_series(1, %s) g
+    """, [job_id, parceiro_id, linhas])
+    cursor.execute("""
+        INSERT INTO movimento_lancamentos_financeiros
+            (lcf_uuid, lcf_descricao, lcf_valor, lcf_data_vencimento, lcf_data_pagamento,
+             lcf_dt_criacao, lcf_dt_alteracao, clf_id_tipo, clf_id_status, ntf_id)
+        SELECT gen_random_uuid(), 'Benchmark', round((random() * 5000)::numeric, 2), v.venc,
+               CASE WHEN v.pendente THEN NULL ELSE v.venc - (random() * 10)::int END,
+               NOW(), NOW(),
+               CASE WHEN random() < 0.5 THEN %(pagar)s ELSE %(receber)s END,
+               CASE WHEN v.pendente THEN %(pendente)s ELSE %(pago)s END,
+               v.ntf_id
+        FROM (
+            SELECT ntf_id, DATE '2023-01-01' + (random() * 1095)::int AS venc, random() < 0.3 AS pendente
+            FROM movimento_notas_fiscais WHERE jbp_id = %(job)s
+        ) v
+    """, {**clf, 'job': job_id})
+    cursor.execute('ANALYZE movimento_lancamentos_financeiros')
+
+    return {
+        **clf,
+        'mes_inicio': date(2024, 6, 1),
+        'mes_fim': date(2024, 7, 1),
+        'dia': date(2024, 6, 15),
+    }
+
+
+def explain_analyze(cursor, sql: str, params) -> dict:
+    """Executa ``EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)`` e retorna o nó raiz (com 'Plan' e 'Execution Time')."""
+    cursor.execute(f'EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}', params)
+    plano = cursor.fetchone()[0]
+    if isinstance(plano, str):
+        plano = json.loads(plano)
+    return plano[0]
+
+
+def resumo_plano(no: dict) -> str:
+    """Nós de acesso à tabela do plano, ex: 'Index Only Scan idx_lcf_status_venc'."""
+    acessos = []
+    if 'Relation Name' in no or 'Index Name' in no:
+        acessos.append(f"{no['Node Type']} {no.get('Index Name', '')}".strip())
+    for filho in no.get('Plans', []):
+        acessos.append(resumo_plano(filho))
+    return ', '.join(a for a in acessos if a)
@@ -0,0 +1,111 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from apps.financeiro.benchmark import explain_analyze, popular_lancamentos, resumo_plano
+
+# Índices avaliados (criados pelas migrations 0002/0003 do financeiro)
+INDICES = ['idx_lcf_tipo_status_venc', 'idx_lcf_status_venc', 'idx_lcf_pagamento']
+
+# Consultas equivalentes às das telas: contas a pagar, calendário (mês/dia), dashboard e receita
+CONSULTAS = {
+    'contas_a_pagar': """
+        SELECT lcf_id, lcf_valor, lcf_data_vencimento FROM movimento_lancamentos_financeiros
+        WHERE clf_id_tipo = %(pagar)s AND clf_id_status = %(pendente)s
+        ORDER BY lcf_data_vencimento, lcf_id LIMIT 21
+    """,
+    'calendario_mes': """
+        SELECT lcf_data_vencimento,
+               SUM(lcf_valor) FILTER (WHERE clf_id_tipo = %(pagar)s),
+               SUM(lcf_valor) FILTER (WHERE clf_id_tipo = %(receber)s)
+        FROM movimento_lancamentos_financeiros
+        WHERE clf_id_status = %(pendente)s
+          AND lcf_data_vencimento >= %(mes_inicio)s AND lcf_data_vencimento < %(mes_fim)s
+        GROUP BY lcf_data_vencimento
+    """,
+    # O mesmo mês por EXTRACT (forma anterior): não usa o índice de vencimento
+    'calendario_mes_extract': """
+        SELECT lcf_data_vencimento,
+               SUM(lcf_valor) FILTER (WHERE clf_id_tipo = %(pagar)s),
+               SUM(lcf_valor) FILTER (WHERE clf_id_tipo = %(receber)s)
+        FROM movimento_lancamentos_financeiros
+        WHERE clf_id_status = %(pendente)s
+          AND EXTRACT(YEAR FROM lcf_data_vencimento) = 2024 AND EXTRACT(MONTH FROM lcf_data_vencimento) = 6
+        GROUP BY lcf_data_vencimento
+    """,
+    'calendario_dia': """
+        SELECT lcf_id, lcf_valor FROM movimento_lancamentos_financeiros
+        WHERE clf_id_status = %(pendente)s AND lcf_data_vencimento = %(dia)s
+    """,
+    'dashboard_pendentes': """
+        SELECT SUM(lcf_valor) FROM movimento_lancamentos_financeiros
+        WHERE clf_id_tipo = %(pagar)s AND clf_id_status = %(pendente)s
+          AND lcf_data_vencimento BETWEEN %(mes_inicio)s AND %(mes_fim)s
+    """,
+    'receita_por_pagamento': """
+        SELECT SUM(lcf_valor) FROM movimento_lancamentos_financeiros
+        WHERE clf_id_tipo = %(receber)s
+          AND lcf_data_pagamento BETWEEN %(mes_inicio)s AND %(mes_fim)s
+    """,
+}
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Popula N lançamentos (padrão 1M) numa transação, compara planos e latências das consultas "
+        "quentes com e sem os índices compostos/parciais e desfaz tudo (ROLLBACK). "
+        "Bloqueia a tabela durante a execução: use apenas em banco de desenvolvimento."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--linhas', type=int, default=1_000_000, help='Quantidade de lançamentos gerados')
+        parser.add_argument('--repeticoes', type=int, default=5, help='Execuções por consulta (mediana)')
+        parser.add_argument('--planos', action='store_true', help='Imprime o plano (EXPLAIN ANALYZE) de cada consulta')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    inicio = time.perf_counter()
+                    params = popular_lancamentos(cursor, options['linhas'])
+                    self.stdout.write(f"{options['linhas']} lançamentos gerados em {time.perf_counter() - inicio:.1f}s")
+                    com = self._medir(cursor, params, options)
+                    for indice in INDICES:
+                        cursor.execute(f'DROP INDEX IF EXISTS {indice}')
+                    cursor.execute('ANALYZE movimento_lancamentos_financeiros')
+                    sem = self._medir(cursor, params, options)
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+        self.stdout.write(f"\n{'consulta':<24}{'sem índices (ms)':>18}{'com índices (ms)':>18}{'ganho':>8}  plano com índices")
+        for nome in CONSULTAS:
+            antes, depois = sem[nome], com[nome]
+            ganho = antes['ms'] / depois['ms'] if depois['ms'] else float('inf')
+            self.stdout.write(
+                f"{nome:<24}{antes['ms']:>18.2f}{depois['ms']:>18.2f}{ganho:>7.1f}x  {depois['resumo']}"
+            )
+        self.stdout.write(
+            f"\ncalendário do mês com índices: intervalo {com['calendario_mes']['ms']:.2f} ms "
+            f"vs EXTRACT {com['calendario_mes_extract']['ms']:.2f} ms"
+        )
+        self.stdout.write(self.style.SUCCESS("Benchmark concluído; dados gerados descartados (ROLLBACK)."))
+
+    def _medir(self, cursor, params: dict, options) -> dict:
+        resultados = {}
+        for nome, sql in CONSULTAS.items():
+            tempos = []
+            for _ in range(options['repeticoes']):
+                plano = explain_analyze(cursor, sql, params)
+                tempos.append(plano['Execution Time'])
+            tempos.sort()
+            resultados[nome] = {'ms': tempos[len(tempos) // 2], 'resumo': resumo_plano(plano['Plan'])}
+            if options['planos']:
+                cursor.execute(f'EXPLAIN (ANALYZE, BUFFERS) {sql}', params)
+                self.stdout.write(f"\n-- {nome}\n" + "\n".join(row[0] for row in cursor.fetchall()))
+        return resultados
@@ -0,0 +1,91 @@
+from datetime import date
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from apps.core import particionamento
+
+
+class Command(BaseCommand):
+    help = (
+        "Particionamento por data das tabelas de PARTICIONAMENTO (settings). "
+        "'converter' transforma a tabela em particionada, com os dados, numa transação que bloqueia as "
+        "escritas nela durante a cópia: rode em janela de manutenção. 'criar' garante as partições futuras "
+        "(também agendado no Celery beat), 'desanexar' separa os períodos antigos e 'listar' mostra as partições."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('acao', choices=['converter', 'criar', 'desanexar', 'listar'])
+        parser.add_argument('tabelas', nargs='*', help='Padrão: todas as tabelas de PARTICIONAMENTO')
+        parser.add_argument('--remover-fks-de-entrada', action='store_true',
+                            help='Permite converter tabelas referenciadas por FKs, removendo essas FKs')
+        parser.add_argument('--ampliar-chaves-unicas', action='store_true',
+                            help='Acrescenta a coluna de partição a todas as chaves únicas (passam a valer '
+                                 'só dentro de cada período), em vez de mantê-las em tabelas <chave>__global')
+        parser.add_argument('--meses-adiante', type=int, default=settings.PARTICIONAMENTO_MESES_ADIANTE)
+        parser.add_argument('--antes-de', help="Com 'desanexar': períodos que terminam até esta data (YYYY-MM-DD)")
+
+    def handle(self, *args, **options):
+        tabelas = options['tabelas'] or list(settings.PARTICIONAMENTO)
+        desconhecidas = [t for t in tabelas if t not in settings.PARTICIONAMENTO]
+        if desconhecidas:
+            raise CommandError(f"Tabelas fora de PARTICIONAMENTO: {', '.join(desconhecidas)}")
+
+        acao = options['acao']
+        if acao == 'desanexar' and not options['antes_de']:
+            raise CommandError("'desanexar' exige --antes-de")
+
+        for tabela in tabelas:
+            coluna, intervalo = settings.PARTICIONAMENTO[tabela]
+            with connection.cursor() as cursor:
+                particionada = particionamento.esta_particionada(cursor, tabela)
+            if acao != 'converter' and not particionada:
+                self.stdout.write(f"{tabela}: não particionada (use 'converter')")
+                continue
+            try:
+                getattr(self, f'_{acao}')(tabela, coluna, intervalo, options)
+            except particionamento.ParticionamentoError as erro:
+                raise CommandError(str(erro))
+
+    def _converter(self, tabela, coluna, intervalo, options):
+        resultado = particionamento.particionar(
+            tabela, coluna, intervalo, remover_fks_de_entrada=options['remover_fks_de_entrada'],
+            ampliar_chaves_unicas=options['ampliar_chaves_unicas'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{tabela}: {resultado['linhas']} linhas em {len(resultado['particoes'])} partições por {coluna}"
+        ))
+        if resultado['chaves_ampliadas']:
+            self.stdout.write(self.style.WARNING(
+                f"  chaves únicas agora incluem {coluna}: {', '.join(resultado['chaves_ampliadas'])}"
+            ))
+        if resultado['chaves_globais']:
+            self.stdout.write(f"  chaves de negócio mantidas em: {', '.join(resultado['chaves_globais'])}")
+        if resultado['fks_removidas']:
+            self.stdout.write(self.style.WARNING(f"  FKs removidas: {', '.join(resultado['fks_removidas'])}"))
+        if resultado['views_recriadas']:
+            self.stdout.write(f"  views recriadas: {', '.join(resultado['views_recriadas'])}")
+        self._criar(tabela, coluna, intervalo, options)
+
+    def _criar(self, tabela, coluna, intervalo, options):
+        criadas = particionamento.criar_particoes_adiante(tabela, intervalo, options['meses_adiante'])
+        self.stdout.write(f"{tabela}: {len(criadas)} partições criadas {', '.join(criadas)}".rstrip())
+
+    def _desanexar(self, tabela, coluna, intervalo, options):
+        try:
+            antes_de = date.fromisoformat(options['antes_de'])
+        except ValueError:
+            raise CommandError("--antes-de inválido: use YYYY-MM-DD")
+        desanexadas = particionamento.desanexar_particoes(tabela, antes_de)
+        self.stdout.write(
+            f"{tabela}: {len(desanexadas)} partições desanexadas (agora tabelas comuns) {', '.join(desanexadas)}".rstrip()
+        )
+
+    def _listar(self, tabela, coluna, intervalo, options):
+        with connection.cursor() as cursor:
+            self.stdout.write(f"{tabela} (por {coluna}):")
+            for particao in particionamento.particoes(cursor, tabela):
+                cursor.execute(f"SELECT COUNT(*) FROM {connection.ops.quote_name(particao['nome'])}")
+                limites = f"[{particao['inicio']}, {particao['fim']})" if particao['inicio'] else 'padrão'
+                self.stdout.write(f"  {particao['nome']:<48} {limites:<26} {cursor.fetchone()[0]:>10} linhas")
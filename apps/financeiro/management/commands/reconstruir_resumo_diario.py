@@ -0,0 +1,36 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.financeiro.repositories import ResumoDiarioRepository
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula o ResumoDiario a partir dos lançamentos pendentes e informa quantas "
+        "linhas divergiam do agregado mantido por deltas. Agende periodicamente como reconciliação."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', help='Primeiro vencimento (YYYY-MM-DD); padrão: sem limite')
+        parser.add_argument('--ate', help='Último vencimento, inclusive (YYYY-MM-DD); padrão: sem limite')
+
+    def handle(self, *args, **options):
+        desde = self._data(options['desde'], '--desde')
+        ate = self._data(options['ate'], '--ate')
+
+        resultado = ResumoDiarioRepository().reconstruir(desde=desde, ate=ate)
+
+        self.stdout.write(f"{resultado['linhas']} linhas recalculadas")
+        if resultado['divergentes']:
+            self.stdout.write(self.style.WARNING(f"{resultado['divergentes']} linhas divergiam e foram corrigidas"))
+        else:
+            self.stdout.write(self.style.SUCCESS("Nenhuma divergência encontrada"))
+
+    def _data(self, valor, opcao):
+        if not valor:
+            return None
+        try:
+            return date.fromisoformat(valor)
+        except ValueError:
+            raise CommandError(f"{opcao} inválido: use YYYY-MM-DD")
@@ -0,0 +1,20 @@
+# Generated by Django 4.2 on 2026-10-19 18:13
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY não roda dentro de transação; não bloqueia escritas
+    atomic = False
+
+    dependencies = [
+        ('financeiro', '0001_initial'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='lancamentofinanceiro',
+            index=models.Index(fields=['clf_tipo', 'clf_status', 'data_vencimento', 'id'], name='idx_lcf_tipo_status_venc'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2 on 2026-10-19 18:15
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY não roda dentro de transação; não bloqueia escritas
+    atomic = False
+
+    dependencies = [
+        ('classificadores', '0001_initial'),
+        ('financeiro', '0002_lancamento_idx_tipo_status_venc'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='lancamentofinanceiro',
+            index=models.Index(fields=['clf_status', 'data_vencimento'], include=('clf_tipo', 'valor'), name='idx_lcf_status_venc'),
+        ),
+        AddIndexConcurrently(
+            model_name='lancamentofinanceiro',
+            index=models.Index(condition=models.Q(('data_pagamento__isnull', False)), fields=['data_pagamento'], include=('clf_tipo', 'valor'), name='idx_lcf_pagamento'),
+        ),
+        # Índices simples das FKs ficam redundantes (prefixo dos compostos); removidos só depois
+        # que os compostos existem
+        migrations.AlterField(
+            model_name='lancamentofinanceiro',
+            name='clf_status',
+            field=models.ForeignKey(db_column='clf_id_status', db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='lancamentos_status', to='classificadores.classificador'),
+        ),
+        migrations.AlterField(
+            model_name='lancamentofinanceiro',
+            name='clf_tipo',
+            field=models.ForeignKey(db_column='clf_id_tipo', db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='lancamentos_tipo', to='classificadores.classificador'),
+        ),
+    ]
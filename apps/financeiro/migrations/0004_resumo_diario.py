@@ -0,0 +1,58 @@
+# Generated by Django 4.2 on 2026-10-19 18:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classificadores', '0001_initial'),
+        ('empresa', '0002_remove_empresanaoclassificada_id_and_more'),
+        ('financeiro', '0003_lancamento_indices_calendario_pagamento'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoDiario',
+            fields=[
+                ('id', models.BigAutoField(db_column='rsd_id', primary_key=True, serialize=False)),
+                ('data', models.DateField(db_column='rsd_data')),
+                ('valor_pendente', models.DecimalField(db_column='rsd_valor_pendente', decimal_places=2, default=0, max_digits=14)),
+                ('qtde_pendente', models.IntegerField(db_column='rsd_qtde_pendente', default=0)),
+                ('dt_alteracao', models.DateTimeField(auto_now=True, db_column='rsd_dt_alteracao')),
+                ('clf_tipo', models.ForeignKey(db_column='clf_id_tipo', on_delete=django.db.models.deletion.PROTECT, related_name='resumos_diarios', to='classificadores.classificador')),
+                ('empresa', models.ForeignKey(blank=True, db_column='emp_cnpj_numero', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='resumos_diarios', to='empresa.minhaempresa')),
+            ],
+            options={
+                'db_table': 'movimento_resumo_diario',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='resumodiario',
+            index=models.Index(fields=['data', 'clf_tipo'], name='idx_rsd_data_tipo'),
+        ),
+        migrations.AddConstraint(
+            model_name='resumodiario',
+            constraint=models.UniqueConstraint(condition=models.Q(('empresa__isnull', False)), fields=('empresa', 'data', 'clf_tipo'), name='uq_rsd_empresa_data_tipo'),
+        ),
+        migrations.AddConstraint(
+            model_name='resumodiario',
+            constraint=models.UniqueConstraint(condition=models.Q(('empresa__isnull', True)), fields=('data', 'clf_tipo'), name='uq_rsd_data_tipo_sem_empresa'),
+        ),
+        # Carga inicial a partir dos lançamentos pendentes já existentes
+        migrations.RunSQL(
+            sql="""
+                INSERT INTO movimento_resumo_diario
+                    (emp_cnpj_numero, rsd_data, clf_id_tipo, rsd_valor_pendente, rsd_qtde_pendente, rsd_dt_alteracao)
+                SELECT j.emp_cnpj_numero, l.lcf_data_vencimento, l.clf_id_tipo, SUM(l.lcf_valor), COUNT(*), NOW()
+                FROM movimento_lancamentos_financeiros l
+                JOIN geral_classificadores status ON status.clf_id = l.clf_id_status
+                    AND status.clf_tipo = 'STATUS_LANCAMENTO' AND status.clf_codigo = 'PENDENTE'
+                JOIN movimento_notas_fiscais n ON n.ntf_id = l.ntf_id
+                JOIN movimento_jobs_processamento j ON j.jbp_id = n.jbp_id
+                GROUP BY j.emp_cnpj_numero, l.lcf_data_vencimento, l.clf_id_tipo;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2 on 2026-10-19 21:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empresa', '0002_remove_empresanaoclassificada_id_and_more'),
+        ('notas', '0002_notafiscal_empresa'),
+        ('financeiro', '0004_resumo_diario'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lancamentofinanceiro',
+            name='empresa',
+            field=models.ForeignKey(blank=True, db_column='emp_cnpj_numero', db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='lancamentos', to='empresa.minhaempresa'),
+        ),
+        # Lançamentos existentes herdam a empresa da nota (já preenchida a partir do job)
+        migrations.RunSQL(
+            sql="""
+                UPDATE movimento_lancamentos_financeiros l
+                SET emp_cnpj_numero = n.emp_cnpj_numero
+                FROM movimento_notas_fiscais n
+                WHERE n.ntf_id = l.ntf_id AND n.emp_cnpj_numero IS NOT NULL
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2 on 2026-10-19 21:05
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY não roda dentro de transação; não bloqueia escritas
+    atomic = False
+
+    dependencies = [
+        ('financeiro', '0005_lancamentofinanceiro_empresa'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='lancamentofinanceiro',
+            index=models.Index(fields=['empresa', 'clf_tipo', 'clf_status', 'data_vencimento', 'id'], name='idx_lcf_emp_tipo_status_venc'),
+        ),
+        AddIndexConcurrently(
+            model_name='lancamentofinanceiro',
+            index=models.Index(fields=['empresa', 'clf_status', 'data_vencimento'], include=['clf_tipo', 'valor'], name='idx_lcf_emp_status_venc'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2 on 2026-10-19 20:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financeiro', '0006_lancamento_indices_empresa'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='resumodiario',
+            name='uq_rsd_empresa_data_tipo',
+        ),
+        migrations.RemoveConstraint(
+            model_name='resumodiario',
+            name='uq_rsd_data_tipo_sem_empresa',
+        ),
+        migrations.AddField(
+            model_name='resumodiario',
+            name='balde',
+            field=models.SmallIntegerField(db_column='rsd_balde', default=0),
+        ),
+        migrations.AddConstraint(
+            model_name='resumodiario',
+            constraint=models.UniqueConstraint(condition=models.Q(('empresa__isnull', False)), fields=('empresa', 'data', 'clf_tipo', 'balde'), name='uq_rsd_empresa_data_tipo_balde'),
+        ),
+        migrations.AddConstraint(
+            model_name='resumodiario',
+            constraint=models.UniqueConstraint(condition=models.Q(('empresa__isnull', True)), fields=('data', 'clf_tipo', 'balde'), name='uq_rsd_data_tipo_balde_sem_emp'),
+        ),
+    ]
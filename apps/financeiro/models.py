@@ -1,16 +1,20 @@
 import uuid
 from django.db import models
 from apps.classificadores.models import Classificador
+from apps.core.tenancy import EmpresaQuerySet
 
 
 class LancamentoFinanceiro(models.Model):
     id = models.BigAutoField(primary_key=True, db_column='lcf_id')
     uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True, db_column='lcf_uuid')
     nota_fiscal = models.OneToOneField('notas.NotaFiscal', on_delete=models.CASCADE, related_name='lancamento', db_column='ntf_id')
+    # Cópia da empresa da nota (ver save); sem índice próprio: é prefixo dos índices idx_lcf_emp_*
+    empresa = models.ForeignKey('empresa.MinhaEmpresa', on_delete=models.PROTECT, null=True, blank=True, related_name='lancamentos', db_column='emp_cnpj_numero', db_index=False)
     descricao = models.CharField(max_length=255, db_column='lcf_descricao')
     valor = models.DecimalField(max_digits=10, decimal_places=2, db_column='lcf_valor')
-    clf_tipo = models.ForeignKey(Classificador, on_delete=models.PROTECT, related_name='lancamentos_tipo', db_column='clf_id_tipo')
-    clf_status = models.ForeignKey(Classificador, on_delete=models.PROTECT, related_name='lancamentos_status', db_column='clf_id_status')
+    # Sem índice próprio: ambas as FKs são prefixo dos índices compostos abaixo
+    clf_tipo = models.ForeignKey(Classificador, on_delete=models.PROTECT, related_name='lancamentos_tipo', db_column='clf_id_tipo', db_index=False)
+    clf_status = models.ForeignKey(Classificador, on_delete=models.PROTECT, related_name='lancamentos_status', db_column='clf_id_status', db_index=False)
     data_vencimento = models.DateField(db_column='lcf_data_vencimento')
     data_pagamento = models.DateField(null=True, blank=True, db_column='lcf_data_pagamento')
     dt_criacao = models.DateTimeField(auto_now_add=True, db_column='lcf_dt_criacao')
@@ -18,8 +22,72 @@ class LancamentoFinanceiro(models.Model):
     usr_criacao = models.IntegerField(null=True, blank=True, db_column='lcf_usr_criacao')
     usr_alteracao = models.IntegerField(null=True, blank=True, db_column='lcf_usr_alteracao')
 
+    objects = EmpresaQuerySet.as_manager()
+
     class Meta:
         db_table = 'movimento_lancamentos_financeiros'
+        indexes = [
+            # Contas a pagar/receber: filtro por tipo+status, cursor por (vencimento, id)
+            models.Index(fields=['clf_tipo', 'clf_status', 'data_vencimento', 'id'], name='idx_lcf_tipo_status_venc'),
+            # Os mesmos, com a empresa autenticada à frente
+            models.Index(fields=['empresa', 'clf_tipo', 'clf_status', 'data_vencimento', 'id'], name='idx_lcf_emp_tipo_status_venc'),
+            models.Index(fields=['empresa', 'clf_status', 'data_vencimento'], include=['clf_tipo', 'valor'], name='idx_lcf_emp_status_venc'),
+            # Calendário (pendentes de todos os tipos por vencimento): index-only scan
+            models.Index(fields=['clf_status', 'data_vencimento'], include=['clf_tipo', 'valor'], name='idx_lcf_status_venc'),
+            # Receita/distribuição por data de pagamento; lançamentos em aberto (NULL) ficam fora
+            models.Index(
+                fields=['data_pagamento'], include=['clf_tipo', 'valor'], name='idx_lcf_pagamento',
+                condition=models.Q(data_pagamento__isnull=False),
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self._state.adding and self.empresa_id is None and self.nota_fiscal_id is not None:
+            self.empresa_id = self.nota_fiscal.empresa_id
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.descricao} - R$ {self.valor}"
+
+
+class ResumoDiario(models.Model):
+    """
+    Parcela (balde) do total e da quantidade de lançamentos PENDENTES por (empresa, dia de vencimento, tipo).
+
+    O total de um dia é a soma dos seus baldes (``settings.RESUMO_DIARIO_BALDES``).
+    Mantido por deltas pelo ResumoDiarioObserver (criação, alteração e remoção de
+    lançamentos) e reconciliado pelo comando ``reconstruir_resumo_diario``.
+    Lançamentos cujo job não tem empresa ficam com ``empresa`` nula.
+    """
+    id = models.BigAutoField(primary_key=True, db_column='rsd_id')
+    empresa = models.ForeignKey('empresa.MinhaEmpresa', on_delete=models.CASCADE, null=True, blank=True, related_name='resumos_diarios', db_column='emp_cnpj_numero')
+    data = models.DateField(db_column='rsd_data')
+    clf_tipo = models.ForeignKey(Classificador, on_delete=models.PROTECT, related_name='resumos_diarios', db_column='clf_id_tipo')
+    balde = models.SmallIntegerField(default=0, db_column='rsd_balde')
+    valor_pendente = models.DecimalField(max_digits=14, decimal_places=2, default=0, db_column='rsd_valor_pendente')
+    qtde_pendente = models.IntegerField(default=0, db_column='rsd_qtde_pendente')
+    dt_alteracao = models.DateTimeField(auto_now=True, db_column='rsd_dt_alteracao')
+
+    objects = EmpresaQuerySet.as_manager()
+
+    class Meta:
+        db_table = 'movimento_resumo_diario'
+        indexes = [
+            models.Index(fields=['data', 'clf_tipo'], name='idx_rsd_data_tipo'),
+        ]
+        constraints = [
+            # NULL não conflita em UNIQUE no PostgreSQL 14: uma restrição para cada caso
+            models.UniqueConstraint(
+                fields=['empresa', 'data', 'clf_tipo', 'balde'],
+                condition=models.Q(empresa__isnull=False),
+                name='uq_rsd_empresa_data_tipo_balde',
+            ),
+            models.UniqueConstraint(
+                fields=['data', 'clf_tipo', 'balde'],
+                condition=models.Q(empresa__isnull=True),
+                name='uq_rsd_data_tipo_balde_sem_emp',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.data} {self.clf_tipo_id}[{self.balde}]: R$ {self.valor_pendente} ({self.qtde_pendente})"
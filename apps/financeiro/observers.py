@@ -2,6 +2,7 @@ from datetime import date, timedelta
 import logging
 
 from apps.core.observers import Observer
+from .repositories import ResumoDiarioRepository
 
 logger = logging.getLogger(__name__)
 
@@ -9,6 +10,9 @@ logger = logging.getLogger(__name__)
 class AlertaVencimentoObserver(Observer):
     """Observer that logs a warning when a financial entry has a near due date."""
 
+    # Só registra logs: não precisa atrasar a transação da nota
+    delivery = 'async'
+
     def update(self, subject, event_type: str, **kwargs):
         if event_type == "lancamento_created":
             lancamento = kwargs.get("lancamento")
@@ -31,3 +35,29 @@ class AlertaVencimentoObserver(Observer):
                 getattr(lancamento, "descricao", "<sem descricao>"),
                 data_venc,
             )
+
+
+class ResumoDiarioObserver(Observer):
+    """Mantém o ResumoDiario (pendentes por dia) por deltas a cada mudança de lançamento.
+
+    Eventos: ``lancamento_created`` e ``lancamento_changed`` somam o estado atual;
+    ``lancamento_changing`` e ``lancamento_deleting`` subtraem o estado ainda gravado.
+    Os eventos devem ser emitidos dentro da transação que altera o lançamento.
+    """
+
+    SINAIS = {
+        "lancamento_created": 1,
+        "lancamento_changed": 1,
+        "lancamento_changing": -1,
+        "lancamento_deleting": -1,
+    }
+
+    def __init__(self):
+        self.repository = ResumoDiarioRepository()
+
+    def update(self, subject, event_type: str, **kwargs):
+        sinal = self.SINAIS.get(event_type)
+        lancamento = kwargs.get("lancamento")
+        if sinal is None or lancamento is None:
+            return
+        self.repository.aplicar_delta(lancamento.id, sinal)
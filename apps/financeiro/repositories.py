@@ -0,0 +1,109 @@
+from datetime import date
+from typing import Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+
+# Empresa do lançamento = a coluna denormalizada emp_cnpj_numero, a mesma do dashboard ao vivo
+# e das listas. Só lançamentos PENDENTES contam.
+_ORIGEM_PENDENTES = """
+    FROM movimento_lancamentos_financeiros l
+    JOIN geral_classificadores status ON status.clf_id = l.clf_id_status
+        AND status.clf_tipo = 'STATUS_LANCAMENTO' AND status.clf_codigo = 'PENDENTE'
+"""
+
+# Um upsert por variante de empresa (com/sem), já que cada uma tem seu índice único parcial. O balde
+# sai do id do lançamento: transações concorrentes no mesmo dia atualizam linhas diferentes em vez de
+# esperar pelo lock de uma só até o commit; a remoção/alteração cai no mesmo balde da criação
+_APLICAR_DELTA = f"""
+    INSERT INTO movimento_resumo_diario
+        (emp_cnpj_numero, rsd_data, clf_id_tipo, rsd_balde, rsd_valor_pendente, rsd_qtde_pendente, rsd_dt_alteracao)
+    SELECT l.emp_cnpj_numero, l.lcf_data_vencimento, l.clf_id_tipo, l.lcf_id %% %(baldes)s,
+           %(sinal)s * l.lcf_valor, %(sinal)s, NOW()
+    {_ORIGEM_PENDENTES}
+    WHERE l.lcf_id = %(lancamento_id)s AND l.emp_cnpj_numero IS NOT NULL
+    ON CONFLICT (emp_cnpj_numero, rsd_data, clf_id_tipo, rsd_balde) WHERE emp_cnpj_numero IS NOT NULL
+    DO UPDATE SET
+        rsd_valor_pendente = movimento_resumo_diario.rsd_valor_pendente + EXCLUDED.rsd_valor_pendente,
+        rsd_qtde_pendente = movimento_resumo_diario.rsd_qtde_pendente + EXCLUDED.rsd_qtde_pendente,
+        rsd_dt_alteracao = NOW();
+
+    INSERT INTO movimento_resumo_diario
+        (emp_cnpj_numero, rsd_data, clf_id_tipo, rsd_balde, rsd_valor_pendente, rsd_qtde_pendente, rsd_dt_alteracao)
+    SELECT NULL, l.lcf_data_vencimento, l.clf_id_tipo, l.lcf_id %% %(baldes)s,
+           %(sinal)s * l.lcf_valor, %(sinal)s, NOW()
+    {_ORIGEM_PENDENTES}
+    WHERE l.lcf_id = %(lancamento_id)s AND l.emp_cnpj_numero IS NULL
+    ON CONFLICT (rsd_data, clf_id_tipo, rsd_balde) WHERE emp_cnpj_numero IS NULL
+    DO UPDATE SET
+        rsd_valor_pendente = movimento_resumo_diario.rsd_valor_pendente + EXCLUDED.rsd_valor_pendente,
+        rsd_qtde_pendente = movimento_resumo_diario.rsd_qtde_pendente + EXCLUDED.rsd_qtde_pendente,
+        rsd_dt_alteracao = NOW();
+"""
+
+_RECALCULAR = f"""
+    SELECT l.emp_cnpj_numero, l.lcf_data_vencimento AS rsd_data, l.clf_id_tipo,
+           SUM(l.lcf_valor) AS rsd_valor_pendente, COUNT(*) AS rsd_qtde_pendente
+    {_ORIGEM_PENDENTES}
+    WHERE l.lcf_data_vencimento >= %(desde)s AND l.lcf_data_vencimento <= %(ate)s
+    GROUP BY l.emp_cnpj_numero, l.lcf_data_vencimento, l.clf_id_tipo
+"""
+
+
+class ResumoDiarioRepository:
+    def aplicar_delta(self, lancamento_id: int, sinal: int):
+        """Soma (sinal=1) ou subtrai (sinal=-1) o lançamento do resumo do seu dia, se estiver PENDENTE.
+
+        O estado lido é o da linha no banco no momento da chamada: para uma alteração,
+        chame com -1 antes do UPDATE e com +1 depois, na mesma transação.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(_APLICAR_DELTA, {
+                'lancamento_id': lancamento_id, 'sinal': sinal, 'baldes': settings.RESUMO_DIARIO_BALDES,
+            })
+
+    def reconstruir(self, desde: Optional[date] = None, ate: Optional[date] = None) -> dict:
+        """Recalcula o resumo a partir dos lançamentos no intervalo [desde, ate].
+
+        Retorna quantas linhas resultaram e quantas divergiam do resumo mantido por deltas
+        (somados os baldes). O recalculado vai inteiro para o balde 0. A tabela fica travada
+        para escrita durante a reconstrução, para que nenhum delta concorrente se perca entre
+        o recálculo e a substituição.
+        """
+        params = {'desde': desde or date.min, 'ate': ate or date.max}
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("LOCK TABLE movimento_resumo_diario IN EXCLUSIVE MODE")
+            # Pode já existir se a chamada estiver dentro de uma transação externa
+            cursor.execute("DROP TABLE IF EXISTS resumo_recalculado")
+            cursor.execute(f"""
+                CREATE TEMP TABLE resumo_recalculado ON COMMIT DROP AS {_RECALCULAR}
+            """, params)
+            cursor.execute("""
+                SELECT COUNT(*)
+                FROM (
+                    SELECT emp_cnpj_numero, rsd_data, clf_id_tipo,
+                           SUM(rsd_valor_pendente) AS rsd_valor_pendente, SUM(rsd_qtde_pendente) AS rsd_qtde_pendente
+                    FROM movimento_resumo_diario
+                    WHERE rsd_data >= %(desde)s AND rsd_data <= %(ate)s
+                    GROUP BY emp_cnpj_numero, rsd_data, clf_id_tipo
+                    HAVING SUM(rsd_qtde_pendente) <> 0
+                ) atual
+                FULL OUTER JOIN resumo_recalculado r
+                    ON r.emp_cnpj_numero IS NOT DISTINCT FROM atual.emp_cnpj_numero
+                    AND r.rsd_data = atual.rsd_data AND r.clf_id_tipo = atual.clf_id_tipo
+                WHERE atual.rsd_qtde_pendente IS DISTINCT FROM r.rsd_qtde_pendente
+                   OR atual.rsd_valor_pendente IS DISTINCT FROM r.rsd_valor_pendente
+            """, params)
+            divergentes = cursor.fetchone()[0]
+            cursor.execute("""
+                DELETE FROM movimento_resumo_diario WHERE rsd_data >= %(desde)s AND rsd_data <= %(ate)s
+            """, params)
+            cursor.execute("""
+                INSERT INTO movimento_resumo_diario
+                    (emp_cnpj_numero, rsd_data, clf_id_tipo, rsd_balde, rsd_valor_pendente, rsd_qtde_pendente,
+                     rsd_dt_alteracao)
+                SELECT emp_cnpj_numero, rsd_data, clf_id_tipo, 0, rsd_valor_pendente, rsd_qtde_pendente, NOW()
+                FROM resumo_recalculado
+            """)
+            linhas = cursor.rowcount
+        return {'linhas': linhas, 'divergentes': divergentes}
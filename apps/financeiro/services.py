@@ -0,0 +1,50 @@
+from datetime import date
+from typing import Optional
+
+from django.db import transaction
+
+from apps.classificadores.models import get_classifier
+from apps.core.observers import Subject
+from apps.dashboard.observers import MetricasFinanceirasObserver
+from .models import LancamentoFinanceiro
+from .observers import ResumoDiarioObserver
+
+
+class LancamentoFinanceiroService(Subject):
+    """
+    Alterações de lançamentos fora do pipeline de notas (pagamento, edição, remoção).
+
+    Cada operação roda numa transação e emite ``lancamento_changing`` /
+    ``lancamento_changed`` (ou ``lancamento_deleting``) para que agregados como o
+    ResumoDiario acompanhem o estado gravado.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.attach(ResumoDiarioObserver())
+        self.attach(MetricasFinanceirasObserver())
+
+    def registrar_pagamento(self, lancamento: LancamentoFinanceiro, data_pagamento: Optional[date] = None) -> LancamentoFinanceiro:
+        lancamento.clf_status = get_classifier('STATUS_LANCAMENTO', 'PAGO')
+        lancamento.data_pagamento = data_pagamento or date.today()
+        return self.salvar(lancamento)
+
+    def salvar(self, lancamento: LancamentoFinanceiro) -> LancamentoFinanceiro:
+        with transaction.atomic():
+            if lancamento.pk is None:
+                lancamento.save()
+                self.notify('lancamento_created', lancamento=lancamento)
+                return lancamento
+            self.notify('lancamento_changing', lancamento=lancamento)
+            lancamento.save()
+            self.notify('lancamento_changed', lancamento=lancamento)
+        return lancamento
+
+    def remover(self, lancamento: LancamentoFinanceiro):
+        with transaction.atomic():
+            self.notify('lancamento_deleting', lancamento=lancamento)
+            lancamento.delete()
+
+    def notificar_remocao(self, lancamento: LancamentoFinanceiro):
+        """Para remoções em cascata (ex.: exclusão da nota): chame antes de apagar, na mesma transação."""
+        self.notify('lancamento_deleting', lancamento=lancamento)
@@ -0,0 +1,25 @@
+import logging
+
+from celery import shared_task
+from django.conf import settings
+from django.db import connection
+
+from apps.core import particionamento
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def manter_particoes_task():
+    """Agendada pelo Celery beat: cria as partições até PARTICIONAMENTO_MESES_ADIANTE das tabelas já convertidas."""
+    criadas = {}
+    for tabela, (_, intervalo) in settings.PARTICIONAMENTO.items():
+        with connection.cursor() as cursor:
+            if not particionamento.esta_particionada(cursor, tabela):
+                continue
+        criadas[tabela] = particionamento.criar_particoes_adiante(
+            tabela, intervalo, settings.PARTICIONAMENTO_MESES_ADIANTE
+        )
+        if criadas[tabela]:
+            logger.info("Partições criadas em %s: %s", tabela, ', '.join(criadas[tabela]))
+    return criadas
@@ -2,17 +2,26 @@
 Testes para o app financeiro.
 Testa listagem de contas a pagar e contas a receber.
 """
+import re
 from decimal import Decimal
 from datetime import date, timedelta
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Sum
+from django.test import override_settings
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 from apps.empresa.models import MinhaEmpresa
 from apps.parceiros.models import Parceiro
 from apps.notas.models import NotaFiscal
-from apps.financeiro.models import LancamentoFinanceiro
+from apps.financeiro.models import LancamentoFinanceiro, ResumoDiario
+from apps.financeiro.repositories import ResumoDiarioRepository
+from apps.financeiro.services import LancamentoFinanceiroService
 from apps.processamento.models import JobProcessamento
 from apps.classificadores.models import Classificador
+from apps.core import particionamento
+from apps.core.tests import QueryBudgetMixin
+from backend.authentication import EmpresaPrincipal
 
 
 class ContasAPagarTestCase(APITestCase):
@@ -448,3 +457,454 @@ class ContasAReceberTestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         # Verifica precisão decimal (2 casas)
         self.assertEqual(str(response.data[0]['valor']), '1234.56')
+
+
+class ContasPaginacaoCursorTestCase(APITestCase):
+    """Listas de contas paginadas por cursor em (data_vencimento, id)."""
+
+    def setUp(self):
+        clf = lambda tipo, codigo: Classificador.objects.get_or_create(
+            tipo=tipo, codigo=codigo, defaults={'descricao': codigo}
+        )[0]
+        tipo_pagar = clf('TIPO_LANCAMENTO', 'PAGAR')
+        pendente = clf('STATUS_LANCAMENTO', 'PENDENTE')
+        parceiro = Parceiro.objects.create(
+            nome='Fornecedor Cursor', cnpj='33.333.333/0001-33', clf_tipo=clf('TIPO_PARCEIRO', 'FORNECEDOR')
+        )
+        empresa = MinhaEmpresa.objects.create(
+            cnpj_numero=33033033000133, cnpj='33.033.033/0001-33', nome='Empresa Cursor'
+        )
+        self.client.force_authenticate(user=EmpresaPrincipal(empresa))
+        job = JobProcessamento.objects.create(empresa=empresa, status=clf('STATUS_JOB', 'CONCLUIDO'))
+
+        # Datas distantes no futuro para não intercalar com dados já existentes no banco
+        base = date(2999, 1, 1)
+        self.vencimentos = []
+        for i in range(5):
+            nota = NotaFiscal.objects.create(
+                job_origem=job, parceiro=parceiro, numero=f'CUR-{i}',
+                data_emissao=date.today(), valor_total=Decimal('10.00'),
+            )
+            # Dois lançamentos por data: o id desempata
+            vencimento = base + timedelta(days=i // 2)
+            LancamentoFinanceiro.objects.create(
+                nota_fiscal=nota, descricao=f'Conta {i}', valor=Decimal('10.00'),
+                clf_tipo=tipo_pagar, clf_status=pendente, data_vencimento=vencimento,
+            )
+            self.vencimentos.append(vencimento)
+
+    def _todas_as_paginas(self, url, params):
+        descricoes = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            descricoes += [r['descricao'] for r in response.data['results']]
+            if not response.data['next']:
+                return descricoes
+            response = self.client.get(response.data['next'])
+
+    def test_cursor_percorre_em_ordem_de_vencimento(self):
+        descricoes = self._todas_as_paginas(reverse('contas-a-pagar'), {'page_size': 2})
+        minhas = [d for d in descricoes if d.startswith('Conta ')]
+        self.assertEqual(minhas, [f'Conta {i}' for i in range(5)])
+
+    def test_total_estimado_opcional(self):
+        response = self.client.get(reverse('contas-a-pagar'), {'estimar_total': 'true'})
+        self.assertIsInstance(response.data['total_estimado'], int)
+
+        response = self.client.get(reverse('contas-a-pagar'))
+        self.assertNotIn('total_estimado', response.data)
+
+
+class CalendarTestCase(QueryBudgetMixin, APITestCase):
+    """Calendário: resumo mensal por intervalo semiaberto e detalhes do dia."""
+
+    def setUp(self):
+        clf = lambda tipo, codigo: Classificador.objects.get_or_create(
+            tipo=tipo, codigo=codigo, defaults={'descricao': codigo}
+        )[0]
+        self.tipo_pagar = clf('TIPO_LANCAMENTO', 'PAGAR')
+        self.tipo_receber = clf('TIPO_LANCAMENTO', 'RECEBER')
+        self.pendente = clf('STATUS_LANCAMENTO', 'PENDENTE')
+        self.pago = clf('STATUS_LANCAMENTO', 'PAGO')
+        self.parceiro = Parceiro.objects.create(
+            nome='Parceiro Calendário', cnpj='44.444.444/0001-44', clf_tipo=clf('TIPO_PARCEIRO', 'FORNECEDOR')
+        )
+        empresa = MinhaEmpresa.objects.create(
+            cnpj_numero=44044044000144, cnpj='44.044.044/0001-44', nome='Empresa Calendário'
+        )
+        self.client.force_authenticate(user=EmpresaPrincipal(empresa))
+        self.job = JobProcessamento.objects.create(empresa=empresa, status=clf('STATUS_JOB', 'CONCLUIDO'))
+        self._seq = 0
+
+    def _lancamento(self, vencimento, tipo, valor, status_lanc=None):
+        self._seq += 1
+        nota = NotaFiscal.objects.create(
+            job_origem=self.job, parceiro=self.parceiro, numero=f'CAL-{self._seq}',
+            data_emissao=date.today(), valor_total=Decimal(valor),
+        )
+        # Via service, para que o ResumoDiario lido pelo calendário acompanhe
+        return LancamentoFinanceiroService().salvar(LancamentoFinanceiro(
+            nota_fiscal=nota, descricao=f'Lançamento {self._seq}', valor=Decimal(valor),
+            clf_tipo=tipo, clf_status=status_lanc or self.pendente, data_vencimento=vencimento,
+        ))
+
+    def test_resumo_do_mes_inclui_ultimo_dia_e_exclui_mes_seguinte(self):
+        # Ano distante para não intercalar com dados já existentes no banco
+        self._lancamento(date(2998, 12, 31), self.tipo_pagar, '1.00')
+        self._lancamento(date(2999, 1, 1), self.tipo_pagar, '100.00')
+        self._lancamento(date(2999, 1, 31), self.tipo_pagar, '30.00')
+        self._lancamento(date(2999, 1, 31), self.tipo_receber, '50.00')
+        self._lancamento(date(2999, 1, 31), self.tipo_receber, '70.00', status_lanc=self.pago)
+        self._lancamento(date(2999, 2, 1), self.tipo_receber, '1.00')
+
+        with self.assertMaxQueries(1):
+            response = self.client.get(reverse('calendar-resumo'), {'ano': 2999, 'mes': 1})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        dias = {d['data']: d for d in response.data['dias']}
+        self.assertEqual(list(dias), ['2999-01-01', '2999-01-31'])
+        self.assertEqual(dias['2999-01-01'], {'data': '2999-01-01', 'valor_pagar': 100.0, 'qtde_pagar': 1})
+        self.assertEqual(dias['2999-01-31']['saldo'], 20.0)
+        self.assertEqual(dias['2999-01-31']['qtde_receber'], 1)
+
+    def test_resumo_dezembro_e_mes_invalido(self):
+        self._lancamento(date(2998, 12, 31), self.tipo_pagar, '1.00')
+        response = self.client.get(reverse('calendar-resumo'), {'ano': 2998, 'mes': 12})
+        self.assertEqual([d['data'] for d in response.data['dias']], ['2998-12-31'])
+
+        response = self.client.get(reverse('calendar-resumo'), {'ano': 2998, 'mes': 13})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_detalhes_do_dia(self):
+        self._lancamento(date(2999, 3, 10), self.tipo_pagar, '10.00')
+        self._lancamento(date(2999, 3, 10), self.tipo_receber, '20.00')
+        self._lancamento(date(2999, 3, 11), self.tipo_pagar, '30.00')
+
+        with self.assertMaxQueries(1):
+            response = self.client.get(reverse('calendar-dia-detalhes'), {'data': '2999-03-10'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(sorted(d['tipo'] for d in response.data['detalhes']), ['PAGAR', 'RECEBER'])
+
+    def test_resumo_mensal_por_intervalo_usa_indice_status_vencimento(self):
+        """O intervalo semiaberto do mês é atendido por idx_lcf_status_venc.
+
+        Só o plano: a comparação de tempos com EXTRACT está em ``manage.py benchmark_indices_lancamentos``.
+        """
+        from django.db import connection
+        from apps.financeiro.benchmark import explain_analyze, popular_lancamentos, resumo_plano
+        from apps.financeiro.management.commands.benchmark_indices_lancamentos import CONSULTAS
+
+        with connection.cursor() as cursor:
+            params = popular_lancamentos(cursor, 2_000)
+            # Com poucas linhas o seq scan sairia mais barato; vale o índice que o planner escolheria
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            plano = explain_analyze(cursor, CONSULTAS['calendario_mes'], params)
+
+        self.assertIn('idx_lcf_status_venc', resumo_plano(plano['Plan']))
+
+
+class ResumoDiarioTestCase(APITestCase):
+    """ResumoDiario mantido por deltas (service/observer) e reconciliado por reconstruir()."""
+
+    def setUp(self):
+        clf = lambda tipo, codigo: Classificador.objects.get_or_create(
+            tipo=tipo, codigo=codigo, defaults={'descricao': codigo}
+        )[0]
+        self.tipo_pagar = clf('TIPO_LANCAMENTO', 'PAGAR')
+        self.pendente = clf('STATUS_LANCAMENTO', 'PENDENTE')
+        clf('STATUS_LANCAMENTO', 'PAGO')
+        self.parceiro = Parceiro.objects.create(
+            nome='Parceiro Resumo', cnpj='55.555.555/0001-55', clf_tipo=clf('TIPO_PARCEIRO', 'FORNECEDOR')
+        )
+        self.empresa = MinhaEmpresa.objects.create(
+            cnpj_numero=55055055000155, cnpj='55.055.055/0001-55', nome='Empresa Resumo'
+        )
+        self.client.force_authenticate(user=EmpresaPrincipal(self.empresa))
+        self.job = JobProcessamento.objects.create(empresa=self.empresa, status=clf('STATUS_JOB', 'CONCLUIDO'))
+        self.service = LancamentoFinanceiroService()
+        self.dia = date(2999, 5, 10)
+
+    def _lancamento(self, valor, numero):
+        nota = NotaFiscal.objects.create(
+            job_origem=self.job, parceiro=self.parceiro, numero=numero,
+            data_emissao=date.today(), valor_total=Decimal(valor),
+        )
+        return self.service.salvar(LancamentoFinanceiro(
+            nota_fiscal=nota, descricao=numero, valor=Decimal(valor),
+            clf_tipo=self.tipo_pagar, clf_status=self.pendente, data_vencimento=self.dia,
+        ))
+
+    def _resumo(self):
+        """(valor, quantidade) do dia: a soma dos baldes."""
+        resumo = ResumoDiario.objects.filter(
+            empresa=self.empresa, data=self.dia, clf_tipo=self.tipo_pagar
+        ).aggregate(valor=Sum('valor_pendente'), qtde=Sum('qtde_pendente'))
+        return resumo['valor'], resumo['qtde']
+
+    def test_criacao_pagamento_e_remocao_aplicam_deltas(self):
+        primeiro = self._lancamento('100.00', 'RSD-1')
+        segundo = self._lancamento('40.00', 'RSD-2')
+        self.assertEqual(self._resumo(), (Decimal('140.00'), 2))
+
+        self.service.registrar_pagamento(primeiro)
+        self.assertEqual(self._resumo(), (Decimal('40.00'), 1))
+
+        # Edição de valor de um pendente: sai o valor antigo, entra o novo
+        segundo.valor = Decimal('45.00')
+        self.service.salvar(segundo)
+        self.assertEqual(self._resumo(), (Decimal('45.00'), 1))
+
+        response = self.client.delete(reverse('notafiscal-detail', kwargs={'uuid': segundo.nota_fiscal.uuid}))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self._resumo(), (Decimal('0.00'), 0))
+
+    @override_settings(RESUMO_DIARIO_BALDES=4)
+    def test_lancamentos_do_mesmo_dia_caem_em_baldes_diferentes(self):
+        lancamentos = [self._lancamento('10.00', f'RSD-B{i}') for i in range(4)]
+
+        baldes = ResumoDiario.objects.filter(empresa=self.empresa, data=self.dia).values_list('balde', flat=True)
+        self.assertEqual(sorted(baldes), sorted(l.pk % 4 for l in lancamentos))
+        self.assertEqual(self._resumo(), (Decimal('40.00'), 4))
+
+        # Depois da reconstrução (tudo no balde 0) a baixa deixa o balde do lançamento negativo;
+        # o calendário soma os baldes e some com o dia quando o total zera
+        ResumoDiarioRepository().reconstruir(desde=self.dia, ate=self.dia)
+        for lancamento in lancamentos:
+            self.service.registrar_pagamento(lancamento)
+        self.assertEqual(self._resumo(), (Decimal('0.00'), 0))
+        response = self.client.get(reverse('calendar-resumo'), {'ano': self.dia.year, 'mes': self.dia.month})
+        self.assertEqual(response.data['dias'], [])
+
+    def test_reconstruir_corrige_divergencias(self):
+        self._lancamento('10.00', 'RSD-3')
+        self._lancamento('15.00', 'RSD-4')
+        ResumoDiario.objects.filter(empresa=self.empresa, data=self.dia).update(valor_pendente=Decimal('999.00'))
+
+        resultado = ResumoDiarioRepository().reconstruir(desde=self.dia, ate=self.dia)
+
+        self.assertEqual(resultado, {'linhas': 1, 'divergentes': 1})
+        self.assertEqual(self._resumo(), (Decimal('25.00'), 2))
+
+        # Sem alterações, uma nova reconciliação não encontra divergências
+        self.assertEqual(ResumoDiarioRepository().reconstruir(desde=self.dia, ate=self.dia)['divergentes'], 0)
+
+    def test_empresa_vem_da_coluna_do_lancamento(self):
+        # Job sem empresa: o resumo segue a empresa gravada na nota/lançamento, como o dashboard e as listas
+        nota = NotaFiscal.objects.create(
+            job_origem=JobProcessamento.objects.create(status=self.job.status), empresa=self.empresa,
+            parceiro=self.parceiro, numero='RSD-5', data_emissao=date.today(), valor_total=Decimal('30.00'),
+        )
+        self.service.salvar(LancamentoFinanceiro(
+            nota_fiscal=nota, descricao='RSD-5', valor=Decimal('30.00'),
+            clf_tipo=self.tipo_pagar, clf_status=self.pendente, data_vencimento=self.dia,
+        ))
+
+        self.assertEqual(self._resumo(), (Decimal('30.00'), 1))
+        self.assertEqual(ResumoDiarioRepository().reconstruir(desde=self.dia, ate=self.dia)['divergentes'], 0)
+
+
+
+class EscopoPorEmpresaTestCase(APITestCase):
+    """Listas e calendário restritos à empresa do JWT; empresa denormalizada em notas e lançamentos."""
+
+    def setUp(self):
+        clf = lambda tipo, codigo: Classificador.objects.get_or_create(
+            tipo=tipo, codigo=codigo, defaults={'descricao': codigo}
+        )[0]
+        tipo_pagar = clf('TIPO_LANCAMENTO', 'PAGAR')
+        pendente = clf('STATUS_LANCAMENTO', 'PENDENTE')
+        parceiro = Parceiro.objects.create(
+            nome='Fornecedor Escopo', cnpj='46.046.046/0001-46', clf_tipo=clf('TIPO_PARCEIRO', 'FORNECEDOR')
+        )
+        self.dia = date(2999, 7, 1)
+        self.empresas = []
+        for i, cnpj_numero in enumerate((46046046000101, 46046046000202)):
+            empresa = MinhaEmpresa.objects.create(
+                cnpj_numero=cnpj_numero, cnpj=f'46.046.046/0002-0{i}', nome=f'Empresa Escopo {i}'
+            )
+            job = JobProcessamento.objects.create(empresa=empresa, status=clf('STATUS_JOB', 'CONCLUIDO'))
+            nota = NotaFiscal.objects.create(
+                job_origem=job, parceiro=parceiro, numero=f'ESC-{i}',
+                data_emissao=date.today(), valor_total=Decimal('10.00'),
+            )
+            LancamentoFinanceiro.objects.create(
+                nota_fiscal=nota, descricao=f'Escopo {i}', valor=Decimal('10.00'),
+                clf_tipo=tipo_pagar, clf_status=pendente, data_vencimento=self.dia,
+            )
+            self.empresas.append(empresa)
+        self.principal = EmpresaPrincipal(self.empresas[0])
+
+    def _descricoes(self, url, params=None):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return {r['descricao'] for r in response.data['results'] if r['descricao'].startswith('Escopo ')}
+
+    def test_empresa_copiada_do_job(self):
+        for empresa in self.empresas:
+            nota = NotaFiscal.objects.get(job_origem__empresa=empresa)
+            self.assertEqual(nota.empresa_id, empresa.pk)
+            self.assertEqual(nota.lancamento.empresa_id, empresa.pk)
+
+    def test_contas_da_empresa_autenticada(self):
+        self.client.force_authenticate(user=self.principal)
+        self.assertEqual(self._descricoes(reverse('contas-a-pagar'), {'page_size': 200}), {'Escopo 0'})
+
+    def test_sem_empresa_autenticada_nao_lista_nada(self):
+        self.assertEqual(self._descricoes(reverse('contas-a-pagar'), {'page_size': 200}), set())
+        response = self.client.get(reverse('calendar-dia-detalhes'), {'data': self.dia.isoformat()})
+        self.assertEqual(response.data['detalhes'], [])
+        outra = NotaFiscal.objects.get(empresa=self.empresas[1])
+        response = self.client.get(reverse('notafiscal-detail', kwargs={'uuid': outra.uuid}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_calendario_dia_da_empresa_autenticada(self):
+        self.client.force_authenticate(user=self.principal)
+        response = self.client.get(reverse('calendar-dia-detalhes'), {'data': self.dia.isoformat()})
+        self.assertEqual([d['numero_nota'] for d in response.data['detalhes']], ['ESC-0'])
+
+    def test_criar_nota_exige_job_da_empresa_autenticada(self):
+        self.client.force_authenticate(user=self.principal)
+        dados = {
+            'numero': 'ESC-NOVA', 'data_emissao': date.today().isoformat(), 'valor_total': '5.00',
+            'parceiro_uuid': str(Parceiro.objects.get(cnpj='46.046.046/0001-46').uuid),
+        }
+        job_outra = JobProcessamento.objects.get(empresa=self.empresas[1])
+        response = self.client.post(reverse('notafiscal-list'), {**dados, 'job_origem': str(job_outra.uuid)})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('job_origem', response.data)
+        self.assertFalse(NotaFiscal.objects.filter(numero='ESC-NOVA').exists())
+
+        job = JobProcessamento.objects.get(empresa=self.empresas[0])
+        response = self.client.post(reverse('notafiscal-list'), {**dados, 'job_origem': str(job.uuid)})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(NotaFiscal.objects.get(numero='ESC-NOVA').empresa_id, self.empresas[0].pk)
+
+    def test_nota_de_outra_empresa_nao_encontrada(self):
+        self.client.force_authenticate(user=self.principal)
+        outra = NotaFiscal.objects.get(empresa=self.empresas[1])
+        response = self.client.get(reverse('notafiscal-detail', kwargs={'uuid': outra.uuid}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        propria = NotaFiscal.objects.get(empresa=self.empresas[0])
+        response = self.client.get(reverse('notafiscal-detail', kwargs={'uuid': propria.uuid}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class ParticionamentoTestCase(APITestCase):
+    """Conversão de movimento_lancamentos_financeiros em particionada por vencimento (desfeita no fim do teste)."""
+
+    TABELA = 'movimento_lancamentos_financeiros'
+
+    def setUp(self):
+        clf = lambda tipo, codigo: Classificador.objects.get_or_create(
+            tipo=tipo, codigo=codigo, defaults={'descricao': codigo}
+        )[0]
+        self.parceiro = Parceiro.objects.create(
+            nome='Fornecedor Partições', cnpj='47.047.047/0001-47', clf_tipo=clf('TIPO_PARCEIRO', 'FORNECEDOR')
+        )
+        self.job = JobProcessamento.objects.create(status=clf('STATUS_JOB', 'CONCLUIDO'))
+        self.tipo_pagar = clf('TIPO_LANCAMENTO', 'PAGAR')
+        self.pendente = clf('STATUS_LANCAMENTO', 'PENDENTE')
+        for vencimento in (date(1990, 1, 10), date(1990, 2, 10), date(1991, 3, 10)):
+            self._lancamento(vencimento)
+
+    def _lancamento(self, vencimento):
+        nota = NotaFiscal.objects.create(
+            job_origem=self.job, parceiro=self.parceiro, numero=f'PRT-{vencimento}',
+            data_emissao=vencimento, valor_total=Decimal('10.00'),
+        )
+        return LancamentoFinanceiro.objects.create(
+            nota_fiscal=nota, descricao=f'PRT {vencimento}', valor=Decimal('10.00'),
+            clf_tipo=self.tipo_pagar, clf_status=self.pendente, data_vencimento=vencimento,
+        )
+
+    def _particoes_lidas(self, desde, ate):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"EXPLAIN SELECT * FROM {self.TABELA} WHERE lcf_data_vencimento >= %s AND lcf_data_vencimento < %s",
+                [desde, ate],
+            )
+            plano = '\n'.join(row[0] for row in cursor.fetchall())
+        return set(re.findall(rf'{self.TABELA}_p\w+', plano))
+
+    def test_converter_podar_criar_e_desanexar(self):
+        resultado = particionamento.particionar(self.TABELA, 'lcf_data_vencimento', 'mes')
+
+        self.assertIn(f'{self.TABELA}_p1990_02', resultado['particoes'])
+        self.assertIn(f'{self.TABELA}_pkey', resultado['chaves_ampliadas'])
+        self.assertEqual(self._particoes_lidas(date(1990, 2, 1), date(1990, 3, 1)), {f'{self.TABELA}_p1990_02'})
+
+        # O ORM segue funcionando; um vencimento sem partição vai para a padrão até ela ser criada
+        novo = self._lancamento(date(1992, 5, 20))
+        self.assertTrue(LancamentoFinanceiro.objects.filter(pk=novo.pk, uuid=novo.uuid).exists())
+        self.assertEqual(
+            particionamento.criar_particoes(self.TABELA, 'mes', [date(1992, 5, 1)]), [f'{self.TABELA}_p1992_05']
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {self.TABELA}_p1992_05")
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+        desanexadas = particionamento.desanexar_particoes(self.TABELA, date(1991, 1, 1))
+        self.assertEqual(desanexadas, [f'{self.TABELA}_p1990_01', f'{self.TABELA}_p1990_02'])
+        self.assertEqual(LancamentoFinanceiro.objects.filter(descricao__startswith='PRT ').count(), 2)
+
+    def test_chave_de_negocio_continua_unica_entre_particoes(self):
+        # ntf_id (OneToOne com a nota) não ganha a data: segue valendo na tabela inteira
+        resultado = particionamento.particionar(self.TABELA, 'lcf_data_vencimento', 'mes')
+        self.assertNotIn(f'{self.TABELA}_ntf_id_key', resultado['chaves_ampliadas'])
+        self.assertEqual(resultado['chaves_globais'], [f'{self.TABELA}_ntf_id_key__global'])
+
+        lancamento = LancamentoFinanceiro.objects.filter(descricao__startswith='PRT ').earliest('data_vencimento')
+        outro_mes = dict(
+            nota_fiscal_id=lancamento.nota_fiscal_id, descricao='PRT duplicado', valor=Decimal('10.00'),
+            clf_tipo=self.tipo_pagar, clf_status=self.pendente,
+        )
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            LancamentoFinanceiro.objects.create(data_vencimento=date(1990, 2, 20), **outro_mes)
+        # Mudar de partição (e de valor da chave) libera a anterior
+        lancamento.data_vencimento = date(1991, 3, 20)
+        lancamento.save(update_fields=['data_vencimento'])
+        lancamento.delete()
+        LancamentoFinanceiro.objects.create(data_vencimento=date(1990, 2, 20), **outro_mes)
+
+        # Criar a partição move as linhas da padrão sem liberar as chaves delas
+        novo = self._lancamento(date(1992, 5, 20))
+        particionamento.criar_particoes(self.TABELA, 'mes', [date(1992, 5, 1)])
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            LancamentoFinanceiro.objects.create(
+                nota_fiscal_id=novo.nota_fiscal_id, descricao='PRT duplicado', valor=Decimal('10.00'),
+                clf_tipo=self.tipo_pagar, clf_status=self.pendente, data_vencimento=date(1990, 1, 20),
+            )
+
+    def test_ampliar_chaves_unicas_e_explicito(self):
+        resultado = particionamento.particionar(
+            self.TABELA, 'lcf_data_vencimento', 'mes', ampliar_chaves_unicas=True
+        )
+        self.assertIn(f'{self.TABELA}_ntf_id_key', resultado['chaves_ampliadas'])
+        self.assertEqual(resultado['chaves_globais'], [])
+
+    def test_notas_mantem_chave_de_acesso_e_numero_sem_chave(self):
+        tabela = 'movimento_notas_fiscais'
+        resultado = particionamento.particionar(tabela, 'ntf_data_emissao', remover_fks_de_entrada=True)
+        self.assertEqual(sorted(resultado['chaves_globais']), [
+            f'{tabela}_ntf_chave_acesso_key__global', 'uq_ntf_parceiro_numero_when_no_chave__global',
+        ])
+
+        nota = dict(job_origem=self.job, parceiro=self.parceiro, valor_total=Decimal('10.00'))
+        NotaFiscal.objects.create(numero='PRT-CHAVE-1', chave_acesso='4' * 44, data_emissao=date(1990, 1, 5), **nota)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            NotaFiscal.objects.create(
+                numero='PRT-CHAVE-2', chave_acesso='4' * 44, data_emissao=date(1991, 3, 5), **nota
+            )
+        # Sem chave de acesso, (parceiro, número) é único; com ela, não entra nessa chave
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            NotaFiscal.objects.create(numero='PRT-1990-01-10', data_emissao=date(1991, 3, 5), **nota)
+        NotaFiscal.objects.create(
+            numero='PRT-1990-01-10', chave_acesso='5' * 44, data_emissao=date(1991, 3, 5), **nota
+        )
+
+    def test_tabela_referenciada_exige_remover_fks(self):
+        with self.assertRaises(particionamento.ParticionamentoError):
+            particionamento.particionar('movimento_notas_fiscais', 'ntf_data_emissao')
@@ -1,17 +1,20 @@
 from rest_framework import generics, views, status
 from rest_framework.response import Response
-from django.db.models import Sum, Value, F, Q, DecimalField, IntegerField, Count
+from django.db.models import Sum, Value, F, Q, DecimalField, IntegerField
 from django.db.models.functions import Coalesce
-from .models import LancamentoFinanceiro
+from .models import LancamentoFinanceiro, ResumoDiario
 from .serializers import LancamentoFinanceiroSerializer
 from apps.classificadores.models import get_classifier
+from apps.core.pagination import VencimentoKeysetPagination
+from apps.core.tenancy import EmpresaScopedMixin, empresa_da_requisicao
 import logging
 from datetime import date
 
 logger = logging.getLogger(__name__)
 
-class ContasAPagarListView(generics.ListAPIView):
+class ContasAPagarListView(EmpresaScopedMixin, generics.ListAPIView):
     serializer_class = LancamentoFinanceiroSerializer
+    pagination_class = VencimentoKeysetPagination
 
     def get_queryset(self):
         tipo = get_classifier('TIPO_LANCAMENTO', 'PAGAR')
@@ -21,11 +24,11 @@ class ContasAPagarListView(generics.ListAPIView):
                 clf_tipo=tipo, clf_status=status
             )
             .select_related('nota_fiscal__parceiro')
-            .order_by('data_vencimento')
         )
 
-class ContasAReceberListView(generics.ListAPIView):
+class ContasAReceberListView(EmpresaScopedMixin, generics.ListAPIView):
     serializer_class = LancamentoFinanceiroSerializer
+    pagination_class = VencimentoKeysetPagination
 
     def get_queryset(self):
         tipo = get_classifier('TIPO_LANCAMENTO', 'RECEBER')
@@ -35,10 +38,16 @@ class ContasAReceberListView(generics.ListAPIView):
                 clf_tipo=tipo, clf_status=status
             )
             .select_related('nota_fiscal__parceiro')
-            .order_by('data_vencimento')
         )
 
 
+def intervalo_do_mes(ano: int, mes: int) -> tuple[date, date]:
+    """Primeiro dia do mês e primeiro dia do mês seguinte (intervalo semiaberto)."""
+    inicio = date(ano, mes, 1)
+    fim = date(ano + 1, 1, 1) if mes == 12 else date(ano, mes + 1, 1)
+    return inicio, fim
+
+
 class CalendarResumoView(views.APIView):
     """
     Retorna um resumo por dia do mês informado com:
@@ -58,30 +67,36 @@ class CalendarResumoView(views.APIView):
         except Exception:
             return Response({"detail": "Parâmetros inválidos"}, status=status.HTTP_400_BAD_REQUEST)
 
-        tipo_pagar = get_classifier('TIPO_LANCAMENTO', 'PAGAR')
-        tipo_receber = get_classifier('TIPO_LANCAMENTO', 'RECEBER')
-        status_pendente = get_classifier('STATUS_LANCAMENTO', 'PENDENTE')
+        try:
+            inicio, fim = intervalo_do_mes(ano, mes)
+        except ValueError:
+            return Response({"detail": "Parâmetros inválidos"}, status=status.HTTP_400_BAD_REQUEST)
 
-        qs_base = LancamentoFinanceiro.objects.filter(
-            data_vencimento__year=ano,
-            data_vencimento__month=mes,
-            clf_status=status_pendente,
+        # Lê o agregado diário (ResumoDiario, mantido por deltas) em vez de somar os lançamentos:
+        # no máximo empresas x 31 dias x 2 tipos x baldes linhas por mês. Intervalo semiaberto [inicio, fim).
+        # Um balde sozinho pode ficar zerado ou negativo: só a soma dos baldes de um dia vale
+        qs_base = ResumoDiario.objects.da_empresa(empresa_da_requisicao(request)).filter(
+            data__gte=inicio,
+            data__lt=fim,
         )
 
-        zero_dec = Value(0, output_field=DecimalField(max_digits=12, decimal_places=2))
-        agg = qs_base.values('data_vencimento').annotate(
-            total_pagar=Coalesce(Sum('valor', filter=Q(clf_tipo=tipo_pagar)), zero_dec),
-            total_receber=Coalesce(Sum('valor', filter=Q(clf_tipo=tipo_receber)), zero_dec),
-            qtde_pagar=Coalesce(Count('id', filter=Q(clf_tipo=tipo_pagar)), Value(0, output_field=IntegerField())),
-            qtde_receber=Coalesce(Count('id', filter=Q(clf_tipo=tipo_receber)), Value(0, output_field=IntegerField())),
-        ).order_by('data_vencimento')
+        zero_dec = Value(0, output_field=DecimalField(max_digits=14, decimal_places=2))
+        zero_int = Value(0, output_field=IntegerField())
+        e_pagar = Q(clf_tipo__codigo='PAGAR')
+        e_receber = Q(clf_tipo__codigo='RECEBER')
+        agg = qs_base.values('data').annotate(
+            total_pagar=Coalesce(Sum('valor_pendente', filter=e_pagar), zero_dec),
+            total_receber=Coalesce(Sum('valor_pendente', filter=e_receber), zero_dec),
+            qtde_pagar=Coalesce(Sum('qtde_pendente', filter=e_pagar), zero_int),
+            qtde_receber=Coalesce(Sum('qtde_pendente', filter=e_receber), zero_int),
+        ).filter(Q(qtde_pagar__gt=0) | Q(qtde_receber__gt=0)).order_by('data')
 
         resultados = []
         for row in agg:
             pagar = float(row['total_pagar']) if row['total_pagar'] is not None else 0.0
             receber = float(row['total_receber']) if row['total_receber'] is not None else 0.0
             payload: dict = {
-                'data': row['data_vencimento'].isoformat(),
+                'data': row['data'].isoformat(),
             }
             if pagar and not receber:
                 payload['valor_pagar'] = pagar
@@ -128,28 +143,23 @@ class CalendarDiaDetalhesView(views.APIView):
 
         try:
             ano, mes, dia = map(int, data_param.split('-'))
+            data_dia = date(ano, mes, dia)
         except Exception:
             return Response({"detail": "Formato de data inválido. Use YYYY-MM-DD"}, status=status.HTTP_400_BAD_REQUEST)
 
-        tipo_pagar = get_classifier('TIPO_LANCAMENTO', 'PAGAR')
-        tipo_receber = get_classifier('TIPO_LANCAMENTO', 'RECEBER')
-        status_pendente = get_classifier('STATUS_LANCAMENTO', 'PENDENTE')
-
         qs = (
-            LancamentoFinanceiro.objects.filter(
-                data_vencimento__year=ano,
-                data_vencimento__month=mes,
-                data_vencimento__day=dia,
-                clf_status=status_pendente,
+            LancamentoFinanceiro.objects.da_empresa(empresa_da_requisicao(request)).filter(
+                data_vencimento=data_dia,
+                clf_status__codigo='PENDENTE',
             )
             .select_related('nota_fiscal__parceiro', 'clf_tipo')
-            .order_by('data_vencimento', 'nota_fiscal__parceiro__nome')
+            .order_by('nota_fiscal__parceiro__nome')
         )
 
         detalhes = []
         for lanc in qs:
             parceiro = lanc.nota_fiscal.parceiro
-            tipo = 'PAGAR' if lanc.clf_tipo_id == tipo_pagar.id else ('RECEBER' if lanc.clf_tipo_id == tipo_receber.id else None)
+            tipo = lanc.clf_tipo.codigo if lanc.clf_tipo.codigo in ('PAGAR', 'RECEBER') else None
             detalhes.append({
                 'nome_fantasia': parceiro.nome,
                 'cnpj': parceiro.cnpj,
@@ -2,6 +2,7 @@ import logging
 from abc import ABC, abstractmethod
 from enum import Enum
 from apps.notas.extractors import InvoiceData
+from apps.core.timing import stage
 
 logger = logging.getLogger(__name__)
 
@@ -56,7 +57,8 @@ class NotaFiscalExtractionService:
 
     def extract_data_from_job(self, job) -> InvoiceData:
         filename = job.arquivo_original.name
-        file_content = job.arquivo_original.read()
+        with stage('leitura_arquivo'):
+            file_content = job.arquivo_original.read()
 
         logger.info(f"Iniciando extração usando método: {ACTIVE_EXTRACTION_METHOD.value}")
 
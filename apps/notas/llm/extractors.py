@@ -6,6 +6,8 @@ import io
 from typing import List, Tuple, Optional
 from pathlib import Path
 
+from apps.core.timing import stage
+
 try:
     from pypdf import PdfReader
 except ImportError:
@@ -91,14 +93,15 @@ class PDFProcessor:
                 "Requer também poppler-utils no sistema."
             )
         
-        images = convert_from_bytes(pdf_bytes, dpi=dpi)
-        
-        image_bytes_list = []
-        for img in images:
-            buf = io.BytesIO()
-            img.save(buf, format=fmt, quality=85 if fmt == 'JPEG' else None)
-            buf.seek(0)
-            image_bytes_list.append(buf.read())
+        with stage('rasterizacao'):
+            images = convert_from_bytes(pdf_bytes, dpi=dpi)
+            
+            image_bytes_list = []
+            for img in images:
+                buf = io.BytesIO()
+                img.save(buf, format=fmt, quality=85 if fmt == 'JPEG' else None)
+                buf.seek(0)
+                image_bytes_list.append(buf.read())
         
         return image_bytes_list
     
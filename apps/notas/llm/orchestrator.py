@@ -6,6 +6,8 @@ import logging
 from typing import List, Tuple, Optional, Union
 from dataclasses import dataclass
 
+from apps.core.timing import stage
+
 from .base import BaseLLMProvider
 from .config import (
     MAX_PDF_PAGES_PER_BATCH,
@@ -113,7 +115,8 @@ class DocumentProcessor:
             
             # Etapa 2: Classificação
             logger.debug(f"LLM: Iniciando classificação para {filename}")
-            classificacao = self.classifier.classify(text=text, images=images)
+            with stage('llm_classificacao'):
+                classificacao = self.classifier.classify(text=text, images=images)
             logger.info(
                 f"LLM: Documento {filename} classificado como {classificacao.tipo} "
                 f"(confiança: {classificacao.confianca:.2f})"
@@ -145,11 +148,12 @@ class DocumentProcessor:
             
             # Etapa 3: Extração especializada
             logger.debug(f"LLM: Iniciando extração especializada para {filename} (tipo: {classificacao.tipo})")
-            dados_extraidos = self.extractor_factory.extract(
-                tipo=classificacao.tipo,
-                text=text,
-                images=images
-            )
+            with stage('llm_extracao'):
+                dados_extraidos = self.extractor_factory.extract(
+                    tipo=classificacao.tipo,
+                    text=text,
+                    images=images
+                )
             
             # Validação: Verificar se dados foram extraídos
             if not dados_extraidos:
@@ -173,7 +177,8 @@ class DocumentProcessor:
             validacao = None
             if self.validate_results:
                 logger.debug(f"LLM: Iniciando validação para {filename}")
-                validacao = self.validator.validate(dados_extraidos)
+                with stage('validacao'):
+                    validacao = self.validator.validate(dados_extraidos)
                 logger.info(
                     f"LLM: Validação para {filename}: {'OK' if validacao.valido else 'FALHOU'} "
                     f"(score: {validacao.score_qualidade:.2f})"
@@ -331,7 +336,8 @@ class DocumentProcessor:
         try:
             # Classifica se tipo não conhecido
             if tipo_conhecido is None:
-                classificacao = self.classifier.classify(images=images)
+                with stage('llm_classificacao'):
+                    classificacao = self.classifier.classify(images=images)
                 tipo_documento = classificacao.tipo
             else:
                 tipo_documento = tipo_conhecido
@@ -355,10 +361,11 @@ class DocumentProcessor:
                 )
             
             # Extrai
-            dados = self.extractor_factory.extract(
-                tipo=tipo_documento,
-                images=images
-            )
+            with stage('llm_extracao'):
+                dados = self.extractor_factory.extract(
+                    tipo=tipo_documento,
+                    images=images
+                )
             
             # Validação: Verificar se dados foram extraídos
             if not dados:
@@ -379,7 +386,8 @@ class DocumentProcessor:
             # Valida
             validacao = None
             if self.validate_results:
-                validacao = self.validator.validate(dados)
+                with stage('validacao'):
+                    validacao = self.validator.validate(dados)
             
             return ProcessingResult(
                 success=True,
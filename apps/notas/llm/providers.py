@@ -4,6 +4,7 @@ Implementa interface BaseLLMProvider usando Google Generative AI.
 """
 import json
 import base64
+import time
 from typing import List, Optional
 from pydantic import BaseModel
 
@@ -13,6 +14,7 @@ try:
 except ImportError:
     genai = None
 
+from apps.core.metrics import LLM_REQUEST_DURATION, LLM_TOKENS
 from .base import BaseLLMProvider, LLMMessage, LLMResponse
 from .config import (
     GEMINI_API_KEY,
@@ -83,16 +85,28 @@ class GeminiProvider(BaseLLMProvider):
             candidate_count=1,
         )
         
-        response = model.generate_content(
-            gemini_parts,
-            generation_config=generation_config,
-        )
+        inicio = time.perf_counter()
+        status = 'error'
+        try:
+            response = model.generate_content(
+                gemini_parts,
+                generation_config=generation_config,
+            )
+            status = 'ok'
+        finally:
+            LLM_REQUEST_DURATION.labels(
+                provider='gemini', model=self.model_name, status=status,
+            ).observe(time.perf_counter() - inicio)
+        
+        tokens_used = response.usage_metadata.total_token_count if hasattr(response, 'usage_metadata') else None
+        if tokens_used:
+            LLM_TOKENS.labels(provider='gemini', model=self.model_name).inc(tokens_used)
         
         return LLMResponse(
             content=response.text,
             raw_response=response,
             model=self.model_name,
-            tokens_used=response.usage_metadata.total_token_count if hasattr(response, 'usage_metadata') else None,
+            tokens_used=tokens_used,
         )
     
     def generate_with_schema(
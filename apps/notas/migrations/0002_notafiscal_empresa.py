@@ -0,0 +1,31 @@
+# Generated by Django 4.2 on 2026-10-19 21:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empresa', '0002_remove_empresanaoclassificada_id_and_more'),
+        ('processamento', '0006_jobprocessamento_idx_status_id'),
+        ('notas', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notafiscal',
+            name='empresa',
+            field=models.ForeignKey(blank=True, db_column='emp_cnpj_numero', db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='notas_fiscais', to='empresa.minhaempresa'),
+        ),
+        # Notas existentes herdam a empresa do job de origem
+        migrations.RunSQL(
+            sql="""
+                UPDATE movimento_notas_fiscais n
+                SET emp_cnpj_numero = j.emp_cnpj_numero
+                FROM movimento_jobs_processamento j
+                WHERE j.jbp_id = n.jbp_id AND j.emp_cnpj_numero IS NOT NULL
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
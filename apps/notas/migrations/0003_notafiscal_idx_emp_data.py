@@ -0,0 +1,20 @@
+# Generated by Django 4.2 on 2026-10-19 21:05
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY não roda dentro de transação; não bloqueia escritas
+    atomic = False
+
+    dependencies = [
+        ('notas', '0002_notafiscal_empresa'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='notafiscal',
+            index=models.Index(fields=['empresa', 'data_emissao'], name='idx_ntf_emp_data'),
+        ),
+    ]
@@ -1,12 +1,15 @@
 import uuid
 from django.db import models
 from django.db.models import Q
+from apps.core.tenancy import EmpresaQuerySet
 
 
 class NotaFiscal(models.Model):
     id = models.BigAutoField(primary_key=True, db_column='ntf_id')
     uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True, db_column='ntf_uuid')
     job_origem = models.ForeignKey('processamento.JobProcessamento', on_delete=models.PROTECT, db_column='jbp_id')
+    # Cópia da empresa do job (ver save); sem índice próprio: é prefixo de idx_ntf_emp_data
+    empresa = models.ForeignKey('empresa.MinhaEmpresa', on_delete=models.PROTECT, null=True, blank=True, related_name='notas_fiscais', db_column='emp_cnpj_numero', db_index=False)
     parceiro = models.ForeignKey('parceiros.Parceiro', on_delete=models.PROTECT, related_name='notas_fiscais', db_column='pcr_id')
     # Para NF-e, quando disponível, ajuda na idempotência e consultas
     chave_acesso = models.CharField(max_length=44, unique=True, null=True, blank=True, db_column='ntf_chave_acesso')
@@ -14,9 +17,13 @@ class NotaFiscal(models.Model):
     data_emissao = models.DateField(db_column='ntf_data_emissao')
     valor_total = models.DecimalField(max_digits=12, decimal_places=2, db_column='ntf_valor_total')
 
+    objects = EmpresaQuerySet.as_manager()
+
     class Meta:
         db_table = 'movimento_notas_fiscais'
         indexes = [
+            # Notas da empresa por data de emissão (dashboard)
+            models.Index(fields=['empresa', 'data_emissao'], name='idx_ntf_emp_data'),
             models.Index(fields=['parceiro', 'data_emissao'], name='idx_ntf_parc_data'),
             models.Index(fields=['parceiro', 'numero'], name='idx_ntf_parc_num'),
         ]
@@ -29,6 +36,11 @@ class NotaFiscal(models.Model):
             )
         ]
 
+    def save(self, *args, **kwargs):
+        if self._state.adding and self.empresa_id is None and self.job_origem_id is not None:
+            self.empresa_id = self.job_origem.empresa_id
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"NF {self.numero} - {self.parceiro.nome}"
 
@@ -1,6 +1,7 @@
 import logging
 from django.db import transaction
 from apps.core.observers import Subject
+from apps.core.timing import stage
 from apps.financeiro.models import LancamentoFinanceiro
 from apps.financeiro.strategies import TipoLancamentoContext
 from apps.parceiros.repositories import ParceiroRepository
@@ -9,7 +10,7 @@ from apps.empresa.repositories import EmpresaRepository
 from .extraction_service import NotaFiscalExtractionService
 from .persistence_service import NotaFiscalPersistenceService
 from .validators import NotaFiscalValidator
-from apps.financeiro.observers import AlertaVencimentoObserver
+from apps.financeiro.observers import AlertaVencimentoObserver, ResumoDiarioObserver
 from apps.dashboard.observers import MetricasFinanceirasObserver
 from apps.parceiros.observers import ValidacaoCNPJObserver
 from apps.notifications.observers import PushStoreObserver
@@ -28,6 +29,7 @@ class NotaFiscalService(Subject):
 
     def _register_observers(self):
         self.attach(AlertaVencimentoObserver())
+        self.attach(ResumoDiarioObserver())
         self.attach(MetricasFinanceirasObserver())
         self.attach(ValidacaoCNPJObserver())
         try:
@@ -40,7 +42,8 @@ class NotaFiscalService(Subject):
 
         # 1. Extração de dados
         logger.debug(f"ORCHESTRATOR: Iniciando extração de dados do job {job.id}")
-        dados_extraidos = self.extraction_service.extract_data_from_job(job)
+        with stage('extracao'):
+            dados_extraidos = self.extraction_service.extract_data_from_job(job)
         logger.info(f"ORCHESTRATOR: Extração concluída - Tipo: {type(dados_extraidos)}")
 
         # Validação: verificar se dados foram extraídos
@@ -51,11 +54,61 @@ class NotaFiscalService(Subject):
         logger.debug(f"ORCHESTRATOR: Dados extraídos: numero={dados_extraidos.numero}, valor={dados_extraidos.valor_total}, remetente_cnpj={dados_extraidos.remetente_cnpj}, destinatario_cnpj={dados_extraidos.destinatario_cnpj}")
 
         # 2. Se empresa não foi informada, tentar identificar ou criar
+        with stage('resolucao_empresa'):
+            empresa = self._resolver_empresa(job, dados_extraidos)
+
+        # Usar transação apenas para as operações críticas
+        logger.debug(f"ORCHESTRATOR: Iniciando transação para operações críticas")
+        with transaction.atomic():
+            # 3. Validação
+            logger.debug(f"ORCHESTRATOR: Iniciando validação CNPJ")
+            with stage('validacao'):
+                self.validator.validate_cnpj_match(dados_extraidos, job.empresa or empresa)
+            logger.info(f"ORCHESTRATOR: Validação CNPJ concluída")
+
+            # 4. Determinar tipo de lançamento e dados do parceiro
+            logger.debug(f"ORCHESTRATOR: Determinando tipo de lançamento e parceiro")
+            resultado_strategy = self.tipo_lancamento_context.determinar_tipo_e_parceiro(
+                dados_extraidos, job.empresa or empresa
+            )
+            logger.info(f"ORCHESTRATOR: Tipo de lançamento determinado: {resultado_strategy.get('tipo_lancamento')}")
+
+            # 5. Criar ou atualizar parceiro
+            logger.debug(f"ORCHESTRATOR: Criando/atualizando parceiro")
+            with stage('upsert_parceiro'):
+                parceiro = self.parceiro_repository.upsert(
+                    **resultado_strategy['parceiro_data']
+                )
+            logger.info(f"ORCHESTRATOR: Parceiro criado/atualizado: {parceiro}")
+            with stage('observers'):
+                self.notify('parceiro_created_or_updated', parceiro=parceiro)
+
+            # 6. Persistir nota fiscal e lançamento financeiro
+            logger.debug(f"ORCHESTRATOR: Iniciando persistência da nota fiscal e lançamento")
+            with stage('persistencia'):
+                lancamento = self.persistence_service.persist_nota_e_lancamento(
+                    job=job,
+                    dados_extraidos=dados_extraidos,
+                    parceiro=parceiro,
+                    tipo_lancamento=resultado_strategy['tipo_lancamento'],
+                )
+            logger.info(f"ORCHESTRATOR: Nota fiscal e lançamento persistidos - Lançamento ID: {lancamento.id}")
+
+            # 7. Notificar observers sobre o novo lançamento
+            logger.debug(f"ORCHESTRATOR: Notificando observers sobre novo lançamento")
+            with stage('observers'):
+                self.notify('lancamento_created', lancamento=lancamento)
+            logger.info(f"ORCHESTRATOR: Observers notificados - processamento concluído com sucesso")
+
+            return lancamento
+
+    def _resolver_empresa(self, job, dados_extraidos):
+        """Identifica a empresa do job pelos CNPJs extraídos (ou cria como não classificada)."""
         empresa = None
         if job.empresa is None:
             logger.info(f"ORCHESTRATOR: Empresa não informada no job {job.id} - tentando identificar automaticamente")
             from apps.empresa.models import MinhaEmpresa, EmpresaNaoClassificada
-            from apps.processamento.services import cnpj_para_numero
+            from apps.core.cnpj import cnpj_para_numero
 
             cnpj_encontrado = dados_extraidos.destinatario_cnpj or dados_extraidos.remetente_cnpj
             logger.debug(f"ORCHESTRATOR: CNPJ encontrado nos dados: {cnpj_encontrado}")
@@ -66,7 +119,9 @@ class NotaFiscalService(Subject):
                 if cnpj_numero:
                     # Primeiro tenta encontrar na MinhaEmpresa
                     try:
-                        empresa = MinhaEmpresa.get_by_cnpj(cnpj_numero)
+                        empresa = EmpresaRepository.find_minha_empresa_by_cnpj(cnpj_numero)
+                        if empresa is None:
+                            raise MinhaEmpresa.DoesNotExist()
                         logger.info(f"ORCHESTRATOR: Empresa encontrada em MinhaEmpresa: {empresa} (CNPJ: {empresa.cnpj})")
                     except MinhaEmpresa.DoesNotExist:
                         logger.debug(f"ORCHESTRATOR: Empresa não encontrada em MinhaEmpresa - verificando empresas não classificadas")
@@ -109,42 +164,4 @@ class NotaFiscalService(Subject):
                 logger.warning("ORCHESTRATOR: Nenhuma empresa MinhaEmpresa encontrada para o CNPJ. Empresa criada como não classificada - usuário deve classificar posteriormente.")
                 # Não lança erro - permite processamento continuar sem empresa associada
 
-        # Usar transação apenas para as operações críticas
-        logger.debug(f"ORCHESTRATOR: Iniciando transação para operações críticas")
-        with transaction.atomic():
-            # 3. Validação
-            logger.debug(f"ORCHESTRATOR: Iniciando validação CNPJ")
-            self.validator.validate_cnpj_match(dados_extraidos, job.empresa or empresa)
-            logger.info(f"ORCHESTRATOR: Validação CNPJ concluída")
-
-            # 4. Determinar tipo de lançamento e dados do parceiro
-            logger.debug(f"ORCHESTRATOR: Determinando tipo de lançamento e parceiro")
-            resultado_strategy = self.tipo_lancamento_context.determinar_tipo_e_parceiro(
-                dados_extraidos, job.empresa or empresa
-            )
-            logger.info(f"ORCHESTRATOR: Tipo de lançamento determinado: {resultado_strategy.get('tipo_lancamento')}")
-
-            # 5. Criar ou atualizar parceiro
-            logger.debug(f"ORCHESTRATOR: Criando/atualizando parceiro")
-            parceiro = self.parceiro_repository.get_or_create(
-                **resultado_strategy['parceiro_data']
-            )
-            logger.info(f"ORCHESTRATOR: Parceiro criado/atualizado: {parceiro}")
-            self.notify('parceiro_created_or_updated', parceiro=parceiro)
-
-            # 6. Persistir nota fiscal e lançamento financeiro
-            logger.debug(f"ORCHESTRATOR: Iniciando persistência da nota fiscal e lançamento")
-            lancamento = self.persistence_service.persist_nota_e_lancamento(
-                job=job,
-                dados_extraidos=dados_extraidos,
-                parceiro=parceiro,
-                tipo_lancamento=resultado_strategy['tipo_lancamento'],
-            )
-            logger.info(f"ORCHESTRATOR: Nota fiscal e lançamento persistidos - Lançamento ID: {lancamento.id}")
-
-            # 7. Notificar observers sobre o novo lançamento
-            logger.debug(f"ORCHESTRATOR: Notificando observers sobre novo lançamento")
-            self.notify('lancamento_created', lancamento=lancamento)
-            logger.info(f"ORCHESTRATOR: Observers notificados - processamento concluído com sucesso")
-
-            return lancamento
\ No newline at end of file
+        return empresa
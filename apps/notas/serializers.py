@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from .models import NotaFiscal
+from apps.core.tenancy import EmpresaScopedSlugRelatedField
 from apps.parceiros.models import Parceiro
+from apps.processamento.models import JobProcessamento
 
 
 class ParceiroResumoSerializer(serializers.ModelSerializer):
@@ -12,8 +14,27 @@ class ParceiroResumoSerializer(serializers.ModelSerializer):
 class NotaFiscalSerializer(serializers.ModelSerializer):
     # Expor apenas uuid (do not expose internal integer id) e dados do parceiro resumidos
     parceiro = ParceiroResumoSerializer(read_only=True)
+    # Escrita por uuid; o job precisa ser da empresa autenticada (a nota herda a empresa dele)
+    job_origem = EmpresaScopedSlugRelatedField(
+        slug_field='uuid', queryset=JobProcessamento.objects.all(), write_only=True, required=False,
+    )
+    parceiro_uuid = serializers.SlugRelatedField(
+        source='parceiro', slug_field='uuid', queryset=Parceiro.objects.all(), write_only=True, required=False,
+    )
 
     class Meta:
         model = NotaFiscal
         # explicit fields: do not send internal DB id
-        fields = ('uuid', 'numero', 'data_emissao', 'valor_total', 'parceiro', 'chave_acesso')
\ No newline at end of file
+        fields = ('uuid', 'numero', 'data_emissao', 'valor_total', 'parceiro', 'chave_acesso', 'job_origem', 'parceiro_uuid')
+
+    def validate(self, attrs):
+        # Obrigatórios só na criação: PUT/PATCH mantêm o job e o parceiro atuais
+        if self.instance is None:
+            erros = {}
+            if 'job_origem' not in attrs:
+                erros['job_origem'] = 'Este campo é obrigatório.'
+            if 'parceiro' not in attrs:
+                erros['parceiro_uuid'] = 'Este campo é obrigatório.'
+            if erros:
+                raise serializers.ValidationError(erros)
+        return attrs
@@ -1,14 +1,26 @@
+from django.db import transaction
 from rest_framework import viewsets, status
 from rest_framework.response import Response
+from apps.financeiro.models import LancamentoFinanceiro
+from apps.core.tenancy import EmpresaScopedMixin
+from apps.financeiro.services import LancamentoFinanceiroService
 from .models import NotaFiscal
 from .serializers import NotaFiscalSerializer
 
-class NotaFiscalViewSet(viewsets.ModelViewSet):
-    queryset = NotaFiscal.objects.all()
+class NotaFiscalViewSet(EmpresaScopedMixin, viewsets.ModelViewSet):
+    queryset = NotaFiscal.objects.select_related('parceiro')
     serializer_class = NotaFiscalSerializer
     lookup_field = 'uuid'
 
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
         self.perform_destroy(instance)
-        return Response(status=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def perform_destroy(self, instance):
+        # O lançamento cai junto (CASCADE): tira-o do ResumoDiario antes, na mesma transação
+        with transaction.atomic():
+            lancamento = LancamentoFinanceiro.objects.filter(nota_fiscal=instance).first()
+            if lancamento is not None:
+                LancamentoFinanceiroService().notificar_remocao(lancamento)
+            instance.delete()
@@ -0,0 +1,129 @@
+import asyncio
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.core.benchmark import consultas_executadas, elevar_limite_de_arquivos, rss_maximo_mb, servidor_asgi
+from apps.core.pubsub import PubSub, notificar, pubsub
+from apps.notifications.models import CANAL_NOTIFICACOES, Device, Notification
+
+PREFIXO = 'bench-longpoll-'
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede o tempo para acordar N assinaturas do pub/sub em memória; depois abre N clientes ociosos "
+        "em GET /api/notifications/pending/wait/ contra um servidor ASGI (uvicorn) no próprio processo, "
+        "conta as consultas ao banco durante a espera e mede a latência até todos acordarem com um "
+        "pg_notify real. Cria e remove usuários/dispositivos "
+        f"'{PREFIXO}*': use apenas em banco de desenvolvimento."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clientes', type=int, default=5000, help='Conexões de long-poll simultâneas')
+        parser.add_argument('--usuarios', type=int, default=500, help='Usuários distintos entre os clientes')
+        parser.add_argument('--ocioso', type=float, default=10, help='Segundos com todos os clientes esperando')
+        parser.add_argument('--intervalo-polling', type=float, default=5,
+                            help='Intervalo do polling atual, para a estimativa comparativa')
+        parser.add_argument('--porta', type=int, default=8765)
+
+    def handle(self, *args, **options):
+        asyncio.run(self._medir_pubsub(options['clientes']))
+        elevar_limite_de_arquivos(options['clientes'])
+        usuarios = self._criar_dispositivos(options['usuarios'])
+        try:
+            with servidor_asgi(options['porta'], options['clientes']):
+                asyncio.run(self._medir(usuarios, options))
+        finally:
+            User.objects.filter(username__startswith=PREFIXO).delete()
+
+    def _criar_dispositivos(self, n: int):
+        User.objects.filter(username__startswith=PREFIXO).delete()
+        with transaction.atomic():
+            usuarios = User.objects.bulk_create([User(username=f'{PREFIXO}{i}') for i in range(n)])
+            Device.objects.bulk_create([
+                Device(token=f'{PREFIXO}{u.pk}', platform='android', user=u) for u in usuarios
+            ])
+        return [u.pk for u in usuarios]
+
+    async def _medir_pubsub(self, n: int):
+        """N esperas ociosas acordadas por publicações vindas de outra thread (como o listener)."""
+        memoria = PubSub()
+        assinaturas = [memoria.assinar('benchmark', i) for i in range(n)]
+        esperas = [asyncio.ensure_future(a.aguardar(60)) for a in assinaturas]
+        await asyncio.sleep(0.05)
+
+        inicio = time.perf_counter()
+        threading.Thread(target=lambda: [memoria.publicar('benchmark', i, 'x') for i in range(n)]).start()
+        acordadas = sum(1 for r in await asyncio.gather(*esperas) if r == 'x')
+        duracao_ms = (time.perf_counter() - inicio) * 1000
+
+        for a in assinaturas:
+            memoria.cancelar(a)
+        self.stdout.write(f"pub/sub em memória: {acordadas}/{n} assinaturas acordadas em {duracao_ms:.1f} ms")
+
+    async def _medir(self, usuarios, options):
+        clientes, porta, ocioso = options['clientes'], options['porta'], options['ocioso']
+
+        inicio = time.perf_counter()
+        conexoes = await asyncio.gather(*(
+            self._abrir(porta, usuarios[i % len(usuarios)], timeout=ocioso + 30) for i in range(clientes)
+        ))
+        while pubsub.assinantes(CANAL_NOTIFICACOES) < clientes:
+            await asyncio.sleep(0.05)
+        self.stdout.write(f"{clientes} clientes esperando após {time.perf_counter() - inicio:.1f}s")
+        antes = await asyncio.to_thread(consultas_executadas)
+        await asyncio.sleep(ocioso)
+        consultas = await asyncio.to_thread(consultas_executadas) - antes
+        polling = clientes * (ocioso / options['intervalo_polling']) * 2
+        self.stdout.write(
+            f"{ocioso:.0f}s ociosos: {consultas} consultas ao banco "
+            f"(polling a cada {options['intervalo_polling']:.0f}s faria ~{polling:.0f})"
+        )
+
+        respostas = [asyncio.ensure_future(self._resposta(leitor, escritor)) for leitor, escritor in conexoes]
+        inicio = time.perf_counter()
+        await asyncio.to_thread(self._notificar, usuarios)
+        latencias = sorted(await asyncio.gather(*(self._latencia(r, inicio) for r in respostas)))
+        acordados = sum(1 for r in respostas if b'"title"' in r.result())
+
+        self.stdout.write(
+            f"pg_notify -> {acordados}/{clientes} respostas com notificação: "
+            f"p50 {latencias[len(latencias) // 2] * 1000:.0f} ms, "
+            f"p99 {latencias[int(len(latencias) * 0.99) - 1] * 1000:.0f} ms, "
+            f"máx {latencias[-1] * 1000:.0f} ms"
+        )
+        rss_mb = rss_maximo_mb()
+        self.stdout.write(self.style.SUCCESS(
+            f"RSS máximo do processo (servidor + clientes): {rss_mb:.0f} MB "
+            f"(~{rss_mb * 1024 / clientes:.1f} KB por cliente)"
+        ))
+
+    async def _abrir(self, porta: int, user_id: int, timeout: float):
+        leitor, escritor = await asyncio.open_connection('127.0.0.1', porta)
+        escritor.write(
+            f"GET /api/notifications/pending/wait/?timeout={timeout:.0f} HTTP/1.1\r\n"
+            f"Host: localhost\r\nX-Device-Token: {PREFIXO}{user_id}\r\nConnection: close\r\n\r\n".encode()
+        )
+        await escritor.drain()
+        return leitor, escritor
+
+    async def _resposta(self, leitor, escritor) -> bytes:
+        try:
+            return await leitor.read()
+        finally:
+            escritor.close()
+
+    async def _latencia(self, resposta, inicio: float) -> float:
+        await resposta
+        return time.perf_counter() - inicio
+
+    def _notificar(self, usuarios):
+        with transaction.atomic():
+            Notification.objects.bulk_create([
+                Notification(user_id=u, title='Benchmark', body='long-poll') for u in usuarios
+            ])
+            notificar(CANAL_NOTIFICACOES, usuarios)
@@ -0,0 +1,108 @@
+import time
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.classificadores.models import Classificador
+from apps.core.queries import record_queries
+from apps.empresa.models import MinhaEmpresa
+from apps.financeiro.models import LancamentoFinanceiro
+from apps.notas.models import NotaFiscal
+from apps.notifications import push
+from apps.notifications.models import Device
+from apps.notifications.observers import PushStoreObserver
+from apps.notifications.push_stub import iniciar
+from apps.notifications.tasks import send_push_to_tokens
+from apps.parceiros.models import Parceiro
+from apps.processamento.models import JobProcessamento
+
+PREFIXO = 'bench-push-'
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede a vazão do envio de push (ExpoPushClient) contra o stub local "
+        "(ou contra EXPO_PUSH_URL com --sem-stub) e, com --fanout N, o fan-out de um lançamento "
+        "(PushStoreObserver) para uma empresa com N dispositivos. Não grava nada no banco: "
+        "o fan-out roda numa transação desfeita ao final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tokens', type=int, default=10_000, help='Quantidade de tokens enviados')
+        parser.add_argument('--latencia-ms', type=int, default=20, help='Latência simulada pelo stub por requisição')
+        parser.add_argument('--invalidos', type=float, default=0.05, help='Fração de tokens inválidos')
+        parser.add_argument('--sem-stub', action='store_true', help='Usa EXPO_PUSH_URL configurada')
+        parser.add_argument('--fanout', type=int, default=0, metavar='DISPOSITIVOS',
+                            help='Dispositivos da empresa no fan-out (0 = não mede)')
+
+    def handle(self, *args, **options):
+        n = options['tokens']
+        a_cada = int(1 / options['invalidos']) if options['invalidos'] else 0
+        tokens = [
+            f"ExponentPushToken[{'invalid' if a_cada and i % a_cada == 0 else 'bench'}-{i}]" for i in range(n)
+        ]
+        payload = {'title': 'Benchmark', 'body': 'Push de teste', 'data': {}}
+
+        servidor = None if options['sem_stub'] else iniciar(latencia_ms=options['latencia_ms'])
+        client = push.ExpoPushClient(url=servidor.push_url if servidor else None)
+
+        inicio = time.perf_counter()
+        resultado = client.enviar(tokens, payload)
+        duracao = time.perf_counter() - inicio
+
+        self.stdout.write(
+            f"{n} tokens em {duracao:.2f}s ({n / duracao:.0f} tokens/s): "
+            f"{resultado.enviados} enviados, {len(resultado.invalidos)} inválidos, {len(resultado.falhas)} com falha"
+        )
+        if servidor is not None:
+            self.stdout.write(f"stub: {servidor.requisicoes} requisições HTTP")
+            servidor.shutdown()
+
+        if options['fanout']:
+            self._medir_fanout(options['fanout'])
+
+    def _medir_fanout(self, n: int):
+        with transaction.atomic():
+            lancamento = self._criar_empresa(n)
+            # Só o fan-out: os lotes são contados, não enfileirados (o envio é medido acima)
+            with mock.patch.object(send_push_to_tokens, 'delay') as delay, record_queries() as rec:
+                inicio = time.perf_counter()
+                PushStoreObserver().update_batch([(None, 'lancamento_created', {'lancamento': lancamento})])
+                duracao_ms = (time.perf_counter() - inicio) * 1000
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"fan-out para {n} dispositivos em {duracao_ms:.1f} ms: {rec.count} consultas, "
+            f"{delay.call_count} lotes de push enfileirados"
+        ))
+
+    def _criar_empresa(self, n: int) -> LancamentoFinanceiro:
+        clf = lambda tipo, codigo: Classificador.objects.get_or_create(
+            tipo=tipo, codigo=codigo, defaults={'descricao': codigo}
+        )[0]
+        empresa = MinhaEmpresa.objects.create(
+            cnpj_numero=99888777000100, cnpj='99.888.777/0001-00', nome='Benchmark Push'
+        )
+        usuarios = User.objects.bulk_create([User(username=f'{PREFIXO}{i}') for i in range(n)])
+        Device.objects.bulk_create([
+            Device(token=f'ExponentPushToken[{PREFIXO}{i}]', platform='android', empresa=empresa, user=u)
+            for i, u in enumerate(usuarios)
+        ])
+        job = JobProcessamento.objects.create(empresa=empresa, status=clf('STATUS_JOB', 'CONCLUIDO'))
+        parceiro = Parceiro.objects.create(
+            nome='Fornecedor Benchmark Push', cnpj='99.888.777/0002-91', clf_tipo=clf('TIPO_PARCEIRO', 'FORNECEDOR')
+        )
+        nota = NotaFiscal.objects.create(
+            job_origem=job, parceiro=parceiro, numero='NF-BENCH-PUSH',
+            data_emissao=date.today(), valor_total=Decimal('99.90'),
+        )
+        # Recarregado sem relações em cache, como chega ao observer pelo EventBus
+        return LancamentoFinanceiro.objects.get(pk=LancamentoFinanceiro.objects.create(
+            nota_fiscal=nota, descricao='Benchmark push', valor=Decimal('99.90'),
+            clf_tipo=clf('TIPO_LANCAMENTO', 'PAGAR'), clf_status=clf('STATUS_LANCAMENTO', 'PENDENTE'),
+            data_vencimento=date.today(),
+        ).pk)
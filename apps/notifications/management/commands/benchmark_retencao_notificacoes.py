@@ -0,0 +1,99 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from apps.financeiro.benchmark import explain_analyze, resumo_plano
+from apps.notifications.repositories import NotificationRetentionRepository
+
+# Consulta de GET /api/notifications/pending/ e do long-poll para um usuário
+PENDENTES = """
+    SELECT * FROM notifications_notification
+    WHERE user_id = %(user_id)s AND NOT delivered
+    ORDER BY created_at
+"""
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Popula N notificações (padrão 10M, um ano de histórico, pendentes só nos últimos dias) numa transação, "
+        "mede a consulta de pendentes por usuário com e sem o índice parcial idx_ntf_user_pendentes, "
+        "aplica a retenção em lotes e desfaz tudo (ROLLBACK). Use apenas em banco de desenvolvimento."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--linhas', type=int, default=10_000_000, help='Quantidade de notificações geradas')
+        parser.add_argument('--usuarios', type=int, default=1000, help='Usuários entre os quais se distribuem')
+        parser.add_argument('--dias', type=int, default=90, help='Prazo de retenção aplicado')
+        parser.add_argument('--lote', type=int, default=5000, help='Linhas por lote da retenção')
+        parser.add_argument('--repeticoes', type=int, default=5, help='Execuções por consulta (mediana)')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    inicio = time.perf_counter()
+                    params = self._popular(cursor, options)
+                    self.stdout.write(
+                        f"{options['linhas']} notificações geradas em {time.perf_counter() - inicio:.1f}s "
+                        f"({params['pendentes']} pendentes)"
+                    )
+                    linhas = [('índice parcial', self._medir(cursor, params, options))]
+                    cursor.execute('DROP INDEX idx_ntf_user_pendentes')
+                    linhas.append(('sem índice parcial', self._medir(cursor, params, options)))
+
+                    retencao = NotificationRetentionRepository().aplicar(options['dias'], lote=options['lote'])
+                    cursor.execute('SELECT COUNT(*) FROM notifications_notification')
+                    restantes = cursor.fetchone()[0]
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+        self.stdout.write(f"\n{'pendentes por usuário':<24}{'mediana (ms)':>14}  plano")
+        for nome, medida in linhas:
+            self.stdout.write(f"{nome:<24}{medida['ms']:>14.2f}  {medida['resumo']}")
+        taxa = retencao['removidas'] / (retencao['ms'] / 1000) if retencao['ms'] else 0
+        self.stdout.write(
+            f"\nretenção ({options['dias']} dias): {retencao['arquivadas']} arquivadas em {retencao['lotes']} lotes, "
+            f"{retencao['ms'] / 1000:.1f}s ({taxa:.0f} linhas/s, {retencao['ms'] / retencao['lotes']:.1f} ms/lote); "
+            f"{restantes} linhas restantes"
+        )
+        self.stdout.write(self.style.SUCCESS("Benchmark concluído; dados gerados descartados (ROLLBACK)."))
+
+    def _popular(self, cursor, options) -> dict:
+        """Um ano de notificações em ordem de criação; as dos últimos 2 dias (e 0,1% das antigas) pendentes."""
+        cursor.execute("""
+            INSERT INTO auth_user
+                (password, is_superuser, username, first_name, last_name, email, is_staff, is_active, date_joined)
+            SELECT '', FALSE, 'bench-retencao-' || g, '', '', '', FALSE, TRUE, NOW()
+            FROM generate_series(1, %s) g
+            RETURNING id
+        """, [options['usuarios']])
+        usuarios = [row[0] for row in cursor.fetchall()]
+
+        cursor.execute('SELECT setseed(0.42)')
+        cursor.execute("""
+            INSERT INTO notifications_notification
+                (ntf_uuid, title, body, delivered, created_at, delivered_at, user_id)
+            SELECT gen_random_uuid(), 'Benchmark', 'Notificação de benchmark', NOT v.pendente, v.criada,
+                   CASE WHEN v.pendente THEN NULL ELSE v.criada + INTERVAL '1 hour' END,
+                   (%(usuarios)s::int[])[1 + g %% cardinality(%(usuarios)s::int[])]
+            FROM generate_series(1, %(linhas)s) g,
+                 LATERAL (SELECT NOW() - (%(linhas)s - g) * (INTERVAL '365 days' / %(linhas)s) AS criada) c,
+                 LATERAL (SELECT c.criada, c.criada > NOW() - INTERVAL '2 days' OR random() < 0.001 AS pendente) v
+        """, {'usuarios': usuarios, 'linhas': options['linhas']})
+        cursor.execute('ANALYZE notifications_notification')
+        cursor.execute('SELECT COUNT(*) FROM notifications_notification WHERE NOT delivered')
+        return {'user_id': usuarios[len(usuarios) // 2], 'pendentes': cursor.fetchone()[0]}
+
+    def _medir(self, cursor, params: dict, options) -> dict:
+        tempos = []
+        for _ in range(options['repeticoes']):
+            plano = explain_analyze(cursor, PENDENTES, params)
+            tempos.append(plano['Execution Time'])
+        tempos.sort()
+        return {'ms': tempos[len(tempos) // 2], 'resumo': resumo_plano(plano['Plan'])}
@@ -0,0 +1,20 @@
+# Generated by Django 4.2 on 2026-10-19 19:04
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY não roda dentro de transação; não bloqueia escritas
+    atomic = False
+
+    dependencies = [
+        ('notifications', '0001_initial'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('delivered', False)), fields=['user', 'created_at'], name='idx_ntf_user_pendentes'),
+        ),
+    ]
@@ -2,6 +2,9 @@ from django.db import models
 from django.conf import settings
 import uuid
 
+# Canal de pg_notify avisando (chave = user_id) que há notificações novas
+CANAL_NOTIFICACOES = 'notificacoes'
+
 
 class Device(models.Model):
     PLATFORM_CHOICES = (('ios', 'iOS'), ('android', 'Android'))
@@ -38,6 +41,37 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Pendentes do usuário em ordem de criação (pending/, long-poll, ack por marca d'água):
+            # só as não entregues entram, então o índice não cresce com o histórico
+            models.Index(
+                fields=['user', 'created_at'], name='idx_ntf_user_pendentes',
+                condition=models.Q(delivered=False),
+            ),
+        ]
 
     def __str__(self):
         return f"Notification to {self.user_id}: {self.title[:20]}"
+
+
+class NotificationArchive(models.Model):
+    """Notificação entregue removida de ``Notification`` pela retenção (ver NotificationRetentionRepository).
+
+    Sem FK para o usuário: o arquivo não trava exclusões de usuários nem
+    precisa de índices de consulta; é histórico para auditoria/exportação.
+    """
+    id = models.BigIntegerField(primary_key=True, db_column='ntf_id')
+    uuid = models.UUIDField(db_column='ntf_uuid')
+    user_id = models.IntegerField()
+    title = models.CharField(max_length=255)
+    body = models.TextField()
+    data = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'notifications_notification_arquivo'
+
+    def __str__(self):
+        return f"Archived notification to {self.user_id}: {self.title[:20]}"
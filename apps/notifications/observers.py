@@ -1,5 +1,16 @@
+import logging
+from collections import defaultdict
+
 from apps.core.observers import Observer
-from apps.notifications.models import Notification, Device
+from apps.core.pubsub import notificar
+from apps.financeiro.models import LancamentoFinanceiro
+from apps.notifications.models import CANAL_NOTIFICACOES, Notification, Device
+from apps.notifications.tasks import send_push_to_tokens
+
+logger = logging.getLogger(__name__)
+
+# Tokens por chamada de send_push_to_tokens
+PUSH_BATCH_SIZE = 500
 
 
 class PushStoreObserver(Observer):
@@ -7,32 +18,71 @@ class PushStoreObserver(Observer):
 
     This keeps push delivery server-side and lets mobile clients poll pending
     notifications and show them natively.
+
+    Delivered asynchronously (after commit, in batches) by the EventBus. A batch
+    of created lancamentos costs a fixed number of queries: one lookup of each
+    lancamento's empresa (its denormalized column), one device lookup, one bulk
+    insert and one pg_notify waking the users' long-poll requests; push delivery
+    is enqueued in chunks of up to PUSH_BATCH_SIZE tokens.
     """
+    delivery = 'async'
+
     def update(self, subject, event_type: str, **kwargs):
-        if event_type == 'lancamento_created':
-            lanc = kwargs.get('lancamento')
-            if lanc is None:
-                return
-            # Notificar por usuário (id): seleciona usuários a partir de Devices associados à mesma empresa do Job
-            try:
-                empresa = lanc.nota_fiscal.job_origem.empresa
-                device_qs = Device.objects.filter(empresa=empresa, active=True).exclude(user__isnull=True)
-                user_ids = set(device_qs.values_list('user_id', flat=True))
-                for uid in user_ids:
-                    Notification.objects.create(
-                        user_id=uid,
-                        title='Novo lançamento',
-                        body=f"{lanc.descricao} - R$ {lanc.valor}",
-                        data={'lancamento_id': str(lanc.uuid)},
-                    )
-            except Exception:
-                # caso o relacionamento não exista ou falhe, não interrompa o fluxo do serviço
-                return
-
-        if event_type == 'parceiro_created_or_updated':
-            parceiro = kwargs.get('parceiro')
-            if parceiro is None:
-                return
-            # notify admin users or company users (project-specific decision)
-            # For now we do nothing specific to keep minimal.
+        self.update_batch([(subject, event_type, kwargs)])
+
+    def update_batch(self, events):
+        lancamentos = [
+            kwargs['lancamento'] for _, event_type, kwargs in events
+            if event_type == 'lancamento_created' and kwargs.get('lancamento') is not None
+        ]
+        # 'parceiro_created_or_updated': nada a notificar por enquanto
+        if not lancamentos:
             return
+        try:
+            self._notificar_lancamentos(lancamentos)
+        except Exception:
+            # caso o relacionamento não exista ou falhe, não interrompa o fluxo do serviço
+            logger.exception("Erro ao gerar notificações de lançamentos")
+
+    def _notificar_lancamentos(self, lancamentos):
+        # lançamento -> empresa (coluna denormalizada do próprio lançamento), sem JOIN
+        empresa_por_lancamento = dict(
+            LancamentoFinanceiro.objects.filter(pk__in=[l.pk for l in lancamentos])
+            .values_list('pk', 'empresa_id')
+        )
+        empresas = {e for e in empresa_por_lancamento.values() if e is not None}
+        if not empresas:
+            return
+
+        usuarios = defaultdict(set)
+        tokens = defaultdict(list)
+        for empresa_id, user_id, token in Device.objects.filter(
+            empresa_id__in=empresas, active=True
+        ).values_list('empresa_id', 'user_id', 'token'):
+            tokens[empresa_id].append(token)
+            if user_id is not None:
+                usuarios[empresa_id].add(user_id)
+
+        notificacoes = []
+        envios = []
+        for lanc in lancamentos:
+            empresa_id = empresa_por_lancamento.get(lanc.pk)
+            title = 'Novo lançamento'
+            body = f"{lanc.descricao} - R$ {lanc.valor}"
+            data = {'lancamento_id': str(lanc.uuid)}
+            notificacoes.extend(
+                Notification(user_id=uid, title=title, body=body, data=data)
+                for uid in usuarios.get(empresa_id, ())
+            )
+            tokens_empresa = tokens.get(empresa_id, [])
+            for inicio in range(0, len(tokens_empresa), PUSH_BATCH_SIZE):
+                envios.append((tokens_empresa[inicio:inicio + PUSH_BATCH_SIZE], {'title': title, 'body': body, 'data': data}))
+
+        Notification.objects.bulk_create(notificacoes, batch_size=1000)
+        notificar(CANAL_NOTIFICACOES, {n.user_id for n in notificacoes})
+        for lote, payload in envios:
+            send_push_to_tokens.delay(lote, payload)
+        logger.info(
+            "PUSH: %d notificações criadas e %d lotes de push enfileirados para %d lançamentos",
+            len(notificacoes), len(envios), len(lancamentos),
+        )
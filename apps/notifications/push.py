@@ -0,0 +1,196 @@
+"""
+Cliente do serviço de push do Expo (https://docs.expo.dev/push-notifications/sending-notifications/).
+
+O app mobile registra tokens ``ExponentPushToken[...]``; o Expo entrega via
+FCM/APNs. Cada requisição leva até ``PUSH_CHUNK_SIZE`` mensagens (limite do
+Expo: 100) e a resposta traz um "ticket" por mensagem, na mesma ordem.
+
+Ticket ``ok`` só diz que o Expo aceitou a mensagem: o resultado da entrega
+(ex.: ``DeviceNotRegistered`` de um app desinstalado) vem depois, no recibo
+do ticket, consultado em ``/push/getReceipts`` em lotes de até 1000 ids.
+
+As requisições usam uma ``requests.Session`` por processo (pool de conexões
+HTTP com keep-alive). ``EXPO_PUSH_URL`` é configurável para apontar para um
+servidor local (``apps/notifications/push_stub.py``) em testes e benchmarks.
+"""
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Erros de ticket que indicam token que nunca mais vai receber push
+ERROS_TOKEN_INVALIDO = {'DeviceNotRegistered'}
+# Credenciais de push do projeto (FCM/APNs) inválidas: o token não tem culpa; desativá-lo apagaria
+# todos os dispositivos do lote. Vai para nova tentativa, que entrega assim que a configuração for corrigida
+ERRO_CREDENCIAIS = 'InvalidCredentials'
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=getattr(settings, 'PUSH_POOL_SIZE', 10))
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.headers.update({
+                    'Accept': 'application/json',
+                    'Accept-Encoding': 'gzip, deflate',
+                    'Content-Type': 'application/json',
+                })
+                access_token = getattr(settings, 'EXPO_ACCESS_TOKEN', '')
+                if access_token:
+                    session.headers['Authorization'] = f'Bearer {access_token}'
+                _session = session
+    return _session
+
+
+def is_expo_token(token: str) -> bool:
+    return token.startswith(('ExponentPushToken[', 'ExpoPushToken['))
+
+
+class LoteRejeitado(Exception):
+    """O serviço recusou o lote inteiro (4xx): repetir não adianta."""
+
+
+@dataclass
+class ResultadoEnvio:
+    enviados: int = 0
+    invalidos: List[str] = field(default_factory=list)  # desativar o Device
+    falhas: List[str] = field(default_factory=list)  # erro transitório: tentar de novo
+    ignorados: List[str] = field(default_factory=list)  # não são tokens Expo
+    rejeitados: int = 0  # mensagens de lotes recusados pelo serviço
+    credenciais_invalidas: int = 0  # tickets InvalidCredentials (também em ``falhas``)
+    tickets: Dict[str, str] = field(default_factory=dict)  # id do ticket ok -> token, para os recibos
+
+
+@dataclass
+class ResultadoRecibos:
+    entregues: int = 0
+    invalidos: List[str] = field(default_factory=list)  # tokens com recibo DeviceNotRegistered
+    erros: int = 0  # outros erros de entrega (só registrados)
+    pendentes: Dict[str, str] = field(default_factory=dict)  # recibo ainda indisponível ou falha: consultar de novo
+
+
+class ExpoPushClient:
+    def __init__(self, url: str = None, receipts_url: str = None):
+        self.url = url or getattr(settings, 'EXPO_PUSH_URL', 'https://exp.host/--/api/v2/push/send')
+        # Padrão: o getReceipts ao lado do send (também no stub)
+        self.receipts_url = (
+            receipts_url or getattr(settings, 'EXPO_RECEIPTS_URL', '') or f"{self.url.rsplit('/', 1)[0]}/getReceipts"
+        )
+        self.chunk_size = min(getattr(settings, 'PUSH_CHUNK_SIZE', 100), 100)
+        self.receipts_chunk_size = min(getattr(settings, 'PUSH_RECEIPTS_CHUNK_SIZE', 1000), 1000)
+        self.timeout = getattr(settings, 'PUSH_TIMEOUT', 10)
+        self.max_tentativas = getattr(settings, 'PUSH_MAX_ATTEMPTS', 4)
+        self.backoff_base = getattr(settings, 'PUSH_BACKOFF_BASE', 0.5)
+
+    def enviar(self, tokens: List[str], payload: dict) -> ResultadoEnvio:
+        resultado = ResultadoEnvio()
+        validos = []
+        for token in tokens:
+            (validos if is_expo_token(token) else resultado.ignorados).append(token)
+
+        for inicio in range(0, len(validos), self.chunk_size):
+            lote = validos[inicio:inicio + self.chunk_size]
+            mensagens = [
+                {'to': token, 'title': payload.get('title'), 'body': payload.get('body'),
+                 'data': payload.get('data') or {}, 'sound': 'default'}
+                for token in lote
+            ]
+            try:
+                tickets = self._post_com_backoff(mensagens)
+            except LoteRejeitado:
+                resultado.rejeitados += len(lote)
+                continue
+            if tickets is None:
+                resultado.falhas.extend(lote)
+                continue
+            self._processar_tickets(lote, tickets, resultado)
+        return resultado
+
+    def consultar_recibos(self, tickets: Dict[str, str]) -> ResultadoRecibos:
+        """Recibos dos tickets (id -> token) devolvidos por ``enviar``, em lotes de até 1000 ids."""
+        resultado = ResultadoRecibos()
+        ids = list(tickets)
+        for inicio in range(0, len(ids), self.receipts_chunk_size):
+            lote = ids[inicio:inicio + self.receipts_chunk_size]
+            try:
+                recibos = self._post_com_backoff({'ids': lote}, self.receipts_url)
+            except LoteRejeitado:
+                resultado.erros += len(lote)
+                continue
+            if recibos is None:
+                resultado.pendentes.update((id_, tickets[id_]) for id_ in lote)
+                continue
+            for id_ in lote:
+                recibo = (recibos or {}).get(id_)
+                if recibo is None:
+                    resultado.pendentes[id_] = tickets[id_]
+                elif recibo.get('status') == 'ok':
+                    resultado.entregues += 1
+                elif (recibo.get('details') or {}).get('error') in ERROS_TOKEN_INVALIDO:
+                    resultado.invalidos.append(tickets[id_])
+                else:
+                    resultado.erros += 1
+                    logger.warning(
+                        "PUSH: recibo com erro para %s...: %s %s", tickets[id_][:24],
+                        (recibo.get('details') or {}).get('error'), recibo.get('message'),
+                    )
+        return resultado
+
+    def _post_com_backoff(self, corpo, url: str = None):
+        """POST do lote; 429/5xx/erros de rede tentam de novo com backoff exponencial e jitter."""
+        for tentativa in range(self.max_tentativas):
+            try:
+                response = get_session().post(url or self.url, json=corpo, timeout=self.timeout)
+                if response.status_code < 400:
+                    return response.json().get('data', [])
+                if response.status_code != 429 and response.status_code < 500:
+                    logger.error("PUSH: lote rejeitado (%s): %s", response.status_code, response.text[:500])
+                    raise LoteRejeitado()
+                logger.warning("PUSH: HTTP %s na tentativa %d", response.status_code, tentativa + 1)
+            except (requests.ConnectionError, requests.Timeout, ValueError) as exc:
+                logger.warning("PUSH: erro na tentativa %d: %s", tentativa + 1, exc)
+            if tentativa + 1 < self.max_tentativas:
+                time.sleep(self.backoff_base * (2 ** tentativa) * (1 + random.random()))
+        return None
+
+    def _processar_tickets(self, lote: List[str], tickets: list, resultado: ResultadoEnvio):
+        credenciais_invalidas = 0
+        for token, ticket in zip(lote, tickets):
+            if ticket.get('status') == 'ok':
+                resultado.enviados += 1
+                if ticket.get('id'):
+                    resultado.tickets[ticket['id']] = token
+                continue
+            erro = (ticket.get('details') or {}).get('error')
+            if erro in ERROS_TOKEN_INVALIDO:
+                resultado.invalidos.append(token)
+            elif erro == ERRO_CREDENCIAIS:
+                credenciais_invalidas += 1
+                resultado.falhas.append(token)
+            elif erro == 'MessageRateExceeded':
+                resultado.falhas.append(token)
+            else:
+                logger.warning("PUSH: falha para %s...: %s %s", token[:24], erro, ticket.get('message'))
+        if credenciais_invalidas:
+            resultado.credenciais_invalidas += credenciais_invalidas
+            logger.error(
+                "PUSH: %d mensagens recusadas por credenciais de push inválidas (EXPO_ACCESS_TOKEN/FCM/APNs); "
+                "tokens mantidos ativos", credenciais_invalidas,
+            )
+        # Resposta com menos tickets que mensagens: o restante volta para nova tentativa
+        resultado.falhas.extend(lote[len(tickets):])
@@ -0,0 +1,111 @@
+"""
+Servidor local que imita o endpoint de envio do Expo, para testes e benchmarks.
+
+Responde um ticket por mensagem: ``InvalidCredentials`` para tokens que contêm
+"sem-credenciais", ``DeviceNotRegistered`` para os que contêm "invalid" e ``ok``
+para os demais. Pode simular latência e falhas (HTTP 503).
+
+``/getReceipts`` devolve os recibos dos tickets ``ok`` (até 1000 ids por
+requisição, como o Expo): ``DeviceNotRegistered`` para tokens que contêm
+"desinstalado" e ``ok`` para os demais.
+
+    python -m apps.notifications.push_stub --port 8765 --latencia-ms 20
+    EXPO_PUSH_URL=http://127.0.0.1:8765/--/api/v2/push/send
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _ticket(token: str) -> dict:
+    if 'sem-credenciais' in token:
+        return {'status': 'error', 'message': 'Unable to retrieve the FCM server key for the recipient\'s app',
+                'details': {'error': 'InvalidCredentials'}}
+    if 'invalid' in token:
+        return {'status': 'error', 'message': f"{token} is not a registered push notification recipient",
+                'details': {'error': 'DeviceNotRegistered'}}
+    return {'status': 'ok', 'id': str(uuid.uuid4())}
+
+
+def _recibo(token: str) -> dict:
+    if 'desinstalado' in token:
+        return {'status': 'error', 'message': f"{token} is not a registered push notification recipient",
+                'details': {'error': 'DeviceNotRegistered'}}
+    return {'status': 'ok'}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def do_POST(self):
+        corpo = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        servidor = self.server
+        servidor.requisicoes += 1
+        if servidor.latencia_ms:
+            time.sleep(servidor.latencia_ms / 1000)
+        if servidor.falhas_pendentes > 0 or random.random() < servidor.taxa_falha:
+            servidor.falhas_pendentes -= 1
+            self._responder(503, {'errors': [{'code': 'UNAVAILABLE'}]})
+            return
+        if self.path.endswith('/getReceipts'):
+            ids = json.loads(corpo or b'{}').get('ids', [])
+            if len(ids) > 1000:
+                self._responder(400, {'errors': [{'code': 'PUSH_TOO_MANY_RECEIPTS'}]})
+                return
+            servidor.recibos_consultados += len(ids)
+            self._responder(200, {'data': {i: servidor.recibos[i] for i in ids if i in servidor.recibos}})
+            return
+        mensagens = json.loads(corpo or b'[]')
+        servidor.mensagens += len(mensagens)
+        tickets = [_ticket(m['to']) for m in mensagens]
+        for mensagem, ticket in zip(mensagens, tickets):
+            if ticket['status'] == 'ok':
+                servidor.recibos[ticket['id']] = _recibo(mensagem['to'])
+        self._responder(200, {'data': tickets})
+
+    def _responder(self, status, dados):
+        corpo = json.dumps(dados).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def iniciar(host='127.0.0.1', port=0, latencia_ms=0, taxa_falha=0.0, falhas_iniciais=0) -> ThreadingHTTPServer:
+    """Sobe o servidor numa thread daemon; as URLs ficam em ``servidor.push_url`` e ``servidor.receipts_url``."""
+    servidor = ThreadingHTTPServer((host, port), _Handler)
+    servidor.daemon_threads = True
+    servidor.latencia_ms = latencia_ms
+    servidor.taxa_falha = taxa_falha
+    servidor.falhas_pendentes = falhas_iniciais
+    servidor.requisicoes = 0
+    servidor.mensagens = 0
+    servidor.recibos = {}
+    servidor.recibos_consultados = 0
+    servidor.push_url = f'http://{host}:{servidor.server_address[1]}/--/api/v2/push/send'
+    servidor.receipts_url = f'http://{host}:{servidor.server_address[1]}/--/api/v2/push/getReceipts'
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latencia-ms', type=int, default=0)
+    parser.add_argument('--taxa-falha', type=float, default=0.0)
+    args = parser.parse_args()
+    servidor = iniciar(args.host, args.port, args.latencia_ms, args.taxa_falha)
+    print(f"Stub de push em {servidor.push_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        servidor.shutdown()
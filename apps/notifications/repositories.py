@@ -0,0 +1,88 @@
+import logging
+import time
+from datetime import timedelta
+from typing import Optional
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Janela = as próximas ``lote`` linhas pela PK a partir do cursor: cada lote lê só a sua faixa
+# (nada de revisitar as linhas já removidas pelos lotes anteriores). ntf_id cresce com created_at,
+# então a primeira janela com linhas recentes marca o fim das antigas.
+# SKIP LOCKED: um ack concorrente não bloqueia a retenção (e vice-versa).
+_JANELA = """
+    janela AS (
+        SELECT ntf_id, created_at FROM notifications_notification
+        WHERE ntf_id > %(cursor)s
+        ORDER BY ntf_id
+        LIMIT %(lote)s
+    ),
+    lote AS (
+        SELECT ntf_id FROM notifications_notification
+        WHERE ntf_id IN (SELECT ntf_id FROM janela) AND delivered AND delivered_at < %(limite)s
+        FOR UPDATE SKIP LOCKED
+    ),
+    removidas AS (
+        DELETE FROM notifications_notification n USING lote
+        WHERE n.ntf_id = lote.ntf_id
+        RETURNING n.ntf_id, n.ntf_uuid, n.user_id, n.title, n.body, n.data, n.created_at, n.delivered_at
+    )
+"""
+
+_RESULTADO = """
+    SELECT (SELECT COUNT(*) FROM removidas),
+           (SELECT COUNT(*) FROM janela),
+           (SELECT MAX(ntf_id) FROM janela),
+           (SELECT COALESCE(BOOL_OR(created_at >= %(limite)s), FALSE) FROM janela)
+"""
+
+_ARQUIVAR = f"""
+    WITH {_JANELA},
+    arquivadas AS (
+        INSERT INTO notifications_notification_arquivo
+            (ntf_id, ntf_uuid, user_id, title, body, data, created_at, delivered_at, archived_at)
+        SELECT r.*, NOW() FROM removidas r
+    )
+    {_RESULTADO}
+"""
+
+_EXCLUIR = f"""
+    WITH {_JANELA}
+    {_RESULTADO}
+"""
+
+
+class NotificationRetentionRepository:
+    def aplicar(self, dias: int, lote: int = 5000, arquivar: bool = True, max_lotes: Optional[int] = None) -> dict:
+        """Move (ou só exclui, com ``arquivar=False``) as notificações entregues há mais de ``dias`` dias.
+
+        Percorre a tabela pela PK em janelas de ``lote`` linhas; cada janela é
+        uma instrução (DELETE ... RETURNING alimentando o INSERT no arquivo) na
+        sua própria transação, para não segurar locks nem gerar uma transação
+        gigante. Para ao chegar a linhas criadas depois do limite ou após
+        ``max_lotes`` janelas. Pendentes nunca são removidas.
+        """
+        limite = timezone.now() - timedelta(days=dias)
+        sql = _ARQUIVAR if arquivar else _EXCLUIR
+        cursor_id, total, lotes = 0, 0, 0
+        inicio = time.perf_counter()
+        while max_lotes is None or lotes < max_lotes:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(sql, {'cursor': cursor_id, 'lote': lote, 'limite': limite})
+                removidas, lidas, ultimo_id, recentes = cursor.fetchone()
+            total += removidas
+            lotes += 1
+            if lidas < lote or recentes:
+                break
+            cursor_id = ultimo_id
+
+        resultado = {
+            'removidas': total,
+            'arquivadas': total if arquivar else 0,
+            'lotes': lotes,
+            'ms': round((time.perf_counter() - inicio) * 1000, 1),
+        }
+        logger.info("RETENCAO: notificações entregues antes de %s: %s", limite.isoformat(), resultado)
+        return resultado
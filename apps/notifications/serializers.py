@@ -15,3 +15,14 @@ class NotificationSerializer(serializers.ModelSerializer):
         model = Notification
         fields = ['uuid', 'user', 'title', 'body', 'data', 'delivered', 'created_at', 'delivered_at']
         read_only_fields = ['uuid', 'delivered', 'created_at', 'delivered_at']
+
+
+class AcknowledgeBulkSerializer(serializers.Serializer):
+    """Confirmação em lote: lista de UUIDs ou tudo criado até ``until`` (marca d'água)."""
+    uuids = serializers.ListField(child=serializers.UUIDField(), required=False, allow_empty=False, max_length=1000)
+    until = serializers.DateTimeField(required=False)
+
+    def validate(self, attrs):
+        if ('uuids' in attrs) == ('until' in attrs):
+            raise serializers.ValidationError("Informe 'uuids' ou 'until' (apenas um).")
+        return attrs
@@ -1,17 +1,100 @@
 from celery import shared_task
+from celery.exceptions import MaxRetriesExceededError
+from django.conf import settings
 import logging
 
+from .models import Device
+from .push import ExpoPushClient
+from .repositories import NotificationRetentionRepository
+
 logger = logging.getLogger(__name__)
 
 
+def _desativar_dispositivos(tokens: list, origem: str):
+    """Desativa, num só UPDATE, os dispositivos cujo token o Expo deu como não registrado."""
+    if tokens:
+        desativados = Device.objects.filter(token__in=tokens, active=True).update(active=False)
+        logger.info('PUSH: %d dispositivos desativados (token inválido no %s)', desativados, origem)
+
+
 @shared_task(bind=True, max_retries=3)
 def send_push_to_tokens(self, tokens: list, payload: dict):
-    # Placeholder: actual implementation should call firebase_admin.messaging
-    # or FCM HTTP v1. For now we log and pretend to send.
-    try:
-        logger.info('Sending push to %d tokens: %s', len(tokens), payload)
-        # TODO: integrate firebase_admin or HTTP call here
-        return {'sent': len(tokens)}
-    except Exception as exc:
-        logger.exception('Error sending push')
-        raise self.retry(exc=exc, countdown=2 ** self.request.retries)
+    """Envia o push para os tokens via Expo e desativa, em lote, os dispositivos com token inválido.
+
+    Tokens com falha transitória (após o backoff do cliente) são reenviados pela
+    própria task, com novo atraso exponencial, até ``max_retries``. Os tickets
+    aceitos vão para ``consultar_recibos_push``, agendada ``PUSH_RECEIPTS_DELAY``
+    segundos depois.
+    """
+    resultado = ExpoPushClient().enviar(tokens, payload)
+
+    _desativar_dispositivos(resultado.invalidos, 'ticket')
+    if resultado.tickets:
+        consultar_recibos_push.apply_async(args=[resultado.tickets], countdown=settings.PUSH_RECEIPTS_DELAY)
+    if resultado.ignorados:
+        logger.warning('PUSH: %d tokens não-Expo ignorados', len(resultado.ignorados))
+
+    logger.info(
+        'PUSH: %d/%d enviados, %d inválidos, %d com falha, %d rejeitados',
+        resultado.enviados, len(tokens), len(resultado.invalidos), len(resultado.falhas), resultado.rejeitados,
+    )
+
+    if resultado.falhas:
+        try:
+            raise self.retry(
+                args=[resultado.falhas, payload],
+                countdown=getattr(settings, 'PUSH_RETRY_COUNTDOWN', 30) * 2 ** self.request.retries,
+            )
+        except MaxRetriesExceededError:
+            logger.error('PUSH: %d tokens sem entrega após %d tentativas', len(resultado.falhas), self.max_retries + 1)
+
+    return {
+        'sent': resultado.enviados,
+        'invalid': len(resultado.invalidos),
+        'failed': len(resultado.falhas),
+        'ignored': len(resultado.ignorados),
+    }
+
+
+@shared_task(bind=True, max_retries=3)
+def consultar_recibos_push(self, tickets: dict):
+    """Consulta os recibos dos tickets (id -> token) e desativa os dispositivos ``DeviceNotRegistered``.
+
+    Recibos ainda indisponíveis (ou cuja consulta falhou) são consultados de
+    novo ``PUSH_RECEIPTS_DELAY`` segundos depois, até ``max_retries``; o Expo
+    os guarda por 24 horas.
+    """
+    resultado = ExpoPushClient().consultar_recibos(tickets)
+
+    _desativar_dispositivos(resultado.invalidos, 'recibo')
+    logger.info(
+        'PUSH: recibos de %d tickets: %d entregues, %d não registrados, %d com erro, %d pendentes',
+        len(tickets), resultado.entregues, len(resultado.invalidos), resultado.erros, len(resultado.pendentes),
+    )
+
+    if resultado.pendentes:
+        try:
+            raise self.retry(args=[resultado.pendentes], countdown=settings.PUSH_RECEIPTS_DELAY)
+        except MaxRetriesExceededError:
+            logger.error('PUSH: %d recibos indisponíveis após %d consultas', len(resultado.pendentes), self.max_retries + 1)
+
+    return {
+        'delivered': resultado.entregues,
+        'invalid': len(resultado.invalidos),
+        'errors': resultado.erros,
+        'pending': len(resultado.pendentes),
+    }
+
+
+@shared_task(ignore_result=True)
+def aplicar_retencao_notificacoes_task():
+    """Agendada pelo Celery beat: arquiva/exclui as notificações entregues além de NOTIFICATIONS_RETENTION_DAYS."""
+    dias = settings.NOTIFICATIONS_RETENTION_DAYS
+    if not dias:
+        return None
+    return NotificationRetentionRepository().aplicar(
+        dias,
+        lote=settings.NOTIFICATIONS_RETENTION_BATCH,
+        arquivar=settings.NOTIFICATIONS_RETENTION_ARCHIVE,
+        max_lotes=settings.NOTIFICATIONS_RETENTION_MAX_BATCHES or None,
+    )
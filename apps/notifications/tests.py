@@ -2,12 +2,35 @@
 Testes para o app notifications.
 Testa registro de dispositivos, listagem de notificações pendentes e acknowledgement.
 """
+import asyncio
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from celery.exceptions import Retry
+from django.test import override_settings
+from django.utils import timezone
 from django.urls import reverse
 from django.contrib.auth.models import User
 from rest_framework import status
 from rest_framework.test import APITestCase
-from apps.notifications.models import Device, Notification
+from apps.core.pubsub import pubsub
+from apps.core.queries import record_queries
+from apps.notifications.models import CANAL_NOTIFICACOES, Device, Notification, NotificationArchive
 from apps.empresa.models import MinhaEmpresa
+from apps.classificadores.models import Classificador
+from apps.core.tests import QueryBudgetMixin
+from apps.financeiro.models import LancamentoFinanceiro
+from apps.notas.models import NotaFiscal
+from apps.notifications import push
+from apps.notifications.observers import PushStoreObserver
+from apps.notifications.push_stub import iniciar as iniciar_stub_push
+from apps.notifications.repositories import NotificationRetentionRepository
+from apps.notifications.tasks import (
+    aplicar_retencao_notificacoes_task, consultar_recibos_push, send_push_to_tokens,
+)
+from apps.parceiros.models import Parceiro
+from apps.processamento.models import JobProcessamento
 
 
 class RegisterDeviceTestCase(APITestCase):
@@ -343,3 +366,352 @@ class AcknowledgeNotificationTestCase(APITestCase):
         # Notificação não deve ter sido marcada como entregue
         notif_outro.refresh_from_db()
         self.assertFalse(notif_outro.delivered)
+
+
+class AcknowledgeBulkNotificationTestCase(QueryBudgetMixin, APITestCase):
+    """Confirmação em lote (lista de UUIDs ou marca d'água de created_at) num único UPDATE."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='bulkuser', password='testpass')
+        self.device = Device.objects.create(user=self.user, token='bulk-device-token', platform='ios')
+        self.notificacoes = Notification.objects.bulk_create([
+            Notification(user=self.user, title=f'Notificação {i}', body='Corpo') for i in range(200)
+        ])
+        self.url = reverse('notifications:ack-bulk')
+
+    def _pendentes(self):
+        return Notification.objects.filter(user=self.user, delivered=False).count()
+
+    def test_confirmar_por_uuids_com_device_token(self):
+        uuids = [str(n.uuid) for n in self.notificacoes[:150]]
+        # Dispositivo e o UPDATE
+        with self.assertMaxQueries(2):
+            response = self.client.post(
+                self.url, {'uuids': uuids}, format='json', HTTP_X_DEVICE_TOKEN=self.device.token,
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['acknowledged'], 150)
+        self.assertEqual(self._pendentes(), 50)
+        self.assertFalse(Notification.objects.filter(delivered=True, delivered_at__isnull=True).exists())
+
+    def test_confirmar_ate_marca_dagua(self):
+        limite = Notification.objects.filter(user=self.user).order_by('created_at')[99].created_at
+        Notification.objects.filter(user=self.user, created_at__gt=limite).update(
+            created_at=limite + timedelta(seconds=1),
+        )
+        self.client.force_authenticate(user=self.user)
+        with self.assertMaxQueries(1):
+            response = self.client.post(self.url, {'until': limite.isoformat()}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['acknowledged'], Notification.objects.filter(created_at__lte=limite).count())
+        self.assertFalse(Notification.objects.filter(user=self.user, delivered=False, created_at__lte=limite).exists())
+        self.assertTrue(Notification.objects.filter(user=self.user, delivered=False, created_at__gt=limite).exists())
+
+    def test_ignora_notificacoes_de_outro_usuario(self):
+        outro = User.objects.create_user(username='bulkother', password='otherpass')
+        alheia = Notification.objects.create(user=outro, title='Outro', body='Não confirmar')
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.post(
+            self.url, {'uuids': [str(alheia.uuid), str(self.notificacoes[0].uuid)]}, format='json',
+        )
+
+        self.assertEqual(response.data['acknowledged'], 1)
+        alheia.refresh_from_db()
+        self.assertFalse(alheia.delivered)
+
+    def test_validacao_do_corpo(self):
+        self.client.force_authenticate(user=self.user)
+        for corpo in ({}, {'uuids': []}, {'uuids': ['nao-e-uuid']},
+                      {'uuids': [str(self.notificacoes[0].uuid)], 'until': '2025-01-01T00:00:00Z'}):
+            response = self.client.post(self.url, corpo, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, corpo)
+        self.assertEqual(self._pendentes(), 200)
+
+    def test_dispositivo_sem_token_ou_desconhecido(self):
+        corpo = {'uuids': [str(self.notificacoes[0].uuid)]}
+        self.assertEqual(self.client.post(self.url, corpo, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(self.url, {**corpo, 'device': 'desconhecido'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class NotificationRetentionTestCase(APITestCase):
+    """Retenção: entregues além do prazo vão para o arquivo em lotes; pendentes e recentes ficam."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='retencao', password='testpass')
+        agora = timezone.now()
+        self.antigas = self._criar(5, criada=agora - timedelta(days=100), entregue=agora - timedelta(days=95))
+        self.pendente_antiga = self._criar(1, criada=agora - timedelta(days=100))[0]
+        self.entregue_recente = self._criar(1, criada=agora - timedelta(days=100), entregue=agora - timedelta(days=1))[0]
+        self.recentes = self._criar(3, criada=agora - timedelta(days=2), entregue=agora - timedelta(days=1))
+
+    def _criar(self, n, criada, entregue=None):
+        notificacoes = Notification.objects.bulk_create([
+            Notification(user=self.user, title='Antiga', body='Corpo', data={'i': i}) for i in range(n)
+        ])
+        ids = [x.id for x in notificacoes]
+        Notification.objects.filter(id__in=ids).update(
+            created_at=criada, delivered=entregue is not None, delivered_at=entregue,
+        )
+        return notificacoes
+
+    def _restantes(self):
+        return set(Notification.objects.filter(user=self.user).values_list('id', flat=True))
+
+    def test_arquiva_entregues_antigas_em_lotes(self):
+        resultado = NotificationRetentionRepository().aplicar(90, lote=2)
+
+        self.assertEqual(resultado['removidas'], 5)
+        self.assertEqual(resultado['arquivadas'], 5)
+        self.assertGreater(resultado['lotes'], 3)
+        self.assertEqual(
+            self._restantes(),
+            {self.pendente_antiga.id, self.entregue_recente.id} | {n.id for n in self.recentes},
+        )
+        arquivadas = NotificationArchive.objects.filter(id__in=[n.id for n in self.antigas]).order_by('id')
+        self.assertEqual(len(arquivadas), 5)
+        self.assertEqual(arquivadas[0].uuid, self.antigas[0].uuid)
+        self.assertEqual(arquivadas[0].user_id, self.user.id)
+        self.assertEqual(arquivadas[0].data, {'i': 0})
+        self.assertIsNotNone(arquivadas[0].delivered_at)
+
+    def test_sem_arquivo_apenas_exclui(self):
+        resultado = NotificationRetentionRepository().aplicar(90, lote=100, arquivar=False)
+
+        self.assertEqual(resultado['removidas'], 5)
+        self.assertEqual(len(self._restantes()), 5)
+        self.assertFalse(NotificationArchive.objects.filter(id__in=[n.id for n in self.antigas]).exists())
+
+    def test_max_lotes_limita_a_execucao(self):
+        resultado = NotificationRetentionRepository().aplicar(90, lote=2, max_lotes=1)
+
+        self.assertEqual(resultado['lotes'], 1)
+        self.assertLessEqual(resultado['removidas'], 2)
+
+    @override_settings(NOTIFICATIONS_RETENTION_DAYS=0)
+    def test_task_desativada_sem_prazo(self):
+        self.assertIsNone(aplicar_retencao_notificacoes_task())
+        self.assertEqual(len(self._restantes()), 10)
+
+    @override_settings(NOTIFICATIONS_RETENTION_DAYS=30, NOTIFICATIONS_RETENTION_BATCH=3,
+                       NOTIFICATIONS_RETENTION_ARCHIVE=True, NOTIFICATIONS_RETENTION_MAX_BATCHES=0)
+    def test_task_usa_a_politica_configurada(self):
+        resultado = aplicar_retencao_notificacoes_task()
+
+        self.assertEqual(resultado['arquivadas'], 5)
+        self.assertNotIn(self.antigas[0].id, self._restantes())
+
+
+# Consultas na thread do teste, dentro da transação do TestCase
+@override_settings(PUBSUB_LISTEN_ENABLED=False, LONG_POLL_DB_THREADS=0)
+class WaitPendingNotificationsTestCase(APITestCase):
+    """Long-poll de notificações: responde ao haver pendentes, a um aviso do pub/sub ou no timeout."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='longpoll-user', password='x')
+        Device.objects.create(token='longpoll-device', platform='android', user=self.user)
+        self.url = reverse('notifications:pending-wait')
+
+    async def _get(self, **params):
+        return await self.async_client.get(self.url, {'device': 'longpoll-device', **params})
+
+    async def _aguardar_assinatura(self):
+        for _ in range(200):
+            if pubsub.assinantes(CANAL_NOTIFICACOES):
+                return
+            await asyncio.sleep(0.01)
+        self.fail("a requisição não chegou a assinar o canal")
+
+    async def test_responde_na_hora_se_ha_pendentes(self):
+        await Notification.objects.acreate(user=self.user, title='Já existe', body='b')
+
+        # Espera de 60s: só termina antes do limite se responder sem esperar
+        response = await asyncio.wait_for(self._get(timeout=60), 10)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([n['title'] for n in response.json()], ['Já existe'])
+
+    async def test_aviso_acorda_a_espera(self):
+        espera = asyncio.ensure_future(self._get(timeout=60))
+        await self._aguardar_assinatura()
+
+        await Notification.objects.acreate(user=self.user, title='Nova', body='b')
+        self.assertEqual(pubsub.publicar(CANAL_NOTIFICACOES, self.user.id), 1)
+        response = await asyncio.wait_for(espera, 10)
+
+        self.assertEqual([n['title'] for n in response.json()], ['Nova'])
+        self.assertEqual(pubsub.assinantes(CANAL_NOTIFICACOES), 0)
+
+    async def test_aviso_sem_pendentes_continua_ate_o_timeout(self):
+        espera = asyncio.ensure_future(self._get(timeout=1))
+        await self._aguardar_assinatura()
+        self.assertEqual(pubsub.publicar(CANAL_NOTIFICACOES, self.user.id), 1)
+
+        # O aviso foi consumido e a requisição voltou a esperar, ainda assinada
+        await asyncio.sleep(0.05)
+        self.assertFalse(espera.done())
+        self.assertEqual(pubsub.assinantes(CANAL_NOTIFICACOES), 1)
+
+        response = await asyncio.wait_for(espera, 10)
+        self.assertEqual(response.json(), [])
+        self.assertEqual(pubsub.assinantes(CANAL_NOTIFICACOES), 0)
+
+    async def test_dispositivo_desconhecido_ou_ausente(self):
+        response = await self.async_client.get(self.url, {'device': 'nao-existe'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = await self._get(timeout='x')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class PushFanoutTestCase(QueryBudgetMixin, APITestCase):
+    """Fan-out de notificações de um lançamento para uma empresa com 1.000 dispositivos."""
+
+    def setUp(self):
+        clf = lambda tipo, codigo: Classificador.objects.get_or_create(
+            tipo=tipo, codigo=codigo, defaults={'descricao': codigo}
+        )[0]
+        empresa = MinhaEmpresa.objects.create(
+            cnpj_numero=11222333000181, cnpj='11.222.333/0001-81', nome='Empresa Push'
+        )
+        users = User.objects.bulk_create([User(username=f'push-bench-{i}') for i in range(1000)])
+        Device.objects.bulk_create([
+            Device(token=f'ExponentPushToken[bench-{i}]', platform='android', empresa=empresa, user=user)
+            for i, user in enumerate(users)
+        ])
+        Device.objects.create(token='ExponentPushToken[inativo]', empresa=empresa, active=False)
+        job = JobProcessamento.objects.create(empresa=empresa, status=clf('STATUS_JOB', 'CONCLUIDO'))
+        parceiro = Parceiro.objects.create(
+            nome='Fornecedor Push', cnpj='11.222.333/0002-62', clf_tipo=clf('TIPO_PARCEIRO', 'FORNECEDOR')
+        )
+        nota = NotaFiscal.objects.create(
+            job_origem=job, parceiro=parceiro, numero='NF-PUSH-1',
+            data_emissao=date.today(), valor_total=Decimal('99.90'),
+        )
+        # Recarregado sem relações em cache, como chega ao observer pelo EventBus
+        self.lancamento = LancamentoFinanceiro.objects.get(pk=LancamentoFinanceiro.objects.create(
+            nota_fiscal=nota, descricao='Compra push', valor=Decimal('99.90'),
+            clf_tipo=clf('TIPO_LANCAMENTO', 'PAGAR'), clf_status=clf('STATUS_LANCAMENTO', 'PENDENTE'),
+            data_vencimento=date.today(),
+        ).pk)
+
+    @mock.patch('apps.notifications.observers.send_push_to_tokens')
+    def test_fanout_1000_dispositivos(self, send_push):
+        """Consultas, INSERTs e lotes de push fixos; o tempo é medido por ``manage.py benchmark_push --fanout``."""
+        # Empresa dos lançamentos, dispositivos, um bulk_create e um pg_notify para os usuários
+        with self.assertMaxQueries(4), record_queries() as rec:
+            PushStoreObserver().update_batch([(None, 'lancamento_created', {'lancamento': self.lancamento})])
+
+        inserts = sum(n for p, n in rec.patterns.items() if p.startswith('INSERT INTO "notifications_notification"'))
+        self.assertEqual(inserts, 1)
+        notificacoes = Notification.objects.filter(data__lancamento_id=str(self.lancamento.uuid))
+        self.assertEqual(notificacoes.count(), 1000)
+        self.assertEqual(send_push.delay.call_count, 2)
+        lotes = [c.args[0] for c in send_push.delay.call_args_list]
+        self.assertEqual([len(lote) for lote in lotes], [500, 500])
+        self.assertEqual(
+            set(lotes[0] + lotes[1]), {f'ExponentPushToken[bench-{i}]' for i in range(1000)}
+        )
+
+    @mock.patch('apps.notifications.observers.send_push_to_tokens')
+    def test_ignora_outros_eventos(self, send_push):
+        with self.assertMaxQueries(0):
+            PushStoreObserver().update_batch([(None, 'parceiro_created_or_updated', {'parceiro': None})])
+        send_push.delay.assert_not_called()
+
+
+class SendPushToTokensTestCase(APITestCase):
+    """Envio em lotes de 100 contra o stub local do Expo, com desativação de tokens inválidos."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.stub = iniciar_stub_push()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.stub.shutdown()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.stub.requisicoes = 0
+        self.stub.falhas_pendentes = 0
+        self.stub.recibos_consultados = 0
+        self.payload = {'title': 'Novo lançamento', 'body': 'Compra - R$ 10', 'data': {'lancamento_id': 'x'}}
+        patcher = mock.patch.object(consultar_recibos_push, 'apply_async')
+        self.agendar_recibos = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_lotes_de_100_e_desativacao_em_massa(self):
+        invalidos = ['ExponentPushToken[invalid-1]', 'ExponentPushToken[invalid-2]']
+        for token in invalidos:
+            Device.objects.create(token=token, platform='ios', active=True)
+        tokens = [f'ExponentPushToken[ok-{i}]' for i in range(248)] + invalidos + ['fcm-token-nao-expo']
+
+        with override_settings(EXPO_PUSH_URL=self.stub.push_url):
+            resultado = send_push_to_tokens(tokens, self.payload)
+
+        self.assertEqual(resultado, {'sent': 248, 'invalid': 2, 'failed': 0, 'ignored': 1})
+        self.assertEqual(self.stub.requisicoes, 3)
+        self.assertFalse(Device.objects.filter(token__in=invalidos, active=True).exists())
+
+    def test_credenciais_invalidas_nao_desativam_dispositivos(self):
+        tokens = ['ExponentPushToken[sem-credenciais-1]', 'ExponentPushToken[sem-credenciais-2]']
+        for token in tokens:
+            Device.objects.create(token=token, platform='android', active=True)
+
+        with override_settings(EXPO_PUSH_URL=self.stub.push_url), self.assertRaises(Retry):
+            send_push_to_tokens(tokens, self.payload)
+
+        self.assertEqual(Device.objects.filter(token__in=tokens, active=True).count(), 2)
+
+    def test_backoff_em_erro_transitorio(self):
+        self.stub.falhas_pendentes = 2
+        with override_settings(EXPO_PUSH_URL=self.stub.push_url, PUSH_BACKOFF_BASE=0):
+            resultado = send_push_to_tokens(['ExponentPushToken[ok-1]'], self.payload)
+
+        self.assertEqual(resultado['sent'], 1)
+        self.assertEqual(self.stub.requisicoes, 3)
+
+    @override_settings(PUSH_RECEIPTS_DELAY=600)
+    def test_tickets_aceitos_agendam_a_consulta_de_recibos(self):
+        tokens = ['ExponentPushToken[ok-1]', 'ExponentPushToken[ok-2]', 'ExponentPushToken[invalid-1]']
+        with override_settings(EXPO_PUSH_URL=self.stub.push_url):
+            send_push_to_tokens(tokens, self.payload)
+
+        self.agendar_recibos.assert_called_once()
+        tickets = self.agendar_recibos.call_args.kwargs['args'][0]
+        self.assertEqual(sorted(tickets.values()), tokens[:2])
+        self.assertEqual(self.agendar_recibos.call_args.kwargs['countdown'], 600)
+
+    def test_recibos_em_lotes_de_1000_desativam_nao_registrados(self):
+        desinstalados = ['ExponentPushToken[desinstalado-1]', 'ExponentPushToken[desinstalado-2]']
+        for token in desinstalados + ['ExponentPushToken[ok-0]']:
+            Device.objects.create(token=token, platform='android', active=True)
+        tokens = [f'ExponentPushToken[ok-{i}]' for i in range(1500)] + desinstalados
+        tickets = push.ExpoPushClient(url=self.stub.push_url).enviar(tokens, self.payload).tickets
+        self.stub.requisicoes = 0
+
+        with override_settings(EXPO_PUSH_URL=self.stub.push_url):
+            resultado = consultar_recibos_push(tickets)
+
+        self.assertEqual(resultado, {'delivered': 1500, 'invalid': 2, 'errors': 0, 'pending': 0})
+        self.assertEqual((self.stub.requisicoes, self.stub.recibos_consultados), (2, 1502))
+        self.assertFalse(Device.objects.filter(token__in=desinstalados, active=True).exists())
+        self.assertTrue(Device.objects.get(token='ExponentPushToken[ok-0]').active)
+
+    def test_recibos_indisponiveis_sao_consultados_de_novo(self):
+        tickets = push.ExpoPushClient(url=self.stub.push_url).enviar(['ExponentPushToken[ok-1]'], self.payload).tickets
+        tickets['ticket-ainda-sem-recibo'] = 'ExponentPushToken[ok-2]'
+
+        with override_settings(EXPO_PUSH_URL=self.stub.push_url), \
+                mock.patch.object(consultar_recibos_push, 'retry', side_effect=Retry) as retry, \
+                self.assertRaises(Retry):
+            consultar_recibos_push(tickets)
+
+        self.assertEqual(retry.call_args.kwargs['args'], [{'ticket-ainda-sem-recibo': 'ExponentPushToken[ok-2]'}])
+
@@ -1,11 +1,16 @@
 from django.urls import path
-from .views import RegisterDeviceView, PendingNotificationsView, AcknowledgeNotificationView
+from .views import (
+    RegisterDeviceView, PendingNotificationsView, WaitPendingNotificationsView, AcknowledgeNotificationView,
+    AcknowledgeBulkNotificationView,
+)
 
 app_name = 'notifications'
 
 urlpatterns = [
     path('register-device/', RegisterDeviceView.as_view(), name='register-device'),
     path('pending/', PendingNotificationsView.as_view(), name='pending'),
+    path('pending/wait/', WaitPendingNotificationsView.as_view(), name='pending-wait'),
     path('ack/', AcknowledgeNotificationView.as_view(), name='ack'),
+    path('ack/bulk/', AcknowledgeBulkNotificationView.as_view(), name='ack-bulk'),
 ]
 
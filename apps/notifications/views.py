@@ -1,11 +1,21 @@
+import asyncio
+import time
+import weakref
+from collections import defaultdict
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.views import View
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
 
-from .models import Device
+from apps.core.async_db import consultar
+from apps.core.pubsub import pubsub
+from .models import CANAL_NOTIFICACOES, Device
 from .serializers import DeviceSerializer
 from .models import Notification
-from .serializers import NotificationSerializer
+from .serializers import AcknowledgeBulkSerializer, NotificationSerializer
 from django.utils import timezone
 
 
@@ -62,6 +72,126 @@ class PendingNotificationsView(APIView):
         return Response(NotificationSerializer(qs, many=True).data)
 
 
+def _usuario_do_dispositivo(device_token):
+    return list(Device.objects.filter(token=device_token, active=True).values_list('user_id', flat=True)[:1])
+
+
+def _pendentes_por_usuario(user_ids):
+    pendentes = defaultdict(list)
+    for notificacao in Notification.objects.filter(user_id__in=user_ids, delivered=False).order_by('created_at'):
+        pendentes[notificacao.user_id].append(notificacao)
+    return pendentes
+
+
+class _PendentesEmLote:
+    """Junta as consultas de pendentes das esperas numa só (``user_id IN (...)``).
+
+    Um aviso para milhares de usuários acorda milhares de esperas no mesmo
+    instante; em vez de uma consulta por requisição, as que chegam enquanto uma
+    consulta está em andamento entram todas na próxima.
+    """
+
+    def __init__(self):
+        self._fila = {}
+        self._ativo = False
+
+    async def carregar(self, user_id):
+        futuro = asyncio.get_running_loop().create_future()
+        self._fila.setdefault(user_id, []).append(futuro)
+        if not self._ativo:
+            self._ativo = True
+            asyncio.ensure_future(self._executar())
+        return await futuro
+
+    async def _executar(self):
+        try:
+            while self._fila:
+                fila, self._fila = self._fila, {}
+                try:
+                    pendentes = await consultar(_pendentes_por_usuario, list(fila))
+                except Exception as e:
+                    for futuros in fila.values():
+                        for futuro in futuros:
+                            if not futuro.done():
+                                futuro.set_exception(e)
+                    continue
+                for user_id, futuros in fila.items():
+                    for futuro in futuros:
+                        if not futuro.done():
+                            futuro.set_result(pendentes.get(user_id, []))
+        finally:
+            self._ativo = False
+
+
+# Um por event loop (um por worker em produção; um por teste assíncrono)
+_lotes = weakref.WeakKeyDictionary()
+
+
+async def _pendentes(user_id):
+    loop = asyncio.get_running_loop()
+    if loop not in _lotes:
+        _lotes[loop] = _PendentesEmLote()
+    return await _lotes[loop].carregar(user_id)
+
+
+class WaitPendingNotificationsView(View):
+    """Long-poll de notificações pendentes por token de dispositivo (view ASGI assíncrona).
+
+    Responde na hora se já houver pendentes; senão segura a requisição até um
+    pg_notify no canal do usuário (PushStoreObserver) ou até ``timeout``
+    segundos, respondendo ``[]``. Enquanto espera não usa thread nem conexão
+    de banco, então o cliente pode reabrir a espera logo em seguida em vez de
+    consultar ``pending/`` em intervalos curtos.
+    """
+
+    async def get(self, request):
+        device_token = request.GET.get('device') or request.headers.get('X-Device-Token')
+        if not device_token:
+            return JsonResponse({'detail': 'device token required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            timeout = float(request.GET.get('timeout', settings.LONG_POLL_TIMEOUT))
+        except ValueError:
+            return JsonResponse({'detail': 'timeout must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+        timeout = min(max(timeout, 0), settings.LONG_POLL_TIMEOUT_MAX)
+
+        usuario = await consultar(_usuario_do_dispositivo, device_token)
+        if not usuario:
+            return JsonResponse({'detail': 'device not found'}, status=status.HTTP_404_NOT_FOUND)
+        user_id = usuario[0]
+        if not user_id:
+            return JsonResponse([], safe=False)
+
+        limite = time.monotonic() + timeout
+        # Assina antes de consultar: um aviso entre a consulta e a espera não se perde
+        with pubsub.assinatura(CANAL_NOTIFICACOES, user_id) as assinatura:
+            pendentes = await _pendentes(user_id)
+            # Avisos podem chegar sem nada pendente (já confirmadas, reconexão do listener)
+            while not pendentes and (restante := limite - time.monotonic()) > 0:
+                if await assinatura.aguardar(restante) is None:
+                    break
+                pendentes = await _pendentes(user_id)
+        return JsonResponse(NotificationSerializer(pendentes, many=True).data, safe=False)
+
+
+def _usuario_da_confirmacao(request):
+    """user_id dono das notificações a confirmar: usuário autenticado ou o do dispositivo.
+
+    Retorna ``(user_id, None)`` ou ``(None, Response de erro)``.
+    """
+    if getattr(request.user, 'is_authenticated', False) and hasattr(request.user, 'id'):
+        return request.user.id, None
+    # Empresa/device-based ack
+    device_token = request.data.get('device') or request.headers.get('X-Device-Token')
+    if not device_token:
+        return None, Response({'detail': 'device token required'}, status=status.HTTP_400_BAD_REQUEST)
+    usuario = _usuario_do_dispositivo(device_token)
+    if not usuario:
+        return None, Response({'detail': 'device not found'}, status=status.HTTP_404_NOT_FOUND)
+    if not usuario[0]:
+        return None, Response({'detail': 'device not linked'}, status=status.HTTP_400_BAD_REQUEST)
+    return usuario[0], None
+
+
 class AcknowledgeNotificationView(APIView):
     permission_classes = [permissions.AllowAny]
 
@@ -70,29 +200,39 @@ class AcknowledgeNotificationView(APIView):
         if not notification_uuid:
             return Response({'detail': 'uuid required'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Standard user
-        if getattr(request.user, 'is_authenticated', False) and hasattr(request.user, 'id'):
-            try:
-                notif = Notification.objects.get(uuid=notification_uuid, user=request.user)
-            except Notification.DoesNotExist:
-                return Response({'detail': 'not found'}, status=status.HTTP_404_NOT_FOUND)
-        else:
-            # Empresa/device-based ack
-            device_token = request.data.get('device') or request.headers.get('X-Device-Token')
-            if not device_token:
-                return Response({'detail': 'device token required'}, status=status.HTTP_400_BAD_REQUEST)
-            try:
-                device = Device.objects.get(token=device_token, active=True)
-            except Device.DoesNotExist:
-                return Response({'detail': 'device not found'}, status=status.HTTP_404_NOT_FOUND)
-            if not device.user_id:
-                return Response({'detail': 'device not linked'}, status=status.HTTP_400_BAD_REQUEST)
-            try:
-                notif = Notification.objects.get(uuid=notification_uuid, user_id=device.user_id)
-            except Notification.DoesNotExist:
-                return Response({'detail': 'not found'}, status=status.HTTP_404_NOT_FOUND)
-
-        notif.delivered = True
-        notif.delivered_at = timezone.now()
-        notif.save(update_fields=['delivered', 'delivered_at'])
+        user_id, erro = _usuario_da_confirmacao(request)
+        if erro:
+            return erro
+        atualizadas = Notification.objects.filter(uuid=notification_uuid, user_id=user_id).update(
+            delivered=True, delivered_at=timezone.now(),
+        )
+        if not atualizadas:
+            return Response({'detail': 'not found'}, status=status.HTTP_404_NOT_FOUND)
         return Response({'ok': True})
+
+
+class AcknowledgeBulkNotificationView(APIView):
+    """Confirma várias notificações num único UPDATE.
+
+    Corpo: ``{"uuids": [...]}`` ou ``{"until": "<created_at>"}``, que confirma
+    todas as pendentes criadas até essa marca (o ``created_at`` da última
+    notificação exibida). UUIDs de outros usuários ou já confirmados são
+    ignorados; a resposta traz quantas foram confirmadas.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request):
+        serializer = AcknowledgeBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user_id, erro = _usuario_da_confirmacao(request)
+        if erro:
+            return erro
+
+        filtros = serializer.validated_data
+        qs = Notification.objects.filter(user_id=user_id, delivered=False)
+        if 'uuids' in filtros:
+            qs = qs.filter(uuid__in=filtros['uuids'])
+        else:
+            qs = qs.filter(created_at__lte=filtros['until'])
+        confirmadas = qs.update(delivered=True, delivered_at=timezone.now())
+        return Response({'ok': True, 'acknowledged': confirmadas})
@@ -2,6 +2,10 @@ import uuid
 from django.db import models
 from apps.classificadores.models import Classificador
 
+# Canal de pg_notify avisando (chave CHAVE_PARCEIRO_ALTERADO, dados = cnpj) que um parceiro mudou
+CANAL_PARCEIROS = 'parceiros'
+CHAVE_PARCEIRO_ALTERADO = 'alterado'
+
 
 class Parceiro(models.Model):
     id = models.BigAutoField(primary_key=True, db_column='pcr_id')
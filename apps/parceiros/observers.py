@@ -1,6 +1,6 @@
-import re
 import logging
 
+from apps.core.cnpj import validar as validar_cnpj
 from apps.core.observers import Observer
 
 logger = logging.getLogger(__name__)
@@ -9,6 +9,9 @@ logger = logging.getLogger(__name__)
 class ValidacaoCNPJObserver(Observer):
     """Observer that validates CNPJ on parceiro create/update events."""
 
+    # Resultado vai só para o log; pode rodar depois do commit
+    delivery = 'async'
+
     def update(self, subject, event_type: str, **kwargs):
         if event_type == "parceiro_created_or_updated":
             parceiro = kwargs.get("parceiro")
@@ -17,33 +20,8 @@ class ValidacaoCNPJObserver(Observer):
 
     def _validar_cnpj(self, parceiro):
         cnpj = getattr(parceiro, "cnpj", "")
-        cnpj_digits = re.sub(r"\D", "", cnpj or "")
-
-        if len(cnpj_digits) != 14:
-            logger.error("CNPJ inválido para %s: %s", getattr(parceiro, "nome", "<sem nome>"), cnpj)
-            return
-
-        try:
-            valido = self._calcular_digito_verificador(cnpj_digits)
-        except Exception:
-            logger.exception("Erro ao validar CNPJ para %s", getattr(parceiro, "nome", "<sem nome>"))
-            return
 
-        if valido:
+        if validar_cnpj(cnpj):
             logger.info("CNPJ válido para %s", getattr(parceiro, "nome", "<sem nome>"))
         else:
             logger.error("CNPJ inválido para %s: %s", getattr(parceiro, "nome", "<sem nome>"), cnpj)
-
-    def _calcular_digito_verificador(self, cnpj: str) -> bool:
-        def calcular_digito(cnpj_base, pesos):
-            soma = sum(int(cnpj_base[i]) * pesos[i] for i in range(len(pesos)))
-            resto = soma % 11
-            return 0 if resto < 2 else 11 - resto
-
-        pesos1 = [5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]
-        pesos2 = [6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]
-
-        digito1 = calcular_digito(cnpj[:12], pesos1)
-        digito2 = calcular_digito(cnpj[:13], pesos2)
-
-        return cnpj[12:14] == f"{digito1}{digito2}"
@@ -1,19 +1,129 @@
-from apps.parceiros.models import Parceiro
+import uuid
+from typing import Iterable, List, Tuple
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from apps.core.cache_local import AUSENTE, CacheLocal, avisar_alteracao
+from apps.core.pubsub import pubsub
+from apps.parceiros.models import CANAL_PARCEIROS, CHAVE_PARCEIRO_ALTERADO, Parceiro
+
+_COLUNAS = 'pcr_id, pcr_uuid, pcr_nome, pcr_cnpj, clf_id_tipo'
+
+# Só reescreve a linha quando nome ou tipo mudam: o parceiro de toda nota de um
+# fornecedor frequente não gera UPDATE (nem trava a linha) a cada processamento
+_ATUALIZAR_SE_MUDOU = """
+    ON CONFLICT (pcr_cnpj) DO UPDATE SET
+        pcr_nome = EXCLUDED.pcr_nome,
+        clf_id_tipo = EXCLUDED.clf_id_tipo
+    WHERE (cadastro_parceiros.pcr_nome, cadastro_parceiros.clf_id_tipo)
+        IS DISTINCT FROM (EXCLUDED.pcr_nome, EXCLUDED.clf_id_tipo)
+"""
+
+_UPSERT = f"""
+    WITH gravado AS (
+        INSERT INTO cadastro_parceiros (pcr_uuid, pcr_nome, pcr_cnpj, clf_id_tipo)
+        VALUES (%(uuid)s, %(nome)s, %(cnpj)s, %(clf_tipo)s)
+        {_ATUALIZAR_SE_MUDOU}
+        RETURNING {_COLUNAS}
+    )
+    -- Linha gravada: o aviso aos outros processos sai na mesma instrução (entregue no commit)
+    SELECT {_COLUNAS}, true FROM gravado,
+        LATERAL (SELECT pg_notify(%(canal)s, %(chave_aviso)s || ':' || pcr_cnpj)) AS aviso
+    UNION ALL
+    SELECT {_COLUNAS}, false FROM cadastro_parceiros
+    WHERE pcr_cnpj = %(cnpj)s AND NOT EXISTS (SELECT 1 FROM gravado)
+"""
+
+_UPSERT_LOTE = f"""
+    WITH entrada AS (
+        SELECT * FROM unnest(%(cnpjs)s::varchar[], %(nomes)s::varchar[], %(tipos)s::bigint[])
+            WITH ORDINALITY AS e(cnpj, nome, clf_tipo, ordem)
+    ),
+    unicos AS (
+        -- ON CONFLICT não aceita a mesma chave duas vezes no comando: vale a última ocorrência
+        SELECT DISTINCT ON (cnpj) cnpj, nome, clf_tipo FROM entrada ORDER BY cnpj, ordem DESC
+    ),
+    gravados AS (
+        INSERT INTO cadastro_parceiros (pcr_uuid, pcr_nome, pcr_cnpj, clf_id_tipo)
+        -- Ordem fixa por CNPJ: dois lotes concorrentes travam as linhas na mesma ordem (sem deadlock)
+        SELECT gen_random_uuid(), nome, cnpj, clf_tipo FROM unicos ORDER BY cnpj
+        {_ATUALIZAR_SE_MUDOU}
+        RETURNING pcr_id, pcr_cnpj
+    )
+    SELECT e.cnpj, COALESCE(g.pcr_id, p.pcr_id), g.pcr_id IS NOT NULL
+    FROM entrada e
+    LEFT JOIN gravados g ON g.pcr_cnpj = e.cnpj
+    LEFT JOIN cadastro_parceiros p ON p.pcr_cnpj = e.cnpj
+    ORDER BY e.ordem
+"""
+
+# cnpj -> Parceiro já gravado, por processo: o fornecedor frequente não vai ao banco a cada nota
+_parceiros = CacheLocal(
+    'parceiro', CANAL_PARCEIROS, CHAVE_PARCEIRO_ALTERADO,
+    maxsize=settings.CNPJ_CACHE_SIZE, ttl=settings.CNPJ_CACHE_TTL,
+)
+
 
 class ParceiroRepository:
-    def get_or_create(self, cnpj: str, nome: str, clf_tipo) -> Parceiro:
-        parceiro, created = Parceiro.objects.get_or_create(
-            cnpj=cnpj,
-            defaults={'nome': nome, 'clf_tipo': clf_tipo}
-        )
-        if not created:
-            update_fields = []
-            if parceiro.nome != nome:
-                parceiro.nome = nome
-                update_fields.append('nome')
-            if parceiro.clf_tipo_id != clf_tipo.id:
-                parceiro.clf_tipo = clf_tipo
-                update_fields.append('clf_tipo')
-            if update_fields:
-                parceiro.save(update_fields=update_fields)
-        return parceiro
\ No newline at end of file
+    def upsert(self, cnpj: str, nome: str, clf_tipo) -> Parceiro:
+        """Cria o parceiro ou atualiza nome/tipo, numa única instrução (sem corrida entre workers).
+
+        Se o parceiro em cache já tem o nome e o tipo pedidos, não há o que gravar: nenhuma consulta.
+        """
+        clf_tipo_id = getattr(clf_tipo, 'pk', clf_tipo)
+        parceiro = _parceiros.get(cnpj)
+        if parceiro is not AUSENTE and (parceiro.nome, parceiro.clf_tipo_id) == (nome, clf_tipo_id):
+            return parceiro
+
+        geracao = _parceiros.geracao
+        params = {
+            'uuid': uuid.uuid4(), 'nome': nome, 'cnpj': cnpj, 'clf_tipo': clf_tipo_id,
+            'canal': CANAL_PARCEIROS, 'chave_aviso': CHAVE_PARCEIRO_ALTERADO,
+        }
+        with connection.cursor() as cursor:
+            cursor.execute(_UPSERT, params)
+            row = cursor.fetchone()
+            if row is None:
+                # Linha gravada por outra transação depois do início da instrução e já igual à pedida:
+                # o ON CONFLICT a vê, o snapshot da instrução não; uma nova leitura a encontra
+                cursor.execute(f"SELECT {_COLUNAS}, false FROM cadastro_parceiros WHERE pcr_cnpj = %s", [cnpj])
+                row = cursor.fetchone()
+        *row, gravado = row
+        parceiro = Parceiro.from_db(connection.alias, ['id', 'uuid', 'nome', 'cnpj', 'clf_tipo_id'], row)
+        if gravado:
+            # Este processo descarta a versão antiga no commit; a nova entra no cache na próxima leitura
+            transaction.on_commit(lambda: pubsub.publicar(CANAL_PARCEIROS, CHAVE_PARCEIRO_ALTERADO, cnpj))
+        else:
+            _parceiros.guardar(cnpj, parceiro, geracao)
+        return parceiro
+
+    def upsert_em_lote(self, parceiros: Iterable[Tuple[str, str, object]], lote: int = 1000) -> List[int]:
+        """
+        Upsert de muitos ``(cnpj, nome, clf_tipo)`` (importações); retorna os ids na ordem da entrada.
+
+        Uma instrução por ``lote`` tuplas, todas na mesma transação. CNPJ repetido
+        na entrada grava a última ocorrência e devolve o mesmo id em todas.
+        """
+        parceiros = [(cnpj, nome, getattr(clf_tipo, 'pk', clf_tipo)) for cnpj, nome, clf_tipo in parceiros]
+        ids = []
+        gravou = False
+        with transaction.atomic(), connection.cursor() as cursor:
+            for inicio in range(0, len(parceiros), lote):
+                cnpjs, nomes, tipos = zip(*parceiros[inicio:inicio + lote])
+                cursor.execute(_UPSERT_LOTE, {'cnpjs': list(cnpjs), 'nomes': list(nomes), 'tipos': list(tipos)})
+                linhas = cursor.fetchall()
+                gravou = gravou or any(gravado for _, _, gravado in linhas)
+                faltantes = sorted({cnpj for cnpj, pcr_id, _ in linhas if pcr_id is None})
+                if faltantes:
+                    # Mesma corrida do upsert unitário: linhas concorrentes fora do snapshot da instrução
+                    cursor.execute(
+                        "SELECT pcr_cnpj, pcr_id FROM cadastro_parceiros WHERE pcr_cnpj = ANY(%s)", [faltantes]
+                    )
+                    encontrados = dict(cursor.fetchall())
+                    linhas = [(cnpj, pcr_id or encontrados[cnpj], gravado) for cnpj, pcr_id, gravado in linhas]
+                ids.extend(pcr_id for _, pcr_id, _ in linhas)
+            if gravou:
+                # Uma importação pode tocar milhares de CNPJs: um único aviso esvazia os caches
+                avisar_alteracao(CANAL_PARCEIROS, CHAVE_PARCEIRO_ALTERADO)
+        return ids
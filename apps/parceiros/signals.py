@@ -0,0 +1,15 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.core.cache_local import avisar_alteracao
+from .models import CANAL_PARCEIROS, CHAVE_PARCEIRO_ALTERADO, Parceiro
+
+
+@receiver(post_save, sender=Parceiro)
+@receiver(post_delete, sender=Parceiro)
+def avisar_parceiro_alterado(sender, instance, **kwargs):
+    """Descarta o parceiro do cache por CNPJ de todos os processos, após o commit.
+
+    O upsert de ``ParceiroRepository`` grava por SQL e avisa por conta própria.
+    """
+    avisar_alteracao(CANAL_PARCEIROS, CHAVE_PARCEIRO_ALTERADO, instance.cnpj)
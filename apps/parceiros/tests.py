@@ -0,0 +1,104 @@
+from django.db import transaction
+
+from apps.classificadores.models import Classificador
+from apps.core.cache_local import AUSENTE
+from apps.core.pubsub import pubsub
+from apps.core.tests import QueryBudgetMixin
+from apps.parceiros.models import CANAL_PARCEIROS, CHAVE_PARCEIRO_ALTERADO, Parceiro
+from apps.parceiros.repositories import ParceiroRepository, _parceiros
+from rest_framework.test import APITestCase
+
+
+class ParceiroRepositoryTestCase(QueryBudgetMixin, APITestCase):
+    """Upsert de parceiros por CNPJ com INSERT ... ON CONFLICT, unitário e em lote."""
+
+    def setUp(self):
+        clf = lambda codigo: Classificador.objects.get_or_create(
+            tipo='TIPO_PARCEIRO', codigo=codigo, defaults={'descricao': codigo}
+        )[0]
+        self.fornecedor = clf('FORNECEDOR')
+        self.cliente = clf('CLIENTE')
+        self.repository = ParceiroRepository()
+        # O cache sobrevive ao rollback do teste: não pode guardar linhas de outro teste
+        _parceiros.cache.clear()
+        self.addCleanup(_parceiros.cache.clear)
+
+    def test_upsert_cria_e_atualiza_em_uma_consulta(self):
+        with self.assertMaxQueries(1):
+            criado = self.repository.upsert('48.048.048/0001-48', 'Fornecedor Upsert', self.fornecedor)
+        self.assertEqual(Parceiro.objects.get(cnpj='48.048.048/0001-48').pk, criado.pk)
+        self.assertEqual(criado.clf_tipo_id, self.fornecedor.pk)
+
+        # Sem mudança: devolve a linha existente
+        with self.assertMaxQueries(1):
+            igual = self.repository.upsert('48.048.048/0001-48', 'Fornecedor Upsert', self.fornecedor)
+        self.assertEqual((igual.pk, igual.uuid), (criado.pk, criado.uuid))
+
+        alterado = self.repository.upsert('48.048.048/0001-48', 'Novo Nome', self.cliente)
+        self.assertEqual(alterado.pk, criado.pk)
+        parceiro = Parceiro.objects.get(pk=criado.pk)
+        self.assertEqual((parceiro.nome, parceiro.clf_tipo_id), ('Novo Nome', self.cliente.pk))
+
+    def test_upsert_em_lote_retorna_ids_na_ordem_da_entrada(self):
+        existente = Parceiro.objects.create(nome='Antigo', cnpj='48.048.048/0002-29', clf_tipo=self.fornecedor)
+        entrada = [
+            ('48.048.048/0003-00', 'Lote C', self.fornecedor),
+            ('48.048.048/0002-29', 'Antigo Renomeado', self.cliente),
+            ('48.048.048/0004-90', 'Lote D', self.fornecedor.pk),
+            ('48.048.048/0003-00', 'Lote C Final', self.cliente),
+        ]
+
+        ids = self.repository.upsert_em_lote(entrada, lote=2)
+
+        por_cnpj = dict(Parceiro.objects.filter(cnpj__startswith='48.048.048/').values_list('cnpj', 'id'))
+        self.assertEqual(ids, [por_cnpj[cnpj] for cnpj, _, _ in entrada])
+        self.assertEqual(ids[1], existente.pk)
+        existente.refresh_from_db()
+        self.assertEqual((existente.nome, existente.clf_tipo_id), ('Antigo Renomeado', self.cliente.pk))
+        # Na mesma instrução, a última ocorrência do CNPJ vale; em lotes distintos, o último lote
+        self.assertEqual(Parceiro.objects.get(cnpj='48.048.048/0003-00').nome, 'Lote C Final')
+        self.assertEqual(self.repository.upsert_em_lote([]), [])
+
+    def test_parceiro_em_cache_sem_consulta(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            criado = self.repository.upsert('48.048.048/0005-70', 'Fornecedor Cache', self.fornecedor)
+        # A gravação só avisa; a primeira leitura sem mudança entra no cache após o commit
+        with self.captureOnCommitCallbacks(execute=True):
+            self.repository.upsert('48.048.048/0005-70', 'Fornecedor Cache', self.fornecedor)
+
+        with self.assertMaxQueries(0):
+            primeiro = self.repository.upsert('48.048.048/0005-70', 'Fornecedor Cache', self.fornecedor)
+            segundo = self.repository.upsert('48.048.048/0005-70', 'Fornecedor Cache', self.fornecedor.pk)
+        self.assertEqual((primeiro.pk, primeiro.uuid), (criado.pk, criado.uuid))
+        self.assertIsNot(primeiro, segundo)
+
+        # Nome diferente do cache: grava e descarta a entrada
+        with self.captureOnCommitCallbacks(execute=True):
+            alterado = self.repository.upsert('48.048.048/0005-70', 'Fornecedor Renomeado', self.fornecedor)
+        self.assertEqual(alterado.nome, 'Fornecedor Renomeado')
+        self.assertIs(_parceiros.get('48.048.048/0005-70'), AUSENTE)
+
+    def test_aviso_de_outro_processo_invalida(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            parceiro = Parceiro.objects.create(nome='Externo', cnpj='48.048.048/0006-50', clf_tipo=self.fornecedor)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.repository.upsert('48.048.048/0006-50', 'Externo', self.fornecedor)
+
+        Parceiro.objects.filter(pk=parceiro.pk).update(nome='Alterado Fora')
+        pubsub.publicar(CANAL_PARCEIROS, CHAVE_PARCEIRO_ALTERADO, '48.048.048/0006-50')
+
+        with self.assertNumQueries(1):
+            self.repository.upsert('48.048.048/0006-50', 'Externo', self.fornecedor)
+        self.assertEqual(Parceiro.objects.get(pk=parceiro.pk).nome, 'Externo')
+
+    def test_transacao_desfeita_nao_entra_no_cache(self):
+        Parceiro.objects.create(nome='Rollback', cnpj='48.048.048/0007-31', clf_tipo=self.fornecedor)
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self.repository.upsert('48.048.048/0007-31', 'Rollback', self.fornecedor)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+
+        self.assertEqual(len(_parceiros.cache), 0)
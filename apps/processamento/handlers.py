@@ -1,14 +1,17 @@
 from django.utils import timezone
 import logging
 from .models import JobProcessamento
+from .publishers import JobStatusPublisher
 from apps.notas.orchestrators import NotaFiscalService
 from apps.classificadores.models import get_classifier
+from apps.core.timing import StageRecorder, stage
 
 logger = logging.getLogger(__name__)
 
 class ProcessamentoTaskHandler:
     def __init__(self):
         self.nota_fiscal_service = NotaFiscalService()
+        self.status_publisher = JobStatusPublisher()
 
     def handle(self, job_id: int):
         logger.info(f"CELERY: Iniciando processamento do job {job_id}")
@@ -20,14 +23,17 @@ class ProcessamentoTaskHandler:
             logger.error(f"CELERY: Job {job_id} não encontrado")
             raise
 
+        recorder = StageRecorder()
         try:
             logger.debug(f"CELERY: Atualizando status para PROCESSANDO")
             job.status = get_classifier('STATUS_JOB', 'PROCESSANDO')
             job.save(update_fields=['status'])
+            self.status_publisher.publish_status(job)
             logger.info(f"CELERY: Status atualizado para PROCESSANDO")
 
             logger.info(f"CELERY: Chamando serviço de processamento de nota fiscal")
-            self.nota_fiscal_service.processar_nota_fiscal_do_job(job)
+            with recorder.activate(), stage('total'):
+                self.nota_fiscal_service.processar_nota_fiscal_do_job(job)
             logger.info(f"CELERY: Processamento concluído com sucesso")
 
             logger.debug(f"CELERY: Atualizando status para CONCLUIDO")
@@ -41,5 +47,7 @@ class ProcessamentoTaskHandler:
             job.mensagem_erro = str(e)
         finally:
             job.dt_conclusao = timezone.now()
+            job.duracao_etapas = recorder.as_dict() or None
             job.save()
+            self.status_publisher.publish_status(job)
             logger.info(f"CELERY: Job {job_id} finalizado - Status: {job.status.descricao}")
\ No newline at end of file
@@ -0,0 +1,174 @@
+import asyncio
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.classificadores.models import get_classifier
+from apps.core.benchmark import consultas_executadas, elevar_limite_de_arquivos, servidor_asgi
+from apps.core.pubsub import pubsub
+from apps.empresa.models import MinhaEmpresa
+from apps.empresa.services import EmpresaAuthService
+from apps.processamento.models import JobProcessamento
+from apps.processamento.publishers import CANAL_JOBS, JobStatusPublisher
+
+# Empresa criada e removida pelo benchmark
+CNPJ_NUMERO = 99887766000155
+CNPJ = '99.887.766/0001-55'
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara as consultas ao banco por segundo de N clientes acompanhando jobs "
+        "pelo stream SSE (GET /api/jobs/stream/) e fazendo polling de GET /api/jobs/<uuid>/, com o "
+        "mesmo ciclo PENDENTE -> PROCESSANDO -> CONCLUIDO de jobs rodando em cada fase (e numa fase sem clientes). "
+        "Servidor uvicorn no próprio processo; cria e remove uma empresa e seus jobs de benchmark: "
+        "use apenas em banco de desenvolvimento."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--watchers', type=int, default=1000, help='Clientes simultâneos')
+        parser.add_argument('--jobs', type=int, default=30, help='Jobs processados durante cada fase')
+        parser.add_argument('--duracao', type=float, default=10, help='Segundos medidos em cada fase')
+        parser.add_argument('--intervalo-polling', type=float, default=2, help='Intervalo do polling por cliente')
+        parser.add_argument('--porta', type=int, default=8766)
+
+    def handle(self, *args, **options):
+        elevar_limite_de_arquivos(options['watchers'])
+        self._limpar()
+        empresa = MinhaEmpresa.objects.create(cnpj_numero=CNPJ_NUMERO, cnpj=CNPJ, nome='Empresa Benchmark Stream')
+        self.token = EmpresaAuthService().gerar_tokens_para_empresa(empresa)['access']
+        try:
+            with servidor_asgi(options['porta'], options['watchers']):
+                base = self._fase_base(options)
+                stream = asyncio.run(self._fase_stream(options))
+                polling = asyncio.run(self._fase_polling(options))
+        finally:
+            self._limpar()
+
+        self.stdout.write(f"\n{'modo':<12}{'consultas/s':>14}{'requisições':>14}{'eventos/atualizações':>22}")
+        for nome, fase in (('sem cliente', base), ('stream', stream), ('polling', polling)):
+            self.stdout.write(
+                f"{nome:<12}{fase['consultas'] / options['duracao']:>14.1f}"
+                f"{fase['requisicoes']:>14}{fase['eventos']:>22}"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            "Consultas incluem as gravações dos jobs (a linha 'sem cliente'); "
+            "no polling o servidor pode saturar antes do intervalo pedido."
+        ))
+
+    def _limpar(self):
+        JobProcessamento.objects.filter(empresa_id=CNPJ_NUMERO).delete()
+        MinhaEmpresa.objects.filter(pk=CNPJ_NUMERO).delete()
+
+    def _ciclo_de_jobs(self, n: int, duracao: float) -> list:
+        """Cria e conclui ``n`` jobs espaçados em ``duracao`` segundos, publicando cada transição."""
+        publisher = JobStatusPublisher()
+        status = {codigo: get_classifier('STATUS_JOB', codigo) for codigo in ('PENDENTE', 'PROCESSANDO', 'CONCLUIDO')}
+        uuids = []
+        for _ in range(n):
+            inicio = time.monotonic()
+            job = JobProcessamento.objects.create(empresa_id=CNPJ_NUMERO, status=status['PENDENTE'])
+            publisher.publish_status(job)
+            job.status = status['PROCESSANDO']
+            job.save(update_fields=['status'])
+            publisher.publish_status(job)
+            job.status = status['CONCLUIDO']
+            job.dt_conclusao = timezone.now()
+            job.save(update_fields=['status', 'dt_conclusao'])
+            publisher.publish_status(job)
+            uuids.append(str(job.uuid))
+            time.sleep(max(0.0, duracao / n - (time.monotonic() - inicio)))
+        return uuids
+
+    def _fase_base(self, options) -> dict:
+        """Só o ciclo de jobs, sem clientes: a carga que as outras fases têm em comum."""
+        antes = consultas_executadas()
+        self._ciclo_de_jobs(options['jobs'], options['duracao'])
+        return {'consultas': consultas_executadas() - antes, 'requisicoes': 0, 'eventos': 0}
+
+    async def _fase_stream(self, options) -> dict:
+        watchers, porta = options['watchers'], options['porta']
+        eventos = [0] * watchers
+
+        async def acompanhar(i):
+            leitor, escritor = await asyncio.open_connection('127.0.0.1', porta)
+            escritor.write(
+                f"GET /api/jobs/stream/ HTTP/1.1\r\nHost: localhost\r\n"
+                f"Authorization: Bearer {self.token}\r\nConnection: close\r\n\r\n".encode()
+            )
+            await escritor.drain()
+            try:
+                async for linha in leitor:
+                    if linha.startswith(b'event: job'):
+                        eventos[i] += 1
+            finally:
+                escritor.close()
+
+        tarefas = [asyncio.ensure_future(acompanhar(i)) for i in range(watchers)]
+        inicio = time.perf_counter()
+        while pubsub.assinantes(CANAL_JOBS) < watchers:
+            await asyncio.sleep(0.05)
+        self.stdout.write(f"stream: {watchers} clientes conectados em {time.perf_counter() - inicio:.1f}s")
+
+        antes = await asyncio.to_thread(consultas_executadas)
+        await asyncio.to_thread(self._ciclo_de_jobs, options['jobs'], options['duracao'])
+        consultas = await asyncio.to_thread(consultas_executadas) - antes
+
+        # Últimas transições ainda a caminho dos clientes
+        esperados = options['jobs'] * 3
+        limite = time.monotonic() + 10
+        while min(eventos) < esperados and time.monotonic() < limite:
+            await asyncio.sleep(0.1)
+        for tarefa in tarefas:
+            tarefa.cancel()
+        await asyncio.gather(*tarefas, return_exceptions=True)
+        self.stdout.write(
+            f"stream: {sum(1 for e in eventos if e >= esperados)}/{watchers} clientes receberam as {esperados} transições"
+        )
+        return {'consultas': consultas, 'requisicoes': watchers, 'eventos': sum(eventos)}
+
+    async def _fase_polling(self, options) -> dict:
+        watchers, porta, intervalo = options['watchers'], options['porta'], options['intervalo_polling']
+        # Todos acompanham um job recém-criado, como o app logo após o upload
+        job = await asyncio.to_thread(lambda: JobProcessamento.objects.create(
+            empresa_id=CNPJ_NUMERO, status=get_classifier('STATUS_JOB', 'PENDENTE'),
+        ))
+        contagem = {'requisicoes': 0, 'erros': 0}
+        ativo = True
+
+        async def consultar():
+            await asyncio.sleep(random.uniform(0, intervalo))
+            while ativo:
+                inicio = time.monotonic()
+                leitor, escritor = await asyncio.open_connection('127.0.0.1', porta)
+                escritor.write(
+                    f"GET /api/jobs/{job.uuid}/ HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n".encode()
+                )
+                await escritor.drain()
+                resposta = await leitor.read()
+                escritor.close()
+                contagem['requisicoes'] += 1
+                if not resposta.startswith(b'HTTP/1.1 200'):
+                    contagem['erros'] += 1
+                await asyncio.sleep(max(0.0, intervalo - (time.monotonic() - inicio)))
+
+        tarefas = [asyncio.ensure_future(consultar()) for _ in range(watchers)]
+        await asyncio.sleep(intervalo + 2)
+
+        contagem.update(requisicoes=0, erros=0)
+        antes = await asyncio.to_thread(consultas_executadas)
+        await asyncio.to_thread(self._ciclo_de_jobs, options['jobs'], options['duracao'])
+        consultas = await asyncio.to_thread(consultas_executadas) - antes
+        requisicoes, erros = contagem['requisicoes'], contagem['erros']
+
+        ativo = False
+        for tarefa in tarefas:
+            tarefa.cancel()
+        await asyncio.gather(*tarefas, return_exceptions=True)
+        self.stdout.write(
+            f"polling: {requisicoes} requisições em {options['duracao']:.0f}s "
+            f"({requisicoes / options['duracao']:.0f}/s; pedido: {watchers / intervalo:.0f}/s), {erros} com erro"
+        )
+        return {'consultas': consultas, 'requisicoes': requisicoes, 'eventos': requisicoes - erros}
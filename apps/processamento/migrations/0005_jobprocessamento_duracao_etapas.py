@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-19 18:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('processamento', '0004_alter_jobprocessamento_empresa'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobprocessamento',
+            name='duracao_etapas',
+            field=models.JSONField(blank=True, db_column='jbp_duracao_etapas', null=True),
+        ),
+    ]
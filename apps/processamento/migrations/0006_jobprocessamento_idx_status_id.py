@@ -0,0 +1,20 @@
+# Generated by Django 4.2 on 2026-10-19 18:13
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY não roda dentro de transação; não bloqueia escritas
+    atomic = False
+
+    dependencies = [
+        ('processamento', '0005_jobprocessamento_duracao_etapas'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='jobprocessamento',
+            index=models.Index(fields=['status', 'id'], name='idx_jbp_status_id'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2 on 2026-10-19 21:05
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY não roda dentro de transação; não bloqueia escritas
+    atomic = False
+
+    dependencies = [
+        ('empresa', '0002_remove_empresanaoclassificada_id_and_more'),
+        ('processamento', '0006_jobprocessamento_idx_status_id'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='jobprocessamento',
+            index=models.Index(fields=['empresa', 'status', 'id'], name='idx_jbp_emp_status_id'),
+        ),
+        AddIndexConcurrently(
+            model_name='jobprocessamento',
+            index=models.Index(fields=['empresa', 'id'], name='idx_jbp_emp_id'),
+        ),
+        # O índice simples da FK fica redundante com os dois acima
+        migrations.AlterField(
+            model_name='jobprocessamento',
+            name='empresa',
+            field=models.ForeignKey(blank=True, db_column='emp_cnpj_numero', db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='jobs', to='empresa.minhaempresa'),
+        ),
+    ]
@@ -1,7 +1,18 @@
 import uuid
 from django.db import models
+from django.db.models import OuterRef, Subquery
 from apps.empresa.models import MinhaEmpresa
 from apps.classificadores.models import Classificador
+from apps.core.tenancy import EmpresaQuerySet
+
+
+class JobProcessamentoQuerySet(EmpresaQuerySet):
+    def com_numero_nota(self):
+        """Anota ``numero_nota`` (primeira nota gerada pelo job) via subquery, sem N+1."""
+        from apps.notas.models import NotaFiscal
+
+        primeira_nota = NotaFiscal.objects.filter(job_origem=OuterRef('pk')).order_by('id').values('numero')[:1]
+        return self.annotate(numero_nota=Subquery(primeira_nota))
 
 
 class JobProcessamento(models.Model):
@@ -9,7 +20,8 @@ class JobProcessamento(models.Model):
     uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True, db_column='jbp_uuid')
     arquivo_original = models.FileField(upload_to='notas_fiscais_uploads/', db_column='jbp_arquivo_original')
     hash_arquivo = models.CharField(max_length=64, db_index=True, null=True, blank=True, db_column='jbp_hash_arquivo')
-    empresa = models.ForeignKey(MinhaEmpresa, on_delete=models.PROTECT, related_name='jobs', db_column='emp_cnpj_numero', null=True, blank=True)
+    # Sem índice próprio: é prefixo dos índices idx_jbp_emp_*
+    empresa = models.ForeignKey(MinhaEmpresa, on_delete=models.PROTECT, related_name='jobs', db_column='emp_cnpj_numero', null=True, blank=True, db_index=False)
     status = models.ForeignKey(Classificador, on_delete=models.PROTECT, related_name='jobs_status', db_column='clf_id_status')
     dt_criacao = models.DateTimeField(auto_now_add=True, db_column='jbp_dt_criacao')
     dt_alteracao = models.DateTimeField(auto_now=True, db_column='jbp_dt_alteracao')
@@ -17,9 +29,20 @@ class JobProcessamento(models.Model):
     usr_alteracao = models.IntegerField(null=True, blank=True, db_column='jbp_usr_alteracao')
     dt_conclusao = models.DateTimeField(null=True, blank=True, db_column='jbp_dt_conclusao')
     mensagem_erro = models.TextField(null=True, blank=True, db_column='jbp_mensagem_erro')
+    # Duração (ms) de cada etapa do pipeline, ex: {"llm_extracao": 8421.3, "persistencia": 35.2}
+    duracao_etapas = models.JSONField(null=True, blank=True, db_column='jbp_duracao_etapas')
+
+    objects = JobProcessamentoQuerySet.as_manager()
 
     class Meta:
         db_table = 'movimento_jobs_processamento'
+        indexes = [
+            # Listas por status paginadas por cursor em -id
+            models.Index(fields=['status', 'id'], name='idx_jbp_status_id'),
+            # Os mesmos (e a lista geral), com a empresa autenticada à frente
+            models.Index(fields=['empresa', 'status', 'id'], name='idx_jbp_emp_status_id'),
+            models.Index(fields=['empresa', 'id'], name='idx_jbp_emp_id'),
+        ]
 
     def __str__(self):
         return f"Job {self.id}"
@@ -1,5 +1,17 @@
 import abc
-from apps.processamento.tasks import processar_nota_fiscal_task
+import json
+import logging
+
+from apps.core.pubsub import notificar
+
+logger = logging.getLogger(__name__)
+
+# Canal de pg_notify das transições de status dos jobs (chave = CNPJ numérico da empresa)
+CANAL_JOBS = 'jobs_status'
+
+# NOTIFY aceita até 8000 bytes de payload
+_MENSAGEM_ERRO_MAX = 500
+
 
 class PublisherInterface(abc.ABC):
     @abc.abstractmethod
@@ -8,5 +20,34 @@ class PublisherInterface(abc.ABC):
 
 class CeleryTaskPublisher(PublisherInterface):
     def publish_processamento_nota(self, job_id: int):
+        # Import local: tasks -> handlers -> publishers (JobStatusPublisher)
+        from apps.processamento.tasks import processar_nota_fiscal_task
         processar_nota_fiscal_task.delay(job_id=job_id)
         print(f"Task para processar Job ID {job_id} enviada para a fila.")
+
+
+def evento_status(job) -> dict:
+    """Estado do job como enviado no stream (``status`` já carregado no job)."""
+    return {
+        'uuid': str(job.uuid),
+        'status': job.status.codigo if job.status_id else None,
+        'dt_conclusao': job.dt_conclusao.isoformat() if job.dt_conclusao else None,
+        'mensagem_erro': (job.mensagem_erro or '')[:_MENSAGEM_ERRO_MAX] or None,
+    }
+
+
+class JobStatusPublisher:
+    """Avisa quem acompanha a empresa (GET /api/jobs/stream/) de cada transição de status de um job.
+
+    O estado vai inteiro no payload do pg_notify: o stream repassa o evento sem
+    consultar o banco. Jobs sem empresa não são publicados. Falhas só são
+    registradas, para não interromper o processamento.
+    """
+
+    def publish_status(self, job):
+        if job.empresa_id is None:
+            return
+        try:
+            notificar(CANAL_JOBS, [job.empresa_id], json.dumps(evento_status(job)))
+        except Exception:
+            logger.exception("STREAM: falha ao publicar status do job %s", job.uuid)
@@ -0,0 +1,55 @@
+from datetime import datetime
+from django.db import connection
+
+
+def get_percentis_etapas(desde: datetime) -> list[dict]:
+    """Retorna p50/p95/p99 (ms) de cada etapa do pipeline para jobs concluídos desde `desde`."""
+    query = """
+        SELECT
+            etapa.key as etapa,
+            COUNT(*) as amostras,
+            AVG(etapa.value::float) as media_ms,
+            percentile_cont(0.50) WITHIN GROUP (ORDER BY etapa.value::float) as p50_ms,
+            percentile_cont(0.95) WITHIN GROUP (ORDER BY etapa.value::float) as p95_ms,
+            percentile_cont(0.99) WITHIN GROUP (ORDER BY etapa.value::float) as p99_ms,
+            MAX(etapa.value::float) as max_ms
+        FROM
+            movimento_jobs_processamento j,
+            jsonb_each_text(j.jbp_duracao_etapas) etapa
+        WHERE
+            j.jbp_duracao_etapas IS NOT NULL AND
+            j.jbp_dt_conclusao >= %s
+        GROUP BY
+            etapa.key
+        ORDER BY
+            p95_ms DESC;
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(query, [desde])
+        columns = [col[0] for col in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def get_resumo_fila() -> dict:
+    """Contagem de jobs por status e idade (s) do job PENDENTE mais antigo, numa única consulta."""
+    query = """
+        SELECT
+            status.clf_codigo as status,
+            COUNT(*) as total,
+            EXTRACT(EPOCH FROM NOW() - MIN(j.jbp_dt_criacao)) as idade_mais_antigo
+        FROM
+            movimento_jobs_processamento j
+            JOIN geral_classificadores status ON status.clf_id = j.clf_id_status
+        GROUP BY
+            status.clf_codigo;
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(query)
+        linhas = cursor.fetchall()
+
+    por_status = {status: total for status, total, _ in linhas}
+    lag_pendente = next((idade for status, _, idade in linhas if status == 'PENDENTE'), None)
+    return {
+        'por_status': por_status,
+        'lag_pendente_segundos': float(lag_pendente) if lag_pendente is not None else 0.0,
+    }
@@ -1,6 +1,5 @@
 from rest_framework import serializers
 from .models import JobProcessamento
-from apps.notas.models import NotaFiscal
 
 class UploadNotaFiscalSerializer(serializers.Serializer):
     arquivo = serializers.FileField()
@@ -17,9 +16,8 @@ class JobProcessamentoSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
     def get_numero_nota(self, obj):
-        # Usar o prefetch_related para evitar N+1 queries
-        notas = getattr(obj, 'notafiscal_set', None)
-        if notas:
-            nota = notas.first()
-            return nota.numero if nota else None
-        return None
+        # Listagens anotam numero_nota via JobProcessamento.objects.com_numero_nota()
+        if hasattr(obj, 'numero_nota'):
+            return obj.numero_nota
+        nota = obj.notafiscal_set.order_by('id').only('numero').first()
+        return nota.numero if nota else None
@@ -1,9 +1,11 @@
 import hashlib
 import logging
 from .models import JobProcessamento
-from .publishers import CeleryTaskPublisher
+from .publishers import CeleryTaskPublisher, JobStatusPublisher
 from .repositories import JobProcessamentoRepository
+from apps.core.cnpj import cnpj_para_numero, somente_digitos
 from apps.empresa.models import MinhaEmpresa
+from apps.empresa.repositories import EmpresaRepository
 from apps.classificadores.models import get_classifier
 from apps.notas.strategies.factory import ExtractionStrategyFactory
 from apps.parceiros.models import Parceiro
@@ -35,14 +37,6 @@ def calcular_hash_arquivo(arquivo):
     arquivo.seek(0)
     return sha256_hash.hexdigest()
 
-def cnpj_para_numero(cnpj_str):
-    """Converte CNPJ string para número inteiro."""
-    if not cnpj_str:
-        return None
-    # Remove pontos, barras e traços
-    cnpj_limpo = ''.join(filter(str.isdigit, cnpj_str))
-    return int(cnpj_limpo) if cnpj_limpo else None
-
 class ProcessamentoService:
     def criar_job_processamento(self, cnpj: str = None, arquivo=None) -> JobProcessamento:
         logger.info(f"PROCESSAMENTO: Iniciando criação de job - CNPJ: {cnpj}, Arquivo: {arquivo.name if arquivo else 'None'}")
@@ -54,7 +48,9 @@ class ProcessamentoService:
             logger.debug(f"PROCESSAMENTO: CNPJ convertido: {cnpj_numero}")
             if cnpj_numero:
                 try:
-                    empresa = MinhaEmpresa.get_by_cnpj(cnpj_numero)
+                    empresa = EmpresaRepository.find_minha_empresa_by_cnpj(cnpj_numero)
+                    if empresa is None:
+                        raise MinhaEmpresa.DoesNotExist()
                     logger.info(f"PROCESSAMENTO: Empresa encontrada: {empresa.nome} (ID: {empresa.pk})")
                 except MinhaEmpresa.DoesNotExist:
                     logger.warning(f"PROCESSAMENTO: Empresa com CNPJ {cnpj} não encontrada")
@@ -92,10 +88,10 @@ class ProcessamentoService:
             parceiro_cnpj_para_validar = None
             # Se o usuário forneceu o CNPJ da sua empresa, o parceiro é o outro CNPJ extraído
             if cnpj:
-                cnpj_limpo = ''.join(filter(str.isdigit, cnpj))
-                if remetente_cnpj and ''.join(filter(str.isdigit, remetente_cnpj)) == cnpj_limpo:
+                cnpj_limpo = somente_digitos(cnpj)
+                if remetente_cnpj and somente_digitos(remetente_cnpj) == cnpj_limpo:
                     parceiro_cnpj_para_validar = destinatario_cnpj
-                elif destinatario_cnpj and ''.join(filter(str.isdigit, destinatario_cnpj)) == cnpj_limpo:
+                elif destinatario_cnpj and somente_digitos(destinatario_cnpj) == cnpj_limpo:
                     parceiro_cnpj_para_validar = remetente_cnpj
                 else:
                     # Não conseguimos identificar parceiro com base no meu_cnpj; prefer remete
@@ -106,8 +102,8 @@ class ProcessamentoService:
 
             if numero_extraido and parceiro_cnpj_para_validar:
                 # Normalize digits-only for CNPJ and invoice number
-                parceiro_digits = ''.join(filter(str.isdigit, parceiro_cnpj_para_validar))
-                numero_digits = ''.join(filter(str.isdigit, str(numero_extraido)))
+                parceiro_digits = somente_digitos(parceiro_cnpj_para_validar)
+                numero_digits = somente_digitos(str(numero_extraido))
 
                 # Try to find parceiro by digits-only CNPJ using Replace annotations
                 parceiro = (
@@ -159,6 +155,7 @@ class ProcessamentoService:
             status=status_pendente,
         )
         logger.info(f"PROCESSAMENTO: Job criado com sucesso - UUID: {job.uuid}, ID: {job.id}")
+        JobStatusPublisher().publish_status(job)
 
         logger.debug(f"PROCESSAMENTO: Publicando tarefa Celery para job {job.id}")
         CeleryTaskPublisher().publish_processamento_nota(job_id=job.id)
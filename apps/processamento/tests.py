@@ -2,7 +2,11 @@
 Testes para o app processamento.
 Testa upload de notas fiscais e consulta de status de jobs.
 """
+import asyncio
 import io
+import json
+from unittest import mock
+from django.test import override_settings
 from django.urls import reverse
 from django.core.files.uploadedfile import SimpleUploadedFile
 from rest_framework import status
@@ -10,6 +14,16 @@ from rest_framework.test import APITestCase
 from apps.empresa.models import MinhaEmpresa
 from apps.processamento.models import JobProcessamento
 from apps.classificadores.models import Classificador, get_classifier
+from apps.core.queries import record_queries
+from apps.core.desconexao import CancelarAoDesconectar
+from apps.core.pubsub import pubsub
+from apps.core.tests import QueryBudgetMixin
+from apps.empresa.services import EmpresaAuthService
+from apps.notas.orchestrators import NotaFiscalService
+from apps.processamento.handlers import ProcessamentoTaskHandler
+from apps.processamento.publishers import CANAL_JOBS
+from apps.processamento.views import JobStatusStreamView
+from backend.authentication import EmpresaPrincipal
 
 
 class ProcessarNotaFiscalTestCase(APITestCase):
@@ -361,3 +375,307 @@ class JobStatusTestCaseREMOVIDO_OLD(APITestCase):
         # Tentar criar URL com UUID inválido deve lançar exceção
         with self.assertRaises(NoReverseMatch):
             url = reverse('job-status', kwargs={'uuid': 'uuid-invalido-123'})
+
+
+class JobMetricasEtapasTestCase(APITestCase):
+    """
+    Testes da instrumentação por etapa do pipeline.
+    Cada job concluído guarda a duração (ms) de suas etapas e o endpoint
+    agrega p50/p95/p99 por etapa.
+    """
+
+    def setUp(self):
+        self.status_concluido = Classificador.objects.get_or_create(
+            tipo='STATUS_JOB',
+            codigo='CONCLUIDO',
+            defaults={'descricao': 'Processamento concluído'}
+        )[0]
+
+    def _criar_job(self, duracao_etapas):
+        from django.utils import timezone
+        return JobProcessamento.objects.create(
+            status=self.status_concluido,
+            dt_conclusao=timezone.now(),
+            duracao_etapas=duracao_etapas,
+        )
+
+    def test_stage_acumula_duracao_no_recorder_ativo(self):
+        """Etapas repetidas são somadas e só o recorder ativo recebe a medição."""
+        from apps.core.timing import StageRecorder, stage
+
+        recorder = StageRecorder()
+        with stage('fora_do_job'):
+            pass
+        with recorder.activate():
+            with stage('llm_classificacao'):
+                pass
+            with stage('llm_classificacao'):
+                pass
+
+        duracoes = recorder.as_dict()
+        self.assertEqual(list(duracoes.keys()), ['llm_classificacao'])
+        self.assertGreaterEqual(duracoes['llm_classificacao'], 0)
+
+    def test_percentis_por_etapa(self):
+        """O endpoint retorna amostras e percentis de cada etapa registrada."""
+        for i in range(1, 101):
+            self._criar_job({'llm_extracao': float(i * 100), 'persistencia': 10.0})
+        self._criar_job(None)
+
+        response = self.client.get(reverse('jobs-metricas-etapas'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etapas = {e['etapa']: e for e in response.data['etapas']}
+        self.assertEqual(etapas['llm_extracao']['amostras'], 100)
+        self.assertAlmostEqual(etapas['llm_extracao']['p50_ms'], 5050.0, delta=1)
+        self.assertAlmostEqual(etapas['llm_extracao']['p95_ms'], 9505.0, delta=1)
+        self.assertAlmostEqual(etapas['llm_extracao']['p99_ms'], 9901.0, delta=1)
+        self.assertEqual(etapas['persistencia']['p99_ms'], 10.0)
+        # Ordenado pela etapa mais lenta (p95)
+        self.assertEqual(response.data['etapas'][0]['etapa'], 'llm_extracao')
+
+    def test_parametro_dias_invalido(self):
+        response = self.client.get(reverse('jobs-metricas-etapas'), {'dias': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class MetricsEndpointTestCase(APITestCase):
+    """Exposição Prometheus em /metrics: fila de jobs e latência/consultas por view."""
+
+    def test_metrics_expoe_fila_e_requisicoes(self):
+        from datetime import timedelta
+        from django.utils import timezone
+
+        status_pendente = Classificador.objects.get_or_create(
+            tipo='STATUS_JOB', codigo='PENDENTE', defaults={'descricao': 'Pendente'}
+        )[0]
+        job = JobProcessamento.objects.create(status=status_pendente)
+        # dt_criacao é auto_now_add: envelhece o job via update
+        JobProcessamento.objects.filter(pk=job.pk).update(dt_criacao=timezone.now() - timedelta(hours=2))
+
+        self.client.get(reverse('jobs-metricas-etapas'))
+        response = self.client.get(reverse('metrics'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        body = response.content.decode()
+        pendentes = JobProcessamento.objects.filter(status=status_pendente).count()
+        self.assertIn(f'gestao_jobs{{status="PENDENTE"}} {float(pendentes)}', body)
+        lag = next(
+            float(linha.split()[-1]) for linha in body.splitlines()
+            if linha.startswith('gestao_jobs_queue_lag_seconds ')
+        )
+        self.assertGreaterEqual(lag, 7000)
+        self.assertIn(
+            'gestao_http_request_duration_seconds_count{method="GET",status="200",view="jobs-metricas-etapas"}',
+            body,
+        )
+        self.assertIn('gestao_http_db_queries_count{view="jobs-metricas-etapas"}', body)
+        self.assertNotIn('view="metrics"', body)
+
+
+class JobListQueryBudgetTestCase(QueryBudgetMixin, APITestCase):
+    """Listagem de jobs: numero_nota anotado e paginação por cursor, sem N+1."""
+
+    def setUp(self):
+        from datetime import date
+        from apps.notas.models import NotaFiscal
+        from apps.parceiros.models import Parceiro
+
+        status_concluido = Classificador.objects.get_or_create(
+            tipo='STATUS_JOB', codigo='CONCLUIDO', defaults={'descricao': 'Concluído'}
+        )[0]
+        tipo_fornecedor = Classificador.objects.get_or_create(
+            tipo='TIPO_PARCEIRO', codigo='FORNECEDOR', defaults={'descricao': 'Fornecedor'}
+        )[0]
+        parceiro = Parceiro.objects.create(nome='Fornecedor Teste', cnpj='98.765.432/0001-10', clf_tipo=tipo_fornecedor)
+
+        empresa = MinhaEmpresa.objects.create(cnpj_numero=47547547000175, cnpj='47.547.547/0001-75', nome='Empresa Lista')
+        self.client.force_authenticate(user=EmpresaPrincipal(empresa))
+        jobs = JobProcessamento.objects.bulk_create(
+            JobProcessamento(empresa=empresa, status=status_concluido) for _ in range(200)
+        )
+        NotaFiscal.objects.bulk_create(
+            NotaFiscal(job_origem=job, parceiro=parceiro, numero=f'NF-{i}', data_emissao=date(2024, 1, 1), valor_total=10)
+            for i, job in enumerate(jobs)
+        )
+        self.ultimo_job = jobs[-1]
+
+    def _listar(self, page_size):
+        with record_queries() as queries:
+            response = self.client.get(reverse('jobs-concluidos'), {'page_size': page_size})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), page_size)
+        return response, queries.count
+
+    def test_quantidade_de_consultas_constante(self):
+        _, consultas_20 = self._listar(20)
+        _, consultas_200 = self._listar(200)
+        self.assertEqual(consultas_20, consultas_200)
+        with self.assertMaxQueries(1):
+            self.client.get(reverse('jobs-concluidos'), {'page_size': 200})
+
+    def test_numero_nota_e_cursor(self):
+        response, _ = self._listar(20)
+        primeiro = response.data['results'][0]
+        self.assertEqual(primeiro['uuid'], str(self.ultimo_job.uuid))
+        self.assertEqual(primeiro['numero_nota'], 'NF-199')
+        self.assertNotIn('count', response.data)
+        self.assertIn('cursor=', response.data['next'])
+
+        proxima = self.client.get(response.data['next'])
+        self.assertEqual(proxima.data['results'][0]['numero_nota'], 'NF-179')
+
+
+class JobEscopoPorEmpresaTestCase(APITestCase):
+    """Listas e detalhe de jobs restritos à empresa do JWT."""
+
+    def setUp(self):
+        concluido = get_classifier('STATUS_JOB', 'CONCLUIDO')
+        self.empresa = MinhaEmpresa.objects.create(cnpj_numero=46146146000101, cnpj='46.146.146/0001-01', nome='Empresa Jobs A')
+        outra = MinhaEmpresa.objects.create(cnpj_numero=46146146000202, cnpj='46.146.146/0002-02', nome='Empresa Jobs B')
+        self.job = JobProcessamento.objects.create(empresa=self.empresa, status=concluido)
+        self.job_outra = JobProcessamento.objects.create(empresa=outra, status=concluido)
+        token = EmpresaAuthService().gerar_tokens_para_empresa(self.empresa)['access']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_listas_trazem_so_jobs_da_empresa(self):
+        for nome in ('jobs-list', 'jobs-concluidos'):
+            response = self.client.get(reverse(nome), {'page_size': 200})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual([r['uuid'] for r in response.data['results']], [str(self.job.uuid)])
+
+    def test_job_de_outra_empresa_nao_encontrado(self):
+        response = self.client.get(reverse('job-status', kwargs={'uuid': self.job_outra.uuid}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(reverse('job-status', kwargs={'uuid': self.job.uuid}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def _upload(self, **data):
+        arquivo = SimpleUploadedFile('nota_escopo.pdf', b'conteudo da nota do escopo', content_type='application/pdf')
+        # Sem pré-extração (LLM) nem fila: só a criação do job
+        sem_dados = mock.Mock(**{'extract.return_value': None})
+        with mock.patch('apps.processamento.services.ExtractionStrategyFactory.create_strategy', return_value=sem_dados), \
+                mock.patch('apps.processamento.services.CeleryTaskPublisher'):
+            return self.client.post(reverse('processar-nota'), {'arquivo': arquivo, **data}, format='multipart')
+
+    def test_upload_cria_job_da_empresa_autenticada(self):
+        for data in ({}, {'meu_cnpj': '46.146.146/0001-01'}):
+            response = self._upload(**data)
+
+            self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+            self.assertEqual(JobProcessamento.objects.get(uuid=response.data['uuid']).empresa, self.empresa)
+            # O status do job recém-criado é visível para a mesma empresa
+            status_job = self.client.get(reverse('job-status', kwargs={'uuid': response.data['uuid']}))
+            self.assertEqual(status_job.status_code, status.HTTP_200_OK)
+
+    def test_upload_com_cnpj_de_outra_empresa_e_rejeitado(self):
+        jobs = JobProcessamento.objects.count()
+
+        response = self._upload(meu_cnpj='46.146.146/0002-02')
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(JobProcessamento.objects.count(), jobs)
+
+    def test_upload_sem_empresa_autenticada(self):
+        self.client.credentials()
+
+        response = self._upload(meu_cnpj='46.146.146/0001-01')
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+# Consultas na thread do teste (transação do TestCase); heartbeat curto para os testes não esperarem
+@override_settings(PUBSUB_LISTEN_ENABLED=False, LONG_POLL_DB_THREADS=0, SSE_HEARTBEAT=0.05)
+class JobStatusStreamTestCase(APITestCase):
+    """Stream SSE de status dos jobs por empresa, alimentado pelo ProcessamentoTaskHandler via pg_notify."""
+
+    def setUp(self):
+        for codigo in ('PENDENTE', 'PROCESSANDO', 'CONCLUIDO', 'ERRO'):
+            Classificador.objects.get_or_create(tipo='STATUS_JOB', codigo=codigo, defaults={'descricao': codigo})
+        self.empresa = MinhaEmpresa.objects.create(
+            cnpj_numero=71982364000105, cnpj='71.982.364/0001-05', nome='Empresa Stream'
+        )
+        self.job = JobProcessamento.objects.create(empresa=self.empresa, status=get_classifier('STATUS_JOB', 'PENDENTE'))
+        self.token = EmpresaAuthService().gerar_tokens_para_empresa(self.empresa)['access']
+        self.url = reverse('jobs-stream')
+
+    async def _proximo_evento(self, eventos):
+        while True:
+            bloco = (await anext(eventos)).decode()
+            if not bloco.startswith(':'):
+                return bloco
+
+    async def test_sem_credenciais(self):
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_estado_inicial_e_transicoes(self):
+        response = await self.async_client.get(self.url, headers={'Authorization': f'Bearer {self.token}'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        eventos = aiter(response.streaming_content)
+
+        self.assertTrue((await self._proximo_evento(eventos)).startswith('retry:'))
+        inicial = await self._proximo_evento(eventos)
+        self.assertIn(str(self.job.uuid), inicial)
+        self.assertIn('"PENDENTE"', inicial)
+
+        transicao = json.dumps({'uuid': str(self.job.uuid), 'status': 'CONCLUIDO'})
+        self.assertEqual(pubsub.publicar(CANAL_JOBS, self.empresa.pk, transicao), 1)
+        self.assertEqual(await self._proximo_evento(eventos), f"event: job\ndata: {transicao}\n\n")
+
+        await eventos.aclose()
+
+    @override_settings(SSE_MAX_DURATION=0.1)
+    async def test_stream_termina_apos_duracao_maxima(self):
+        response = await self.async_client.get(self.url, headers={'Authorization': f'Bearer {self.token}'})
+        blocos = [bloco async for bloco in response.streaming_content]
+        self.assertIn(b': ping\n\n', blocos)
+        self.assertEqual(pubsub.assinantes(CANAL_JOBS), 0)
+
+    async def test_desconexao_do_cliente_encerra_o_stream(self):
+        async def app(scope, receive, send):
+            async for bloco in JobStatusStreamView()._eventos(self.empresa.pk):
+                await send({'type': 'http.response.body', 'body': bloco.encode(), 'more_body': True})
+
+        pedido = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+        desconectar = asyncio.Event()
+
+        async def receive():
+            if pedido:
+                return pedido.pop()
+            await desconectar.wait()
+            return {'type': 'http.disconnect'}
+
+        enviados = asyncio.Queue()
+
+        async def send(mensagem):
+            await enviados.put(mensagem['body'])
+
+        # SSE_MAX_DURATION padrão (minutos): sem o cancelamento, a tarefa não terminaria
+        tarefa = asyncio.ensure_future(CancelarAoDesconectar(app)({'type': 'http', 'method': 'GET'}, receive, send))
+        self.assertTrue((await asyncio.wait_for(enviados.get(), 1)).startswith(b'retry:'))
+        self.assertEqual(pubsub.assinantes(CANAL_JOBS), 1)
+
+        desconectar.set()
+        await asyncio.wait_for(tarefa, 1)
+        self.assertEqual(pubsub.assinantes(CANAL_JOBS), 0)
+
+    def _transicoes_publicadas(self, notificar):
+        for chamada in notificar.call_args_list:
+            canal, chaves, dados = chamada.args
+            self.assertEqual((canal, chaves), (CANAL_JOBS, [self.empresa.pk]))
+        return [json.loads(c.args[2])['status'] for c in notificar.call_args_list]
+
+    @mock.patch('apps.processamento.publishers.notificar')
+    def test_handler_publica_transicoes(self, notificar):
+        with mock.patch.object(NotaFiscalService, 'processar_nota_fiscal_do_job'):
+            ProcessamentoTaskHandler().handle(self.job.id)
+        self.assertEqual(self._transicoes_publicadas(notificar), ['PROCESSANDO', 'CONCLUIDO'])
+
+    @mock.patch('apps.processamento.publishers.notificar')
+    def test_handler_publica_erro(self, notificar):
+        with mock.patch.object(NotaFiscalService, 'processar_nota_fiscal_do_job', side_effect=ValueError('XML inválido')):
+            ProcessamentoTaskHandler().handle(self.job.id)
+        self.assertEqual(self._transicoes_publicadas(notificar), ['PROCESSANDO', 'ERRO'])
+        self.assertEqual(json.loads(notificar.call_args.args[2])['mensagem_erro'], 'XML inválido')
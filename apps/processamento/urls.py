@@ -1,6 +1,7 @@
 from django.urls import path
 from .views import ProcessarNotaFiscalView, JobStatusView
 from .views import JobListView, JobPendentesView, JobConcluidosView, JobErrosView
+from .views import JobMetricasEtapasView, JobStatusStreamView
 
 urlpatterns = [
     path('processar-nota/', ProcessarNotaFiscalView.as_view(), name='processar-nota'),
@@ -8,5 +9,7 @@ urlpatterns = [
     path('jobs/pendentes/', JobPendentesView.as_view(), name='jobs-pendentes'),
     path('jobs/concluidos/', JobConcluidosView.as_view(), name='jobs-concluidos'),
     path('jobs/erros/', JobErrosView.as_view(), name='jobs-erros'),
+    path('jobs/stream/', JobStatusStreamView.as_view(), name='jobs-stream'),
+    path('jobs/metricas-etapas/', JobMetricasEtapasView.as_view(), name='jobs-metricas-etapas'),
     path('jobs/<uuid:uuid>/', JobStatusView.as_view(), name='job-status'),
 ]
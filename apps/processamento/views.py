@@ -1,16 +1,37 @@
+import json
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
 from rest_framework import generics, views, status
+from rest_framework.exceptions import AuthenticationFailed, PermissionDenied
 from rest_framework.response import Response
+from django.utils import timezone
 import logging
 from .models import JobProcessamento
 from .serializers import UploadNotaFiscalSerializer, JobProcessamentoSerializer
 from .services import ProcessamentoService, DuplicateInvoiceError
 from .models import JobProcessamento
 from apps.classificadores.models import get_classifier
+from .publishers import CANAL_JOBS, JobStatusPublisher, evento_status
 from .tasks import processar_nota_fiscal_task
+from . import selectors
+from apps.core.async_db import consultar
+from apps.core.pubsub import pubsub
+from apps.core.cnpj import cnpj_para_numero
+from apps.core.tenancy import EmpresaScopedMixin, empresa_da_requisicao
+from backend.authentication import EmpresaJWTAuthentication
 
 logger = logging.getLogger(__name__)
 
 class ProcessarNotaFiscalView(views.APIView):
+    """
+    Recebe o arquivo da nota e cria o job de processamento da empresa autenticada.
+
+    A empresa do job vem do token de empresa (401 sem ele); ``meu_cnpj``, se
+    enviado, precisa ser o da empresa autenticada (403 caso contrário).
+    """
     serializer_class = UploadNotaFiscalSerializer
     permission_classes = []  # Temporário para teste
 
@@ -19,6 +40,12 @@ class ProcessarNotaFiscalView(views.APIView):
         logger.debug(f"API: Headers: {dict(request.headers)}")
         logger.debug(f"API: Data keys: {list(request.data.keys()) if hasattr(request.data, 'keys') else 'No data'}")
 
+        empresa = empresa_da_requisicao(request)
+        if empresa is None:
+            return Response(
+                {'detail': 'Credenciais de autenticação não foram fornecidas.'}, status=status.HTTP_401_UNAUTHORIZED,
+            )
+
         serializer = self.serializer_class(data=request.data)
         try:
             serializer.is_valid(raise_exception=True)
@@ -29,11 +56,16 @@ class ProcessarNotaFiscalView(views.APIView):
             logger.error(f"API: Erro na validação dos dados: {str(e)}")
             raise
 
+        meu_cnpj = validated_data.get('meu_cnpj')
+        if meu_cnpj and cnpj_para_numero(meu_cnpj) != empresa.cnpj_numero:
+            logger.warning("API: meu_cnpj diferente da empresa autenticada (%s)", empresa.cnpj_numero)
+            raise PermissionDenied("meu_cnpj não corresponde à empresa autenticada.")
+
         service = ProcessamentoService()
         try:
             logger.info("API: Chamando serviço de processamento")
             job = service.criar_job_processamento(
-                cnpj=validated_data.get('meu_cnpj'),
+                cnpj=empresa.cnpj,
                 arquivo=validated_data['arquivo']
             )
             logger.info(f"API: Job criado com sucesso - UUID: {job.uuid}")
@@ -58,11 +90,11 @@ class ProcessarNotaFiscalView(views.APIView):
             return Response({"detail": "Erro interno do servidor"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class JobStatusView(generics.RetrieveDestroyAPIView):
+class JobStatusView(EmpresaScopedMixin, generics.RetrieveDestroyAPIView):
     """
     Recupera o status do job (GET) e permite remoção do job (DELETE).
     """
-    queryset = JobProcessamento.objects.all()
+    queryset = JobProcessamento.objects.select_related('status').com_numero_nota()
     serializer_class = JobProcessamentoSerializer
     lookup_field = 'uuid'
     permission_classes = []  # Temporário para teste
@@ -107,6 +139,7 @@ class JobStatusView(generics.RetrieveDestroyAPIView):
         instance.mensagem_erro = None
         instance.dt_conclusao = None
         instance.save(update_fields=['status', 'mensagem_erro', 'dt_conclusao'])
+        JobStatusPublisher().publish_status(instance)
 
         try:
             processar_nota_fiscal_task.delay(instance.id)
@@ -117,35 +150,126 @@ class JobStatusView(generics.RetrieveDestroyAPIView):
         return Response({'uuid': str(instance.uuid), 'status': {'codigo': instance.status.codigo, 'descricao': instance.status.descricao}}, status=status.HTTP_202_ACCEPTED)
 
 
-class JobPendentesView(generics.ListAPIView):
+class JobPendentesView(EmpresaScopedMixin, generics.ListAPIView):
     """Lista jobs pendentes (GET /api/jobs/pendentes/)."""
     serializer_class = JobProcessamentoSerializer
     permission_classes = []  # Temporário para teste
 
     def get_queryset(self):
-        return JobProcessamento.objects.filter(status__codigo='PENDENTE').order_by('-id').select_related('status').prefetch_related('notafiscal_set')
+        return JobProcessamento.objects.filter(status__codigo='PENDENTE').select_related('status').com_numero_nota()
 
 
-class JobConcluidosView(generics.ListAPIView):
+class JobConcluidosView(EmpresaScopedMixin, generics.ListAPIView):
     """Lista jobs concluídos (GET /api/jobs/concluidos/)."""
     serializer_class = JobProcessamentoSerializer
     permission_classes = []  # Temporário para teste
 
     def get_queryset(self):
-        return JobProcessamento.objects.filter(status__codigo='CONCLUIDO').order_by('-id').select_related('status').prefetch_related('notafiscal_set')
+        return JobProcessamento.objects.filter(status__codigo='CONCLUIDO').select_related('status').com_numero_nota()
 
 
-class JobErrosView(generics.ListAPIView):
+class JobErrosView(EmpresaScopedMixin, generics.ListAPIView):
     """Lista jobs com erro (GET /api/jobs/erros/)."""
     serializer_class = JobProcessamentoSerializer
     permission_classes = []  # Temporário para teste
 
     def get_queryset(self):
-        return JobProcessamento.objects.filter(status__codigo='ERRO').order_by('-id').select_related('status').prefetch_related('notafiscal_set')
+        return JobProcessamento.objects.filter(status__codigo='ERRO').select_related('status').com_numero_nota()
 
 
-class JobListView(generics.ListAPIView):
+class JobListView(EmpresaScopedMixin, generics.ListAPIView):
     """Lista jobs para exibição em filas (GET /api/jobs/)."""
-    queryset = JobProcessamento.objects.all().order_by('-id').select_related('status').prefetch_related('notafiscal_set')
+    queryset = JobProcessamento.objects.select_related('status').com_numero_nota()
     serializer_class = JobProcessamentoSerializer
-    permission_classes = []  # Temporário para teste
\ No newline at end of file
+    permission_classes = []  # Temporário para teste
+
+
+class JobMetricasEtapasView(views.APIView):
+    """Percentis de duração por etapa do pipeline (GET /api/jobs/metricas-etapas/).
+
+    Query params:
+      - dias (int, padrão 7): janela de jobs concluídos considerada
+    """
+    permission_classes = []  # Temporário para teste
+
+    def get(self, request, *args, **kwargs):
+        try:
+            dias = int(request.query_params.get('dias', 7))
+        except (TypeError, ValueError):
+            return Response({"detail": "Parâmetros inválidos"}, status=status.HTTP_400_BAD_REQUEST)
+
+        desde = timezone.now() - timedelta(days=dias)
+        etapas = []
+        for row in selectors.get_percentis_etapas(desde):
+            etapas.append({
+                'etapa': row['etapa'],
+                'amostras': row['amostras'],
+                'media_ms': round(row['media_ms'], 1),
+                'p50_ms': round(row['p50_ms'], 1),
+                'p95_ms': round(row['p95_ms'], 1),
+                'p99_ms': round(row['p99_ms'], 1),
+                'max_ms': round(row['max_ms'], 1),
+            })
+
+        return Response({'dias': dias, 'etapas': etapas}, status=status.HTTP_200_OK)
+
+
+def _jobs_em_andamento(empresa_id) -> list:
+    return [
+        evento_status(job)
+        for job in JobProcessamento.objects.filter(
+            empresa_id=empresa_id, status__codigo__in=['PENDENTE', 'PROCESSANDO'],
+        ).select_related('status').order_by('dt_criacao')
+    ]
+
+
+def _sse(dados: str, evento: str = 'job') -> str:
+    return f"event: {evento}\ndata: {dados}\n\n"
+
+
+class JobStatusStreamView(View):
+    """Stream (Server-Sent Events) das transições de status dos jobs da empresa (GET /api/jobs/stream/).
+
+    Autenticado pelo JWT da empresa (``Authorization: Bearer``). Ao conectar envia
+    os jobs PENDENTE/PROCESSANDO (uma consulta) e depois repassa cada transição
+    publicada pelo JobStatusPublisher via pg_notify, sem consultar o banco.
+    Um comentário a cada SSE_HEARTBEAT segundos mantém proxies abertos; após
+    SSE_MAX_DURATION segundos o stream termina e o cliente reconecta (``retry``).
+    Se o cliente desconectar antes, ``CancelarAoDesconectar`` (backend/asgi.py)
+    cancela o stream e a assinatura é liberada na hora.
+    """
+
+    async def get(self, request):
+        try:
+            autenticado = await consultar(EmpresaJWTAuthentication().authenticate, request)
+        except AuthenticationFailed as e:
+            return JsonResponse({'detail': str(e.detail)}, status=status.HTTP_401_UNAUTHORIZED)
+        if not autenticado:
+            return JsonResponse(
+                {'detail': 'Credenciais de autenticação não foram fornecidas.'}, status=status.HTTP_401_UNAUTHORIZED,
+            )
+
+        response = StreamingHttpResponse(self._eventos(autenticado[0].empresa.pk), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # nginx: não acumular o stream em buffer
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def _eventos(self, empresa_id):
+        # Assina antes do estado inicial: uma transição entre os dois não se perde
+        with pubsub.assinatura(CANAL_JOBS, empresa_id) as assinatura:
+            yield f"retry: {settings.SSE_RETRY_MS}\n\n"
+            for evento in await consultar(_jobs_em_andamento, empresa_id):
+                yield _sse(json.dumps(evento))
+
+            limite = time.monotonic() + settings.SSE_MAX_DURATION
+            while (restante := limite - time.monotonic()) > 0:
+                dados = await assinatura.aguardar(min(settings.SSE_HEARTBEAT, restante))
+                if dados is None:
+                    yield ": ping\n\n"
+                elif dados:
+                    yield _sse(dados)
+                else:
+                    # Listener reconectou: transições podem ter se perdido, reenvia o estado
+                    for evento in await consultar(_jobs_em_andamento, empresa_id):
+                        yield _sse(json.dumps(evento))
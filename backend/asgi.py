@@ -1,6 +1,8 @@
 import os
 from django.core.asgi import get_asgi_application
+from apps.core.desconexao import CancelarAoDesconectar
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
-application = get_asgi_application()
+# Streams (SSE) e long-polls terminam quando o cliente desconecta, não só no fim da janela
+application = CancelarAoDesconectar(get_asgi_application())
@@ -1,3 +1,6 @@
+import copy
+import time
+from functools import lru_cache
 from typing import Optional, Tuple
 from django.utils.translation import gettext_lazy as _
 from rest_framework.authentication import BaseAuthentication, get_authorization_header
@@ -5,7 +8,10 @@ from rest_framework import exceptions
 from rest_framework.request import Request
 from rest_framework_simplejwt.backends import TokenBackend
 from django.conf import settings
-from apps.empresa.models import MinhaEmpresa
+from apps.core.lru import LRUCache
+from apps.core.metrics import record_cache
+from apps.core.pubsub import pubsub
+from apps.empresa.models import CANAL_EMPRESAS, CHAVE_EMPRESA_ALTERADA, MinhaEmpresa
 
 
 class EmpresaPrincipal:
@@ -23,6 +29,37 @@ class EmpresaPrincipal:
         return self.empresa
 
 
+# token -> empresa autenticada (None = token válido sem claims de empresa, ex.: JWT de usuário).
+# Entradas expiram no 'exp' do token ou em AUTH_PRINCIPAL_CACHE_TTL; alterar/excluir a empresa
+# (apps/empresa/signals.py) as descarta em todos os processos.
+_principais = LRUCache(maxsize=settings.AUTH_PRINCIPAL_CACHE_SIZE)
+_AUSENTE = object()
+_invalidacoes = None
+
+
+@lru_cache(maxsize=4)
+def _token_backend(signing_key: str) -> TokenBackend:
+    return TokenBackend(algorithm='HS256', signing_key=signing_key)
+
+
+def invalidar_empresa(dados: str):
+    """Callback do pub/sub: ``dados`` é o cnpj_numero alterado; vazio (reconexão do listener) limpa tudo."""
+    if not dados:
+        _principais.clear()
+        return
+    cnpj_numero = int(dados)
+    _principais.descartar_se(lambda empresa: empresa is not None and empresa.pk == cnpj_numero)
+
+
+def _escutar_invalidacoes():
+    global _invalidacoes
+    if _invalidacoes is None:
+        _invalidacoes = pubsub.assinar_callback(CANAL_EMPRESAS, CHAVE_EMPRESA_ALTERADA, invalidar_empresa)
+    elif pubsub.listener is not None:
+        # Após um fork o processo filho precisa do próprio listener
+        pubsub.listener.escutar(CANAL_EMPRESAS)
+
+
 class EmpresaJWTAuthentication(BaseAuthentication):
     keyword = 'Bearer'
 
@@ -37,22 +74,38 @@ class EmpresaJWTAuthentication(BaseAuthentication):
             raise exceptions.AuthenticationFailed(_('Invalid Authorization header.'))
 
         token = auth[1].decode('utf-8')
+        empresa = _principais.get(token, _AUSENTE)
+        record_cache('auth_principal', empresa is not _AUSENTE)
+        if empresa is _AUSENTE:
+            empresa = self._resolver(token)
+        if empresa is None:
+            return None
+
+        # Cópia por requisição: a instância em cache é compartilhada entre threads
+        principal = EmpresaPrincipal(copy.copy(empresa))
+        return (principal, token)
+
+    def _resolver(self, token: str) -> Optional[MinhaEmpresa]:
+        """Valida o token e carrega a empresa; guarda o resultado até o 'exp' do token."""
         try:
-            backend = TokenBackend(algorithm='HS256', signing_key=settings.SECRET_KEY)
-            payload = backend.decode(token, verify=True)
+            payload = _token_backend(settings.SECRET_KEY).decode(token, verify=True)
         except Exception:
             # Not our token format; let other authenticators try
             return None
 
         emp_uuid = payload.get('emp_uuid')
         emp_cnpj = payload.get('emp_cnpj')
-        if not emp_uuid or not emp_cnpj:
-            return None
-
-        try:
-            empresa = MinhaEmpresa.objects.get(uuid=emp_uuid, cnpj=emp_cnpj)
-        except MinhaEmpresa.DoesNotExist:
-            raise exceptions.AuthenticationFailed(_('Empresa inválida'))
+        # Uma invalidação durante a leitura muda a geração: o resultado já pode estar velho
+        geracao = _principais.geracao
+        empresa = None
+        if emp_uuid and emp_cnpj:
+            try:
+                empresa = MinhaEmpresa.objects.get(uuid=emp_uuid, cnpj=emp_cnpj, dt_exclusao__isnull=True)
+            except MinhaEmpresa.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Empresa inválida'))
 
-        principal = EmpresaPrincipal(empresa)
-        return (principal, token)
+        if settings.AUTH_PRINCIPAL_CACHE_TTL and geracao == _principais.geracao:
+            _escutar_invalidacoes()
+            ttl = min(settings.AUTH_PRINCIPAL_CACHE_TTL, payload.get('exp', 0) - time.time())
+            _principais.set(token, empresa, ttl=ttl)
+        return empresa
@@ -0,0 +1,48 @@
+import os
+
+from django.http import HttpResponse
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+
+
+class FilaJobsCollector:
+    """Series derived from the database at scrape time (same value for every worker)."""
+
+    def collect(self):
+        from apps.processamento.selectors import get_resumo_fila
+
+        resumo = get_resumo_fila()
+
+        jobs = GaugeMetricFamily('gestao_jobs', 'Jobs de processamento por status', labels=['status'])
+        for status, total in sorted(resumo['por_status'].items()):
+            jobs.add_metric([status], total)
+        yield jobs
+
+        yield GaugeMetricFamily(
+            'gestao_jobs_queue_lag_seconds',
+            'Idade do job PENDENTE mais antigo (0 quando a fila está vazia)',
+            value=resumo['lag_pendente_segundos'],
+        )
+
+
+def metrics(request):
+    """Prometheus exposition endpoint.
+    - With PROMETHEUS_MULTIPROC_DIR set, aggregates every gunicorn/celery process
+      that wrote to the shared directory; otherwise exposes this process only.
+    - Queue series come straight from the DB, so a failing DB returns 503.
+    """
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    fila = CollectorRegistry()
+    fila.register(FilaJobsCollector())
+    try:
+        output = generate_latest(registry) + generate_latest(fila)
+    except Exception as exc:  # pragma: no cover
+        return HttpResponse(f"# metrics unavailable: {str(exc)[:300]}\n", status=503, content_type='text/plain')
+
+    return HttpResponse(output, content_type=CONTENT_TYPE_LATEST)
@@ -1,5 +1,19 @@
+import logging
 import re
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from apps.core.metrics import HTTP_DB_QUERIES, HTTP_REQUEST_DURATION
+from apps.core.queries import record_context_queries, record_queries
+
+logger = logging.getLogger(__name__)
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return (match.view_name or match._func_path) if match else 'unmatched'
 
 
 class ApiVersionFallbackMiddleware:
@@ -40,3 +54,86 @@ class ApiVersionFallbackMiddleware:
 
         response = self.get_response(request)
         return response
+
+
+class PrometheusMetricsMiddleware:
+    """
+    Records request latency and the number of SQL queries per request,
+    labelled by the resolved URL name (one series per DRF view/action).
+
+    Requests that don't resolve to a view are grouped under "unmatched" to
+    keep label cardinality bounded. The /metrics endpoint itself is skipped.
+
+    Async-capable: under ASGI a sync-only middleware here would run the whole
+    request (long-poll included) in Django's single sync thread. In async mode
+    queries are counted per context, following sync views and the async ORM
+    into the threads where they run.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        with record_queries() as queries:
+            response = self.get_response(request)
+        return self._observe(request, response, time.perf_counter() - start, queries.count)
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        with record_context_queries() as queries:
+            response = await self.get_response(request)
+        return self._observe(request, response, time.perf_counter() - start, queries.count)
+
+    def _observe(self, request, response, elapsed, query_count):
+        view = _view_name(request)
+        if view == 'metrics':
+            return response
+
+        HTTP_REQUEST_DURATION.labels(
+            view=view, method=request.method, status=response.status_code,
+        ).observe(elapsed)
+        HTTP_DB_QUERIES.labels(view=view).observe(query_count)
+        return response
+
+
+class QueryCountMiddleware:
+    """
+    Opt-in N+1 detector (settings.QUERY_INSPECTOR_ENABLED).
+
+    Records every SQL query of the request and logs a warning when the request
+    runs more than QUERY_INSPECTOR_MAX_QUERIES queries or repeats the same
+    normalized query more than QUERY_INSPECTOR_MAX_DUPLICATES times. The totals
+    are also returned in the X-DB-Query-Count / X-DB-Query-Time-Ms headers.
+
+    Sync-only: under ASGI it holds a thread for the whole request, long-poll
+    included, so keep it to debugging sessions.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_INSPECTOR_ENABLED', False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.max_queries = getattr(settings, 'QUERY_INSPECTOR_MAX_QUERIES', 50)
+        self.max_duplicates = getattr(settings, 'QUERY_INSPECTOR_MAX_DUPLICATES', 5)
+
+    def __call__(self, request):
+        with record_queries() as queries:
+            response = self.get_response(request)
+
+        response['X-DB-Query-Count'] = str(queries.count)
+        response['X-DB-Query-Time-Ms'] = f"{queries.total_time * 1000:.1f}"
+
+        duplicates = queries.duplicates(min_count=self.max_duplicates + 1)
+        if queries.count > self.max_queries or duplicates:
+            logger.warning(
+                "QUERIES: %s %s (%s) excedeu o limite: %s",
+                request.method, request.path, _view_name(request), queries.summary(),
+            )
+        return response
@@ -28,6 +28,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First so latency covers the whole middleware stack
+    'backend.middleware.PrometheusMetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     # Ensure CommonMiddleware comes after CorsMiddleware
     'django.middleware.security.SecurityMiddleware',
@@ -37,8 +39,15 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Only active with QUERY_INSPECTOR_ENABLED=True
+    'backend.middleware.QueryCountMiddleware',
 ]
 
+# N+1 detection: logs requests above the query budget (see QueryCountMiddleware)
+QUERY_INSPECTOR_ENABLED = config('QUERY_INSPECTOR_ENABLED', default=False, cast=bool)
+QUERY_INSPECTOR_MAX_QUERIES = config('QUERY_INSPECTOR_MAX_QUERIES', default=50, cast=int)
+QUERY_INSPECTOR_MAX_DUPLICATES = config('QUERY_INSPECTOR_MAX_DUPLICATES', default=5, cast=int)
+
 ROOT_URLCONF = 'backend.urls'
 
 TEMPLATES = [
@@ -99,6 +108,19 @@ MEDIA_ROOT = BASE_DIR / 'media'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Caches. 'dashboard' is shared by web and worker processes (file backend on a
+# shared volume by default), since invalidations come from the worker; see apps/dashboard/cache.py
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'dashboard': {
+        'BACKEND': config('DASHBOARD_CACHE_BACKEND', default='django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': config('DASHBOARD_CACHE_LOCATION', default='/tmp/gestao_cache/dashboard'),
+        'TIMEOUT': config('DASHBOARD_CACHE_TIMEOUT', cast=int, default=900),
+    },
+}
 # DRF / JWT
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
@@ -108,7 +130,8 @@ REST_FRAMEWORK = {
     # 'DEFAULT_PERMISSION_CLASSES': (
     #     'rest_framework.permissions.IsAuthenticated',
     # ),
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    # Cursor (keyset) pagination: no COUNT(*)/OFFSET; see apps/core/pagination.py
+    'DEFAULT_PAGINATION_CLASS': 'apps.core.pagination.KeysetPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_RENDERER_CLASSES': (
         'rest_framework.renderers.JSONRenderer',
@@ -118,6 +141,19 @@ REST_FRAMEWORK = {
 SIMPLE_JWT = {
     'SIGNING_KEY': SECRET_KEY,
 }
+# Cache por processo de token -> empresa em EmpresaJWTAuthentication (0 = desligado); invalidado
+# em todos os processos ao salvar/excluir a empresa, e nunca além do 'exp' do token
+AUTH_PRINCIPAL_CACHE_TTL = config('AUTH_PRINCIPAL_CACHE_TTL', cast=int, default=300)
+AUTH_PRINCIPAL_CACHE_SIZE = config('AUTH_PRINCIPAL_CACHE_SIZE', cast=int, default=4096)
+# Cache por processo de CNPJ -> parceiro/empresa (apps/core/cache_local.py; 0 = desligado),
+# invalidado em todos os processos ao gravar o parceiro/empresa
+CNPJ_CACHE_TTL = config('CNPJ_CACHE_TTL', cast=int, default=600)
+CNPJ_CACHE_SIZE = config('CNPJ_CACHE_SIZE', cast=int, default=10000)
+# Linhas (baldes) por tipo em dashboard_metricas_financeiras: transações concorrentes atualizam
+# baldes diferentes em vez de disputar uma única linha por tipo; a leitura soma os baldes
+METRICAS_FINANCEIRAS_BALDES = config('METRICAS_FINANCEIRAS_BALDES', cast=int, default=16)
+# Idem para movimento_resumo_diario: baldes por (empresa, dia, tipo), somados pelo calendário
+RESUMO_DIARIO_BALDES = config('RESUMO_DIARIO_BALDES', cast=int, default=16)
 
 
 # CORS configuration
@@ -157,6 +193,69 @@ CELERY_TASK_ACKS_LATE = config('CELERY_TASK_ACKS_LATE', cast=bool, default=True)
 CELERY_TASK_TIME_LIMIT = config('CELERY_TASK_TIME_LIMIT', cast=int, default=600)  # hard limit 10m
 CELERY_TASK_SOFT_TIME_LIMIT = config('CELERY_TASK_SOFT_TIME_LIMIT', cast=int, default=540)  # soft 9m
 
+# Observers 'async' (notificações, alertas) são entregues após o commit, em lotes,
+# por um consumidor em background; False = todos síncronos. See apps/core/event_bus.py
+EVENT_BUS_ENABLED = config('EVENT_BUS_ENABLED', cast=bool, default=True)
+EVENT_BUS_BATCH_SIZE = config('EVENT_BUS_BATCH_SIZE', cast=int, default=100)
+EVENT_BUS_FLUSH_INTERVAL = config('EVENT_BUS_FLUSH_INTERVAL', cast=float, default=0.5)
+
+# Push (Expo). EXPO_PUSH_URL pode apontar para o stub local (apps/notifications/push_stub.py)
+EXPO_PUSH_URL = config('EXPO_PUSH_URL', default='https://exp.host/--/api/v2/push/send')
+EXPO_ACCESS_TOKEN = config('EXPO_ACCESS_TOKEN', default='')
+PUSH_TIMEOUT = config('PUSH_TIMEOUT', cast=float, default=10)
+PUSH_MAX_ATTEMPTS = config('PUSH_MAX_ATTEMPTS', cast=int, default=4)
+# Recibos (getReceipts; padrão: ao lado de EXPO_PUSH_URL), consultados este tanto de segundos após o envio
+EXPO_RECEIPTS_URL = config('EXPO_RECEIPTS_URL', default='')
+PUSH_RECEIPTS_DELAY = config('PUSH_RECEIPTS_DELAY', cast=int, default=900)
+
+# Long-poll/SSE (apps/core/pubsub.py): conexão dedicada em LISTEN por processo web
+PUBSUB_LISTEN_ENABLED = config('PUBSUB_LISTEN_ENABLED', cast=bool, default=True)
+# Segundos que GET /api/notifications/pending/wait/ segura a requisição (máximo abaixo do proxy_read_timeout do nginx)
+LONG_POLL_TIMEOUT = config('LONG_POLL_TIMEOUT', cast=float, default=25)
+LONG_POLL_TIMEOUT_MAX = config('LONG_POLL_TIMEOUT_MAX', cast=float, default=55)
+# Threads (cada uma com sua conexão persistente) que consultam o banco pelas esperas de long-poll e SSE, por processo
+LONG_POLL_DB_THREADS = config('LONG_POLL_DB_THREADS', cast=int, default=4)
+# SSE de status dos jobs (GET /api/jobs/stream/): keep-alive, duração máxima antes de o cliente reconectar
+SSE_HEARTBEAT = config('SSE_HEARTBEAT', cast=float, default=15)
+SSE_MAX_DURATION = config('SSE_MAX_DURATION', cast=float, default=300)
+SSE_RETRY_MS = config('SSE_RETRY_MS', cast=int, default=3000)
+
+# Retenção de notificações entregues (apps/notifications/repositories.py); 0 = manter tudo
+NOTIFICATIONS_RETENTION_DAYS = config('NOTIFICATIONS_RETENTION_DAYS', cast=int, default=90)
+# True = move para notifications_notification_arquivo; False = só exclui
+NOTIFICATIONS_RETENTION_ARCHIVE = config('NOTIFICATIONS_RETENTION_ARCHIVE', cast=bool, default=True)
+NOTIFICATIONS_RETENTION_BATCH = config('NOTIFICATIONS_RETENTION_BATCH', cast=int, default=5000)
+# Lotes por execução (0 = até esgotar); limita a duração abaixo do CELERY_TASK_SOFT_TIME_LIMIT
+NOTIFICATIONS_RETENTION_MAX_BATCHES = config('NOTIFICATIONS_RETENTION_MAX_BATCHES', cast=int, default=200)
+
+# Particionamento por data (apps/core/particionamento.py): tabela -> (coluna, 'mes' | 'ano').
+# A conversão é feita uma vez pelo comando 'particoes converter'; a task mantém as partições futuras
+PARTICIONAMENTO = {
+    'movimento_lancamentos_financeiros': ('lcf_data_vencimento', 'mes'),
+    'movimento_notas_fiscais': ('ntf_data_emissao', 'mes'),
+}
+PARTICIONAMENTO_MESES_ADIANTE = config('PARTICIONAMENTO_MESES_ADIANTE', cast=int, default=3)
+
+# Periodic tasks (celery beat)
+CELERY_BEAT_SCHEDULE = {
+    'atualizar-dashboard': {
+        'task': 'apps.dashboard.tasks.atualizar_dashboard_task',
+        'schedule': config('DASHBOARD_REFRESH_SECONDS', cast=int, default=300),
+    },
+    'reconciliar-metricas-financeiras': {
+        'task': 'apps.dashboard.tasks.reconciliar_metricas_financeiras_task',
+        'schedule': config('METRICAS_RECONCILIACAO_SECONDS', cast=int, default=3600),
+    },
+    'reter-notificacoes': {
+        'task': 'apps.notifications.tasks.aplicar_retencao_notificacoes_task',
+        'schedule': config('NOTIFICATIONS_RETENTION_SECONDS', cast=int, default=3600),
+    },
+    'manter-particoes': {
+        'task': 'apps.financeiro.tasks.manter_particoes_task',
+        'schedule': config('PARTICIONAMENTO_SECONDS', cast=int, default=86400),
+    },
+}
+
 # --- LOGGING SETTINGS ---
 LOGGING = {
     'version': 1,
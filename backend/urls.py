@@ -3,10 +3,12 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from .health import healthz
+from .metrics import metrics
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('healthz', healthz, name='healthz'),
+    path('metrics', metrics, name='metrics'),
     path('api/', include('apps.processamento.urls')),
     path('api/', include('apps.financeiro.urls')),
     path('api/', include('apps.dashboard.urls')),
@@ -21,6 +21,14 @@ wait_for_tcp() {
 
 wait_for_tcp "$DB_HOST" "$DB_PORT" || true
 
+if [ -n "${PROMETHEUS_MULTIPROC_DIR:-}" ]; then
+  mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+  if [ "${PROMETHEUS_MULTIPROC_RESET:-0}" = "1" ]; then
+    echo "[entrypoint] Resetting Prometheus multiprocess dir ${PROMETHEUS_MULTIPROC_DIR}..."
+    rm -f "$PROMETHEUS_MULTIPROC_DIR"/*.db
+  fi
+fi
+
 PY=$(command -v python || command -v python3)
 echo "[entrypoint] Applying migrations..."
 "$PY" manage.py migrate --noinput
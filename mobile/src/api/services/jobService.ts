@@ -76,23 +76,23 @@ export const deleteJob = async (uuid: string) => {
 
 export const listJobs = async () => {
   const res = await api.get(endpoints.listJobs);
-  return res.data as JobStatus[];
+  return (res.data as PaginatedResponse<JobStatus>).results;
 };
 
-export const listJobsPendentes = async (params?: { page?: number }) => {
-  const url = params?.page ? `${endpoints.listJobsPendentes}?page=${params.page}` : endpoints.listJobsPendentes;
+export const listJobsPendentes = async (params?: { cursor?: string }) => {
+  const url = params?.cursor ? `${endpoints.listJobsPendentes}?cursor=${encodeURIComponent(params.cursor)}` : endpoints.listJobsPendentes;
   const res = await api.get(url);
   return res.data as PaginatedResponse<JobStatus>;
 };
 
-export const listJobsConcluidos = async (params?: { page?: number }) => {
-  const url = params?.page ? `${endpoints.listJobsConcluidos}?page=${params.page}` : endpoints.listJobsConcluidos;
+export const listJobsConcluidos = async (params?: { cursor?: string }) => {
+  const url = params?.cursor ? `${endpoints.listJobsConcluidos}?cursor=${encodeURIComponent(params.cursor)}` : endpoints.listJobsConcluidos;
   const res = await api.get(url);
   return res.data as PaginatedResponse<JobStatus>;
 };
 
-export const listJobsErros = async (params?: { page?: number }) => {
-  const url = params?.page ? `${endpoints.listJobsErros}?page=${params.page}` : endpoints.listJobsErros;
+export const listJobsErros = async (params?: { cursor?: string }) => {
+  const url = params?.cursor ? `${endpoints.listJobsErros}?cursor=${encodeURIComponent(params.cursor)}` : endpoints.listJobsErros;
   const res = await api.get(url);
   return res.data as PaginatedResponse<JobStatus>;
 };
\ No newline at end of file
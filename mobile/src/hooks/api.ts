@@ -105,7 +105,7 @@ export function useJobStatus(uuid?: string) {
 const getNextPageParam = (lastPage: PaginatedResponse<JobStatus>) => {
   if (lastPage.next) {
     const url = new URL(lastPage.next);
-    return parseInt(url.searchParams.get('page') || '1');
+    return url.searchParams.get('cursor') ?? undefined;
   }
   return undefined;
 };
@@ -113,8 +113,8 @@ const getNextPageParam = (lastPage: PaginatedResponse<JobStatus>) => {
 export function useListJobsPendentes() {
   return useInfiniteQuery({
     queryKey: queryKeys.jobsPendentes,
-    queryFn: ({ pageParam = 1 }) => JobService.listJobsPendentes({ page: pageParam }),
-    initialPageParam: 1,
+    queryFn: ({ pageParam }) => JobService.listJobsPendentes({ cursor: pageParam }),
+    initialPageParam: undefined as string | undefined,
     getNextPageParam,
   });
 }
@@ -122,8 +122,8 @@ export function useListJobsPendentes() {
 export function useListJobsConcluidos() {
   return useInfiniteQuery({
     queryKey: queryKeys.jobsConcluidos,
-    queryFn: ({ pageParam = 1 }) => JobService.listJobsConcluidos({ page: pageParam }),
-    initialPageParam: 1,
+    queryFn: ({ pageParam }) => JobService.listJobsConcluidos({ cursor: pageParam }),
+    initialPageParam: undefined as string | undefined,
     getNextPageParam,
   });
 }
@@ -131,8 +131,8 @@ export function useListJobsConcluidos() {
 export function useListJobsErros() {
   return useInfiniteQuery({
     queryKey: queryKeys.jobsErros,
-    queryFn: ({ pageParam = 1 }) => JobService.listJobsErros({ page: pageParam }),
-    initialPageParam: 1,
+    queryFn: ({ pageParam }) => JobService.listJobsErros({ cursor: pageParam }),
+    initialPageParam: undefined as string | undefined,
     getNextPageParam,
   });
 }
@@ -35,17 +35,17 @@ export const MockJobService = {
     await mockDelay(300);
     return [...mockJobsDB].reverse();
   },
-  listJobsPendentes: async (params: { page: number }): Promise<PaginatedResponse<JobStatus>> => {
+  listJobsPendentes: async (params: { cursor?: string }): Promise<PaginatedResponse<JobStatus>> => {
     await mockDelay(300);
     const pendentes = mockJobsDB.filter(j => j.status.codigo === 'PENDENTE');
     return { results: pendentes, next: null, previous: null, count: pendentes.length };
   },
-  listJobsConcluidos: async (params: { page: number }): Promise<PaginatedResponse<JobStatus>> => {
+  listJobsConcluidos: async (params: { cursor?: string }): Promise<PaginatedResponse<JobStatus>> => {
     await mockDelay(300);
     const concluidos = mockJobsDB.filter(j => j.status.codigo === 'CONCLUIDO');
     return { results: concluidos, next: null, previous: null, count: concluidos.length };
   },
-  listJobsErros: async (params: { page: number }): Promise<PaginatedResponse<JobStatus>> => {
+  listJobsErros: async (params: { cursor?: string }): Promise<PaginatedResponse<JobStatus>> => {
     await mockDelay(300);
     const erros = mockJobsDB.filter(j => j.status.codigo === 'ERRO');
     return { results: erros, next: null, previous: null, count: erros.length };
@@ -1,5 +1,6 @@
 export type PaginatedResponse<T> = {
-  count: number;
+  // Ausente nas listagens com paginação por cursor
+  count?: number;
   next: string | null;
   previous: string | null;
   results: T[];